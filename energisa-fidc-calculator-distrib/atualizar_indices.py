@@ -0,0 +1,50 @@
+"""
+Atualiza o cache local de indices (data/series_indices.json).
+
+Sem argumentos, baixa as variacoes mensais do IPCA da SIDRA/IBGE (precisa de
+internet). Com ``--arquivo``, le um arquivo local, o que funciona sem rede:
+
+- CSV/Excel com colunas de periodo e valor: variacao mensal do IPCA (%) ou,
+  com ``--serie igpm``, numero-indice do IGP-M;
+- JSON no formato do cache, copiado de outra maquina.
+
+Uso:
+    python atualizar_indices.py
+    python atualizar_indices.py --arquivo ipca_mensal.csv
+    python atualizar_indices.py --arquivo igpm.xlsx --serie igpm
+    python atualizar_indices.py --arquivo series_indices.json
+"""
+
+import argparse
+import sys
+
+from utils.provedor_indices import SERIES_SUPORTADAS, obter_provedor_indices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--arquivo', help='arquivo local (csv, xlsx, xls ou json) em vez da SIDRA')
+    parser.add_argument('--serie', choices=SERIES_SUPORTADAS, default='ipca',
+                        help='serie contida no arquivo csv/excel (padrao: ipca)')
+    args = parser.parse_args(argv)
+
+    provedor = obter_provedor_indices()
+    try:
+        if args.arquivo:
+            atualizadas = provedor.atualizar_de_arquivo(args.arquivo, args.serie)
+        else:
+            atualizadas = {'ipca': provedor.atualizar_da_sidra()}
+    except Exception as e:
+        print(f"Falha na atualizacao: {e}")
+        return 1
+
+    descricao = provedor.descricao()
+    for nome in atualizadas:
+        info = descricao[nome]
+        print(f"{nome}: {info['inicio']} a {info['fim']} ({atualizadas[nome]} periodos) - {info['fonte']}")
+    print(f"Cache: {provedor.caminho}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
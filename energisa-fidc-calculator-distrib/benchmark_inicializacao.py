@@ -0,0 +1,111 @@
+"""
+Benchmark de partida a frio do app (importacoes + objetos criados por pagina).
+
+Cada medicao roda em um processo Python novo, como o primeiro acesso ao
+servidor do Streamlit: importa os modulos das paginas e do app v2 e cria
+os objetos que toda pagina cria (ParametrosCorrecao, MapeadorCampos,
+CalculadorCorrecao).
+
+Falha (codigo de saida 1) se:
+- a mediana do tempo de partida passar do limite (``--limite``, em segundos);
+- algum modulo pesado que deve ser importado sob demanda (sidrapy, bs4,
+  openpyxl, xlsxwriter, requests) for carregado na partida.
+
+Uso:
+    python benchmark_inicializacao.py
+    python benchmark_inicializacao.py --limite 3.5 --repeticoes 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PASTA_APP = Path(__file__).resolve().parent
+LIMITE_SEGUNDOS_PADRAO = 4.0
+REPETICOES_PADRAO = 3
+# Modulos que a partida nao deve carregar (cada um tem importacao adiada no codigo)
+MODULOS_SOB_DEMANDA = ('sidrapy', 'bs4', 'openpyxl', 'xlsxwriter', 'requests')
+PAGINAS = ('2_Carregamento.py', '3_Mapeamento.py', '4_Correcao.py')
+
+_SCRIPT_PARTIDA = r"""
+import importlib.util, json, sys, time
+inicio = time.perf_counter()
+sys.path.insert(0, {pasta_app!r})
+sys.path.insert(0, {pasta_v2!r})
+
+import utils.auto_export_resultado  # importado pelo main.py
+for pagina in {paginas!r}:
+    spec = importlib.util.spec_from_file_location("pagina_" + pagina[0], {pasta_paginas!r} + "/" + pagina)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+import engine  # app v2
+importacoes = time.perf_counter() - inicio
+
+from utils.parametros_correcao import ParametrosCorrecao
+from utils.mapeador_campos import MapeadorCampos
+from utils.calculador_correcao import CalculadorCorrecao
+params = ParametrosCorrecao()
+MapeadorCampos(params)
+CalculadorCorrecao(params)
+total = time.perf_counter() - inicio
+
+print(json.dumps({{
+    "importacoes": importacoes,
+    "total": total,
+    "modulos": sorted(nome.split(".")[0] for nome in sys.modules),
+}}))
+"""
+
+
+def medir_partida() -> dict:
+    """Uma partida a frio em um processo novo: tempos e modulos carregados."""
+    script = _SCRIPT_PARTIDA.format(
+        pasta_app=str(PASTA_APP),
+        pasta_v2=str(PASTA_APP / 'v2'),
+        pasta_paginas=str(PASTA_APP / 'pages'),
+        paginas=PAGINAS,
+    )
+    processo = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=PASTA_APP, capture_output=True, text=True,
+    )
+    if processo.returncode != 0:
+        ultima_linha = (processo.stderr.strip().splitlines() or ['sem saida'])[-1]
+        raise RuntimeError(f"a partida falhou: {ultima_linha}")
+    # Streamlit fora do servidor escreve avisos; o JSON e a ultima linha
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limite', type=float, default=LIMITE_SEGUNDOS_PADRAO,
+                        help='tempo maximo (mediana) da partida, em segundos')
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO)
+    args = parser.parse_args(argv)
+
+    try:
+        medicoes = [medir_partida() for _ in range(max(args.repeticoes, 1))]
+    except RuntimeError as e:
+        print(f"REGRESSAO: {e}")
+        return 1
+    importacoes = statistics.median(medicao['importacoes'] for medicao in medicoes)
+    total = statistics.median(medicao['total'] for medicao in medicoes)
+    carregados = sorted(set(MODULOS_SOB_DEMANDA) & set(medicoes[0]['modulos']))
+
+    print(f"Partida a frio (mediana de {len(medicoes)}): {total:.2f}s "
+          f"(importacoes {importacoes:.2f}s, objetos {total - importacoes:.2f}s) - limite {args.limite:.2f}s")
+
+    falhas = []
+    if total > args.limite:
+        falhas.append(f"partida em {total:.2f}s acima do limite de {args.limite:.2f}s")
+    if carregados:
+        falhas.append(f"modulos sob demanda carregados na partida: {', '.join(carregados)}")
+    for falha in falhas:
+        print(f"REGRESSAO: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
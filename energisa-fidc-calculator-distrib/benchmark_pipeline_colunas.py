@@ -0,0 +1,144 @@
+"""
+Benchmark das etapas de correcao (PipelineColunas): tempo, copias de
+DataFrame e MB copiados por etapa, em uma carteira sintetica.
+
+A contagem de copias troca ``pd.DataFrame.copy`` no processo inteiro
+enquanto mede; por isso ``contar_copias`` vive aqui e nao no runtime do app
+(o ProfilerPipeline recebe o contador por parametro).
+
+Falha (codigo de saida 1) se alguma etapa do pipeline padrao fizer copias
+profundas alem da copia de entrada (``--max-copias``).
+
+Uso:
+    python benchmark_pipeline_colunas.py
+    python benchmark_pipeline_colunas.py --registros 500000 --voltz
+"""
+
+import argparse
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.calculador_aging import CalculadorAging
+from utils.calculador_correcao import CalculadorCorrecao
+from utils.parametros_correcao import ParametrosCorrecao
+from utils.pipeline_colunas import ProfilerPipeline
+
+REGISTROS_PADRAO = 200_000
+MAX_COPIAS_PADRAO = 0
+DATA_BASE = datetime(2025, 4, 30)
+
+
+class ContadorCopias:
+    """Conta chamadas a DataFrame.copy(deep=True) e os bytes copiados."""
+
+    def __init__(self):
+        self.copias = 0
+        self.bytes_copiados = 0
+
+    def registrar(self, df: pd.DataFrame) -> None:
+        self.copias += 1
+        self.bytes_copiados += int(df.memory_usage(index=True, deep=False).sum())
+
+
+_contadores_ativos = []
+_copy_original = pd.DataFrame.copy
+
+
+def _copy_contado(self, deep=True):
+    if deep:
+        for contador in _contadores_ativos:
+            contador.registrar(self)
+    return _copy_original(self, deep=deep)
+
+
+@contextmanager
+def contar_copias():
+    """
+    Conta as copias profundas de DataFrame feitas dentro do contexto. Troca
+    ``pd.DataFrame.copy`` no processo inteiro: uso so neste benchmark, com
+    uma unica thread.
+    """
+    if threading.active_count() > 1:
+        raise RuntimeError("contar_copias instrumenta o processo inteiro; rode o benchmark sem outras threads")
+    contador = ContadorCopias()
+    if not _contadores_ativos:
+        pd.DataFrame.copy = _copy_contado
+    _contadores_ativos.append(contador)
+    try:
+        yield contador
+    finally:
+        _contadores_ativos.remove(contador)
+        if not _contadores_ativos:
+            pd.DataFrame.copy = _copy_original
+
+
+def carteira_sintetica(registros: int) -> pd.DataFrame:
+    """Carteira com as colunas mapeadas que o calculo de correcao usa."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "empresa": "VOLTZ",
+        "tipo": "CCB",
+        "id_padronizado": np.arange(registros).astype(str),
+        "nome_cliente": "cliente",
+        "documento": "documento",
+        "contrato": np.arange(registros),
+        "valor_principal": rng.uniform(10, 5000, registros).round(2),
+        "valor_nao_cedido": 0.0,
+        "valor_terceiro": 0.0,
+        "valor_cip": 0.0,
+        "data_vencimento": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 2500, registros), unit="D"),
+        "data_base": pd.Timestamp(DATA_BASE),
+    })
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--registros", type=int, default=REGISTROS_PADRAO)
+    parser.add_argument("--max-copias", type=int, default=MAX_COPIAS_PADRAO,
+                        help="copias profundas aceitas dentro das etapas do pipeline padrao")
+    parser.add_argument("--voltz", action="store_true", help="mede tambem o pipeline VOLTZ")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    params = ParametrosCorrecao()
+    params.data_base_padrao = DATA_BASE
+    datas = pd.date_range("2015-01-01", "2025-12-01", freq="MS")
+    calculador = CalculadorCorrecao(
+        params,
+        df_indices_igpm=pd.DataFrame({"data": datas, "indice": np.linspace(500, 1100, len(datas))}),
+        df_di_pre=pd.DataFrame({"meses_futuros": range(0, 200), "252": 12.0}),
+    )
+    df = CalculadorAging(params)._processar_aging_completo_interno(carteira_sintetica(args.registros))
+
+    profiler = ProfilerPipeline(contar_copias=contar_copias)
+    calculador.processar_correcao_completa(df, "benchmark", profiler=profiler)
+    print(f"Pipeline padrao ({args.registros:,} registros):")
+    print(profiler.resumo().to_string(index=False))
+
+    if args.voltz:
+        taxas = pd.DataFrame({
+            "Empresa": "VOLTZ", "Tipo": "CCB",
+            "Aging": ["A vencer", "Primeiro ano", "Segundo ano", "Terceiro ano", "Demais anos"],
+            "Taxa de recuperação": [0.9, 0.7, 0.5, 0.3, 0.1],
+            "Prazo de recebimento": [3, 6, 12, 18, 24],
+        })
+        profiler_voltz = ProfilerPipeline(contar_copias=contar_copias)
+        calculador.calculador_voltz.processar_correcao_voltz_completa(df, "benchmark", taxas, profiler=profiler_voltz)
+        print(f"\nPipeline VOLTZ ({args.registros:,} registros):")
+        print(profiler_voltz.resumo().to_string(index=False))
+
+    if profiler.total_copias > args.max_copias:
+        print(f"REGRESSAO: {profiler.total_copias} copia(s) nas etapas do pipeline padrao "
+              f"(limite {args.max_copias})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
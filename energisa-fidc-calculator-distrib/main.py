@@ -125,6 +125,7 @@ def main():
         if caminho_exportado:
             if novo_arquivo:
                 st.success(f"💾 Resultado final exportado automaticamente em: {caminho_exportado}")
+                st.caption(f"⏱️ Exportação Excel: {st.session_state.get('auto_export_desempenho', '')}")
             else:
                 st.info(f"💾 Última exportação automática: {caminho_exportado}")
         
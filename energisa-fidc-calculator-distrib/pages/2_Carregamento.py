@@ -3,10 +3,14 @@ Página de Carregamento - FIDC Calculator
 Upload e análise de arquivos Excel das distribuidoras
 """
 
+import time
+
 import streamlit as st
 import pandas as pd
 from datetime import datetime
 from utils.analisador_bases import AnalisadorBases
+from utils.cache_uploads import ler_com_hash
+from utils.carregamento_paralelo import CargaPlanilha, ler_amostra_planilha
 
 def show():
     """Página de Carregamento da Base"""
@@ -24,6 +28,10 @@ def show():
         st.session_state.arquivos_processados = {}
     if 'processamento_confirmado' not in st.session_state:
         st.session_state.processamento_confirmado = False
+    if 'hashes_arquivos' not in st.session_state:
+        st.session_state.hashes_arquivos = {}  # nome do arquivo -> hash do conteúdo
+    if 'uploads_vistos' not in st.session_state:
+        st.session_state.uploads_vistos = set()
     
     # Estilos personalizados para o uploader
     st.markdown(
@@ -45,12 +53,30 @@ def show():
         help="Você pode carregar múltiplos arquivos Excel. Cada um será processado individualmente."
     )
     
-    # Armazenar arquivos carregados (sem processar ainda)
+    # Armazenar arquivos carregados (sem processar ainda). Cada upload é avaliado
+    # uma vez; o conteúdo (hash) decide se é arquivo novo, repetido ou substituto.
     if uploaded_files:
         for uploaded_file in uploaded_files:
-            if uploaded_file.name not in st.session_state.arquivos_para_processar:
-                st.session_state.arquivos_para_processar[uploaded_file.name] = uploaded_file
-                st.success(f"✅ Arquivo adicionado: {uploaded_file.name}")
+            identificador = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+            if identificador in st.session_state.uploads_vistos:
+                continue
+            st.session_state.uploads_vistos.add(identificador)
+            
+            nome_arquivo = uploaded_file.name
+            _, hash_conteudo = ler_com_hash(uploaded_file)
+            hash_anterior = st.session_state.hashes_arquivos.get(nome_arquivo)
+            if hash_anterior == hash_conteudo:
+                continue
+            
+            if hash_anterior is not None:
+                # Mesmo nome, conteúdo novo (ex.: base do mês seguinte): descarta a leitura e o mapeamento antigos
+                st.session_state.arquivos_processados.pop(nome_arquivo, None)
+                st.session_state.get('mapeamentos_finais', {}).pop(nome_arquivo, None)
+                st.info(f"🔁 Arquivo substituído (conteúdo diferente): {nome_arquivo}")
+            else:
+                st.success(f"✅ Arquivo adicionado: {nome_arquivo}")
+            st.session_state.arquivos_para_processar[nome_arquivo] = uploaded_file
+            st.session_state.hashes_arquivos[nome_arquivo] = hash_conteudo
     
     # Mostrar arquivos aguardando processamento
     if st.session_state.arquivos_para_processar:
@@ -70,61 +96,80 @@ def show():
     # Processar arquivos após confirmação
     if st.session_state.processamento_confirmado and st.session_state.arquivos_para_processar:
         
-        with st.spinner("🔄 Processando e analisando arquivos Excel..."):
-            # Inicializar analisador
-            if 'analisador' not in st.session_state:
-                analisador = AnalisadorBases(st.session_state.params)
-                st.session_state.analisador = analisador
-            
-            # Processar cada arquivo
-            for nome_arquivo, uploaded_file in st.session_state.arquivos_para_processar.items():
-                if nome_arquivo not in st.session_state.arquivos_processados:
-                    try:
-                        st.write(f"🔄 Processando {nome_arquivo}...")
-                        
-                        # Carregar e processar arquivo
-                        df = st.session_state.analisador.carregar_base_excel(uploaded_file, nome_arquivo)
-                        
-                        if not df.empty:
-                            # Calcular valor total se possível
-                            valor_total = 0
-                            for col in df.columns:
-                                if any(termo in col.lower() for termo in ['valor', 'principal', 'liquido']):
-                                    try:
-                                        valor_total = df[col].sum()
-                                        break
-                                    except:
-                                        continue
-                            
-                            # Armazenar com o nome do arquivo
-                            st.session_state.arquivos_processados[nome_arquivo] = {
-                                'dataframe': df,
-                                'registros': len(df),
-                                'colunas': len(df.columns),
-                                'nome_arquivo': nome_arquivo,
-                                'valor_total': valor_total
-                            }
-                            
-                            st.success(f"✅ {nome_arquivo} processado com sucesso!")
-                        else:
-                            st.error(f"❌ Erro ao processar {nome_arquivo}. Verifique se é um arquivo Excel válido.")
-                            
-                    except Exception as e:
-                        st.error(f"❌ Erro ao processar {nome_arquivo}: {str(e)}")
-            
-            # Limpar arquivos para processar
-            st.session_state.arquivos_para_processar = {}
-            st.session_state.processamento_confirmado = False
+        # Inicializar analisador
+        if 'analisador' not in st.session_state:
+            analisador = AnalisadorBases(st.session_state.params)
+            st.session_state.analisador = analisador
+        
+        pendentes = {
+            nome_arquivo: uploaded_file
+            for nome_arquivo, uploaded_file in st.session_state.arquivos_para_processar.items()
+            if nome_arquivo not in st.session_state.arquivos_processados
+        }
+        
+        # Fase 1: só cabeçalho + amostra de cada arquivo (não depende do tamanho).
+        # A base completa é lida em segundo plano depois que o mapeamento é confirmado.
+        progresso = st.progress(0.0, text=f"🔄 Lendo cabeçalho de {len(pendentes)} arquivo(s) Excel...")
+        resultados = {}
+        
+        inicio_leitura = time.perf_counter()
+        for posicao, (nome_arquivo, uploaded_file) in enumerate(pendentes.items(), start=1):
+            try:
+                # Arquivo já lido (mesmo conteúdo, qualquer nome ou sessão) sai do cache
+                conteudo, hash_conteudo = ler_com_hash(uploaded_file)
+                st.session_state.hashes_arquivos[nome_arquivo] = hash_conteudo
+                resultado = ler_amostra_planilha(conteudo, nome_arquivo, hash_conteudo=hash_conteudo)
+                resultados[nome_arquivo] = resultado
+                progresso.progress(
+                    posicao / len(pendentes),
+                    text=f"🔄 {posicao}/{len(pendentes)} lidos - último: {nome_arquivo} ({resultado.segundos:.2f}s)",
+                )
+                
+                if not resultado.dataframe.empty:
+                    df = resultado.dataframe
+                    
+                    # Armazenar com o nome do arquivo
+                    st.session_state.arquivos_processados[nome_arquivo] = {
+                        'dataframe': df,  # amostra: cabeçalho + primeiras linhas
+                        'amostra': True,
+                        'registros': resultado.total_linhas if resultado.total_linhas is not None else len(df),
+                        'colunas': len(df.columns),
+                        'nome_arquivo': nome_arquivo,
+                        'aba': resultado.aba,
+                        'tempo_leitura': resultado.segundos,
+                        'carga': CargaPlanilha(conteudo, nome_arquivo, resultado.aba, hash_conteudo),
+                    }
+                else:
+                    st.error(f"❌ Erro ao processar {nome_arquivo}. Verifique se é um arquivo Excel válido.")
             
+            except Exception as e:
+                st.error(f"❌ Erro ao processar {nome_arquivo}: {str(e)}")
+        tempo_total = time.perf_counter() - inicio_leitura
+        
+        st.session_state.tempos_carregamento = {
+            'arquivos': {nome: resultado.descricao() for nome, resultado in resultados.items()},
+            'total': tempo_total,
+        }
+        
+        # Limpar arquivos para processar
+        st.session_state.arquivos_para_processar = {}
+        st.session_state.processamento_confirmado = False
+        
         st.rerun()
     
+    # Tempos da última leitura
+    if st.session_state.get('tempos_carregamento'):
+        tempos = st.session_state.tempos_carregamento
+        with st.expander(f"⏱️ Leitura dos cabeçalhos: {tempos['total']:.2f}s no total", expanded=False):
+            for descricao in tempos['arquivos'].values():
+                st.write(f"• {descricao}")
+    
     # Exibir resumo dos arquivos processados
     if st.session_state.arquivos_processados:
         st.markdown("---")
         st.subheader("📋 Arquivos Processados")
         
         total_registros = 0
-        total_valor = 0
         
         for nome_arquivo, info in st.session_state.arquivos_processados.items():
             col1, col2, col3 = st.columns([2, 1, 1])
@@ -133,7 +178,12 @@ def show():
                 st.success(f"**📄 {nome_arquivo}**")
             
             with col2:
-                st.metric("📊 Registros", f"{info['registros']:,}")
+                st.metric(
+                    "📊 Registros",
+                    f"{info['registros']:,}",
+                    help="Pela dimensão da planilha; a contagem exata sai da carga completa, no mapeamento."
+                    if info.get('amostra') else None,
+                )
                 total_registros += info['registros']
             
             with col3:
@@ -219,6 +269,8 @@ def show():
                             🎯 **Tipo:** Maior data de vencimento  
                             ✅ **Registros válidos:** {coluna_preferida.get('registros_validos', 0):,} ({coluna_preferida.get('percentual_valido', 0):.1%})
                             """)
+                            if info.get('amostra'):
+                                st.caption(f"Calculada sobre a amostra de {len(df_arquivo):,} linhas lida no carregamento.")
                     
                     with col_data2:
                         st.write("**🛠️ Ajustar data base**")
@@ -5,7 +5,7 @@ Mapeamento automático e manual de campos dos arquivos
 
 import streamlit as st
 import pandas as pd
-from utils.mapeador_campos import MapeadorCampos
+from utils.mapeador_campos import MapeadorCampos, consolidar_bases_padronizadas
 
 def detectar_voltz(arquivos_processados, mapeador):
     """
@@ -32,6 +32,47 @@ def obter_campos_obrigatorios_padrao():
     """
     return ['empresa', 'tipo', 'status', 'situacao', 'nome_cliente', 'classe', 'contrato', 'valor_principal', 'valor_nao_cedido', 'valor_terceiro', 'valor_cip', 'data_vencimento']
 
+def iniciar_carga_completa(info_arquivo, mapeador, mapeamento):
+    """
+    Dispara em segundo plano a leitura da base completa, só com as colunas
+    que o mapeamento usa. Arquivos sem carga pendente (já completos) são ignorados.
+    """
+    carga = info_arquivo.get('carga')
+    if carga is not None:
+        carga.iniciar(mapeador.colunas_necessarias(info_arquivo['dataframe'].columns, mapeamento))
+    return carga
+
+def exibir_carga_completa(info_arquivo, mapeador, mapeamento):
+    """
+    Inicia a carga completa do arquivo e mostra o andamento
+    """
+    carga = iniciar_carga_completa(info_arquivo, mapeador, mapeamento)
+    if carga is None:
+        return
+    if not carga.pronta:
+        st.info(f"⏳ Carregando a base completa em segundo plano ({len(carga.colunas)} colunas mapeadas)...")
+        return
+    resultado = carga.resultado()
+    if resultado.ok:
+        st.caption(f"📥 Base completa carregada: {resultado.descricao()}")
+    else:
+        st.error(f"❌ Erro ao carregar a base completa: {resultado.erro}")
+
+def obter_base_completa(info_arquivo, mapeador, mapeamento):
+    """
+    DataFrame completo do arquivo (colunas usadas pelo mapeamento), esperando a carga
+    em segundo plano se ela ainda não terminou
+    """
+    carga = iniciar_carga_completa(info_arquivo, mapeador, mapeamento)
+    if carga is None:
+        return info_arquivo['dataframe']
+    if not carga.pronta:
+        st.info(f"⏳ Aguardando a carga completa de {info_arquivo['nome_arquivo']}...")
+    resultado = carga.resultado()
+    if not resultado.ok:
+        raise ValueError(f"{info_arquivo['nome_arquivo']}: {resultado.erro}")
+    return resultado.dataframe
+
 def show():
     """Página de Mapeamento de Campos"""
     st.header("🗺️ Mapeamento de Campos")
@@ -83,7 +124,7 @@ def show():
         # Informações do arquivo
         col1, col2 = st.columns(2)
         with col1:
-            st.info(f"📊 **Registros:** {len(df_arquivo):,}")
+            st.info(f"📊 **Registros:** {info_arquivo['registros']:,}")
         with col2:
             st.info(f"📋 **Colunas:** {len(df_arquivo.columns)}")
         
@@ -98,13 +139,21 @@ def show():
             if len(df_arquivo.columns) > 15:
                 st.caption(f"... e mais {len(df_arquivo.columns) - 15} colunas")
         
-        # Mapeamento automático para este arquivo
-        try:
-            with st.spinner(f"🔍 Analisando colunas de {nome_arquivo}..."):
-                mapeamento_auto = mapeador.criar_mapeamento_automatico(df_arquivo, nome_arquivo)
-        except Exception as e:
-            st.error(f"❌ Erro no mapeamento automático de {nome_arquivo}: {str(e)}")
-            mapeamento_auto = {}
+        # Perfil aprendido: mesmo cabeçalho já mapeado em execuções anteriores
+        perfil = mapeador.obter_perfil_mapeamento(df_arquivo, nome_arquivo)
+        if perfil is not None:
+            if nome_arquivo not in st.session_state.mapeamentos_finais:
+                st.session_state.mapeamentos_finais[nome_arquivo] = perfil
+            st.success("📌 Cabeçalho reconhecido - mapeamento salvo em execuções anteriores aplicado automaticamente")
+            mapeamento_auto = perfil
+        else:
+            # Mapeamento automático para este arquivo
+            try:
+                with st.spinner(f"🔍 Analisando colunas de {nome_arquivo}..."):
+                    mapeamento_auto = mapeador.criar_mapeamento_automatico(df_arquivo, nome_arquivo)
+            except Exception as e:
+                st.error(f"❌ Erro no mapeamento automático de {nome_arquivo}: {str(e)}")
+                mapeamento_auto = {}
         
         # Usar mapeamento salvo se existir, senão usar o automático
         if nome_arquivo in st.session_state.mapeamentos_finais:
@@ -112,29 +161,36 @@ def show():
         else:
             mapeamento_inicial = mapeamento_auto if mapeamento_auto else {}
         
+        key_suffix = f"_{nome_arquivo.replace('.', '_').replace(' ', '_')}"
+        # Com perfil reconhecido a revisão fica recolhida
+        container_mapeamento = (
+            st.expander("✏️ Revisar mapeamento", expanded=False) if perfil is not None else st.container()
+        )
+        
         try:
-            mapeamento_manual = mapeador.permitir_mapeamento_manual(
-                df_arquivo, 
-                mapeamento_inicial,
-                nome_arquivo,  # Passar nome do arquivo para detecção VOLTZ
-                key_suffix=f"_{nome_arquivo.replace('.', '_').replace(' ', '_')}"
-            )
+            # Formulário: alterar os campos não dispara rerun, só o botão de salvar
+            with container_mapeamento, st.form(key=f"form_mapeamento{key_suffix}"):
+                mapeamento_manual = mapeador.permitir_mapeamento_manual(
+                    df_arquivo, 
+                    mapeamento_inicial,
+                    nome_arquivo,  # Passar nome do arquivo para detecção VOLTZ
+                    key_suffix=key_suffix
+                )
+                salvar = st.form_submit_button("💾 Salvar Mapeamento", type="secondary")
             
-            # Botões de ação para este arquivo
-            col1, col2 = st.columns(2)
+            if salvar:
+                st.session_state.mapeamentos_finais[nome_arquivo] = mapeamento_manual
+                mapeador.salvar_perfil_mapeamento(df_arquivo, nome_arquivo, mapeamento_manual)
+                st.success(f"✅ Mapeamento salvo para {nome_arquivo}!")
+                st.rerun()
             
-            with col1:
-                if st.button(f"💾 Salvar Mapeamento", key=f"salvar_{nome_arquivo}", type="secondary"):
-                    st.session_state.mapeamentos_finais[nome_arquivo] = mapeamento_manual
-                    st.success(f"✅ Mapeamento salvo para {nome_arquivo}!")
-                    st.rerun()
-            
-            with col2:
-                # Verificar se o mapeamento está salvo
-                if nome_arquivo in st.session_state.mapeamentos_finais:
-                    st.success("✅ Mapeamento salvo")
-                else:
-                    st.warning("⏳ Mapeamento não salvo")
+            # Verificar se o mapeamento está salvo
+            if nome_arquivo in st.session_state.mapeamentos_finais:
+                st.success("✅ Mapeamento salvo")
+                # Mapeamento confirmado: a base completa (só colunas usadas) começa a ser lida
+                exibir_carga_completa(info_arquivo, mapeador, st.session_state.mapeamentos_finais[nome_arquivo])
+            else:
+                st.warning("⏳ Mapeamento não salvo")
         
         except Exception as e:
             st.error(f"❌ Erro no mapeamento manual de {nome_arquivo}: {str(e)}")
@@ -166,14 +222,23 @@ def show():
                 dataframes_padronizados = {}
                 total_registros_processados = 0
                 
+                # Cargas completas que ainda não começaram vão todas para o pool agora
+                for nome_arquivo, mapeamento_final in st.session_state.mapeamentos_finais.items():
+                    if nome_arquivo in arquivos_processados:
+                        iniciar_carga_completa(arquivos_processados[nome_arquivo], mapeador, mapeamento_final)
+                
                 for nome_arquivo, mapeamento_final in st.session_state.mapeamentos_finais.items():
                     if nome_arquivo in arquivos_processados:
-                        df_arquivo = arquivos_processados[nome_arquivo]['dataframe']
+                        info_arquivo = arquivos_processados[nome_arquivo]
+                        df_arquivo = obter_base_completa(info_arquivo, mapeador, mapeamento_final)
                         
                         # Aplicar mapeamento
                         df_padronizado = mapeador.aplicar_mapeamento(df_arquivo, mapeamento_final, nome_arquivo)
                         
                         if not df_padronizado.empty:
+                            # Mapeamento usado vira o perfil do cabeçalho para os próximos arquivos
+                            # (cabeçalho completo da amostra, não só as colunas carregadas)
+                            mapeador.salvar_perfil_mapeamento(info_arquivo['dataframe'], nome_arquivo, mapeamento_final)
                             dataframes_padronizados[nome_arquivo] = df_padronizado
                             total_registros_processados += len(df_padronizado)
                             st.success(f"✅ {nome_arquivo}: {len(df_padronizado):,} registros padronizados")
@@ -181,17 +246,14 @@ def show():
                             st.error(f"❌ Erro ao aplicar mapeamento em {nome_arquivo}")
                 
                 if dataframes_padronizados:
-                    # Combinar todos os dataframes padronizados
+                    # Combinar todos os dataframes padronizados (projeções sobre os arquivos
+                    # carregados): cópia única, coluna a coluna, já no tamanho final
+                    df_final_padronizado = consolidar_bases_padronizadas(list(dataframes_padronizados.values()))
                     if len(dataframes_padronizados) == 1:
                         # Apenas um arquivo
-                        df_final_padronizado = list(dataframes_padronizados.values())[0]
                         nome_arquivo_unico = list(dataframes_padronizados.keys())[0]
                     else:
-                        # Múltiplos arquivos - combinar
-                        df_final_padronizado = pd.concat(
-                            dataframes_padronizados.values(), 
-                            ignore_index=True
-                        )
+                        # Múltiplos arquivos
                         nome_arquivo_unico = None
                     
                     # ========== VERIFICAÇÃO DE DUPLICATAS ESPECÍFICA PARA VOLTZ ==========
@@ -14,20 +14,21 @@ from utils.calculador_correcao import CalculadorCorrecao
 from utils.calculador_valor_justo_distribuidoras import CalculadorValorJustoDistribuidoras, CalculadorValorJusto
 from utils.visualizador_voltz import VisualizadorVoltz
 from utils.visualizador_distribuidoras import VisualizadorDistribuidoras
-from utils.auto_export_resultado import exportar_resultado_final_excel
+from utils.visualizador_paginado import exibir_resultado_paginado
+from utils.auto_export_resultado import exibir_exportacao_resultado_final, iniciar_exportacao_resultado_final
 from utils.exportacao_csv_brasil import salvar_csv_brasil
+from utils.leitor_excel import ler_excel
+from utils.curva_di_pre_store import obter_store_curvas_di_pre
+from utils.eventos_streamlit import SinkStreamlit
 from utils.correcao_otimizada import (
     aplicar_correcao_monetaria_vetorizada,
-    calcular_indice_diario_vetorizado,
+    aplicar_indices_correcao,
     calcular_valor_justo_di_pre_vetorizado,
+    obter_index_curve,
     otimizar_curva_di_pre,
 )
 
 # Importar classe de valor justo do app original
-import requests
-from dateutil.relativedelta import relativedelta
-from openpyxl import load_workbook
-from io import BytesIO
 
 class CalculadorIndicesEconomicos:
     """
@@ -41,282 +42,44 @@ class CalculadorIndicesEconomicos:
     
     def carregar_indices_do_excel(self, arquivo_excel, aba_especifica=None):
         """
-        Carrega dados de IGP-M/IPCA do arquivo Excel usando openpyxl para maior robustez.
+        Carrega dados de IGP-M/IPCA do arquivo Excel (leitor compartilhado com o v2).
         Suporta duas estruturas:
         1. Aba IGPM_IPCA: Coluna C (Ano), Coluna D (Mês) e Coluna F (Índice IGP-M)
         2. Aba IGPM: Coluna A (Mês/Ano), Coluna B (Índice)
         
+        O arquivo é lido uma única vez (todas as abas) e fica em cache pelo
+        hash do conteúdo: carregar a outra aba do mesmo arquivo não relê o Excel.
+        
         Parâmetros:
         - arquivo_excel: arquivo Excel para carregar
         - aba_especifica: nome específico da aba (para VOLTZ usar "IGPM")
         """
         try:
-            import pandas as pd
-            import streamlit as st
-            import numpy as np
-            from datetime import datetime
-            from openpyxl import load_workbook
-            from io import BytesIO
-            
-            print("🔄 Carregando índices do arquivo Excel com openpyxl...")
-            
-            # ===== PREPARAR ARQUIVO PARA OPENPYXL =====
-            if hasattr(arquivo_excel, 'read'):
-                # Se é um objeto file, ler bytes
-                if hasattr(arquivo_excel, 'seek'):
-                    arquivo_excel.seek(0)  # Voltar para o início
-                arquivo_bytes = BytesIO(arquivo_excel.read())
-            else:
-                arquivo_bytes = arquivo_excel
-            
-            # ===== CARREGAR WORKBOOK COM OPENPYXL =====
-            try:
-                workbook = load_workbook(arquivo_bytes, data_only=True, read_only=True)
-                print(f"📊 Workbook carregado. Abas disponíveis: {workbook.sheetnames}")
-            except Exception as e:
-                print(f"❌ Erro ao carregar workbook: {e}")
-                st.error(f"Erro ao abrir arquivo Excel: {e}")
-                return None
-            
-            # ===== DETERMINAR QUAL ABA USAR =====
-            if aba_especifica:
-                if aba_especifica in workbook.sheetnames:
-                    sheet_name = aba_especifica
-                    print(f"✅ Aba específica '{aba_especifica}' encontrada")
-                else:
-                    print(f"⚠️ Aba '{aba_especifica}' não encontrada. Abas disponíveis: {workbook.sheetnames}")
-                    # Tentar primeira aba como fallback
-                    sheet_name = workbook.sheetnames[0]
-                    print(f"📊 Usando primeira aba como fallback: '{sheet_name}'")
-            else:
-                # Usar primeira aba
-                sheet_name = workbook.sheetnames[0]
-                print(f"📊 Usando primeira aba: '{sheet_name}'")
-            
-            # ===== CARREGAR DADOS DA ABA SELECIONADA =====
-            try:
-                worksheet = workbook[sheet_name]
-                print(f"📊 Aba '{sheet_name}' carregada com {worksheet.max_row} linhas e {worksheet.max_column} colunas")
-                
-                # Converter worksheet para lista de listas para processamento
-                dados_brutos = []
-                for row in worksheet.iter_rows(values_only=True):
-                    dados_brutos.append(list(row))
-                
-                # Criar DataFrame a partir dos dados brutos
-                df_completo = pd.DataFrame(dados_brutos)
-                
-                # Remover linhas completamente vazias
-                df_completo = df_completo.dropna(how='all').reset_index(drop=True)
-                
-                print(f"📊 Dados extraídos: {df_completo.shape[0]} linhas e {df_completo.shape[1]} colunas (após limpeza)")
-                
-            except Exception as e:
-                print(f"❌ Erro ao ler aba '{sheet_name}': {e}")
-                st.error(f"Erro ao ler aba '{sheet_name}': {e}")
-                return None
-            finally:
-                workbook.close()
-            
-            # ===== DETECTAR E PROCESSAR ESTRUTURA DOS DADOS =====
-            if aba_especifica == "IGPM":
-                print("📊 Processando estrutura IGPM - Colunas A (data) e B (índice)")
-                
-                if df_completo.shape[1] < 2:
-                    raise ValueError(f"Aba IGPM tem apenas {df_completo.shape[1]} colunas, mas precisa de pelo menos 2 (A-B)")
-                
-                # Extrair colunas A (0) e B (1) - Data e Índice
-                df = df_completo.iloc[:, [0, 1]].copy()
-                df.columns = ['data_excel', 'indice']
-                
-                # Remover linhas com dados nulos
-                df = df.dropna(subset=['data_excel']).copy()
-                
-                print(f"📊 Dados extraídos: {len(df)} linhas com data_excel e índice")
-                
-                # ===== PROCESSAR DIFERENTES FORMATOS DE DATA =====
-                df['ano'] = None
-                df['mes'] = None
-                
-                for idx, row in df.iterrows():
-                    data_valor = row['data_excel']
-                    
-                    try:
-                        # Caso 1: Data do Excel (datetime ou serial)
-                        if isinstance(data_valor, datetime):
-                            df.at[idx, 'ano'] = data_valor.year
-                            df.at[idx, 'mes'] = data_valor.month
-                            print(f"✅ Linha {idx}: Data Excel datetime - {data_valor.year}/{data_valor.month}")
-                            
-                        elif isinstance(data_valor, (int, float)):
-                            # Converter serial do Excel para datetime
-                            from datetime import timedelta
-                            # Excel epoch: 1900-01-01 (mas com bug do ano 1900)
-                            excel_epoch = datetime(1899, 12, 30)  # Correção do bug do Excel
-                            data_convertida = excel_epoch + timedelta(days=int(data_valor))
-                            df.at[idx, 'ano'] = data_convertida.year
-                            df.at[idx, 'mes'] = data_convertida.month
-                            print(f"✅ Linha {idx}: Serial Excel {data_valor} → {data_convertida.year}/{data_convertida.month}")
-                            
-                        elif isinstance(data_valor, str):
-                            # Caso 2: Formato texto "mês/ano"
-                            if '/' in str(data_valor):
-                                meses_dict = {
-                                    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6,
-                                    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
-                                }
-                                
-                                partes = str(data_valor).split('/')
-                                if len(partes) >= 2:
-                                    mes_nome = partes[0].strip().lower()
-                                    ano_str = partes[1].strip()
-                                    
-                                    if mes_nome in meses_dict:
-                                        df.at[idx, 'mes'] = meses_dict[mes_nome]
-                                        df.at[idx, 'ano'] = int(ano_str)
-                                        print(f"✅ Linha {idx}: Texto '{data_valor}' → {int(ano_str)}/{meses_dict[mes_nome]}")
-                                    else:
-                                        print(f"⚠️ Linha {idx}: Mês '{mes_nome}' não reconhecido")
-                                else:
-                                    print(f"⚠️ Linha {idx}: Formato inválido '{data_valor}'")
-                            else:
-                                # Tentar converter string para datetime
-                                try:
-                                    data_convertida = pd.to_datetime(str(data_valor), errors='raise')
-                                    df.at[idx, 'ano'] = data_convertida.year
-                                    df.at[idx, 'mes'] = data_convertida.month
-                                    print(f"✅ Linha {idx}: String '{data_valor}' → {data_convertida.year}/{data_convertida.month}")
-                                except:
-                                    print(f"⚠️ Linha {idx}: Não foi possível converter '{data_valor}'")
-                        else:
-                            print(f"⚠️ Linha {idx}: Tipo não suportado {type(data_valor)}: {data_valor}")
-                            
-                    except Exception as e:
-                        print(f"❌ Linha {idx}: Erro ao processar '{data_valor}': {e}")
-                        continue
-                
-                # Remover linhas onde não conseguimos extrair ano e mês
-                df = df.dropna(subset=['ano', 'mes']).copy()
-                df['ano'] = df['ano'].astype(int)
-                df['mes'] = df['mes'].astype(int)
-                
-                print(f"📊 Processamento IGPM: {len(df)} registros com data válida")
-                
-            else:
-                print("📊 Processando estrutura IGPM_IPCA - Colunas C (ano), D (mês) e F (índice)")
-                
-                # Verificar se tem pelo menos 6 colunas (A até F)
-                if df_completo.shape[1] < 6:
-                    raise ValueError(f"Estrutura IGPM_IPCA tem apenas {df_completo.shape[1]} colunas, mas precisa de pelo menos 6 (A-F)")
-                
-                # Extrair colunas C (2), D (3) e F (5) - Ano, Mês e Índice IGP-M
-                df = df_completo.iloc[:, [2, 3, 5]].copy()
-                df.columns = ['ano', 'mes', 'indice']
-            
-            # ===== PADRONIZAR COLUNAS PARA ['ano', 'mes', 'indice'] =====
-            if 'data_excel' in df.columns:
-                # Para estrutura IGPM, já processamos e temos ano, mes, indice
-                df = df[['ano', 'mes', 'indice']].copy()
-            elif 'mes_ano' in df.columns:
-                # Fallback para formato antigo (se ainda existir)
-                df = df[['ano', 'mes', 'indice']].copy()
-            
-            print(f"📊 Dados padronizados - ano, mês e índice extraídos")
-            
-            # ===== LIMPEZA E VALIDAÇÃO DOS DADOS =====
-            # Limpar dados nulos
-            df_original_len = len(df)
-            df = df.dropna().copy()
-            print(f"📊 Removidas {df_original_len - len(df)} linhas com valores nulos")
-            
-            # Processar colunas de ano e mês
-            print("🔄 Processando e validando colunas de ano e mês...")
-            
-            # Converter ano e mês para inteiros com tratamento robusto
-            try:
-                df['ano'] = pd.to_numeric(df['ano'], errors='coerce').astype('Int64')
-                df['mes'] = pd.to_numeric(df['mes'], errors='coerce').astype('Int64')
-                
-                print(f"📊 Conversão bem-sucedida - Anos: {sorted(df['ano'].dropna().unique())[:5]}...")
-                print(f"📊 Meses únicos: {sorted(df['mes'].dropna().unique())}")
-                
-            except Exception as conv_error:
-                print(f"⚠️ Erro na conversão padrão: {conv_error}")
-                # Tentativa de conversão manual mais robusta
-                df['ano'] = df['ano'].astype(str).str.extract(r'(\d{4})')[0].astype(float).astype('Int64')
-                df['mes'] = df['mes'].astype(str).str.extract(r'(\d{1,2})')[0].astype(float).astype('Int64')
-                print("✅ Conversão manual aplicada com sucesso")
-            
-            # Remover linhas com ano/mês inválidos
-            df_limpo = df.dropna(subset=['ano', 'mes']).copy()
-            
-            # Validar valores de ano e mês
-            mask_ano_valido = (df_limpo['ano'] >= 1990) & (df_limpo['ano'] <= 2030)
-            mask_mes_valido = (df_limpo['mes'] >= 1) & (df_limpo['mes'] <= 12)
-            
-            df_filtrado = df_limpo[mask_ano_valido & mask_mes_valido].copy()
-            
-            if len(df_filtrado) == 0:
-                raise ValueError("Nenhuma data válida encontrada após validação")
-            
-            print(f"📊 {len(df_filtrado)} registros com ano/mês válidos")
-            
-            # ===== CRIAR COLUNA DE DATA =====
-            try:
-                df_filtrado['data'] = pd.to_datetime(
-                    df_filtrado['ano'].astype(str) + '-' + df_filtrado['mes'].astype(str).str.zfill(2) + '-01',
-                    format='%Y-%m-%d'
-                )
-                print(f"📊 {len(df_filtrado)} datas criadas com sucesso")
-            except Exception as e:
-                print(f"❌ Erro ao criar datas: {e}")
-                raise ValueError("Erro ao combinar ano e mês em datas válidas")
-            
-            # ===== PROCESSAR COLUNA DE ÍNDICE =====
-            print("🔄 Processando e validando coluna de índice...")
-            
-            # Converter índice para float, tratando vírgulas decimais brasileiras
-            if df_filtrado['indice'].dtype == 'object':
-                df_filtrado['indice'] = df_filtrado['indice'].astype(str).str.replace(',', '.')
-            
-            # Converter para numérico
-            df_filtrado['indice'] = pd.to_numeric(df_filtrado['indice'], errors='coerce')
-            
-            # Remover linhas com índices inválidos
-            df_final = df_filtrado.dropna(subset=['indice']).copy()
-            
-            if len(df_final) == 0:
-                raise ValueError("Nenhum índice válido encontrado após conversão numérica")
-            
-            print(f"📊 Índices convertidos: {len(df_filtrado)} → {len(df_final)} registros válidos")
-            
-            # ===== FINALIZAR E VALIDAR =====
-            # Manter apenas colunas necessárias
-            df_final = df_final[['data', 'indice']].copy()
+            from utils.leitor_indices import (
+                ABA_IGPM, ESTRUTURA_ANO_MES, ESTRUTURA_DATA_INDICE, ler_indices_excel,
+            )
             
-            # Ordenar por data
-            df_final = df_final.sort_values('data').reset_index(drop=True)
+            arquivo = ler_indices_excel(arquivo_excel)
+            aba = arquivo.aba_utilizada(aba_especifica)
+            if aba_especifica and aba != aba_especifica:
+                print(f"⚠️ Aba '{aba_especifica}' não encontrada. Usando primeira aba como fallback: '{aba}'")
             
-            # Validações finais
-            periodo_min = df_final['data'].min()
-            periodo_max = df_final['data'].max()
-            indice_min = df_final['indice'].min()
-            indice_max = df_final['indice'].max()
+            # A estrutura segue a aba pedida: IGPM = colunas A/B, demais = C/D/F
+            estrutura = ESTRUTURA_DATA_INDICE if aba_especifica == ABA_IGPM else ESTRUTURA_ANO_MES
+            df_final = arquivo.curva(aba, estrutura)
+            if df_final is not None:
+                df_final = df_final[df_final['data'].dt.year.between(1990, 2030)].reset_index(drop=True)
+            if df_final is None or df_final.empty:
+                raise ValueError(f"Nenhum índice válido encontrado na aba '{aba}'")
             
-            # Salvar resultado
             self.df_indices = df_final
-            
-            print(f"✅ {len(df_final)} registros carregados com OPENPYXL!")
-            print(f"📊 Período: {periodo_min.strftime('%Y-%m')} a {periodo_max.strftime('%Y-%m')}")
-            print(f"📊 Índice: {indice_min:.2f} a {indice_max:.2f}")
-            
+            print(f"✅ {len(df_final)} registros carregados da aba '{aba}' "
+                  f"({df_final['data'].min().strftime('%Y-%m')} a {df_final['data'].max().strftime('%Y-%m')})")
             return self.df_indices
             
         except Exception as e:
-            error_msg = f"❌ Erro ao carregar índices com openpyxl: {str(e)}"
-            print(error_msg)
-            if 'st' in locals():
-                st.error(f"Erro ao processar arquivo Excel: {str(e)}")
+            print(f"❌ Erro ao carregar índices do Excel: {str(e)}")
+            st.error(f"Erro ao processar arquivo Excel: {str(e)}")
             return None
     
     
@@ -506,7 +269,7 @@ def show():
     
     df_padronizado = st.session_state.df_padronizado
     calc_aging = CalculadorAging(st.session_state.params)
-    calc_correcao = CalculadorCorrecao(st.session_state.params)
+    store_curvas_di_pre = obter_store_curvas_di_pre()
     
     # ETAPA 0: CARREGAMENTO DOS ÍNDICES IGP-M/IPCA (OBRIGATÓRIO)
     st.subheader("📊 0️⃣ Carregar Índices IGP-M/IPCA")
@@ -566,7 +329,7 @@ def show():
                         # Criar instância do calculador
                         calc_valor_justo = CalculadorValorJusto()
                         
-                        # ===== CARREGAR AMBAS AS ABAS SEPARADAMENTE =====
+                        # ===== CARREGAR AMBAS AS ABAS (uma leitura do arquivo, em cache) =====
                         st.info("📊 **Carregando aba IGPM** (para VOLTZ)...")
                         df_igpm = calc_valor_justo.calculador_indices.carregar_indices_do_excel(uploaded_file_indices, "IGPM")
                         
@@ -746,7 +509,7 @@ def show():
                 try:
                     with st.spinner("🔄 Processando arquivo de taxa de recuperação..."):
                         # [Código de processamento mantido igual]
-                        df_taxa_upload = pd.read_excel(uploaded_file_taxa, sheet_name="Input", header=None)
+                        df_taxa_upload = ler_excel(uploaded_file_taxa, sheet_name="Input", header=None)
                         
                         tipos = ["Privado", "Público", "Hospital"]
                         aging_labels = ["A vencer", "Primeiro ano", "Segundo ano", "Terceiro ano", "Quarto ano", "Quinto ano", "Demais anos"]
@@ -847,6 +610,21 @@ def show():
     
     if not tem_cdi:
         st.warning("⚠️ **PASSO 2:** Faça o upload do arquivo CDI/DI-PRE para continuar.")
+
+        # Curva já armazenada no histórico para a data base atual
+        data_curva_historico = store_curvas_di_pre.resolver_data_arquivo(
+            st.session_state.params.data_base_padrao
+        )
+        if data_curva_historico is not None:
+            st.info(
+                f"📚 Curva DI-PRE de {data_curva_historico.strftime('%d/%m/%Y')} disponível no histórico "
+                f"para a data base {pd.Timestamp(st.session_state.params.data_base_padrao).strftime('%d/%m/%Y')}."
+            )
+            if st.button("📚 Usar curva do histórico", key="usar_curva_historico_di_pre"):
+                st.session_state.df_di_pre = store_curvas_di_pre.carregar_curva(data_curva_historico)
+                st.session_state.cdi_carregado = True
+                st.session_state.calculo_solicitado = False
+                st.rerun()
         
         with st.expander("📤 Upload do Arquivo CDI/DI-PRE", expanded=True):
             st.info("""
@@ -892,6 +670,12 @@ def show():
                             # Otimizar curva DI-PRE (vetorizado, sem loop por mes)
                             st.session_state.df_di_pre = otimizar_curva_di_pre(st.session_state.df_di_pre)
 
+                            # Guardar curva no histórico para reprocessar datas base antigas
+                            try:
+                                store_curvas_di_pre.salvar_curva(st.session_state.df_di_pre)
+                            except Exception as e:
+                                st.warning(f"⚠️ Curva DI-PRE não foi salva no histórico: {str(e)}")
+
                             st.rerun()  # Recarregar a página para atualizar o estado
                         else:
                             st.error("❌ Não foi possível processar o arquivo CDI. Verifique o formato do arquivo.")
@@ -1008,6 +792,17 @@ def show():
             # Container para logs detalhados
             log_container = st.expander("📊 **Logs Detalhados de Performance**", expanded=False)
 
+            # Calculadores sem Streamlit: dados de mercado explícitos, eventos exibidos no log da página
+            eventos_calculo = SinkStreamlit(container=log_container, barra_progresso=progress_main)
+            calc_correcao = CalculadorCorrecao(
+                st.session_state.params,
+                curve_store=store_curvas_di_pre,
+                eventos=eventos_calculo,
+                df_indices_igpm=st.session_state.get('df_indices_igpm'),
+                df_indices_economicos=st.session_state.get('df_indices_economicos'),
+                df_di_pre=st.session_state.get('df_di_pre'),
+            )
+
             # Pré-visualizações intermediárias por etapa (otimizadas para não sobrecarregar a UI)
             exibir_previews_etapas = st.checkbox(
                 "📋 Exibir pré-visualizações por etapa",
@@ -1396,15 +1191,14 @@ def show():
                 st.session_state.df_final = df_final_temp
                 st.session_state.df_com_aging = df_com_aging
 
-                caminho_exportado, novo_arquivo = exportar_resultado_final_excel(
+                # Exportação (Excel, CSV, Parquet e Arrow) em segundo plano; o progresso aparece no painel de resultados.
+                job_exportacao = iniciar_exportacao_resultado_final(
                     st.session_state.df_final,
                     eh_voltz=True,
+                    params=calc_correcao.params,
                 )
-                if caminho_exportado:
-                    if novo_arquivo:
-                        st.success(f"💾 Resultado final VOLTZ exportado automaticamente em: {caminho_exportado}")
-                    else:
-                        st.info(f"💾 Última exportação automática VOLTZ: {caminho_exportado}")
+                if job_exportacao is not None:
+                    st.info(f"💾 Resultado final VOLTZ: exportação iniciada em segundo plano ({', '.join(a.rotulo for a in job_exportacao.artefatos.values())})")
                 
                 progress_main.progress(1.0)
                 etapa_tempo = time.time() - etapa_inicio
@@ -1759,196 +1553,55 @@ def show():
                         periodo_max = df_indices['data'].max().strftime('%Y-%m')
                         st.success(f"✅ **Índices carregados:** {tipo_indice} - {registros_indices:,} registros ({periodo_min} a {periodo_max})")
                     
-                    df_indices['data'] = pd.to_datetime(df_indices['data'])
-                    df_indices = df_indices.sort_values('data')
-                    
-                    # Criar índices com mês anterior para cálculo da taxa mensal
-                    df_indices['data_mes_anterior'] = df_indices['data'].shift(1)
-                    df_indices['indice_mes_anterior'] = df_indices['indice'].shift(1)
-                    
-                    # Calcular taxa mensal = indice_atual - indice_anterior (diferença simples)
-                    df_indices['taxa_mensal'] = 1 - df_indices['indice_mes_anterior'] / df_indices['indice']
-                    df_indices['taxa_diaria'] = (df_indices['taxa_mensal'] + 1) ** (1/30) - 1
+                    # Curva compilada uma vez por arquivo: índice, índice anterior e taxa diária por competência
+                    curva_indices = obter_index_curve(df_indices)
 
-                    # Preparar DataFrame principal
-                    df_final_temp = df_final_temp.copy()
+                    # Preparar DataFrame principal (colunas convertidas no próprio frame, sem cópia)
                     df_final_temp['data_vencimento_limpa'] = pd.to_datetime(df_final_temp['data_vencimento_limpa'], errors='coerce')
                     df_final_temp['data_base'] = pd.to_datetime(df_final_temp['data_base'], errors='coerce')
 
                     progress_main.progress(0.52)
-                    
-                    # ==== MERGE 1: DATA BASE (ULTRA-OTIMIZADO) ====
+
+                    # ==== ÍNDICES DIÁRIOS E FATOR DE CORREÇÃO (CHAVES INTEIRAS DE MÊS) ====
                     with log_container:
-                        st.info("🔄 **Merge 1/2:** Índices da data base (O(log n))...")
-                    
-                    # Criar coluna auxiliar para merge (ano-mês)
-                    df_indices['ano_mes'] = df_indices['data'].dt.to_period('M')
-                    df_final_temp['ano_mes_base'] = df_final_temp['data_base'].dt.to_period('M')
-                    df_final_temp['ano_mes_venc'] = df_final_temp['data_vencimento_limpa'].dt.to_period('M')
+                        st.info("🧮 **Cálculo vetorizado** de índices diários (data base e vencimento)...")
 
-                    registros_antes_merge_indices = len(df_final_temp)
+                    resumo_indices = aplicar_indices_correcao(
+                        df_final_temp,
+                        curva_indices,
+                        coluna_data_base='data_base',
+                        coluna_data_vencimento='data_vencimento_limpa',
+                        coluna_fator='fator_correcao',
+                    )
 
-                    # Garantir cardinalidade 1:1 por ano_mes para evitar explosão de linhas no merge.
-                    df_indices_merge = df_indices[
-                        ['ano_mes', 'indice', 'indice_mes_anterior', 'taxa_mensal', 'taxa_diaria']
-                    ].dropna(subset=['ano_mes']).copy()
+                    progress_main.progress(0.56)
 
-                    duplicatas_ano_mes = int(df_indices_merge.duplicated(subset=['ano_mes']).sum())
-                    if duplicatas_ano_mes > 0:
-                        with log_container:
-                            st.warning(
-                                f"⚠️ Foram encontradas {duplicatas_ano_mes:,} linhas duplicadas de índices por mês. "
-                                "Aplicando deduplicação para manter 1 registro por ano-mês."
-                            )
-                        df_indices_merge = (
-                            df_indices_merge
-                            .sort_values('ano_mes')
-                            .drop_duplicates(subset=['ano_mes'], keep='last')
-                            .reset_index(drop=True)
-                        )
-                    
-                    # Merge com data base
-                    df_merged_base = df_final_temp.merge(
-                        df_indices_merge.rename(columns={
-                            'ano_mes': 'ano_mes_base',
-                            'indice': 'indice_mes_base',
-                            'indice_mes_anterior': 'indice_mes_anterior_base',
-                            'taxa_mensal': 'taxa_mensal_base',
-                            'taxa_diaria': 'taxa_diaria_base'
-                        }),
-                        on='ano_mes_base',
-                        how='left',
-                        validate='m:1'
-                    )
+                    # ==== FALLBACK: ÚLTIMO ÍNDICE DISPONÍVEL ====
+                    # Quando a competência da data_base/data_vencimento não existe na curva,
+                    # usar o último índice válido disponível para evitar fator=1 silencioso.
+                    ultimo_indice_disponivel = curva_indices.ultimo_indice
 
-                    if len(df_merged_base) != registros_antes_merge_indices:
+                    qtd_base_sem_indice = resumo_indices['sem_indice_base']
+                    if qtd_base_sem_indice > 0:
                         with log_container:
                             st.warning(
-                                f"⚠️ Merge de data base alterou contagem de linhas "
-                                f"({registros_antes_merge_indices:,} → {len(df_merged_base):,})."
+                                f"⚠️ {qtd_base_sem_indice:,} registro(s) sem índice da data base. "
+                                f"Aplicado fallback para o último índice disponível ({ultimo_indice_disponivel:.6f})."
                             )
-                    
-                    progress_main.progress(0.54)
-                    
-                    # ==== MERGE 2: DATA VENCIMENTO (ULTRA-OTIMIZADO) ====
-                    with log_container:
-                        st.info("🔄 **Merge 2/2:** Índices da data vencimento (O(log n))...")
-                        
-                    df_merged_completo = df_merged_base.merge(
-                        df_indices_merge.rename(columns={
-                            'ano_mes': 'ano_mes_venc',
-                            'indice': 'indice_mes_venc',
-                            'indice_mes_anterior': 'indice_mes_anterior_venc',
-                            'taxa_mensal': 'taxa_mensal_venc',
-                            'taxa_diaria': 'taxa_diaria_venc'
-                        }),
-                        on='ano_mes_venc',
-                        how='left',
-                        validate='m:1'
-                    )
 
-                    if len(df_merged_completo) != registros_antes_merge_indices:
+                    qtd_venc_sem_indice = resumo_indices['sem_indice_vencimento']
+                    if qtd_venc_sem_indice > 0:
                         with log_container:
                             st.warning(
-                                f"⚠️ Merge de data vencimento alterou contagem de linhas "
-                                f"({registros_antes_merge_indices:,} → {len(df_merged_completo):,})."
+                                f"⚠️ {qtd_venc_sem_indice:,} registro(s) sem índice do vencimento. "
+                                f"Aplicado fallback para o último índice disponível ({ultimo_indice_disponivel:.6f})."
                             )
 
-                    # ==== FALLBACK: ÚLTIMO ÍNDICE DISPONÍVEL ==== 
-                    # Quando a competência da data_base/data_vencimento não existe na curva,
-                    # usar o último índice válido disponível para evitar fator=1 silencioso.
-                    serie_indices_validos = pd.to_numeric(df_indices_merge.get('indice'), errors='coerce').dropna()
-                    if not serie_indices_validos.empty:
-                        ultimo_indice_disponivel = float(serie_indices_validos.iloc[-1])
-
-                        mask_base_sem_indice = df_merged_completo['indice_mes_base'].isna()
-                        qtd_base_sem_indice = int(mask_base_sem_indice.sum())
-                        if qtd_base_sem_indice > 0:
-                            df_merged_completo.loc[mask_base_sem_indice, 'indice_mes_base'] = ultimo_indice_disponivel
-                            with log_container:
-                                st.warning(
-                                    f"⚠️ {qtd_base_sem_indice:,} registro(s) sem índice da data base. "
-                                    f"Aplicado fallback para o último índice disponível ({ultimo_indice_disponivel:.6f})."
-                                )
-
-                        mask_venc_sem_indice = df_merged_completo['indice_mes_venc'].isna()
-                        qtd_venc_sem_indice = int(mask_venc_sem_indice.sum())
-                        if qtd_venc_sem_indice > 0:
-                            df_merged_completo.loc[mask_venc_sem_indice, 'indice_mes_venc'] = ultimo_indice_disponivel
-                            with log_container:
-                                st.warning(
-                                    f"⚠️ {qtd_venc_sem_indice:,} registro(s) sem índice do vencimento. "
-                                    f"Aplicado fallback para o último índice disponível ({ultimo_indice_disponivel:.6f})."
-                                )
-                    
-                    progress_main.progress(0.56)
-                    
-                    # ==== CÁLCULO DOS ÍNDICES DIÁRIOS (VETORIZADO) ====
-                    with log_container:
-                        st.info("🧮 **Cálculo vetorizado** de índices diários...")
-                    
-                    # Aplicar cálculo vetorizado
-                    with log_container:
-                        st.info("🔄 **Aplicando** índices data base...")
-                    df_merged_completo['indice_base_diario'] = calcular_indice_diario_vetorizado(
-                        df=df_merged_completo,
-                        coluna_data='data_base',
-                        coluna_indice_mes='indice_mes_base',
-                        coluna_indice_mes_anterior='indice_mes_anterior_base',
-                        coluna_taxa_mensal='taxa_mensal_base',
-                        coluna_taxa_diaria='taxa_diaria_base',
-                    )
-                    
                     progress_main.progress(0.58)
-                    
-                    with log_container:
-                        st.info("🔄 **Aplicando** índices data vencimento...")
-                    df_merged_completo['indice_venc_diario'] = calcular_indice_diario_vetorizado(
-                        df=df_merged_completo,
-                        coluna_data='data_vencimento_limpa',
-                        coluna_indice_mes='indice_mes_venc',
-                        coluna_indice_mes_anterior='indice_mes_anterior_venc',
-                        coluna_taxa_mensal='taxa_mensal_venc',
-                        coluna_taxa_diaria='taxa_diaria_venc',
-                    )
-                    
-                    # ==== CÁLCULO DO FATOR DE CORREÇÃO (ULTRA-RÁPIDO) ====
-                    # Mask para registros válidos
-                    mask_validos = (
-                        df_merged_completo['indice_base_diario'].notna()
-                        & df_merged_completo['indice_venc_diario'].notna()
-                        & (df_merged_completo['indice_base_diario'] > 0)
-                        & (df_merged_completo['indice_venc_diario'] > 0)
-                    )
-                    
-                    # Fator de correção = indice_vencimento / indice_base
-                    df_merged_completo['fator_correcao'] = 1.0  # Default
-                    df_merged_completo.loc[mask_validos, 'fator_correcao'] = (
-                        df_merged_completo.loc[mask_validos, 'indice_base_diario'] /
-                        df_merged_completo.loc[mask_validos, 'indice_venc_diario']
-                    )
-                    
-                    # ==== APLICAR CORREÇÃO MONETÁRIA (VETORIZADA) ====
-                    df_merged_completo = aplicar_correcao_monetaria_vetorizada(
-                        df_merged_completo,
-                        coluna_fator='fator_correcao',
-                    )
 
-                    # Atualizar colunas finais
-                    df_merged_completo.loc[mask_validos, 'indice_vencimento'] = df_merged_completo.loc[mask_validos, 'indice_venc_diario']
-                    df_merged_completo.loc[mask_validos, 'indice_base'] = df_merged_completo.loc[mask_validos, 'indice_base_diario']
-
-                    registros_customizados = mask_validos.sum()
-                    total_registros = len(df_merged_completo)
-                    percentual = (registros_customizados / total_registros) * 100
-
-                    # Limpar colunas auxiliares
-                    colunas_temp = [
-                        'ano_mes_base', 'ano_mes_venc', 'indice_mes_base', 'indice_mes_venc',
-                        'taxa_mensal_base', 'taxa_mensal_venc', 'data_fechamento_base', 'data_fechamento_venc',
-                        'indice_base_diario', 'indice_venc_diario', 'indice_mes_anterior_base', 'taxa_diaria_base', 'indice_mes_anterior_venc', 'taxa_diaria_venc'
-                    ]
-                    df_final_temp = df_merged_completo.drop(columns=[col for col in colunas_temp if col in df_merged_completo.columns])
+                    registros_customizados = resumo_indices['registros_validos']
+                    total_registros = len(df_final_temp)
+                    percentual = (registros_customizados / total_registros) * 100 if total_registros else 0
                     
                     etapa_tempo = time.time() - etapa_inicio
                     velocidade_indices = registros_customizados / etapa_tempo if etapa_tempo > 0 else 0
@@ -1975,9 +1628,10 @@ def show():
                 with log_container:
                     st.info("💰 **Calculando correção monetária** vetorizada...")
 
-                df_final_temp = aplicar_correcao_monetaria_vetorizada(
+                aplicar_correcao_monetaria_vetorizada(
                     df_final_temp,
                     coluna_fator='fator_correcao',
+                    inplace=True,
                 )
 
                 # Renomear fator_correcao para fator_correcao_ate_data_base
@@ -2013,14 +1667,18 @@ def show():
 
                 try:
                     # ========== USAR MÓDULO ESPECÍFICO PARA DISTRIBUIDORAS ==========
-                    calc_valor_justo_dist = CalculadorValorJustoDistribuidoras(st.session_state.params)
+                    calc_valor_justo_dist = CalculadorValorJustoDistribuidoras(
+                        st.session_state.params,
+                        curve_store=store_curvas_di_pre,
+                        eventos=eventos_calculo,
+                        df_taxa_recuperacao=st.session_state.get('df_taxa_recuperacao'),
+                        df_di_pre=st.session_state.get('df_di_pre'),
+                        df_indices_economicos=st.session_state.get('df_indices_economicos'),
+                        df_indices_igpm=st.session_state.get('df_indices_igpm'),
+                    )
                     
                     # Processar valor justo completo para distribuidoras
-                    df_final_temp = calc_valor_justo_dist.processar_valor_justo_distribuidoras(
-                        df_final_temp, 
-                        log_container, 
-                        progress_main
-                    )
+                    df_final_temp = calc_valor_justo_dist.processar_valor_justo_distribuidoras(df_final_temp)
                     # ============= ETAPA 7: CALCULAR VALOR JUSTO REAJUSTADO =============
                     # Aplicar descontos por aging sobre o valor justo
                     df_final_temp = calc_correcao.calcular_valor_justo_reajustado(df_final_temp)
@@ -2043,15 +1701,14 @@ def show():
                     st.session_state.df_final = df_final_temp
                     st.session_state.df_com_aging = df_com_aging
 
-                    caminho_exportado, novo_arquivo = exportar_resultado_final_excel(
+                    # Exportação (Excel, CSV, Parquet e Arrow) em segundo plano; o progresso aparece no painel de resultados.
+                    job_exportacao = iniciar_exportacao_resultado_final(
                         st.session_state.df_final,
                         eh_voltz=False,
+                        params=calc_correcao.params,
                     )
-                    if caminho_exportado:
-                        if novo_arquivo:
-                            st.success(f"💾 Resultado final exportado automaticamente em: {caminho_exportado}")
-                        else:
-                            st.info(f"💾 Última exportação automática: {caminho_exportado}")
+                    if job_exportacao is not None:
+                        st.info(f"💾 Resultado final: exportação iniciada em segundo plano ({', '.join(a.rotulo for a in job_exportacao.artefatos.values())})")
                     
                     # Calcular estatísticas do DI-PRE para exibição
                     calc_valor_justo = CalculadorValorJusto()
@@ -2105,15 +1762,14 @@ def show():
                     st.session_state.df_final = df_final_temp
                     st.session_state.df_com_aging = df_com_aging
 
-                    caminho_exportado, novo_arquivo = exportar_resultado_final_excel(
+                    # Exportação (Excel, CSV, Parquet e Arrow) em segundo plano; o progresso aparece no painel de resultados.
+                    job_exportacao = iniciar_exportacao_resultado_final(
                         st.session_state.df_final,
                         eh_voltz=False,
+                        params=calc_correcao.params,
                     )
-                    if caminho_exportado:
-                        if novo_arquivo:
-                            st.success(f"💾 Dados básicos exportados automaticamente em: {caminho_exportado}")
-                        else:
-                            st.info(f"💾 Última exportação automática: {caminho_exportado}")
+                    if job_exportacao is not None:
+                        st.info(f"💾 Dados básicos: exportação iniciada em segundo plano ({', '.join(a.rotulo for a in job_exportacao.artefatos.values())})")
 
                     st.exception(e)  # Debug detalhado
                     
@@ -2152,10 +1808,11 @@ def show():
             if coluna_valor_justo == 'valor_justo_reajustado':
                 st.caption("Valor Justo exibido com base em valor_justo_reajustado (pós-RV).")
 
-            st.write("**📋 Pré-visualização do resultado final**")
-            st.dataframe(st.session_state.df_final.head(200), use_container_width=True, height=420)
-            if len(st.session_state.df_final) > 200:
-                st.caption(f"Mostrando 200 de {len(st.session_state.df_final):,} registros para evitar MessageSizeError.")
+            exibir_exportacao_resultado_final()
+
+            st.write("**📋 Resultado final**")
+            # Só a página atual é enviada ao navegador (evita MessageSizeError em bases grandes)
+            exibir_resultado_paginado(st.session_state.df_final, "resultado_final")
 
     # Mostrar resultados APENAS se o cálculo foi solicitado pelo usuário E temos dados calculados
     calculo_foi_solicitado = st.session_state.get('calculo_solicitado', False)
@@ -0,0 +1,142 @@
+"""
+CSV pt-BR: truncamento pelo PlanoTruncamento e escrita em blocos tem de gerar
+o mesmo arquivo do truncamento original (copia do frame + parse por coluna).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.exportacao_csv_brasil import (
+    CASAS_DECIMAIS_SUBUNITARIO,
+    _coluna_candidata_por_nome,
+    _parse_numero_robusto,
+    _preservar_precisao_coluna,
+    salvar_csv_brasil,
+    salvar_csv_brasil_em_blocos,
+    truncar_numericos,
+)
+
+
+def _truncar_original(df, casas_decimais=4):
+    """Truncamento da versao original (oraculo)."""
+    df_saida = df.copy()
+    colunas = [
+        coluna for coluna in df_saida.select_dtypes(include=["float", "float32", "float64"]).columns
+        if not _preservar_precisao_coluna(coluna)
+    ]
+    colunas += [
+        coluna for coluna in df_saida.select_dtypes(include=["int", "int32", "int64"]).columns
+        if _coluna_candidata_por_nome(coluna)
+    ]
+    for coluna in df_saida.select_dtypes(include=["object", "string"]).columns:
+        if not _coluna_candidata_por_nome(coluna):
+            continue
+        convertida = _parse_numero_robusto(df_saida[coluna])
+        if convertida.notna().mean() >= 0.60:
+            df_saida[coluna] = convertida
+            colunas.append(coluna)
+
+    for coluna in dict.fromkeys(colunas):
+        valores = _parse_numero_robusto(df_saida[coluna]).to_numpy(dtype="float64", copy=True)
+        validos = ~np.isnan(valores)
+        subunitario = validos & (np.abs(valores) < 1)
+        padrao = validos & ~subunitario
+        valores[padrao] = np.trunc(valores[padrao] * 10 ** casas_decimais) / 10 ** casas_decimais
+        valores[subunitario] = (
+            np.trunc(valores[subunitario] * 10 ** CASAS_DECIMAIS_SUBUNITARIO) / 10 ** CASAS_DECIMAIS_SUBUNITARIO
+        )
+        df_saida[coluna] = valores
+    return df_saida
+
+
+def _csv_original(df, caminho):
+    df_export = _truncar_original(df.drop(columns=["documento"], errors="ignore"))
+    df_export.to_csv(caminho, index=False, encoding="utf-8-sig", sep=";", decimal=",")
+
+
+def _ler(caminho):
+    return caminho.read_bytes()
+
+
+@pytest.fixture
+def carteira():
+    rng = np.random.default_rng(5)
+    registros = 1_000
+    valores_texto = [
+        f"{valor:,.6f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        for valor in rng.uniform(0, 1e6, registros)
+    ]
+    return pd.DataFrame({
+        "id_padronizado": [f"ID{i}" for i in range(registros)],
+        "documento": "12345678900",
+        "valor_principal": rng.uniform(-5000, 5000, registros),
+        "taxa_desconto": rng.uniform(-1, 1, registros),
+        "fator_correcao": rng.uniform(0.5, 2, registros),
+        "ipca_mensal": rng.uniform(0, 0.01, registros),
+        "valor_parcelas": rng.integers(0, 100, registros),
+        "dias_atraso": rng.integers(0, 100, registros),
+        "valor_texto": np.where(rng.random(registros) < 0.9, valores_texto, "abc"),
+        "nome_cliente": "Fulano",
+        "juros": np.where(rng.random(registros) < 0.1, np.nan, rng.uniform(0, 10, registros)),
+        "saldo": np.float32(rng.uniform(0, 10, registros)),
+    })
+
+
+def test_csv_igual_ao_original(carteira, tmp_path):
+    _csv_original(carteira, tmp_path / "original.csv")
+
+    salvar_csv_brasil(carteira, tmp_path / "novo.csv")
+
+    assert _ler(tmp_path / "novo.csv") == _ler(tmp_path / "original.csv")
+
+
+@pytest.mark.parametrize("tamanho_bloco", [1, 97, 1_000, 5_000])
+def test_csv_em_blocos_igual_ao_original(carteira, tmp_path, tamanho_bloco):
+    _csv_original(carteira, tmp_path / "original.csv")
+    blocos = []
+
+    registros = salvar_csv_brasil_em_blocos(
+        carteira, tmp_path / "blocos.csv", tamanho_bloco=tamanho_bloco, ao_escrever_bloco=blocos.append
+    )
+
+    assert registros == len(carteira)
+    assert sum(blocos) == len(carteira)
+    assert _ler(tmp_path / "blocos.csv") == _ler(tmp_path / "original.csv")
+
+
+def test_csv_em_blocos_com_colunas_projetadas(carteira, tmp_path):
+    colunas = ["valor_texto", "documento", "id_padronizado", "inexistente", "valor_principal"]
+    _csv_original(carteira[["valor_texto", "documento", "id_padronizado", "valor_principal"]], tmp_path / "original.csv")
+
+    salvar_csv_brasil_em_blocos(carteira, tmp_path / "blocos.csv", tamanho_bloco=300, colunas=colunas)
+
+    assert _ler(tmp_path / "blocos.csv") == _ler(tmp_path / "original.csv")
+
+
+def test_csv_vazio_igual_ao_original(carteira, tmp_path):
+    vazio = carteira.iloc[:0]
+    _csv_original(vazio, tmp_path / "original.csv")
+
+    salvar_csv_brasil_em_blocos(vazio, tmp_path / "blocos.csv")
+
+    assert _ler(tmp_path / "blocos.csv") == _ler(tmp_path / "original.csv")
+
+
+def test_truncamento_valores_fixos():
+    df = pd.DataFrame({
+        "valor": [1234.567891, -0.123456789, np.inf, np.nan],
+        "fator_desconto": [1.123456789, 0.5, 2.0, 3.0],
+        "valor_parcelas": [1, 2, 3, 4],
+        "dias_atraso": [1, 2, 3, 4],
+        "valor_texto": ["1.234,56789", "0,123456789", "abc", "10"],
+    })
+
+    resultado = truncar_numericos(df)
+
+    np.testing.assert_array_equal(resultado["valor"], [1234.5678, -0.12345678, np.inf, np.nan])
+    assert resultado["fator_desconto"].tolist() == df["fator_desconto"].tolist()
+    assert resultado["valor_parcelas"].dtype == "float64"
+    assert resultado["dias_atraso"].dtype == "int64"
+    np.testing.assert_array_equal(resultado["valor_texto"], [1234.5678, 0.12345678, np.nan, 10.0])
+    assert df["valor_texto"].tolist()[0] == "1.234,56789"
@@ -0,0 +1,92 @@
+"""
+Datas mensais da aba de indices: a conversao vetorizada tem de reproduzir a
+conversao linha a linha original nos formatos que ela aceitava.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.leitor_indices import ESTRUTURA_ANO_MES, converter_aba_indices, converter_datas_mensais
+
+MESES_ORIGINAIS = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+
+
+def _data_original(valor):
+    """Conversao da aba IGPM na pagina de Correcao original (oraculo)."""
+    if isinstance(valor, datetime):
+        return pd.Timestamp(valor.year, valor.month, 1)
+    if isinstance(valor, (int, float)):
+        data = datetime(1899, 12, 30) + timedelta(days=int(valor))
+        return pd.Timestamp(data.year, data.month, 1)
+    if '/' in valor:
+        mes, ano = [parte.strip() for parte in valor.split('/')[:2]]
+        return pd.Timestamp(int(ano), MESES_ORIGINAIS[mes.lower()], 1)
+    data = pd.to_datetime(valor)
+    return pd.Timestamp(data.year, data.month, 1)
+
+
+VALORES_ORIGINAIS = [
+    datetime(1994, 8, 1), datetime(2021, 3, 31, 15, 0), pd.Timestamp("2024-12-15"),
+    34547, 34547.9, 45000, 1,
+    "agosto/1994", "Setembro/1994", " março / 2021 ", "dezembro/2035",
+    "2021-03-15", "2021-03-15 00:00:00", "1999-12-01",
+]
+
+
+def test_datas_iguais_a_conversao_original():
+    valores = pd.Series(VALORES_ORIGINAIS, dtype=object)
+
+    resultado = converter_datas_mensais(valores)
+
+    esperado = pd.Series([_data_original(valor) for valor in VALORES_ORIGINAIS], dtype="datetime64[ns]")
+    pd.testing.assert_series_equal(resultado, esperado, check_names=False)
+
+
+def test_datas_coluna_datetime():
+    valores = pd.Series(pd.to_datetime(["1994-08-17", None, "2025-01-31"]), index=[5, 6, 7])
+
+    resultado = converter_datas_mensais(valores)
+
+    assert resultado.tolist()[0] == pd.Timestamp("1994-08-01")
+    assert pd.isna(resultado.iloc[1])
+    assert resultado.tolist()[2] == pd.Timestamp("2025-01-01")
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("ago-1994", "1994-08-01"),
+    ("ago/1994", "1994-08-01"),
+    ("marco/2021", "2021-03-01"),
+    ("15/03/2021", "2021-03-01"),
+    ("34547", "1994-08-01"),
+    ("texto", None),
+    ("mesinvalido/2021", None),
+    (np.nan, None),
+])
+def test_datas_formatos_adicionais(valor, esperado):
+    resultado = converter_datas_mensais(pd.Series([valor], dtype=object))
+
+    if esperado is None:
+        assert pd.isna(resultado.iloc[0])
+    else:
+        assert resultado.iloc[0] == pd.Timestamp(esperado)
+
+
+def test_aba_ano_mes_filtra_anos_e_meses():
+    grade = pd.DataFrame({
+        0: None, 1: None,
+        2: [1994, 1989, 2021, 2036, 2021, "x"],
+        3: [8, 1, 13, 1, 6, 1],
+        4: None,
+        5: ["100,5", 1.0, 2.0, 3.0, 1069.29, 4.0],
+    })
+
+    curva = converter_aba_indices(grade, ESTRUTURA_ANO_MES)
+
+    assert curva["data"].tolist() == [pd.Timestamp("1994-08-01"), pd.Timestamp("2021-06-01")]
+    assert curva["indice"].tolist() == [100.5, 1069.29]
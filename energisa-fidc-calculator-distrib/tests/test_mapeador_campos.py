@@ -0,0 +1,105 @@
+"""
+IDs padronizados: a versao vetorizada tem de gerar os mesmos IDs do calculo
+linha a linha original (``criar_id_unico`` + sufixos via groupby/cumcount).
+"""
+
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.mapeador_campos import adicionar_sufixos_duplicados, construir_ids_padronizados
+
+
+def _id_original(nome, data_venc, nome_distribuidora):
+    """Calculo linha a linha da versao original (oraculo)."""
+    nome = str(nome).strip() if pd.notna(nome) else "SEM_NOME"
+    nome_limpo = re.sub(r'[^A-Za-z0-9\s]', '', nome)
+    nome_limpo = re.sub(r'\s+', '_', nome_limpo.strip().upper())
+    if pd.notna(data_venc):
+        if isinstance(data_venc, str):
+            data_str = data_venc.replace('/', '').replace('-', '').replace(' ', '')[:8]
+        else:
+            try:
+                data_str = pd.to_datetime(data_venc).strftime('%Y%m%d')
+            except Exception:
+                data_str = "SEMDATA"
+    else:
+        data_str = "SEMDATA"
+    id_unico = f"{nome_distribuidora}_{nome_limpo}_{data_str}"
+    if len(id_unico) > 100:
+        id_unico = f"{nome_distribuidora}_{nome_limpo[:50]}_{data_str}"
+    return id_unico
+
+
+def _ids_originais(nomes, datas, nome_distribuidora):
+    ids = pd.Series(
+        [_id_original(nome, data, nome_distribuidora) for nome, data in zip(nomes, datas)],
+        index=nomes.index,
+    )
+    if ids.nunique() < len(ids):
+        ids = ids.groupby(ids).cumcount().astype(str).replace('0', '') + '_' + ids
+        ids = ids.str.replace('^_', '', regex=True)
+    return ids
+
+
+def _ids_novos(nomes, datas, nome_distribuidora):
+    ids = construir_ids_padronizados(nomes, datas, nome_distribuidora)
+    return adicionar_sufixos_duplicados(ids)
+
+
+NOMES = [
+    "Maria da Silva", "  maria   DA silva ", "José Ação Ltda.", "ÁGUA & LUZ S/A", "cliente\t123",
+    "O'Brien-Smith", "", "   ", np.nan, None, 12345, 3.5, "x" * 120, "Nome com ç e ü", "a_b-c",
+]
+
+
+@pytest.mark.parametrize("nome_distribuidora", ["ENERGISA", "EMT", ""])
+def test_ids_iguais_ao_calculo_original_com_datas_datetime(nome_distribuidora):
+    rng = np.random.default_rng(7)
+    nomes = pd.Series(rng.choice(np.array(NOMES, dtype=object), 400))
+    datas = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 30, 400), unit="D"))
+    datas[rng.random(400) < 0.1] = pd.NaT
+
+    esperado = _ids_originais(nomes, datas, nome_distribuidora)
+    pd.testing.assert_series_equal(_ids_novos(nomes, datas, nome_distribuidora), esperado, check_names=False)
+
+
+def test_ids_iguais_ao_calculo_original_com_datas_mistas():
+    datas_mistas = [
+        "15/03/2024", "2024-03-15", "2024-03-15 10:30:00", "texto", "",
+        datetime(2023, 1, 31), pd.Timestamp("2022-12-01"), 45000, 45000.7, np.nan, None, pd.NaT,
+    ]
+    nomes = pd.Series(np.resize(np.array(NOMES, dtype=object), 60), index=np.arange(100, 160))
+    datas = pd.Series(np.resize(np.array(datas_mistas, dtype=object), 60), index=nomes.index, dtype=object)
+
+    esperado = _ids_originais(nomes, datas, "DIST")
+    pd.testing.assert_series_equal(_ids_novos(nomes, datas, "DIST"), esperado, check_names=False)
+
+
+def test_ids_valores_fixos():
+    nomes = pd.Series(["José da Silva", "José da Silva", "x" * 120, np.nan, "José da Silva"])
+    datas = pd.Series(pd.to_datetime(["2024-01-05", "2024-01-05", "2024-02-01", None, "2024-01-05"]))
+
+    ids = _ids_novos(nomes, datas, "EMT")
+
+    assert ids.tolist() == [
+        "EMT_JOS_DA_SILVA_20240105",
+        "1_EMT_JOS_DA_SILVA_20240105",
+        f"EMT_{'X' * 50}_20240201",
+        "EMT_SEMNOME_SEMDATA",
+        "2_EMT_JOS_DA_SILVA_20240105",
+    ]
+
+
+def test_sufixos_a_partir_da_decima_repeticao():
+    ids = pd.Series(["A"] * 12 + ["B"], index=np.arange(13) * 2, name="id_padronizado")
+
+    resultado = adicionar_sufixos_duplicados(ids)
+
+    esperado = ids.groupby(ids).cumcount().astype(str).replace('0', '') + '_' + ids
+    esperado = esperado.str.replace('^_', '', regex=True)
+    pd.testing.assert_series_equal(resultado, esperado, check_names=False)
+    assert resultado.iloc[11] == "11_A"
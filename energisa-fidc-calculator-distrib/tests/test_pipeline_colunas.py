@@ -0,0 +1,153 @@
+"""
+Correcao monetaria como PipelineColunas: as etapas in place tem de produzir
+os mesmos valores da cadeia original (uma copia por etapa) e nao podem
+alterar o DataFrame de quem chamou.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.calculador_correcao import CalculadorCorrecao
+from utils.pipeline_colunas import EtapaColunas, PipelineColunas, ProfilerPipeline
+
+
+INDICES = {"2021.01": 500.0, "2021.06": 550.0, "2025.01": 600.0}
+
+
+class ParametrosFixos:
+    """Parametros de correcao com indices fixos (sem cache nem SIDRA)."""
+
+    taxa_multa = 0.02
+    taxa_juros_mensal = 0.01
+
+    def buscar_indice_correcao(self, data):
+        return INDICES.get(f"{data.year}.{data.month:02d}", 624.40)
+
+
+def _carteira():
+    return pd.DataFrame({
+        "valor_principal": ["1.000,00", 50.0, 200.0],
+        "valor_nao_cedido": [100.0, 80.0, np.nan],
+        "valor_terceiro": [0.0, 0.0, 0.0],
+        "valor_cip": [np.nan, 0.0, 0.0],
+        "dias_atraso": [60, 10, 0],
+        "data_vencimento_limpa": pd.to_datetime(["2021-01-15", "2021-06-10", None]),
+        "data_base": pd.Timestamp("2025-01-31"),
+    })
+
+
+def _correcao_original(params, df):
+    """Formulas da cadeia original de etapas (oraculo)."""
+    limpar = CalculadorCorrecao(params).limpar_e_converter_valor
+    df = df.copy()
+    df["valor_liquido"] = np.maximum(
+        limpar(df["valor_principal"])
+        - limpar(df["valor_nao_cedido"].fillna(0))
+        - limpar(df["valor_terceiro"].fillna(0))
+        - limpar(df["valor_cip"].fillna(0)),
+        0,
+    )
+    em_atraso = df["dias_atraso"] > 0
+    df["multa"] = np.where(em_atraso, df["valor_liquido"] * params.taxa_multa, 0)
+    df["meses_atraso"] = df["dias_atraso"] / 30
+    df["juros_moratorios"] = np.where(
+        em_atraso, df["valor_liquido"] * params.taxa_juros_mensal * df["meses_atraso"], 0
+    )
+    df["indice_vencimento"] = df["data_vencimento_limpa"].apply(
+        lambda x: params.buscar_indice_correcao(x) if pd.notna(x) else 624.40
+    )
+    df["indice_base"] = df["data_base"].apply(params.buscar_indice_correcao)
+    df["fator_correcao"] = df["indice_base"] / df["indice_vencimento"]
+    df["correcao_monetaria"] = np.maximum(
+        np.where(em_atraso, df["valor_liquido"] * (df["fator_correcao"] - 1), 0), 0
+    )
+    df["valor_corrigido"] = df["valor_liquido"] + df["multa"] + df["juros_moratorios"] + df["correcao_monetaria"]
+    return df
+
+
+COLUNAS_CALCULADAS = [
+    "valor_liquido", "multa", "meses_atraso", "juros_moratorios", "indice_vencimento",
+    "indice_base", "fator_correcao", "correcao_monetaria", "valor_corrigido",
+]
+
+
+def test_correcao_valores_fixos():
+    resultado = CalculadorCorrecao(ParametrosFixos()).processar_correcao_completa(_carteira(), "teste")
+
+    np.testing.assert_allclose(resultado["valor_liquido"], [900.0, 0.0, 200.0])
+    np.testing.assert_allclose(resultado["multa"], [18.0, 0.0, 0.0])
+    np.testing.assert_allclose(resultado["juros_moratorios"], [18.0, 0.0, 0.0])
+    np.testing.assert_allclose(resultado["indice_vencimento"], [500.0, 550.0, 624.40])
+    np.testing.assert_allclose(resultado["fator_correcao"], [1.2, 600.0 / 550.0, 600.0 / 624.40])
+    np.testing.assert_allclose(resultado["correcao_monetaria"], [180.0, 0.0, 0.0])
+    np.testing.assert_allclose(resultado["valor_corrigido"], [1116.0, 0.0, 200.0])
+
+
+def test_correcao_igual_a_cadeia_original():
+    rng = np.random.default_rng(3)
+    registros = 2_000
+    df = pd.DataFrame({
+        "valor_principal": rng.uniform(-100, 5000, registros).round(2),
+        "valor_nao_cedido": np.where(rng.random(registros) < 0.2, np.nan, rng.uniform(0, 300, registros)),
+        "valor_terceiro": rng.uniform(0, 100, registros),
+        "valor_cip": rng.uniform(0, 50, registros),
+        "dias_atraso": rng.integers(-300, 3000, registros),
+        "data_vencimento_limpa": pd.Timestamp("2020-06-01") + pd.to_timedelta(rng.integers(0, 1700, registros), unit="D"),
+        "data_base": pd.Timestamp("2025-01-31"),
+    })
+    params = ParametrosFixos()
+
+    resultado = CalculadorCorrecao(params).processar_correcao_completa(df, "teste")
+
+    esperado = _correcao_original(params, df)
+    pd.testing.assert_frame_equal(resultado[COLUNAS_CALCULADAS], esperado[COLUNAS_CALCULADAS], check_dtype=False)
+
+
+def test_correcao_nao_altera_entrada():
+    df = _carteira()
+    original = df.copy()
+
+    CalculadorCorrecao(ParametrosFixos()).processar_correcao_completa(df, "teste")
+
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_profiler_registra_etapas_sem_contar_copias():
+    profiler = ProfilerPipeline()
+
+    CalculadorCorrecao(ParametrosFixos()).processar_correcao_completa(_carteira(), "teste", profiler=profiler)
+
+    assert profiler.resumo()["etapa"].tolist() == [
+        "valor_liquido", "multa", "juros_moratorios", "correcao_monetaria", "valor_corrigido",
+    ]
+    assert profiler.total_copias is None
+
+
+def test_pipeline_exige_colunas_lidas():
+    pipeline = PipelineColunas([EtapaColunas("dobro", lambda df: df, le=["valor"])])
+
+    with pytest.raises(KeyError, match="valor"):
+        pipeline.executar(pd.DataFrame({"outro": [1]}))
+
+
+def test_pipeline_exige_colunas_escritas():
+    pipeline = PipelineColunas([EtapaColunas("dobro", lambda df: df, escreve=["dobro"])])
+
+    with pytest.raises(KeyError, match="dobro"):
+        pipeline.executar(pd.DataFrame({"valor": [1]}))
+
+
+def test_pipeline_rejeita_novo_frame_sem_copia():
+    pipeline = PipelineColunas([EtapaColunas("filtro", lambda df: df[df["valor"] > 1])])
+
+    with pytest.raises(RuntimeError, match="copia=True"):
+        pipeline.executar(pd.DataFrame({"valor": [1, 2]}))
+
+
+def test_pipeline_aceita_novo_frame_com_copia():
+    pipeline = PipelineColunas([EtapaColunas("filtro", lambda df: df[df["valor"] > 1], copia=True)])
+
+    resultado = pipeline.executar(pd.DataFrame({"valor": [1, 2]}))
+
+    assert resultado["valor"].tolist() == [2]
@@ -0,0 +1,81 @@
+"""
+IPCA acumulado: a serie montada das variacoes do cache tem de ter os mesmos
+valores do laco original com a SIDRA (arredondamento a 4 casas a cada mes).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.provedor_indices import (
+    IPCA_ACUMULADO_EMBUTIDO,
+    VALOR_BASE_IPCA,
+    ProvedorIndices,
+    ipca_acumulado,
+    variacoes_ipca_embutidas,
+)
+
+
+def _ipca_original(variacoes, valor_inicial):
+    """Laco de ``_calcular_ipca_acumulado`` da versao original (oraculo)."""
+    meses = sorted(variacoes)
+    acumulado = [valor_inicial]
+    for i in range(1, len(meses)):
+        acumulado.append(round(acumulado[-1] * (1 + variacoes[meses[i - 1]] / 100), 4))
+    return dict(zip(meses, acumulado))
+
+
+def _variacoes_aleatorias(meses, semente=11):
+    rng = np.random.default_rng(semente)
+    periodos = pd.period_range("2021-06", periods=meses, freq="M").strftime("%Y.%m")
+    return dict(zip(periodos, rng.uniform(-0.7, 1.7, meses).round(2)))
+
+
+@pytest.mark.parametrize("valor_base", [VALOR_BASE_IPCA, 1000.0, 1.0])
+def test_ipca_igual_ao_laco_original(valor_base):
+    variacoes = _variacoes_aleatorias(60)
+
+    resultado = ipca_acumulado(variacoes, valor_base)
+
+    esperado = _ipca_original(variacoes, valor_base)
+    assert {mes: resultado[mes] for mes in esperado} == esperado
+
+
+def test_ipca_vai_ate_o_mes_seguinte_a_ultima_variacao():
+    variacoes = {"2024.11": 0.39, "2024.12": 0.52}
+
+    resultado = ipca_acumulado(variacoes, 1000.0)
+
+    assert resultado == {"2024.11": 1000.0, "2024.12": 1003.9, "2025.01": round(1003.9 * 1.0052, 4)}
+
+
+def test_ipca_para_no_primeiro_buraco():
+    variacoes = {"2021.06": 0.53, "2021.07": 0.96, "2021.09": 1.16}
+
+    resultado = ipca_acumulado(variacoes, 1000.0)
+
+    assert list(resultado) == ["2021.06", "2021.07", "2021.08"]
+
+
+def test_variacoes_embutidas_remontam_a_serie_embutida():
+    assert ipca_acumulado(variacoes_ipca_embutidas(), VALOR_BASE_IPCA) == IPCA_ACUMULADO_EMBUTIDO
+
+
+def test_provedor_sem_cache_usa_serie_embutida(tmp_path):
+    provedor = ProvedorIndices(tmp_path)
+
+    assert provedor.ipca_acumulado() == IPCA_ACUMULADO_EMBUTIDO
+    assert provedor.ipca_acumulado(2 * VALOR_BASE_IPCA)["2025.04"] == round(IPCA_ACUMULADO_EMBUTIDO["2025.04"] * 2, 4)
+
+
+def test_provedor_estende_serie_embutida_com_o_cache(tmp_path):
+    provedor = ProvedorIndices(tmp_path)
+    provedor.guardar_serie("ipca", {"2025.04": 0.43, "2025.05": 0.26}, fonte="teste")
+
+    resultado = provedor.ipca_acumulado()
+
+    assert {mes: resultado[mes] for mes in IPCA_ACUMULADO_EMBUTIDO} == IPCA_ACUMULADO_EMBUTIDO
+    assert resultado["2025.05"] == round(IPCA_ACUMULADO_EMBUTIDO["2025.04"] * 1.0043, 4)
+    assert resultado["2025.06"] == round(resultado["2025.05"] * 1.0026, 4)
+    esperado = _ipca_original(provedor.serie("ipca"), VALOR_BASE_IPCA)
+    assert {mes: resultado[mes] for mes in esperado} == esperado
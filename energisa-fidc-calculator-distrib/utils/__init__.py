@@ -1,19 +1,36 @@
 # Pacote utils para o FIDC Calculator
 
-# Importações principais
-from .calculador_correcao import CalculadorCorrecao
-from .calculador_voltz import CalculadorVoltz
-from .calculador_remuneracao_variavel import (
-    CalculadorRemuneracaoVariavel,
-    calcular_remuneracao_variavel_padrao,
-    calcular_remuneracao_variavel_voltz,
-    obter_faixas_aging_padrao,
-    obter_faixas_aging_voltz
-)
+# Importações principais, carregadas sob demanda (PEP 562): importar um
+# submódulo qualquer (ex.: utils.leitor_excel) não carrega os calculadores.
+import importlib
+
+_ORIGENS = {
+    'CalculadorCorrecao': '.calculador_correcao',
+    'CalculadorVoltz': '.calculador_voltz',
+    'CalculadorRemuneracaoVariavel': '.calculador_remuneracao_variavel',
+    'calcular_remuneracao_variavel_padrao': '.calculador_remuneracao_variavel',
+    'calcular_remuneracao_variavel_voltz': '.calculador_remuneracao_variavel',
+    'obter_faixas_aging_padrao': '.calculador_remuneracao_variavel',
+    'obter_faixas_aging_voltz': '.calculador_remuneracao_variavel',
+}
+
+
+def __getattr__(nome):
+    origem = _ORIGENS.get(nome)
+    if origem is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(origem, __name__), nome)
+    globals()[nome] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_ORIGENS))
+
 
 __all__ = [
     'CalculadorCorrecao',
-    'CalculadorVoltz', 
+    'CalculadorVoltz',
     'CalculadorRemuneracaoVariavel',
     'calcular_remuneracao_variavel_padrao',
     'calcular_remuneracao_variavel_voltz',
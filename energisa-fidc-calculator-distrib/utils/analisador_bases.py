@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import streamlit as st
 
+from .carregamento_paralelo import ler_planilha
+
 
 class AnalisadorBases:
     """
@@ -28,26 +30,14 @@ class AnalisadorBases:
         try:
             # Verificar se é arquivo Excel
             if uploaded_file.name.endswith('.xlsx') or uploaded_file.name.endswith('.xls'):
-                # Verificar se tem múltiplas abas
-                xl_file = pd.ExcelFile(uploaded_file)
+                # Abas e dados lidos com o arquivo aberto uma única vez
+                resultado = ler_planilha(uploaded_file, nome_distribuidora)
                 
-                if len(xl_file.sheet_names) > 1:
-                    st.info(f"📋 Abas disponíveis: {xl_file.sheet_names}")
-                    
-                    # Usar primeira aba ou buscar por nomes comuns
-                    abas_comuns = ['Base', 'Dados', 'Principal', nome_distribuidora.title()]
-                    aba_principal = xl_file.sheet_names[0]  # Default
-                    
-                    for aba_comum in abas_comuns:
-                        if aba_comum in xl_file.sheet_names:
-                            aba_principal = aba_comum
-                            break
-                    
-                    df = pd.read_excel(uploaded_file, sheet_name=aba_principal)
-                    st.info(f"📄 Aba utilizada: {aba_principal}")
-                else:
-                    df = pd.read_excel(uploaded_file)
+                if len(resultado.abas) > 1:
+                    st.info(f"📋 Abas disponíveis: {resultado.abas}")
+                    st.info(f"📄 Aba utilizada: {resultado.aba}")
                 
+                df = resultado.dataframe
                 st.success(f"✅ Base {nome_distribuidora} carregada: {len(df):,} registros x {len(df.columns)} colunas")
                 return df
                 
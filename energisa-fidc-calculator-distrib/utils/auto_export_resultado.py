@@ -4,34 +4,106 @@ Utilitario para exportacao automatica do resultado final em Excel.
 
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
 
-from utils.exportacao_csv_brasil import truncar_numericos
+from utils.exportacao_colunar import parametros_execucao
+from utils.exportacao_excel_streaming import exportar_excel_streaming
+from utils.exportacao_jobs import STATUS_CONCLUIDO, STATUS_ERRO, ArtefatoExportacao, JobExportacao
+from utils.manifesto_exportacao import ManifestoExportacao, chave_execucao
 
+FORMATOS_EXPORTACAO_PADRAO = ("excel", "csv", "parquet", "arrow")
+# Para envio a administradora: CSV gzip avulso e pacote zip (CSV gzip + resumo + manifesto)
+FORMATOS_EXPORTACAO_COMPACTADA = ("csv_gz", "pacote")
+# Parametros da execucao gravados no proprio resultado (df_final.attrs)
+ATRIBUTO_PARAMETROS = "fidc_parametros_execucao"
 
-def _chave_resultado(df_final: pd.DataFrame) -> str:
-    """Gera uma chave simples para evitar exportacoes duplicadas em reruns."""
-    registros = str(len(df_final))
-    total_colunas = str(len(df_final.columns))
 
-    agregados = []
-    for coluna in ("valor_principal", "valor_corrigido", "valor_justo"):
-        if coluna in df_final.columns:
-            serie = pd.to_numeric(df_final[coluna], errors="coerce")
-            agregados.append(f"{serie.sum(skipna=True):.2f}")
-        else:
-            agregados.append("NA")
+def _parametros_exportacao(df_final: pd.DataFrame, eh_voltz: bool) -> dict:
+    """
+    Parametros do calculo que gerou ``df_final`` (gravados por
+    ``iniciar_exportacao_resultado_final``); sem eles, os parametros atuais da sessao.
+    """
+    parametros = df_final.attrs.get(ATRIBUTO_PARAMETROS)
+    if parametros is None:
+        parametros = parametros_execucao(st.session_state.get("params"))
+    return {"eh_voltz": eh_voltz, **parametros}
 
-    return "|".join([registros, total_colunas] + agregados)
+
+def _chave_resultado(df_final: pd.DataFrame, eh_voltz: bool = False) -> str:
+    """
+    Chave da execucao (hash do conteudo + hash dos parametros) usada no manifesto.
+    O hash do conteudo fica em cache enquanto ``df_final`` for o mesmo objeto.
+    """
+    return chave_execucao(df_final, _parametros_exportacao(df_final, eh_voltz))
 
 
 def _resolver_pasta_data() -> Path:
     return Path(__file__).resolve().parents[1] / "data"
 
 
+def _manifesto() -> ManifestoExportacao:
+    return ManifestoExportacao(_resolver_pasta_data())
+
+
+def _registrar_no_manifesto(chave: str, formato: str, caminho: Path, registros: int, parametros: dict) -> None:
+    try:
+        _manifesto().registrar(chave, formato, caminho, registros=registros, parametros=parametros)
+    except OSError:
+        # Sem manifesto o arquivo continua valido; so nao sera reaproveitado.
+        pass
+
+
+def _preparar_df_exportacao(df_final: pd.DataFrame) -> pd.DataFrame:
+    """Copia rasa sem 'documento' e com o nome de coluna da data base."""
+    # Copia rasa: colunas removidas/renomeadas/truncadas nao afetam df_final.
+    df_export = df_final.copy(deep=False)
+    if "documento" in df_export.columns:
+        del df_export["documento"]
+
+    # No arquivo Excel final, expor o nome da coluna alinhado ao conceito de data base.
+    if "valor_corrigido" in df_export.columns and "valor_corrigido_ate_data_base" not in df_export.columns:
+        df_export.columns = [
+            "valor_corrigido_ate_data_base" if coluna == "valor_corrigido" else coluna
+            for coluna in df_export.columns
+        ]
+    return df_export
+
+
+def _caminho_base_resultado(eh_voltz: bool, execucao_id: Optional[str]) -> Path:
+    """Caminho do arquivo final sem extensao, dentro da pasta data."""
+    pasta_data = _resolver_pasta_data()
+    pasta_data.mkdir(parents=True, exist_ok=True)
+
+    prefixo = "FIDC_VOLTZ_Dados_Finais" if eh_voltz else "FIDC_Dados_Finais"
+    sufixo = execucao_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    return pasta_data / f"{prefixo}_{sufixo}"
+
+
+def _registrar_exportacao(
+    caminho: Path,
+    df_final: pd.DataFrame,
+    execucao_id: Optional[str],
+    desempenho: str,
+    chave: str,
+) -> None:
+    st.session_state.auto_export_caminho = str(caminho)
+    st.session_state.auto_export_chave_resultado = chave
+    st.session_state.auto_export_execucao_id = execucao_id
+    st.session_state.auto_export_registros = len(df_final)
+    st.session_state.auto_export_data_hora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    st.session_state.auto_export_desempenho = desempenho
+
+
+def _job_da_execucao(execucao_id: Optional[str]) -> Optional[JobExportacao]:
+    job = st.session_state.get("job_exportacao")
+    if job is not None and execucao_id and job.identificador == execucao_id:
+        return job
+    return None
+
+
 def exportar_resultado_final_excel(
     df_final: pd.DataFrame,
     eh_voltz: bool = False,
@@ -53,38 +125,207 @@ def exportar_resultado_final_excel(
     if execucao_id and execucao_id == ultimo_execucao_id and ultimo_caminho:
         return str(ultimo_caminho), False
 
-    chave_atual = _chave_resultado(df_final)
+    # Exportacao em segundo plano desta execucao ja cuida do Excel.
+    job = _job_da_execucao(execucao_id)
+    if job is not None and job.artefato("excel") is not None:
+        return str(job.artefato("excel").caminho), False
+
+    chave_atual = _chave_resultado(df_final, eh_voltz)
     ultima_chave = st.session_state.get("auto_export_chave_resultado")
     if not execucao_id and ultima_chave == chave_atual and ultimo_caminho:
         return str(ultimo_caminho), False
 
-    pasta_data = _resolver_pasta_data()
-    pasta_data.mkdir(parents=True, exist_ok=True)
+    # Mesmo resultado e parametros ja exportados (outra sessao ou antes de reiniciar o app).
+    existente = _manifesto().artefatos(chave_atual).get("excel")
+    if existente is not None:
+        _registrar_exportacao(existente, df_final, execucao_id, "reaproveitado de exportacao anterior", chave_atual)
+        return str(existente), False
 
-    prefixo = "FIDC_VOLTZ_Dados_Finais" if eh_voltz else "FIDC_Dados_Finais"
-    sufixo = execucao_id or datetime.now().strftime("%Y%m%d_%H%M%S")
-    caminho_arquivo = pasta_data / f"{prefixo}_{sufixo}.xlsx"
+    caminho_arquivo = _caminho_base_resultado(eh_voltz, execucao_id).with_suffix(".xlsx")
 
-    df_export = df_final.copy()
-    if "documento" in df_export.columns:
-        df_export = df_export.drop(columns=["documento"], errors="ignore")
+    # Escrita em streaming direto no disco; acima de 1.048.576 linhas divide em abas numeradas.
+    # O truncamento numerico e aplicado bloco a bloco durante a escrita.
+    estatisticas = exportar_excel_streaming(
+        caminho_arquivo,
+        [("resultado", _preparar_df_exportacao(df_final))],
+        casas_decimais_truncamento=4,
+    )
 
-    # No arquivo Excel final, expor o nome da coluna alinhado ao conceito de data base.
-    if "valor_corrigido" in df_export.columns and "valor_corrigido_ate_data_base" not in df_export.columns:
-        df_export = df_export.rename(columns={"valor_corrigido": "valor_corrigido_ate_data_base"})
+    _registrar_no_manifesto(chave_atual, "excel", caminho_arquivo, len(df_final), _parametros_exportacao(df_final, eh_voltz))
+    _registrar_exportacao(caminho_arquivo, df_final, execucao_id, estatisticas.descricao(), chave_atual)
+    st.session_state.auto_export_estatisticas = estatisticas.to_dict()
 
-    df_export = truncar_numericos(df_export, casas_decimais=4)
+    return str(caminho_arquivo), True
 
-    with pd.ExcelWriter(caminho_arquivo, engine="openpyxl") as writer:
-        df_export.to_excel(writer, index=False, sheet_name="resultado")
 
-    st.session_state.auto_export_caminho = str(caminho_arquivo)
-    st.session_state.auto_export_chave_resultado = chave_atual
-    st.session_state.auto_export_execucao_id = execucao_id
-    st.session_state.auto_export_registros = len(df_final)
-    st.session_state.auto_export_data_hora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+def iniciar_exportacao_resultado_final(
+    df_final: pd.DataFrame,
+    eh_voltz: bool = False,
+    formatos: Iterable[str] = FORMATOS_EXPORTACAO_PADRAO,
+    params=None,
+) -> Optional[JobExportacao]:
+    """
+    Dispara a exportacao do resultado final (Excel, CSV, Parquet e Arrow por padrao)
+    em segundo plano e retorna imediatamente. O job fica em
+    ``st.session_state.job_exportacao``; use ``exibir_exportacao_resultado_final``
+    para acompanhar. Uma execucao de calculo gera no maximo um job, e formatos
+    ja exportados para o mesmo resultado e parametros (manifesto em disco) sao
+    reaproveitados sem nova escrita.
 
-    return str(caminho_arquivo), True
+    ``params`` sao os parametros usados pelo calculador; ficam gravados em
+    ``df_final.attrs`` e formam a chave do manifesto desta e das proximas
+    exportacoes do mesmo resultado, mesmo que a sessao mude depois.
+    """
+    if df_final is None or df_final.empty:
+        return None
+    if params is not None:
+        df_final.attrs[ATRIBUTO_PARAMETROS] = parametros_execucao(params)
+
+    execucao_id = st.session_state.get("calculo_execucao_id")
+    job = _job_da_execucao(execucao_id)
+    if job is not None:
+        return job
+
+    job = _criar_job(df_final, eh_voltz, execucao_id, formatos)
+    st.session_state.job_exportacao = job
+    st.session_state.job_exportacao_df_final = df_final
+    st.session_state.job_exportacao_eh_voltz = eh_voltz
+    return job
+
+
+def _criar_job(
+    df_final: pd.DataFrame,
+    eh_voltz: bool,
+    execucao_id: Optional[str],
+    formatos: Iterable[str],
+) -> JobExportacao:
+    """Job iniciado, reaproveitando do manifesto os formatos ja exportados."""
+    parametros = _parametros_exportacao(df_final, eh_voltz)
+    chave = chave_execucao(df_final, parametros)
+    st.session_state.job_exportacao_chave = chave
+
+    def ao_concluir(artefato: ArtefatoExportacao) -> None:
+        _registrar_no_manifesto(chave, artefato.formato, artefato.caminho, len(df_final), parametros)
+
+    return JobExportacao(
+        _preparar_df_exportacao(df_final),
+        _caminho_base_resultado(eh_voltz, execucao_id),
+        formatos,
+        identificador=execucao_id,
+        parametros=parametros,
+        artefatos_existentes=_manifesto().artefatos(chave),
+        ao_concluir=ao_concluir,
+    ).iniciar()
+
+
+def iniciar_exportacao_compactada(
+    df_final: pd.DataFrame,
+    eh_voltz: bool = False,
+    formatos: Iterable[str] = FORMATOS_EXPORTACAO_COMPACTADA,
+) -> Optional[JobExportacao]:
+    """
+    Dispara em segundo plano o CSV compactado e o pacote zip do resultado final
+    (``st.session_state.job_exportacao_compactada``), uma vez por execucao.
+    """
+    if df_final is None or df_final.empty:
+        return None
+
+    execucao_id = st.session_state.get("calculo_execucao_id")
+    job = st.session_state.get("job_exportacao_compactada")
+    if job is not None and execucao_id and job.identificador == execucao_id:
+        return job
+
+    job = _criar_job(df_final, eh_voltz, execucao_id, formatos)
+    st.session_state.job_exportacao_compactada = job
+    return job
+
+
+def _exibir_painel_job(job: JobExportacao) -> None:
+    for artefato in job.artefatos.values():
+        if artefato.status == STATUS_CONCLUIDO:
+            st.success(f"✅ **{artefato.rotulo}** `{artefato.caminho.name}` — {artefato.descricao()}")
+        elif artefato.status == STATUS_ERRO:
+            st.error(f"❌ **{artefato.rotulo}** — {artefato.descricao()}")
+        else:
+            st.progress(artefato.progresso, text=f"⏳ {artefato.rotulo}: {artefato.descricao()}")
+
+    if not job.concluido:
+        return
+
+    # Excel concluido: registrar como exportacao automatica (evita reexportar em main.py).
+    excel = job.artefato("excel")
+    df_final = st.session_state.get("job_exportacao_df_final")
+    if (
+        excel is not None
+        and excel.status == STATUS_CONCLUIDO
+        and df_final is not None
+        and st.session_state.get("auto_export_caminho") != str(excel.caminho)
+    ):
+        _registrar_exportacao(
+            excel.caminho,
+            df_final,
+            job.identificador,
+            excel.descricao(),
+            st.session_state.get("job_exportacao_chave") or _chave_resultado(df_final),
+        )
+
+
+def _atualizar_painel_job(job: JobExportacao) -> None:
+    """
+    Corpo do fragmento com ``run_every``: ao concluir o job, reexecuta a pagina,
+    que passa a exibir o painel fora do fragmento e encerra a atualizacao.
+    """
+    _exibir_painel_job(job)
+    if job.concluido:
+        st.rerun()
+
+
+def _exibir_painel_job_ao_vivo(job: JobExportacao, chave_atualizar: str, rotulo_atualizar: str) -> None:
+    """Painel do job atualizado a cada segundo enquanto ele estiver em andamento."""
+    fragmento = getattr(st, "fragment", None)
+    if fragmento is not None and not job.concluido:
+        # Streamlit com fragmentos: atualiza so o painel, sem rerun da pagina.
+        fragmento(run_every=1.0)(_atualizar_painel_job)(job)
+        return
+
+    _exibir_painel_job(job)
+    if not job.concluido:
+        st.button(rotulo_atualizar, key=chave_atualizar)
+
+
+def _exibir_exportacao_compactada() -> None:
+    """CSV gzip + pacote zip sob demanda, com razao de compressao e vazao."""
+    st.markdown("#### 📦 Exportação compactada")
+    job = st.session_state.get("job_exportacao_compactada")
+    execucao_id = st.session_state.get("calculo_execucao_id")
+    if job is None or job.identificador != execucao_id:
+        if st.button(
+            "📦 Gerar CSV compactado (.csv.gz) e pacote .zip",
+            key="iniciar_job_exportacao_compactada",
+            help="Pacote com CSV gzip, planilha de resumo e manifesto da execução, para envio à administradora.",
+        ):
+            job = iniciar_exportacao_compactada(
+                st.session_state.get("job_exportacao_df_final"),
+                eh_voltz=st.session_state.get("job_exportacao_eh_voltz", False),
+            )
+        if job is None:
+            return
+
+    _exibir_painel_job_ao_vivo(
+        job, "atualizar_job_exportacao_compactada", "🔄 Atualizar status da exportação compactada",
+    )
+
+
+def exibir_exportacao_resultado_final() -> None:
+    """Painel com progresso por formato e artefatos concluidos (tamanho e MB/s)."""
+    job = st.session_state.get("job_exportacao")
+    if job is None:
+        return
+
+    st.markdown("### 💾 Exportação do Resultado Final")
+    _exibir_painel_job_ao_vivo(job, "atualizar_job_exportacao", "🔄 Atualizar status da exportação")
+
+    _exibir_exportacao_compactada()
 
 
 def exportar_resultado_final_csv(
@@ -0,0 +1,67 @@
+"""
+Cache de valores derivados de um DataFrame, valido enquanto o mesmo objeto
+estiver vivo.
+
+Cubo de agregados, hash do conteudo e paginador do resultado final sao
+caros de montar e dependem so do DataFrame. Entre reruns do Streamlit o
+resultado continua sendo o mesmo objeto (``st.session_state``), entao o
+valor e guardado pelo ``id`` do DataFrame, com uma referencia fraca (o
+item sai do cache quando o DataFrame e coletado) e a assinatura de linhas e
+colunas (o item e refeito se o DataFrame ganhar ou perder linhas/colunas).
+Valores alterados in place sem mudar a assinatura exigem ``descartar``.
+"""
+
+import weakref
+from typing import Callable, Dict, Generic, Tuple, TypeVar
+
+import pandas as pd
+
+T = TypeVar("T")
+
+
+def assinatura_dataframe(df: pd.DataFrame) -> Tuple:
+    return (len(df), tuple(df.columns))
+
+
+class CachePorDataFrame(Generic[T]):
+    """
+    Um valor por DataFrame vivo.
+
+    Uso:
+        _cubos = CachePorDataFrame()
+        cubo = _cubos.obter(df, CuboAgregados)   # fabrica(df) so na primeira vez
+        _cubos.descartar(df)
+    """
+
+    def __init__(self):
+        self._itens: Dict[int, Tuple[weakref.ref, Tuple, T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def obter(self, df: pd.DataFrame, fabrica: Callable[[pd.DataFrame], T]) -> T:
+        """Valor em cache de ``df``, ou ``fabrica(df)`` (guardado para as proximas chamadas)."""
+        chave = id(df)
+        entrada = self._itens.get(chave)
+        if entrada is not None:
+            referencia, assinatura, valor = entrada
+            if referencia() is df and assinatura == assinatura_dataframe(df):
+                return valor
+
+        valor = fabrica(df)
+        itens = self._itens
+
+        def _descartar(referencia_morta):
+            atual = itens.get(chave)
+            if atual is not None and atual[0] is referencia_morta:
+                del itens[chave]
+
+        try:
+            itens[chave] = (weakref.ref(df, _descartar), assinatura_dataframe(df), valor)
+        except TypeError:
+            pass
+        return valor
+
+    def descartar(self, df: pd.DataFrame) -> None:
+        """Remove o valor de ``df`` (apos alterar valores in place)."""
+        self._itens.pop(id(df), None)
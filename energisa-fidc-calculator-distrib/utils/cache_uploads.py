@@ -0,0 +1,132 @@
+"""
+Cache em memoria das planilhas enviadas, indexado pelo conteudo.
+
+A chave e o hash blake2b do arquivo, calculado em blocos enquanto o buffer
+do upload e lido (``ler_com_hash``). O mesmo arquivo enviado com outro nome
+reaproveita a leitura, e um arquivo novo com o nome de um antigo (base do
+mes seguinte) e lido de novo.
+
+Os DataFrames lidos ficam em um LRU limitado pela memoria ocupada. Ha uma
+unica instancia por processo (``obter_cache_uploads``), compartilhada por
+todas as sessoes do Streamlit. Os DataFrames do cache nao devem ser
+alterados no lugar: outras sessoes podem estar usando o mesmo objeto.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import pandas as pd
+
+TAMANHO_BLOCO_HASH = 1024 ** 2
+LIMITE_BYTES_PADRAO = 1024 ** 3
+
+
+def ler_com_hash(arquivo) -> Tuple[bytes, str]:
+    """
+    Conteudo e hash de um arquivo enviado, caminho, arquivo aberto ou bytes,
+    em uma unica passada pelo buffer.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    if isinstance(arquivo, (bytes, bytearray, memoryview)):
+        conteudo = bytes(arquivo)
+        visao = memoryview(conteudo)
+        for inicio in range(0, len(conteudo), TAMANHO_BLOCO_HASH):
+            hasher.update(visao[inicio:inicio + TAMANHO_BLOCO_HASH])
+        return conteudo, hasher.hexdigest()
+
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, 'rb') as origem:
+            return ler_com_hash(origem)
+
+    arquivo.seek(0)
+    blocos = []
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO_HASH)
+        if not bloco:
+            break
+        hasher.update(bloco)
+        blocos.append(bloco)
+    arquivo.seek(0)
+    return b''.join(blocos), hasher.hexdigest()
+
+
+def tamanho_em_memoria(valor) -> int:
+    """Bytes ocupados por um DataFrame (ou objeto com ``.dataframe``), incluindo textos."""
+    df = getattr(valor, 'dataframe', valor)
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(valor)
+
+
+class CacheUploads:
+    """
+    LRU de leituras de planilhas limitado por bytes.
+
+    Uso:
+        cache = obter_cache_uploads()
+        resultado = cache.obter(("completa", hash_arquivo, aba, colunas))
+        if resultado is None:
+            resultado = ler_planilha(...)
+            cache.guardar(("completa", hash_arquivo, aba, colunas), resultado)
+
+    Itens maiores que o limite inteiro nao sao guardados.
+    """
+
+    def __init__(self, limite_bytes: int = LIMITE_BYTES_PADRAO):
+        self.limite_bytes = max(int(limite_bytes), 0)
+        self._itens: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        self._bytes_em_uso = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    @property
+    def bytes_em_uso(self) -> int:
+        return self._bytes_em_uso
+
+    def obter(self, chave: Hashable) -> Optional[object]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            self._itens.move_to_end(chave)
+            return item[0]
+
+    def guardar(self, chave: Hashable, valor, tamanho: Optional[int] = None) -> bool:
+        """Guarda ``valor`` e descarta os menos usados ate caber; False se nao couber."""
+        tamanho = tamanho_em_memoria(valor) if tamanho is None else int(tamanho)
+        if tamanho > self.limite_bytes:
+            return False
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes_em_uso -= anterior[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes_em_uso += tamanho
+            while self._bytes_em_uso > self.limite_bytes:
+                _, (_, tamanho_descartado) = self._itens.popitem(last=False)
+                self._bytes_em_uso -= tamanho_descartado
+        return True
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._bytes_em_uso = 0
+
+
+_cache_global: Optional[CacheUploads] = None
+_lock_global = threading.Lock()
+
+
+def obter_cache_uploads() -> CacheUploads:
+    """Cache do processo, compartilhado entre sessoes."""
+    global _cache_global
+    with _lock_global:
+        if _cache_global is None:
+            _cache_global = CacheUploads()
+        return _cache_global
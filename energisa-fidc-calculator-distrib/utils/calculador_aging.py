@@ -9,6 +9,7 @@ import numpy as np
 from datetime import datetime
 import streamlit as st
 from .checkpoint_manager import usar_checkpoint
+from .pipeline_colunas import EtapaColunas, PipelineColunas
 
 
 class CalculadorAging:
@@ -38,8 +39,6 @@ class CalculadorAging:
         Calcula dias de atraso entre vencimento e data base.
         """
         
-        df = df.copy()
-        
         # Verificar se temos campo de data de vencimento
         if 'data_vencimento' not in df.columns:
             st.error("❌ Campo data_vencimento não encontrado")
@@ -93,8 +92,6 @@ class CalculadorAging:
         Aplica classificação de aging para todo o DataFrame.
         """
         with st.spinner("🏷️ Aplicando classificação de aging..."):
-            df = df.copy()
-
             # Aplicar classificação
             df['aging'] = df['dias_atraso'].apply(self.classificar_aging)
         
@@ -123,11 +120,13 @@ class CalculadorAging:
         """
         Implementação interna do processamento de aging (sem checkpoint)
         """
-        # Calcular dias de atraso
-        df = self.calcular_dias_atraso(df)
-        
-        # Aplicar classificação
-        df = self.aplicar_classificacao_aging(df)
+        pipeline = PipelineColunas([
+            EtapaColunas('dias_atraso', self.calcular_dias_atraso,
+                         escreve=['dias_atraso']),
+            EtapaColunas('classificacao_aging', self.aplicar_classificacao_aging,
+                         le=['dias_atraso'], escreve=['aging']),
+        ])
+        df = pipeline.executar(df)
         
         st.success("✅ Cálculo de aging concluído!")
         
@@ -7,9 +7,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
-import streamlit as st
 from .calculador_voltz import CalculadorVoltz
 from .calculador_remuneracao_variavel import CalculadorRemuneracaoVariavel
+from .eventos_calculo import SinkEventos, SinkLogging
+from .pipeline_colunas import EtapaColunas, PipelineColunas, ProfilerPipeline, profiler_depuracao
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +18,42 @@ logger = logging.getLogger(__name__)
 class CalculadorCorrecao:
     """
     Calcula correção monetária e valor corrigido final.
+    
+    Não depende de Streamlit: índices, curva DI-PRE e parâmetros entram como
+    argumentos, e mensagens de progresso vão para o sink de ``eventos``.
     """
     
-    def __init__(self, params):
+    def __init__(self, params, curve_store=None, eventos: SinkEventos = None,
+                 df_indices_igpm: pd.DataFrame = None, df_indices_economicos: pd.DataFrame = None,
+                 df_di_pre: pd.DataFrame = None):
         self.params = params
-        # Inicializar calculador específico da Voltz
-        self.calculador_voltz = CalculadorVoltz(params)
+        self.curve_store = curve_store
+        self.eventos = eventos if eventos is not None else SinkLogging(__name__)
+        # Dados de mercado guardados para o calculador VOLTZ, criado só quando usado
+        self.df_indices_igpm = df_indices_igpm
+        self.df_indices_economicos = df_indices_economicos
+        self.df_di_pre = df_di_pre
+        self._calculador_voltz = None
+    
+    @property
+    def calculador_voltz(self) -> CalculadorVoltz:
+        """Calculador específico da VOLTZ (instanciado no primeiro uso)."""
+        if self._calculador_voltz is None:
+            self._calculador_voltz = CalculadorVoltz(
+                self.params,
+                curve_store=self.curve_store,
+                eventos=self.eventos,
+                df_indices_igpm=self.df_indices_igpm,
+                df_indices_economicos=self.df_indices_economicos,
+                df_di_pre=self.df_di_pre,
+            )
+        return self._calculador_voltz
     
     def identificar_distribuidora(self, nome_arquivo: str) -> str:
         """
         Identifica o tipo de distribuidora baseado no nome do arquivo.
         """
-        if self.calculador_voltz.identificar_voltz(nome_arquivo):
+        if CalculadorVoltz.identificar_voltz(nome_arquivo):
             return "VOLTZ"
         else:
             return "PADRAO"
@@ -40,10 +65,10 @@ class CalculadorCorrecao:
         tipo_distribuidora = self.identificar_distribuidora(nome_base)
         
         if tipo_distribuidora == "VOLTZ":
-            st.success("⚡ **VOLTZ detectada!** Aplicando regras específicas para Fintech/CCBs")
+            self.eventos.sucesso("⚡ **VOLTZ detectada!** Aplicando regras específicas para Fintech/CCBs")
             return self.calculador_voltz.processar_correcao_voltz_completa(df, nome_base, df_taxa_recuperacao)
         else:
-            st.info("🏢 **Distribuidora padrão** - Aplicando regras convencionais")
+            self.eventos.info("🏢 **Distribuidora padrão** - Aplicando regras convencionais")
             return self.processar_correcao_completa_com_recuperacao(df, nome_base, df_taxa_recuperacao)
     
     def limpar_e_converter_valor(self, serie_valor: pd.Series) -> pd.Series:
@@ -201,6 +226,9 @@ class CalculadorCorrecao:
     def calcular_valor_liquido(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula valor líquido = valor_principal - valor_nao_cedido - valor_terceiro - valor_cip
+        
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
         """
         # Limpar valor principal
         if 'valor_principal' not in df.columns:
@@ -238,9 +266,10 @@ class CalculadorCorrecao:
     def calcular_multa(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula multa de 2% sobre valor líquido.
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Calcular valor líquido se não foi calculado
         if 'valor_liquido' not in df.columns:
             df = self.calcular_valor_liquido(df)
@@ -257,9 +286,10 @@ class CalculadorCorrecao:
     def calcular_juros_moratorios(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula juros moratórios de 1% ao mês proporcional sobre valor líquido.
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Calcular meses de atraso
         df['meses_atraso'] = df['dias_atraso'] / 30
         
@@ -275,9 +305,10 @@ class CalculadorCorrecao:
     def calcular_correcao_monetaria(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula correção monetária baseada em IGPM/IPCA sobre valor líquido.
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Buscar índices
         df['indice_vencimento'] = df['data_vencimento_limpa'].apply(
             lambda x: self.params.buscar_indice_correcao(x) if pd.notna(x) else 624.40
@@ -303,9 +334,10 @@ class CalculadorCorrecao:
     def calcular_valor_corrigido_final(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula valor corrigido final somando todos os componentes.
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Somar todos os componentes
         df['valor_corrigido'] = (
             df['valor_liquido'] +
@@ -318,10 +350,8 @@ class CalculadorCorrecao:
     
     def gerar_resumo_correcao(self, df: pd.DataFrame, nome_base: str):
         """
-        Gera resumo da correção monetária.
+        Gera resumo da correção monetária (evento de resumo no sink).
         """
-        st.subheader(f"📊 Resumo da Correção - {nome_base.upper()}")
-        
         valor_principal = df['valor_principal_limpo'].sum()
         valor_deducoes = (df['valor_nao_cedido_limpo'].sum() + 
                          df['valor_terceiro_limpo'].sum() + 
@@ -334,47 +364,52 @@ class CalculadorCorrecao:
         
         percentual_total = ((valor_corrigido / valor_liquido) - 1) * 100 if valor_liquido > 0 else 0
         
-        # Exibir em formato de métricas
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric("💵 Valor Principal", f"R$ {valor_principal:,.2f}")
-            st.metric("⚖️ Multa (2%)", f"R$ {multa_total:,.2f}")
-        
-        with col2:
-            st.metric("➖ Deduções Totais", f"R$ {valor_deducoes:,.2f}")
-            st.metric("📈 Juros Moratórios", f"R$ {juros_total:,.2f}")
-        
-        with col3:
-            st.metric("💎 Valor Líquido", f"R$ {valor_liquido:,.2f}")
-            st.metric("💹 Correção Monetária", f"R$ {correcao_total:,.2f}")
-        
-        with col4:
-            st.metric("🎯 Valor Corrigido", f"R$ {valor_corrigido:,.2f}")
-            st.metric("📊 Correção Total", f"{percentual_total:.2f}%")
+        # Métricas em 4 colunas (linha 1: valores base; linha 2: encargos)
+        self.eventos.resumo(f"📊 Resumo da Correção - {nome_base.upper()}", {
+            "💵 Valor Principal": f"R$ {valor_principal:,.2f}",
+            "➖ Deduções Totais": f"R$ {valor_deducoes:,.2f}",
+            "💎 Valor Líquido": f"R$ {valor_liquido:,.2f}",
+            "🎯 Valor Corrigido": f"R$ {valor_corrigido:,.2f}",
+            "⚖️ Multa (2%)": f"R$ {multa_total:,.2f}",
+            "📈 Juros Moratórios": f"R$ {juros_total:,.2f}",
+            "💹 Correção Monetária": f"R$ {correcao_total:,.2f}",
+            "📊 Correção Total": f"{percentual_total:.2f}%",
+        })
     
-    def processar_correcao_completa(self, df: pd.DataFrame, nome_base: str) -> pd.DataFrame:
+    def processar_correcao_completa(self, df: pd.DataFrame, nome_base: str, profiler: ProfilerPipeline = None) -> pd.DataFrame:
         """
         Executa todo o processo de correção monetária.
+        
+        O DataFrame recebido não é alterado; as etapas trabalham sobre uma única
+        cópia. Com ``profiler``, registra o tempo (e as cópias, se ele contar)
+        por etapa; sem ele e com FIDC_PERFIL_ETAPAS=1 no ambiente, publica o
+        tempo das etapas nos eventos.
         """
         if df.empty:
             return df
         
-        # Calcular valor líquido
-        df = self.calcular_valor_liquido(df)
-        
-        # Calcular multa
-        df = self.calcular_multa(df)
-        
-        # Calcular juros moratórios
-        df = self.calcular_juros_moratorios(df)
-        
-        # Calcular correção monetária
-        df = self.calcular_correcao_monetaria(df)
-        
-        # Calcular valor corrigido final
-        df = self.calcular_valor_corrigido_final(df)
-        
+        # Com FIDC_PERFIL_ETAPAS ligado, mede as etapas e publica o resumo
+        profiler_debug = profiler_depuracao() if profiler is None else None
+        
+        # Etapas alteram o mesmo frame in place; a única cópia é a de entrada
+        pipeline = PipelineColunas([
+            EtapaColunas('valor_liquido', self.calcular_valor_liquido,
+                         escreve=['valor_liquido']),
+            EtapaColunas('multa', self.calcular_multa,
+                         le=['dias_atraso', 'valor_liquido'], escreve=['multa']),
+            EtapaColunas('juros_moratorios', self.calcular_juros_moratorios,
+                         le=['dias_atraso', 'valor_liquido'], escreve=['meses_atraso', 'juros_moratorios']),
+            EtapaColunas('correcao_monetaria', self.calcular_correcao_monetaria,
+                         le=['data_vencimento_limpa', 'data_base', 'dias_atraso', 'valor_liquido'],
+                         escreve=['indice_vencimento', 'indice_base', 'fator_correcao', 'correcao_monetaria']),
+            EtapaColunas('valor_corrigido', self.calcular_valor_corrigido_final,
+                         le=['valor_liquido', 'multa', 'juros_moratorios', 'correcao_monetaria'],
+                         escreve=['valor_corrigido']),
+        ], profiler=profiler or profiler_debug)
+        
+        df = pipeline.executar(df)
+        if profiler_debug is not None:
+            self.eventos.resumo(f"⏱️ Etapas da correção - {nome_base}", profiler_debug.metricas())
         return df
     
     def mapear_aging_para_taxa(self, aging: str) -> str:
@@ -401,14 +436,14 @@ class CalculadorCorrecao:
         Adiciona taxa de recuperação e prazo de recebimento cruzando Empresa, Tipo e Aging.
         """
         if df.empty or df_taxa_recuperacao.empty:
-            st.warning("⚠️ Dados insuficientes para calcular taxa de recuperação")
+            self.eventos.aviso("⚠️ Dados insuficientes para calcular taxa de recuperação")
             df['aging_taxa'] = 'Não identificado'
             df['taxa_recuperacao'] = 0.0
             df['prazo_recebimento'] = 0
             df['valor_recuperavel'] = 0.0
             return df
         
-        with st.spinner("🔄 Aplicando taxas de recuperação..."):
+        with self.eventos.etapa("🔄 Aplicando taxas de recuperação..."):
             df = df.copy()
             
             # Remover registros onde empresa é None ou vazia
@@ -419,10 +454,10 @@ class CalculadorCorrecao:
             
             if registros_antes != registros_depois:
                 registros_removidos = registros_antes - registros_depois
-                st.warning(f"⚠️ Removidos {registros_removidos:,} registros sem empresa válida")
+                self.eventos.aviso(f"⚠️ Removidos {registros_removidos:,} registros sem empresa válida")
             
             if df.empty:
-                st.error("❌ Nenhum registro válido após remoção de empresas vazias")
+                self.eventos.erro("❌ Nenhum registro válido após remoção de empresas vazias")
                 return df
             
             # Mapear aging detalhado para categorias de taxa
@@ -461,7 +496,7 @@ class CalculadorCorrecao:
             registros_com_taxa = (df_merged['taxa_recuperacao'] > 0).sum()
             percentual_match = (registros_com_taxa / total_registros) * 100
             
-            st.success(f"✅ Taxa de recuperação aplicada: {registros_com_taxa:,}/{total_registros:,} registros ({percentual_match:.1f}%)")
+            self.eventos.sucesso(f"✅ Taxa de recuperação aplicada: {registros_com_taxa:,}/{total_registros:,} registros ({percentual_match:.1f}%)")
             
             # Mostrar estatísticas por categoria
             if registros_com_taxa > 0:
@@ -549,7 +584,7 @@ class CalculadorCorrecao:
         - Maior que 1080 dias: 50,0%
         """
         if df is None:
-            st.warning("⚠️ DataFrame nulo em calcular_valor_justo_reajustado. Continuando com DataFrame vazio.")
+            self.eventos.aviso("⚠️ DataFrame nulo em calcular_valor_justo_reajustado. Continuando com DataFrame vazio.")
             return pd.DataFrame()
 
         if df.empty:
@@ -557,7 +592,7 @@ class CalculadorCorrecao:
 
         # Garantir que temos a coluna-base para RV
         if 'valor_recuperavel_ate_recebimento' not in df.columns:
-            st.warning("⚠️ Coluna 'valor_recuperavel_ate_recebimento' não encontrada. Mantendo cálculo com zero.")
+            self.eventos.aviso("⚠️ Coluna 'valor_recuperavel_ate_recebimento' não encontrada. Mantendo cálculo com zero.")
             df['valor_recuperavel_ate_recebimento'] = 0.0
 
         # Aplicar remuneração variável sobre o valor recuperável até recebimento
@@ -567,12 +602,18 @@ class CalculadorCorrecao:
         )
 
         if df_resultado is None:
-            st.warning("⚠️ Remuneração variável retornou vazio. Continuando com valores zerados.")
+            self.eventos.aviso("⚠️ Remuneração variável retornou vazio. Continuando com valores zerados.")
             df_resultado = df.copy()
             df_resultado['remuneracao_variavel_valor_final'] = pd.to_numeric(
                 df_resultado.get('valor_recuperavel_ate_recebimento', 0), errors='coerce'
             ).fillna(0)
 
+        # Resumo da remuneração variável (antes de renomear a coluna final pós-RV)
+        with self.eventos.etapa("💎 Calculando valor justo..."):
+            resumo = calculador_rv.gerar_resumo_remuneracao(
+                df_resultado, coluna_valor='valor_recuperavel_ate_recebimento', exibir_streamlit=False
+            )
+
         # Renomear coluna final pós-RV conforme nomenclatura de negócio
         if 'remuneracao_variavel_valor_final' in df_resultado.columns:
             df_resultado['valor_recebimento_pos_rv'] = pd.to_numeric(
@@ -600,10 +641,12 @@ class CalculadorCorrecao:
         )
         df_resultado['valor_justo'] = pd.to_numeric(df_resultado['valor_justo'], errors='coerce').fillna(0.0).clip(lower=0)
 
-        # Gerar resumo usando o novo sistema
-        with st.spinner("💎 Calculando valor justo..."):
-            resumo = calculador_rv.gerar_resumo_remuneracao(
-                df_resultado, coluna_valor='valor_recuperavel_ate_recebimento'
-            )
+        if resumo:
+            self.eventos.sucesso(f"✅ Remuneração variável calculada para {resumo['distribuidora']}!")
+            self.eventos.resumo("Remuneração variável", {
+                "Valor Original": f"R$ {resumo['total_valor_original']:,.2f}",
+                "Total Desconto": f"R$ {resumo['total_desconto']:,.2f} (-{resumo['percentual_desconto']:.2f}%)",
+                "Valor Final": f"R$ {resumo['total_valor_final']:,.2f}",
+            })
 
         return df_resultado
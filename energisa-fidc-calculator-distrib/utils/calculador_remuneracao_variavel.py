@@ -16,7 +16,6 @@ Data: 2025-09-04
 import pandas as pd
 import numpy as np
 from typing import Dict, Optional, Union
-import streamlit as st
 from datetime import datetime
 import logging
 
@@ -114,7 +113,8 @@ class CalculadorRemuneracaoVariavel:
                                      df: pd.DataFrame, 
                                      coluna_valor: str = 'valor_justo_ate_recebimento',
                                      coluna_aging: str = 'aging',
-                                     prefixo_colunas: str = 'remuneracao_variavel') -> pd.DataFrame:
+                                     prefixo_colunas: str = 'remuneracao_variavel',
+                                     inplace: bool = False) -> pd.DataFrame:
         """
         Calcula a remuneração variável baseada no aging dos valores.
         
@@ -123,6 +123,7 @@ class CalculadorRemuneracaoVariavel:
             coluna_valor: Nome da coluna com os valores base para cálculo
             coluna_aging: Nome da coluna com as faixas de aging
             prefixo_colunas: Prefixo para as novas colunas criadas
+            inplace: Se True, adiciona as colunas no próprio df (sem cópia)
             
         Returns:
             pd.DataFrame: DataFrame com colunas de remuneração variável adicionadas
@@ -131,8 +132,8 @@ class CalculadorRemuneracaoVariavel:
             logger.error("Validação de dados falhou")
             return df
         
-        # Criar cópia para não modificar original
-        df_resultado = df.copy()
+        # Criar cópia para não modificar original (exceto em pipelines in place)
+        df_resultado = df if inplace else df.copy()
         
         # Mapear percentuais de desconto baseado no aging
         coluna_percentual = f'{prefixo_colunas}_perc'
@@ -209,13 +210,15 @@ class CalculadorRemuneracaoVariavel:
             'distribuidora': self.distribuidora
         }
         
-        if exibir_streamlit and st:
+        if exibir_streamlit:
             self._exibir_resumo_streamlit(resumo, resumo_por_aging)
         
         return resumo
     
     def _exibir_resumo_streamlit(self, resumo: Dict, resumo_por_aging: pd.DataFrame):
         """Exibe resumo no Streamlit"""
+        import streamlit as st
+
         st.success(f"✅ Remuneração variável calculada para {self.distribuidora}!")
         
         col1, col2, col3 = st.columns(3)
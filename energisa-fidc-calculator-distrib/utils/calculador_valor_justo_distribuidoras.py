@@ -6,10 +6,11 @@ que precisam do cálculo completo de valor justo após a correção monetária b
 
 import pandas as pd
 import numpy as np
-import streamlit as st
 from datetime import datetime
 import time
 
+from .eventos_calculo import SinkEventos, SinkLogging
+
 class CalculadorValorJusto:
     """Classe auxiliar para estatísticas do DI-PRE"""
     
@@ -31,10 +32,44 @@ class CalculadorValorJustoDistribuidoras:
     """
     Classe responsável pelo cálculo completo de valor justo para distribuidoras padrão
     (todas exceto VOLTZ, que tem seu próprio fluxo otimizado)
+    
+    Sem dependência de Streamlit: tabela de recuperação, curva DI-PRE e índices
+    entram pelo construtor; logs e progresso vão para o sink de ``eventos``.
     """
     
-    def __init__(self, params):
+    def __init__(self, params, curve_store=None, eventos: SinkEventos = None,
+                 df_taxa_recuperacao: pd.DataFrame = None, df_di_pre: pd.DataFrame = None,
+                 df_indices_economicos: pd.DataFrame = None, df_indices_igpm: pd.DataFrame = None):
         self.params = params
+        # Repositório opcional de curvas DI-PRE históricas (CurvaDIPreStore)
+        self.curve_store = curve_store
+        self.eventos = eventos if eventos is not None else SinkLogging(__name__)
+        self.df_taxa_recuperacao = df_taxa_recuperacao
+        self.df_di_pre = df_di_pre
+        self.df_indices_economicos = df_indices_economicos
+        self.df_indices_igpm = df_indices_igpm
+
+    def _resolver_curva_di_pre(self, df_final_temp):
+        """
+        Resolve a curva DI-PRE vigente na data base.
+
+        A curva recebida no construtor (upload explícito) tem prioridade;
+        sem ela, com curve_store, busca a curva as-of da data base do cálculo.
+        """
+        if self.df_di_pre is not None and not self.df_di_pre.empty:
+            return self.df_di_pre
+
+        if self.curve_store is not None:
+            data_base = None
+            if 'data_base' in df_final_temp.columns:
+                data_base = pd.to_datetime(df_final_temp['data_base'], errors='coerce').max()
+            if data_base is None or pd.isna(data_base):
+                data_base = getattr(self.params, 'data_base_padrao', None)
+
+            df_di_pre = self.curve_store.obter_curva(data_base)
+            if df_di_pre is not None and not df_di_pre.empty:
+                return df_di_pre
+        return None
 
     @staticmethod
     def _somar_meses_calendario(data_base: pd.Series, meses: pd.Series) -> pd.Series:
@@ -90,14 +125,12 @@ class CalculadorValorJustoDistribuidoras:
         fator = np.where(np.isfinite(fator), fator, np.longdouble(0.0))
         return fator.astype(np.float64)
     
-    def processar_valor_justo_distribuidoras(self, df_final_temp, log_container, progress_main):
+    def processar_valor_justo_distribuidoras(self, df_final_temp):
         """
         Processa o cálculo completo de valor justo para distribuidoras padrão
         
         Args:
             df_final_temp: DataFrame com dados básicos já processados
-            log_container: Container do Streamlit para logs
-            progress_main: Barra de progresso principal
             
         Returns:
             DataFrame com valor justo calculado
@@ -110,51 +143,48 @@ class CalculadorValorJustoDistribuidoras:
                 df_final_temp['data_base'] = datetime.now()
             df_final_temp['data_base'] = pd.to_datetime(df_final_temp['data_base'], errors='coerce')
             
-            progress_main.progress(0.82)
+            self.eventos.progresso(0.82)
 
-            progress_main.progress(0.85)
+            self.eventos.progresso(0.85)
             
             # ============= CÁLCULO DO PERÍODO ATÉ RECEBIMENTO (MERGE OTIMIZADO) =============
-            with log_container:
-                st.info("📊 **Merge dinâmico** de prazos de recebimento...")
+            self.eventos.info("📊 **Merge dinâmico** de prazos de recebimento...")
             
-            df_final_temp = self._calcular_meses_recebimento(df_final_temp, log_container)
+            df_final_temp = self._calcular_meses_recebimento(df_final_temp)
             
             # ============= MERGE OTIMIZADO COM TAXAS DI-PRE (VETORIZADO) =============
-            with log_container:
-                st.info("📊 **Merge vetorizado** com taxas DI-PRE por prazo...")
+            self.eventos.info("📊 **Merge vetorizado** com taxas DI-PRE por prazo...")
             
-            df_final_temp = self._aplicar_taxas_di_pre(df_final_temp, log_container)
+            df_final_temp = self._aplicar_taxas_di_pre(df_final_temp)
             
             # ============= CÁLCULO DA TAXA DI-PRE ANUALIZADA (VETORIZADO) =============
             df_final_temp = self._calcular_taxas_anualizadas(df_final_temp)
             
             # ============= CÁLCULO DO IPCA MENSAL REAL DOS DADOS DO EXCEL =============
-            df_final_temp = self._calcular_ipca_mensal(df_final_temp, log_container)
+            df_final_temp = self._calcular_ipca_mensal(df_final_temp)
             
             # ============= CÁLCULO FINAL DO VALOR JUSTO =============
-            progress_main.progress(0.88)
+            self.eventos.progresso(0.88)
             
-            with log_container:
-                st.info("💰 **Calculando Valor Justo** conforme orientação do Thiago...")
+            self.eventos.info("💰 **Calculando Valor Justo** conforme orientação do Thiago...")
             
-            df_final_temp = self._calcular_valor_justo_final(df_final_temp, log_container)
+            df_final_temp = self._calcular_valor_justo_final(df_final_temp)
             
-            progress_main.progress(0.92)
+            self.eventos.progresso(0.92)
             
             return df_final_temp
             
         except Exception as e:
-            st.error(f"❌ Erro no cálculo do valor justo para distribuidoras: {str(e)}")
+            self.eventos.erro(f"❌ Erro no cálculo do valor justo para distribuidoras: {str(e)}")
             raise e
     
-    def _calcular_meses_recebimento(self, df_final_temp, log_container):
+    def _calcular_meses_recebimento(self, df_final_temp):
         """Calcula os meses até recebimento baseado na taxa de recuperação"""
         
         try:
             # Verificar se temos dados de taxa de recuperação carregados
-            if 'df_taxa_recuperacao' in st.session_state and not st.session_state.df_taxa_recuperacao.empty:
-                df_taxa = st.session_state.df_taxa_recuperacao.copy()
+            if self.df_taxa_recuperacao is not None and not self.df_taxa_recuperacao.empty:
+                df_taxa = self.df_taxa_recuperacao
 
                 registros_antes_merge = len(df_final_temp)
 
@@ -170,11 +200,10 @@ class CalculadorValorJustoDistribuidoras:
 
                 duplicatas_taxa = int(df_taxa_merge.duplicated(subset=['Empresa', 'Tipo', 'Aging']).sum())
                 if duplicatas_taxa > 0:
-                    with log_container:
-                        st.warning(
-                            f"⚠️ {duplicatas_taxa:,} chave(s) duplicada(s) em taxa de recuperação "
-                            "(Empresa/Tipo/Aging). Usando apenas a primeira ocorrência por chave."
-                        )
+                    self.eventos.aviso(
+                        f"⚠️ {duplicatas_taxa:,} chave(s) duplicada(s) em taxa de recuperação "
+                        "(Empresa/Tipo/Aging). Usando apenas a primeira ocorrência por chave."
+                    )
                     df_taxa_merge = df_taxa_merge.drop_duplicates(
                         subset=['Empresa', 'Tipo', 'Aging'],
                         keep='first'
@@ -190,11 +219,10 @@ class CalculadorValorJustoDistribuidoras:
                 )
 
                 if len(df_final_temp) != registros_antes_merge:
-                    with log_container:
-                        st.warning(
-                            f"⚠️ Merge de prazo alterou contagem de linhas "
-                            f"({registros_antes_merge:,} → {len(df_final_temp):,})."
-                        )
+                    self.eventos.aviso(
+                        f"⚠️ Merge de prazo alterou contagem de linhas "
+                        f"({registros_antes_merge:,} → {len(df_final_temp):,})."
+                    )
                 
                 # Usar prazo_recebimento do merge, com fallback para valor padrão
                 df_final_temp['meses_ate_recebimento'] = df_final_temp['Prazo de recebimento'].fillna(6).astype(int)
@@ -206,32 +234,33 @@ class CalculadorValorJustoDistribuidoras:
                 # Mostrar estatísticas do mapeamento
                 contagem_meses = df_final_temp['meses_ate_recebimento'].value_counts().sort_index()
                 
-                with log_container:
-                    st.success(f"✅ **Meses de recebimento** obtidos dinamicamente!")
+                self.eventos.sucesso(f"✅ **Meses de recebimento** obtidos dinamicamente!")
                 
                 # Mostrar distribuição em um formato mais compacto
                 distribuicao_str = ", ".join([f"{meses}m: {count:,}" for meses, count in contagem_meses.items()])
-                with log_container:
-                    st.info(f"📊 **Distribuição:** {distribuicao_str}")
+                self.eventos.info(f"📊 **Distribuição:** {distribuicao_str}")
             else:
-                raise Exception("Dados de taxa de recuperação não encontrados no session_state")
+                raise Exception("Dados de taxa de recuperação não informados")
                         
         except Exception as e:
-            with log_container:
-                st.warning(f"⚠️ Erro ao usar dados da taxa de recuperação: {str(e)}")
-                st.info("📊 Usando valores padrão para meses de recebimento...")
+            self.eventos.aviso(f"⚠️ Erro ao usar dados da taxa de recuperação: {str(e)}")
+            self.eventos.info("📊 Usando valores padrão para meses de recebimento...")
 
             # Fallback padrão: 6 meses
             df_final_temp['meses_ate_recebimento'] = 6
         
         return df_final_temp
     
-    def _aplicar_taxas_di_pre(self, df_final_temp, log_container):
+    def _aplicar_taxas_di_pre(self, df_final_temp):
         """Aplica as taxas DI-PRE baseadas no prazo de recebimento"""
         
         # Verificar se temos dados DI-PRE disponíveis
-        if 'df_di_pre' in st.session_state and not st.session_state.df_di_pre.empty:
-            df_di_pre = st.session_state.df_di_pre.copy()
+        df_di_pre = self._resolver_curva_di_pre(df_final_temp)
+        if df_di_pre is not None:
+            if 'data_arquivo' in df_di_pre.columns:
+                data_curva = pd.to_datetime(df_di_pre['data_arquivo'], errors='coerce').max()
+                if not pd.isna(data_curva):
+                    self.eventos.info(f"📈 Curva DI-PRE utilizada: {data_curva.strftime('%d/%m/%Y')}")
             
             # Preparar dados DI-PRE para merge
             df_di_pre_merge = df_di_pre[['meses_futuros', '252']].copy()
@@ -253,11 +282,10 @@ class CalculadorValorJustoDistribuidoras:
 
             duplicatas_di = int(df_di_pre_merge.duplicated(subset=['meses_ate_recebimento']).sum())
             if duplicatas_di > 0:
-                with log_container:
-                    st.warning(
-                        f"⚠️ {duplicatas_di:,} prazo(s) duplicado(s) em DI-PRE. "
-                        "Mantendo a primeira taxa por prazo para evitar duplicação de linhas."
-                    )
+                self.eventos.aviso(
+                    f"⚠️ {duplicatas_di:,} prazo(s) duplicado(s) em DI-PRE. "
+                    "Mantendo a primeira taxa por prazo para evitar duplicação de linhas."
+                )
                 df_di_pre_merge = df_di_pre_merge.drop_duplicates(
                     subset=['meses_ate_recebimento'],
                     keep='first'
@@ -273,19 +301,17 @@ class CalculadorValorJustoDistribuidoras:
             )
 
             if len(df_final_temp) != registros_antes_merge:
-                with log_container:
-                    st.warning(
-                        f"⚠️ Merge DI-PRE alterou contagem de linhas "
-                        f"({registros_antes_merge:,} → {len(df_final_temp):,})."
-                    )
+                self.eventos.aviso(
+                    f"⚠️ Merge DI-PRE alterou contagem de linhas "
+                    f"({registros_antes_merge:,} → {len(df_final_temp):,})."
+                )
             
             # Para registros sem match exato, buscar o mais próximo
             mask_sem_taxa = df_final_temp['taxa_di_pre_percentual'].isna()
             registros_sem_taxa = mask_sem_taxa.sum()
             
             if registros_sem_taxa > 0:
-                with log_container:
-                    st.info(f"📊 **Buscando taxas mais próximas** para {registros_sem_taxa:,} registros...")
+                self.eventos.info(f"📊 **Buscando taxas mais próximas** para {registros_sem_taxa:,} registros...")
 
                 prazos_disponiveis = df_di_pre_merge['meses_ate_recebimento'].to_numpy()
                 taxas_disponiveis = df_di_pre_merge['taxa_di_pre_percentual'].to_numpy()
@@ -309,13 +335,11 @@ class CalculadorValorJustoDistribuidoras:
             registros_com_taxa = (~df_final_temp['taxa_di_pre_decimal'].isna()).sum()
             taxa_media = df_final_temp['taxa_di_pre_decimal'].mean() * 100
             
-            with log_container:
-                st.success(f"✅ **Merge DI-PRE concluído:** {registros_com_taxa:,}/{len(df_final_temp):,} registros com taxa (média: {taxa_media:.3f}%)")
+            self.eventos.sucesso(f"✅ **Merge DI-PRE concluído:** {registros_com_taxa:,}/{len(df_final_temp):,} registros com taxa (média: {taxa_media:.3f}%)")
         
         else:
             # Fallback para taxa padrão
-            with log_container:
-                st.warning("⚠️ Dados DI-PRE não disponíveis. Usando taxa padrão.")
+            self.eventos.aviso("⚠️ Dados DI-PRE não disponíveis. Usando taxa padrão.")
             df_final_temp['taxa_di_pre_decimal'] = 0.10  # 10% ao ano como fallback
             df_final_temp['taxa_di_pre_percentual'] = 10.0
         
@@ -342,10 +366,10 @@ class CalculadorValorJustoDistribuidoras:
         
         return df_final_temp
     
-    def _calcular_ipca_mensal(self, df_final_temp, log_container):
+    def _calcular_ipca_mensal(self, df_final_temp):
         """Calcula o IPCA mensal baseado nos índices carregados"""
         
-        st.info("📊 Calculando IPCA/IGPM com sazonalidade histórica (média móvel de 3 anos por mês)...")
+        self.eventos.info("📊 Calculando IPCA/IGPM com sazonalidade histórica (média móvel de 3 anos por mês)...")
 
         # Data base de referência da carteira (usa a data predominante; fallback para hoje)
         data_base_serie = pd.to_datetime(df_final_temp.get('data_base'), errors='coerce')
@@ -356,17 +380,17 @@ class CalculadorValorJustoDistribuidoras:
             data_base_ref = pd.Timestamp(data_base_validas.mode().iloc[0])
 
         # ========== SELEÇÃO DOS ÍNDICES PARA CÁLCULO ==========
-        if 'df_indices_economicos' in st.session_state:
-            df_indices = st.session_state.df_indices_economicos.copy()
+        if self.df_indices_economicos is not None:
+            df_indices = self.df_indices_economicos.copy()
             tipo_calculo = "IGPM_IPCA (Distribuidoras)"
-        elif 'df_indices_igpm' in st.session_state:
-            df_indices = st.session_state.df_indices_igpm.copy()
+        elif self.df_indices_igpm is not None:
+            df_indices = self.df_indices_igpm.copy()
             tipo_calculo = "IGPM (Fallback)"
         else:
             df_indices = pd.DataFrame()
             tipo_calculo = "Sem índices"
 
-        st.info(f"📊 Usando {tipo_calculo} para projeção sazonal determinística")
+        self.eventos.info(f"📊 Usando {tipo_calculo} para projeção sazonal determinística")
 
         # Fallback padrão fixo (último recurso)
         ipca_mensal_fallback = 0.0037  # ~4.53% a.a.
@@ -399,7 +423,7 @@ class CalculadorValorJustoDistribuidoras:
                 usou_fallback_data_base = True
 
             if usou_fallback_data_base:
-                st.warning(
+                self.eventos.aviso(
                     "⚠️ Índice da competência da data base não encontrado. "
                     f"Usando último índice disponível em {data_ref.strftime('%Y-%m')} "
                     "como referência para a projeção."
@@ -463,7 +487,7 @@ class CalculadorValorJustoDistribuidoras:
             df_final_temp['ipca_anual'] = float(ipca_anual)
             df_final_temp['ipca_mensal'] = float(ipca_mensal_calculado)
 
-            st.success(f"""
+            self.eventos.sucesso(f"""
             ✅ **IPCA sazonal calculado com histórico real!**
             📅 Data base de referência: {data_base_ref.strftime('%Y-%m')}
             📊 Índice de referência: {indice_atual_num:.6f} ({data_ref.strftime('%Y-%m')})
@@ -474,7 +498,7 @@ class CalculadorValorJustoDistribuidoras:
             df_final_temp['ipca_anual'] = float(ipca_anual_fallback)
             df_final_temp['ipca_mensal'] = float(ipca_mensal_fallback)
 
-            st.warning(
+            self.eventos.aviso(
                 "⚠️ Não foi possível usar histórico de índices para sazonalidade. "
                 f"Aplicando fallback fixo: IPCA mensal={ipca_mensal_fallback:.6f} "
                 f"(IPCA anual implícito={ipca_anual_fallback*100:.2f}%)."
@@ -541,7 +565,7 @@ class CalculadorValorJustoDistribuidoras:
         
         return df_final_temp
     
-    def _calcular_valor_justo_final(self, df_final_temp, log_container):
+    def _calcular_valor_justo_final(self, df_final_temp):
         """Calcula valor recuperável até recebimento e prepara fator de desconto.
         
         A sequência final de cálculo do valor justo continua em
@@ -561,8 +585,7 @@ class CalculadorValorJustoDistribuidoras:
             df_final_temp['valor_recuperavel_ate_recebimento'] = 0.0
 
         # ===== PASSO 2: TAXAS CDI + SPREAD =====
-        with log_container:
-            st.info("📊 **Usando taxas CDI** já calculadas no merge vetorizado...")
+        self.eventos.info("📊 **Usando taxas CDI** já calculadas no merge vetorizado...")
 
         df_final_temp['cdi_taxa_prazo'] = df_final_temp['taxa_di_pre_decimal']
 
@@ -582,14 +605,13 @@ class CalculadorValorJustoDistribuidoras:
         )
 
         # ===== ESTATÍSTICAS =====
-        with log_container:
-            valor_total_recuperavel = df_final_temp['valor_recuperavel_ate_recebimento'].sum()
-            st.success(f"""
-            ✅ **Valor Recuperável até Recebimento calculado!**
-            💰 Total Recuperável: R$ {valor_total_recuperavel:,.2f}
+        valor_total_recuperavel = df_final_temp['valor_recuperavel_ate_recebimento'].sum()
+        self.eventos.sucesso(f"""
+        ✅ **Valor Recuperável até Recebimento calculado!**
+        💰 Total Recuperável: R$ {valor_total_recuperavel:,.2f}
             
-            🔢 Próxima etapa: aplicar remuneração variável e trazer a valor presente.
-            """)
+        🔢 Próxima etapa: aplicar remuneração variável e trazer a valor presente.
+        """)
 
         # ===== COLUNA DE CONTROLE =====
         df_final_temp['data_calculo'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
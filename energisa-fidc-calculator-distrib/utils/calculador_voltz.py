@@ -16,12 +16,13 @@ ESTRUTURA DOS DADOS:
 
 import pandas as pd
 import numpy as np
-import streamlit as st
 from datetime import datetime, timedelta, date
 import time
 from typing import Optional
-from .checkpoint_manager import usar_checkpoint, checkpoint_manager
+from .correcao_otimizada import obter_index_curve
+from .eventos_calculo import SinkEventos, SinkLogging
 from .calculador_remuneracao_variavel import CalculadorRemuneracaoVariavel
+from .pipeline_colunas import EtapaColunas, PipelineColunas, ProfilerPipeline, profiler_depuracao
 
 
 class CalculadorVoltz:
@@ -34,10 +35,28 @@ class CalculadorVoltz:
     - Sempre usar IGP-M (não IPCA como outras distribuidoras)
     - Taxa de recuperação diferente
     - Juros remuneratórios e moratórios específicos
+    
+    Núcleo sem Streamlit: índices IGP-M/IGPM_IPCA e curva DI-PRE entram pelo
+    construtor e as mensagens vão para o sink de ``eventos``. Apenas os
+    painéis de resumo/performance (gerar_resumo_voltz, relatorio_performance,
+    executar_benchmark_performance) importam Streamlit.
     """
     
-    def __init__(self, params):
+    def __init__(self, params, curve_store=None, eventos: SinkEventos = None,
+                 df_indices_igpm: pd.DataFrame = None, df_indices_economicos: pd.DataFrame = None,
+                 df_di_pre: pd.DataFrame = None):
         self.params = params
+
+        # Repositório opcional de curvas DI-PRE históricas (CurvaDIPreStore)
+        self.curve_store = curve_store
+
+        # Destino das mensagens de progresso (SinkStreamlit nas páginas)
+        self.eventos = eventos if eventos is not None else SinkLogging(__name__)
+
+        # Dados de mercado explícitos (antes lidos do session state)
+        self.df_indices_igpm = df_indices_igpm
+        self.df_indices_economicos = df_indices_economicos
+        self.df_di_pre = df_di_pre
         
         # Parâmetros específicos da VOLTZ
         # NOTA: Taxa de juros remuneratórios (4,65% a.m.) calculada do vencimento até data base
@@ -88,7 +107,8 @@ class CalculadorVoltz:
             errors='coerce',
         )
     
-    def identificar_voltz(self, nome_arquivo: str) -> bool:
+    @staticmethod
+    def identificar_voltz(nome_arquivo: str) -> bool:
         """
         Identifica se o arquivo é da VOLTZ baseado no nome do arquivo.
         """
@@ -113,6 +133,9 @@ class CalculadorVoltz:
         """
         Calcula valor líquido = valor_principal - deduções.
         Para VOLTZ, mantém a mesma lógica de dedução.
+        
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
         """
         # Limpar valor principal
         if 'valor_principal' not in df.columns:
@@ -135,9 +158,10 @@ class CalculadorVoltz:
         da data de vencimento até a data base.
         
         Fórmula: Valor Corrigido = Valor Líquido × (1 + 0.0465)^meses
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Obter data base dos parâmetros
         data_base = self.params.data_base_padrao
         if isinstance(data_base, str):
@@ -194,7 +218,7 @@ class CalculadorVoltz:
             tipo_indice = 'IGP-M'
             
             # Verificar se temos dados de índices econômicos carregados
-            if 'df_indices_economicos' not in st.session_state or st.session_state.df_indices_economicos.empty:
+            if self.df_indices_economicos is None or self.df_indices_economicos.empty:
                 return 1.0
             
             # Converter datas
@@ -206,7 +230,7 @@ class CalculadorVoltz:
                 return 1.0
             
             # Versão simplificada e mais eficiente
-            df_indices = st.session_state.df_indices_economicos.copy()
+            df_indices = self.df_indices_economicos.copy()
             
             # Verificar se os dados têm estrutura válida
             if 'data' not in df_indices.columns or 'indice' not in df_indices.columns:
@@ -242,7 +266,7 @@ class CalculadorVoltz:
             return max(fator_acumulado, 1.0)  # Garantir que não seja menor que 1
             
         except Exception as e:
-            st.warning(f"⚠️ Erro ao buscar índice IGP-M para VOLTZ: {str(e)}")
+            self.eventos.aviso(f"⚠️ Erro ao buscar índice IGP-M para VOLTZ: {str(e)}")
             return 1.0
     
     def _obter_dados_igpm_voltz(self):
@@ -251,20 +275,20 @@ class CalculadorVoltz:
         Sempre usa df_indices_igpm quando disponível, senão df_indices_economicos.
         """
         # Priorizar df_indices_igpm (específico para VOLTZ)
-        if hasattr(st.session_state, 'df_indices_igpm') and st.session_state.df_indices_igpm is not None:
-            dados_igpm = st.session_state.df_indices_igpm
+        if self.df_indices_igpm is not None:
+            dados_igpm = self.df_indices_igpm
             # st.success("� **VOLTZ**: Usando dados IGP-M da aba específica 'IGPM'")
-        elif hasattr(st.session_state, 'df_indices_economicos') and st.session_state.df_indices_economicos is not None:
-            dados_igpm = st.session_state.df_indices_economicos
-            st.warning("⚠️ **VOLTZ**: Usando fallback - dados de df_indices_economicos")
+        elif self.df_indices_economicos is not None:
+            dados_igpm = self.df_indices_economicos
+            self.eventos.aviso("⚠️ **VOLTZ**: Usando fallback - dados de df_indices_economicos")
         else:
-            st.error("❌ **ERRO VOLTZ**: Nenhum dado de índices IGP-M encontrado!")
+            self.eventos.erro("❌ **ERRO VOLTZ**: Nenhum dado de índices IGP-M encontrado!")
             return None
         
         # Validar se os dados têm a estrutura correta (data + indice)
         if 'data' not in dados_igpm.columns or 'indice' not in dados_igpm.columns:
-            st.error(f"❌ **ERRO VOLTZ**: Estrutura de dados inválida! Colunas encontradas: {list(dados_igpm.columns)}")
-            st.error("🔧 **SOLUÇÃO**: O arquivo deve ter colunas 'data' e 'indice'")
+            self.eventos.erro(f"❌ **ERRO VOLTZ**: Estrutura de dados inválida! Colunas encontradas: {list(dados_igpm.columns)}")
+            self.eventos.erro("🔧 **SOLUÇÃO**: O arquivo deve ter colunas 'data' e 'indice'")
             return None
         
         # st.info(f"✅ **VOLTZ**: Dados IGP-M válidos encontrados com {len(dados_igpm)} registros")
@@ -309,7 +333,7 @@ class CalculadorVoltz:
         
         Parâmetros:
         - data_alvo: Data para a qual calcular o índice proporcional
-        - df_indices_sorted: DataFrame com índices ordenados (deve ter colunas 'periodo', 'indice', 'indice_anterior')
+        - df_indices_sorted: DataFrame com índices (deve ter colunas 'data' e 'indice')
         
         Retorna:
         - float: Índice proporcional calculado
@@ -322,45 +346,10 @@ class CalculadorVoltz:
         """
         if pd.isna(data_alvo):
             return 1.0
-            
-        # Calcular proporção de dias no mês da data alvo
-        dia_alvo = data_alvo.day
-        
-        # Calcular último dia do mês da data alvo
-        if data_alvo.month == 12:
-            primeiro_dia_mes_seguinte = pd.Timestamp(year=data_alvo.year + 1, month=1, day=1)
-        else:
-            primeiro_dia_mes_seguinte = pd.Timestamp(year=data_alvo.year, month=data_alvo.month + 1, day=1)
-        
-        ultimo_dia_mes = (primeiro_dia_mes_seguinte - pd.Timedelta(days=1)).day
-        proporcao_dias = dia_alvo / ultimo_dia_mes
-        
-        # Buscar índices do mês da data alvo
-        periodo_alvo = pd.Period(data_alvo, freq='M')
-        mask_mes = df_indices_sorted['periodo'] == periodo_alvo
-        
-        if mask_mes.any():
-            # Índices do mês encontrados
-            registro = df_indices_sorted[mask_mes].iloc[0]
-            indice_mes = registro['indice']
-            indice_anterior = registro['indice_anterior']
-        else:
-            # Buscar último índice disponível antes da data alvo
-            mask_antes = df_indices_sorted['periodo'] < periodo_alvo
-            if mask_antes.any():
-                ultimo_antes = df_indices_sorted[mask_antes].iloc[-1]
-                indice_mes = ultimo_antes['indice']
-                indice_anterior = ultimo_antes['indice_anterior']
-            else:
-                return 1.0
-        
-        # Calcular índice proporcional
-        variacao_mensal = indice_mes - indice_anterior
-        variacao_proporcional = variacao_mensal * proporcao_dias
-        indice_proporcional = indice_anterior + variacao_proporcional
-        
-        # REMOVIDO: return max(indice_proporcional, 1.0) para permitir índices negativos
-        return indice_proporcional  # Permitir valores negativos se existirem nos dados
+
+        curva = obter_index_curve(df_indices_sorted)
+        # REMOVIDO: max(indice_proporcional, 1.0) para permitir índices negativos
+        return float(curva.value_at([data_alvo], pro_rata='linear', asof=True, valor_ausente=1.0)[0])
     
     def calcular_indices_proporcionais_vetorizado(self, datas_series: pd.Series, df_indices_sorted: pd.DataFrame) -> pd.Series:
         """
@@ -377,82 +366,12 @@ class CalculadorVoltz:
         """
         if datas_series.empty:
             return pd.Series([], dtype=float)
-        
-        # Criar DataFrame temporário com dados das datas
-        df_temp = pd.DataFrame({
-            'data_alvo': pd.to_datetime(datas_series),
-            'original_index': datas_series.index
-        }).dropna()
-        
-        if df_temp.empty:
-            return pd.Series([1.0] * len(datas_series), index=datas_series.index)
-        
-        # CÁLCULOS VETORIZADOS DE PROPORÇÕES
-        df_temp['ano'] = df_temp['data_alvo'].dt.year
-        df_temp['mes'] = df_temp['data_alvo'].dt.month
-        df_temp['dia'] = df_temp['data_alvo'].dt.day
-        
-        # Calcular último dia do mês usando função auxiliar robusta
-        df_temp['ultimo_dia_mes'] = self._calcular_ultimo_dia_mes_vetorizado(df_temp[['ano', 'mes']])
-        
-        # Proporção de dias (vetorizado)
-        df_temp['proporcao_dias'] = df_temp['dia'] / df_temp['ultimo_dia_mes']
-        
-        # Período mensal para merge
-        df_temp['periodo'] = df_temp['data_alvo'].dt.to_period('M')
-        
-        # MERGE PARA OBTER ÍNDICES
-        df_com_indices = df_temp.merge(
-            df_indices_sorted[['periodo', 'indice', 'indice_anterior']],
-            on='periodo',
-            how='left'
-        )
-        
-        # TRATAMENTO DE ÍNDICES FALTANTES
-        mask_sem_indice = (df_com_indices['indice'].isna() | df_com_indices['indice_anterior'].isna())
-        
-        if mask_sem_indice.sum() > 0:
-            # Buscar índices usando merge_asof para registros faltantes
-            df_sem_indices = df_com_indices[mask_sem_indice].copy()
-            df_sem_indices['periodo_ordinal'] = df_sem_indices['periodo'].map(
-                lambda x: x.ordinal if pd.notna(x) else 0
-            )
-            
-            merged_indices = pd.merge_asof(
-                df_sem_indices[['periodo_ordinal']].reset_index().sort_values('periodo_ordinal'),
-                df_indices_sorted[['periodo_ordinal', 'indice', 'indice_anterior']].sort_values('periodo_ordinal'),
-                left_on='periodo_ordinal',
-                right_on='periodo_ordinal',
-                direction='backward'
-            ).sort_values('index').set_index('index')
-            
-            # Atualizar valores faltantes
-            df_com_indices.loc[mask_sem_indice, 'indice'] = merged_indices['indice'].fillna(1.0)
-            df_com_indices.loc[mask_sem_indice, 'indice_anterior'] = merged_indices['indice_anterior'].fillna(1.0)
-        
-        # Preencher valores restantes
-        df_com_indices['indice'] = df_com_indices['indice'].fillna(1.0)
-        df_com_indices['indice_anterior'] = df_com_indices['indice_anterior'].fillna(1.0)
-        
-        # CALCULAR ÍNDICES PROPORCIONAIS (VETORIZADO)
-        variacao_mensal = df_com_indices['indice'] - df_com_indices['indice_anterior']
-        variacao_proporcional = variacao_mensal * df_com_indices['proporcao_dias']
-        df_com_indices['indice_proporcional'] = df_com_indices['indice_anterior'] + variacao_proporcional
-        
-        # REMOVIDO: Garantir que não seja menor que 1 (para permitir índices negativos)
-        # df_com_indices['indice_proporcional'] = np.maximum(df_com_indices['indice_proporcional'], 1.0)
-        
-        # Limpar colunas auxiliares criadas durante o cálculo
-        colunas_auxiliares = [
-            'ultimo_dia_mes', 'proporcao_dias', 'periodo', 'ano', 'mes', 'dia'
-        ]
-        df_com_indices = df_com_indices.drop(columns=colunas_auxiliares, errors='ignore')
-        
-        # Retornar série com índices corretos
-        resultado = pd.Series([1.0] * len(datas_series), index=datas_series.index)
-        resultado.loc[df_com_indices['original_index']] = df_com_indices['indice_proporcional']
-        
-        return resultado
+
+        # Curva compilada uma vez por arquivo de índices (pro-rata linear, busca as-of)
+        curva = obter_index_curve(df_indices_sorted)
+        indices = curva.value_at(datas_series, pro_rata='linear', asof=True, valor_ausente=1.0)
+
+        return pd.Series(indices, index=datas_series.index)
 
     def exemplo_calculo_proporcional(self, data_exemplo: str = "2023-01-10") -> dict:
         """
@@ -585,25 +504,27 @@ class CalculadorVoltz:
         
         if not mask_anterior.any():
             # Se não há dados anteriores, retornar o último índice disponível
-            st.warning("⚠️ **VOLTZ**: Não há dados anteriores para média móvel, usando último índice")
+            self.eventos.aviso("⚠️ **VOLTZ**: Não há dados anteriores para média móvel, usando último índice")
             return df_indices_sorted['indice'].iloc[-1] if len(df_indices_sorted) > 0 else 1.0
         
         # Obter os últimos 12 registros (ou menos se não houver 12)
         indices_anteriores = df_indices_sorted[mask_anterior].tail(12)
         
         if len(indices_anteriores) == 0:
-            st.warning("⚠️ **VOLTZ**: Nenhum índice anterior encontrado para média móvel")
+            self.eventos.aviso("⚠️ **VOLTZ**: Nenhum índice anterior encontrado para média móvel")
             return 1.0
         
         # DEBUG: Mostrar dados usados na média móvel
-        st.info(f"🔍 **DEBUG MÉDIA MÓVEL**: Usando {len(indices_anteriores)} meses para cálculo")
-        st.write("📊 **Períodos usados na média móvel:**")
-        st.dataframe(indices_anteriores[['periodo', 'indice']])
+        self.eventos.info(f"🔍 **DEBUG MÉDIA MÓVEL**: Usando {len(indices_anteriores)} meses para cálculo")
+        periodos_usados = ", ".join(
+            f"{periodo}: {indice:.6f}" for periodo, indice in zip(indices_anteriores['periodo'], indices_anteriores['indice'])
+        )
+        self.eventos.info(f"📊 **Períodos usados na média móvel:** {periodos_usados}")
         
         # Calcular média móvel (incluindo valores negativos se existirem)
         media_movel = indices_anteriores['indice'].mean()
         
-        st.info(f"🔍 **DEBUG MÉDIA MÓVEL**: Média calculada: {media_movel:.6f}")
+        self.eventos.info(f"🔍 **DEBUG MÉDIA MÓVEL**: Média calculada: {media_movel:.6f}")
         
         # IMPORTANTE: Não forçar mínimo de 1.0 para permitir índices negativos
         # return max(media_movel, 1.0)  # Comentado para permitir negativos
@@ -623,15 +544,16 @@ class CalculadorVoltz:
         - Se data_base < último índice: calcula proporcional como antes
         
         ULTRA-OTIMIZADO: Usa função genérica para cálculo proporcional de índices.
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Garantir que temos as datas necessárias
         if 'data_vencimento_limpa' not in df.columns:
             if 'data_vencimento' in df.columns:
                 df['data_vencimento_limpa'] = pd.to_datetime(df['data_vencimento'], errors='coerce')
             else:
-                st.warning("⚠️ Data de vencimento não encontrada. Correção monetária não aplicada.")
+                self.eventos.aviso("⚠️ Data de vencimento não encontrada. Correção monetária não aplicada.")
                 df['correcao_monetaria_igpm'] = 0
                 df['fator_igpm_ate_data_base'] = 1.0
                 return df
@@ -644,14 +566,14 @@ class CalculadorVoltz:
         # Verificar se temos dados de índices IGP-M específicos para VOLTZ
         df_indices = self._obter_dados_igpm_voltz()
         if df_indices is None:
-            st.warning("⚠️ Dados de índices IGP-M não disponíveis. Usando fator padrão.")
+            self.eventos.aviso("⚠️ Dados de índices IGP-M não disponíveis. Usando fator padrão.")
             df['fator_igpm_ate_data_base'] = 1.0
             df['correcao_monetaria_igpm'] = 0
             return df
 
         # Verificar estrutura dos dados de índices
         if 'data' not in df_indices.columns or 'indice' not in df_indices.columns:
-            st.warning("⚠️ Estrutura de dados de índices inválida para VOLTZ.")
+            self.eventos.aviso("⚠️ Estrutura de dados de índices inválida para VOLTZ.")
             df['fator_igpm_ate_data_base'] = 1.0
             df['correcao_monetaria_igpm'] = 0
             return df
@@ -696,29 +618,29 @@ class CalculadorVoltz:
         periodo_data_base = pd.Period(data_base, freq='M')
         
         # DEBUG: Mostrar informações sobre os dados disponíveis
-        st.info(f"🔍 **DEBUG VOLTZ**: Último período disponível: {ultimo_periodo_disponivel}")
-        st.info(f"🔍 **DEBUG VOLTZ**: Último índice disponível: {ultimo_indice_disponivel}")
-        st.info(f"🔍 **DEBUG VOLTZ**: Último dia do mês disponível: {ultimo_dia_mes_disponivel.date()}")
-        st.info(f"🔍 **DEBUG VOLTZ**: Data base: {data_base.date()}")
-        st.info(f"🔍 **DEBUG VOLTZ**: Período data base: {periodo_data_base}")
-        st.info(f"🔍 **DEBUG VOLTZ**: Total de índices disponíveis: {len(df_indices_sorted)}")
+        self.eventos.info(f"🔍 **DEBUG VOLTZ**: Último período disponível: {ultimo_periodo_disponivel}")
+        self.eventos.info(f"🔍 **DEBUG VOLTZ**: Último índice disponível: {ultimo_indice_disponivel}")
+        self.eventos.info(f"🔍 **DEBUG VOLTZ**: Último dia do mês disponível: {ultimo_dia_mes_disponivel.date()}")
+        self.eventos.info(f"🔍 **DEBUG VOLTZ**: Data base: {data_base.date()}")
+        self.eventos.info(f"🔍 **DEBUG VOLTZ**: Período data base: {periodo_data_base}")
+        self.eventos.info(f"🔍 **DEBUG VOLTZ**: Total de índices disponíveis: {len(df_indices_sorted)}")
         
         # Aplicar nova lógica para índice base
         if periodo_data_base > ultimo_periodo_disponivel:
             # Data base é maior que último índice: usar média móvel dos últimos 12 meses
             indice_base_proporcional = self._calcular_media_movel_12_meses(df_indices_sorted, data_base)
-            st.success(f"✅ **VOLTZ**: Usando MÉDIA MÓVEL para índice base: {indice_base_proporcional:.6f}")
+            self.eventos.sucesso(f"✅ **VOLTZ**: Usando MÉDIA MÓVEL para índice base: {indice_base_proporcional:.6f}")
         elif data_base.date() == ultimo_dia_mes_disponivel.date():
             # Data base é igual ao último dia do mês/ano disponível: usar último índice
             indice_base_proporcional = ultimo_indice_disponivel
-            st.success(f"✅ **VOLTZ**: Usando ÚLTIMO ÍNDICE para índice base: {indice_base_proporcional:.6f}")
+            self.eventos.sucesso(f"✅ **VOLTZ**: Usando ÚLTIMO ÍNDICE para índice base: {indice_base_proporcional:.6f}")
         else:
             # Data base é anterior ou no meio do período: calcular proporcional como antes
             indice_base_proporcional = self.calcular_indice_proporcional_data(
                 pd.to_datetime(data_base),
                 df_indices_sorted
             )
-            st.success(f"✅ **VOLTZ**: Usando CÁLCULO PROPORCIONAL para índice base: {indice_base_proporcional:.6f}")
+            self.eventos.sucesso(f"✅ **VOLTZ**: Usando CÁLCULO PROPORCIONAL para índice base: {indice_base_proporcional:.6f}")
         
         # CÁLCULO DO FATOR DE CORREÇÃO (VETORIZADO)
         mask_valido = df['indice_vencimento'] > 0
@@ -781,6 +703,9 @@ class CalculadorVoltz:
     def calcular_multa_voltz(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula multa para contratos vencidos.
+        
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
         """
         df['multa'] = np.where(df['esta_vencido'], df['valor_liquido'] * self.taxa_multa, 0)
         return df
@@ -788,6 +713,9 @@ class CalculadorVoltz:
     def calcular_juros_moratorios_voltz(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calcula fator de juros moratórios para contratos vencidos.
+        
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
         """
         if 'meses_atraso' not in df.columns:
             df = self.identificar_status_contrato(df)
@@ -819,6 +747,9 @@ class CalculadorVoltz:
         - Saldo devedor no vencimento + correção IGP-M (do vencimento até data base)
 
         Cálculo vetorizado direto do valor corrigido VOLTZ.
+        
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
         """
         # Arrays NumPy diretos
         esta_vencido = df['esta_vencido'].to_numpy()
@@ -921,7 +852,8 @@ class CalculadorVoltz:
 
         return df
     
-    def processar_correcao_voltz_completa(self, df: pd.DataFrame, nome_base: str, df_taxa_recuperacao: pd.DataFrame = None) -> pd.DataFrame:
+    def processar_correcao_voltz_completa(self, df: pd.DataFrame, nome_base: str, df_taxa_recuperacao: pd.DataFrame = None,
+                                          profiler: ProfilerPipeline = None) -> pd.DataFrame:
         """
         Executa todo o processo de correção monetária específico para VOLTZ seguindo a ordem correta:
         
@@ -933,66 +865,86 @@ class CalculadorVoltz:
         6. Calcular valor corrigido final
         7. Aplicar taxa de recuperação com merge triplo (Empresa + Tipo + Aging mapeado)
         8. Calcular valor até data de recebimento (IGP-M + Juros moratórios projetados)
+        
+        O DataFrame recebido não é alterado; as etapas trabalham sobre uma única
+        cópia. Com ``profiler``, registra o tempo (e as cópias, se ele contar)
+        por etapa; sem ele e com FIDC_PERFIL_ETAPAS=1 no ambiente, publica o
+        tempo das etapas nos eventos.
         """
         if df.empty:
             return df
         
-        st.info("⚡ **Processando com regras específicas VOLTZ (Fintech)**")
+        self.eventos.info("⚡ **Processando com regras específicas VOLTZ (Fintech)**")
+        
+        if df_taxa_recuperacao is None or df_taxa_recuperacao.empty:
+            self.eventos.erro("❌ **ERRO VOLTZ**: Dados de taxa de recuperação não fornecidos ou inválidos!")
+            return None
+        
+        # Com FIDC_PERFIL_ETAPAS ligado, mede as etapas e publica o resumo
+        profiler_debug = profiler_depuracao() if profiler is None else None
         
-        with st.spinner("🔄 Aplicando cálculos VOLTZ..."):
+        # Etapas alteram o mesmo frame in place; só o merge da taxa de
+        # recuperação e a reorganização final geram um novo DataFrame
+        pipeline = PipelineColunas([
             # 1. Calcular valor líquido
-            df = self.calcular_valor_liquido(df)
-            
-            # 2. Definir saldo devedor no vencimento (juros remuneratórios já inclusos no valor)
-            df = self.calcular_juros_remuneratorios_ate_data_base(df)
-            st.info("✅ Juros remuneratórios até a data base calculados.")
-
+            EtapaColunas('valor_liquido', self.calcular_valor_liquido,
+                         escreve=['valor_liquido']),
+            # 2. Juros remuneratórios (4,65% a.m.) do vencimento até a data base
+            EtapaColunas('juros_remuneratorios', self.calcular_juros_remuneratorios_ate_data_base,
+                         le=['valor_liquido'], escreve=['juros_remuneratorios_ate_data_base'],
+                         mensagem="✅ Juros remuneratórios até a data base calculados."),
             # 3. Identificar status dos contratos (vencido/a vencer)
-            df = self.identificar_status_contrato(df)
-
-            # 4. Calcular correção monetária IGP-M (do vencimento até data base)
-            df = self.calcular_correcao_monetaria_igpm(df)
-            st.info("✅ Correção monetária IGP-M até a data base calculada.")
-
-            # 5. Para vencidos: calcular multa (2%) e juros moratórios (1% a.m.)
-            df = self.calcular_multa_voltz(df)
-            df = self.calcular_juros_moratorios_voltz(df)
-            st.info("✅ Juros moratórios até a data base calculados.")
-
-            # 6. Calcular valor corrigido final
-            df = self.calcular_valor_corrigido_voltz(df)
-            st.info("✅ Valor corrigido até a data base calculado.")
-
-            # 7. Aplicar taxa de recuperação (NOVO: antes do final)
-            if df_taxa_recuperacao is not None and not df_taxa_recuperacao.empty:
-                df = self.aplicar_taxa_recuperacao_voltz(df, df_taxa_recuperacao)
-                st.success("✅ Taxa de recuperação aplicada.")
-            else:
-                st.error("❌ **ERRO VOLTZ**: Dados de taxa de recuperação não fornecidos ou inválidos!")
-                return None
-            
-            # 8. Calcular valor até data de recebimento
-            df = self.calcular_valor_ate_recebimento_voltz(df)
-            st.success("✅ Valor corrigido até a data de recebimento calculado.")
-
-            # 9. Calcular remuneração variável e valor justo VOLTZ
-            df = self.calcular_remuneracao_variavel_voltz(df)
-            st.success("✅ Remuneração variável e valor justo calculados.")
-
-            # Buscar taxa DI-PRE correspondente para cada linha
-            df = self._aplicar_taxa_di_pre(df, st.session_state.df_di_pre, 0.025)
-
-            # 10. Calcular valor justo usando taxa de desconto
-            df = self._calcular_valor_justo_com_desconto_voltz(df)
-
+            EtapaColunas('status_contrato', self.identificar_status_contrato,
+                         escreve=['esta_vencido', 'dias_atraso', 'meses_atraso']),
+            # 4. Correção monetária IGP-M (do vencimento até data base)
+            EtapaColunas('correcao_igpm', self.calcular_correcao_monetaria_igpm,
+                         le=['valor_liquido'], escreve=['correcao_monetaria_igpm'],
+                         mensagem="✅ Correção monetária IGP-M até a data base calculada."),
+            # 5. Para vencidos: multa (2%) e juros moratórios (1% a.m.)
+            EtapaColunas('multa', self.calcular_multa_voltz,
+                         le=['esta_vencido', 'valor_liquido'], escreve=['multa']),
+            EtapaColunas('juros_moratorios', self.calcular_juros_moratorios_voltz,
+                         le=['valor_liquido'], escreve=['juros_moratorios_ate_data_base'],
+                         mensagem="✅ Juros moratórios até a data base calculados."),
+            # 6. Valor corrigido até a data base
+            EtapaColunas('valor_corrigido', self.calcular_valor_corrigido_voltz,
+                         le=['esta_vencido', 'valor_liquido', 'juros_remuneratorios_ate_data_base'],
+                         escreve=['valor_corrigido_ate_data_base'],
+                         mensagem="✅ Valor corrigido até a data base calculado."),
+            # 7. Taxa de recuperação (merge Empresa + Aging mapeado)
+            EtapaColunas('taxa_recuperacao',
+                         lambda frame: self.aplicar_taxa_recuperacao_voltz(frame, df_taxa_recuperacao),
+                         le=['valor_corrigido_ate_data_base'],
+                         escreve=['taxa_recuperacao', 'meses_ate_recebimento', 'valor_recuperavel_ate_data_base'],
+                         copia=True, mensagem="✅ Taxa de recuperação aplicada."),
+            # 8. Valor até a data de recebimento
+            EtapaColunas('valor_ate_recebimento', self.calcular_valor_ate_recebimento_voltz,
+                         le=['valor_corrigido_ate_data_base', 'taxa_recuperacao'],
+                         escreve=['data_recebimento', 'valor_corrigido_ate_recebimento',
+                                  'valor_recuperavel_ate_recebimento'],
+                         mensagem="✅ Valor corrigido até a data de recebimento calculado."),
+            # 9. Remuneração variável
+            EtapaColunas('remuneracao_variavel', self.calcular_remuneracao_variavel_voltz,
+                         mensagem="✅ Remuneração variável e valor justo calculados."),
+            # Taxa DI-PRE correspondente para cada linha
+            EtapaColunas('taxa_di_pre',
+                         lambda frame: self._aplicar_taxa_di_pre(frame, self.df_di_pre, 0.025),
+                         le=['meses_ate_recebimento'], escreve=['taxa_di_pre_total_anual']),
+            # 10. Valor justo usando taxa de desconto
+            EtapaColunas('valor_justo', self._calcular_valor_justo_com_desconto_voltz),
             # 11. Reorganizar colunas para apresentação final
-            df = self.reorganizar_colunas_voltz(df)
+            EtapaColunas('reorganizar_colunas', self.reorganizar_colunas_voltz, copia=True),
+        ], profiler=profiler or profiler_debug, notificar=self.eventos.info)
+        
+        with self.eventos.etapa("🔄 Aplicando cálculos VOLTZ..."):
+            df = pipeline.executar(df)
+        
+        if profiler_debug is not None:
+            self.eventos.resumo(f"⏱️ Etapas VOLTZ - {nome_base}", profiler_debug.metricas())
+        if df is None:
+            return None
 
-            # Exibir DataFrame final
-            st.subheader("📊 Resultado Final - VOLTZ")
-            st.dataframe(df, use_container_width=True)
-            
-            return df
+        self.eventos.sucesso(f"📊 Resultado Final - VOLTZ: {len(df):,} registros, {len(df.columns)} colunas")
 
         return df
     
@@ -1029,16 +981,14 @@ class CalculadorVoltz:
         Implementa merge triplo: Empresa + Tipo + Aging mapeado
         """
         if df_taxa_recuperacao is None or df_taxa_recuperacao.empty:
-            st.error("❌ **ERRO VOLTZ**: Dados de taxa de recuperação não fornecidos ou inválidos!")
+            self.eventos.erro("❌ **ERRO VOLTZ**: Dados de taxa de recuperação não fornecidos ou inválidos!")
             return None
         
-        df = df.copy()
-        
         # ETAPA 1: MAPEAMENTO VETORIZADO - Aging detalhado → Categoria taxa
         if 'aging' in df.columns:
             df['aging_taxa'] = df['aging'].apply(self.mapear_aging_para_taxa_voltz)
         else:
-            st.warning("⚠️ Coluna 'aging' não encontrada. Usando categoria padrão.")
+            self.eventos.aviso("⚠️ Coluna 'aging' não encontrada. Usando categoria padrão.")
             df['aging_taxa'] = 'Primeiro ano'
         
         # ETAPA 2: PREPARAR DADOS PARA MERGE TRIPLO
@@ -1099,12 +1049,12 @@ class CalculadorVoltz:
                 
             if 'taxa_recuperacao' not in df_merged.columns:
                 # Se não encontrou coluna de taxa, usar padrão
-                st.error("❌ **ERRO VOLTZ**: Dados de taxa de recuperação não encontrados nos dados. Revisar base de dados.")
+                self.eventos.erro("❌ **ERRO VOLTZ**: Dados de taxa de recuperação não encontrados nos dados. Revisar base de dados.")
                 return None
             
             df = df_merged
         else:
-            st.error("❌ **ERRO VOLTZ**: Não foi possível identificar taxa de recuperação para VOLTZ.")
+            self.eventos.erro("❌ **ERRO VOLTZ**: Não foi possível identificar taxa de recuperação para VOLTZ.")
             return None
         
         # ETAPA 6: CÁLCULO VETORIZADO DO VALOR RECUPERÁVEL
@@ -1119,6 +1069,8 @@ class CalculadorVoltz:
         """
         Gera resumo específico para VOLTZ com visualização clara dos cálculos.
         """
+        import streamlit as st
+
         st.subheader(f"⚡ Resumo VOLTZ - {nome_base.upper()}")
         
         # Separar contratos por status
@@ -1420,6 +1372,8 @@ class CalculadorVoltz:
         """
         Gera relatório visual de performance para análise do processamento.
         """
+        import streamlit as st
+
         st.subheader("⚡ Relatório de Performance - VOLTZ")
         
         metrics = self.verificar_performance_dados(df)
@@ -1528,6 +1482,8 @@ class CalculadorVoltz:
         """
         Executa benchmark real de performance das operações otimizadas.
         """
+        import streamlit as st
+
         import time
         
         st.subheader("🏃‍♂️ Benchmark de Performance em Tempo Real")
@@ -1627,9 +1583,10 @@ class CalculadorVoltz:
         2. Busca índices IGP-M (merge otimizado)  
         3. Aplicação de fatores (NumPy arrays)
         4. Cálculo final (operações matriciais)
-        """
-        df = df.copy()
         
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
+        """
         # Data base
         data_base = getattr(self.params, 'data_base_padrao', datetime.now())
         if isinstance(data_base, str):
@@ -1649,12 +1606,12 @@ class CalculadorVoltz:
         # 2. BUSCAR ÍNDICES IGP-M (operação única)
         df_indices_igpm = self._obter_dados_igpm_voltz()
         if df_indices_igpm is None:
-            st.error("❌ **ERRO VOLTZ**: Dados de índices IGP-M não disponíveis.")
+            self.eventos.erro("❌ **ERRO VOLTZ**: Dados de índices IGP-M não disponíveis.")
             return None
         else:
             # Com dados: cálculo otimizado
             df = self._aplicar_indices_recebimento(df, data_base)
-            st.info("✅ Índices IGP-M aplicados vetorialmente.")
+            self.eventos.info("✅ Índices IGP-M aplicados vetorialmente.")
             
             # Juros moratórios adicionais (só para vencidos)
             meses_adicionais = df['meses_ate_recebimento'].values
@@ -1667,7 +1624,7 @@ class CalculadorVoltz:
                 0.0
             )
             df['juros_moratorios_recebimento'] = np.where(esta_vencido, valores_corrigidos * fatores_juros, 0)
-            st.info("✅ Juros moratórios adicionais calculados vetorialmente.")
+            self.eventos.info("✅ Juros moratórios adicionais calculados vetorialmente.")
         
         # 2.5. CALCULAR JUROS REMUNERATÓRIOS ATÉ DATA DE RECEBIMENTO (TODOS OS CONTRATOS)
         # Taxa de juros remuneratórios: 4,65% a.m.
@@ -1690,7 +1647,7 @@ class CalculadorVoltz:
         # Calcular juros remuneratórios adicionais (diferença)
         df['juros_remuneratorios_recebimento'] = valores_com_juros_recebimento - valores_base
         df['juros_remuneratorios_recebimento'] = np.maximum(df['juros_remuneratorios_recebimento'], 0)
-        st.info("✅ Juros remuneratórios até recebimento calculados (4,65% a.m.).")
+        self.eventos.info("✅ Juros remuneratórios até recebimento calculados (4,65% a.m.).")
         
         # 3. CÁLCULO FINAL VETORIZADO - VALOR CORRIGIDO ATÉ RECEBIMENTO
         df['valor_corrigido_ate_recebimento'] = (
@@ -1718,17 +1675,15 @@ class CalculadorVoltz:
         - Se data_recebimento > última data IGP-M: extrapola usando variação mensal da última competência
         - Mantém cálculo proporcional para meses parciais
         """
-        df = df.copy()
-        
         # Verificar se temos dados de índices IGP-M específicos para VOLTZ
         df_indices = self._obter_dados_igpm_voltz()
         if df_indices is None:
-            st.error("❌ **ERRO VOLTZ**: Dados de índices IGP-M não disponíveis para cálculo.")
+            self.eventos.erro("❌ **ERRO VOLTZ**: Dados de índices IGP-M não disponíveis para cálculo.")
             return None
         
         # Verificar estrutura dos dados
         if 'data' not in df_indices.columns or 'indice' not in df_indices.columns:
-            st.error("❌ **ERRO VOLTZ**: Estrutura dos dados de índices IGP-M inválida.")
+            self.eventos.erro("❌ **ERRO VOLTZ**: Estrutura dos dados de índices IGP-M inválida.")
             return None
 
         # PREPARAR DADOS DE ÍNDICES PARA FUNÇÃO GENÉRICA
@@ -2019,7 +1974,7 @@ Esta metodologia garante precisão temporal máxima, aplicando:
         
         # Garantir que temos a taxa de recuperação
         if 'taxa_recuperacao' not in df.columns:
-            st.warning("⚠️ Taxa de recuperação não encontrada. Usando 100%.")
+            self.eventos.aviso("⚠️ Taxa de recuperação não encontrada. Usando 100%.")
             df['taxa_recuperacao'] = 1.0
         
         # Calcular meses até recebimento estimado baseado no aging
@@ -2074,7 +2029,7 @@ Esta metodologia garante precisão temporal máxima, aplicando:
         elif 'aging' in df.columns:
             coluna_aging = 'aging'
         else:
-            st.warning("⚠️ Coluna de aging não encontrada. Usando prazo padrão de 24 meses.")
+            self.eventos.aviso("⚠️ Coluna de aging não encontrada. Usando prazo padrão de 24 meses.")
             df['meses_ate_recebimento'] = 24
             return df
         
@@ -2087,27 +2042,33 @@ Esta metodologia garante precisão temporal máxima, aplicando:
         """
         Aplica taxa DI-PRE + spread de risco para cada linha baseado nos meses até recebimento.
         
-        Usa dados do session state para acessar df_di_pre com coluna 'meses_futuros' calculada.
+        Usa a curva df_di_pre recebida (ou a do construtor), com coluna
+        'meses_futuros' calculada; sem curva explícita, usa a curva do
+        curve_store vigente na data base.
         """
-        # Verificar se temos dados DI-PRE no session state
-        if hasattr(st.session_state, 'df_di_pre') and st.session_state.df_di_pre is not None:
-            df_di_pre_session = st.session_state.df_di_pre.copy()
+        if df_di_pre is None:
+            df_di_pre = self.df_di_pre
+
+        if (df_di_pre is None or df_di_pre.empty) and self.curve_store is not None:
+            data_base = getattr(self.params, 'data_base_padrao', datetime.now())
+            df_di_pre = self.curve_store.obter_curva(data_base)
+
+        # Curva DI-PRE explícita (upload da sessão ou parâmetro) ou do histórico
+        if df_di_pre is not None and not df_di_pre.empty:
+            df_di_pre_session = df_di_pre.copy()
             
             # Criar coluna 'meses_futuros' se não existir
             if 'meses_futuros' not in df_di_pre_session.columns:
                 if 'dias_corridos' in df_di_pre_session.columns:
                     df_di_pre_session['meses_futuros'] = (df_di_pre_session['dias_corridos'] / 30.44).round().astype(int)
-                    st.info("✅ VOLTZ: Coluna 'meses_futuros' criada a partir de 'dias_corridos'")
+                    self.eventos.info("✅ VOLTZ: Coluna 'meses_futuros' criada a partir de 'dias_corridos'")
                 else:
-                    st.warning("⚠️ VOLTZ: Nem 'meses_futuros' nem 'dias_corridos' encontrados no df_di_pre")
+                    self.eventos.aviso("⚠️ VOLTZ: Nem 'meses_futuros' nem 'dias_corridos' encontrados no df_di_pre")
                     # Usar valores padrão
                     df_di_pre_session['meses_futuros'] = range(1, len(df_di_pre_session) + 1)
         else:
-            # Fallback: usar df_di_pre passado como parâmetro
-            df_di_pre_session = df_di_pre.copy()
-            if 'meses_futuros' not in df_di_pre_session.columns:
-                st.warning("⚠️ VOLTZ: df_di_pre não possui coluna 'meses_futuros'. Usando valores padrão.")
-                df_di_pre_session['meses_futuros'] = range(1, len(df_di_pre_session) + 1)
+            self.eventos.erro("❌ **ERRO VOLTZ**: Curva DI-PRE não disponível.")
+            return None
         
         # Inicializar colunas
         df['taxa_di_pre'] = 0.0
@@ -2149,7 +2110,7 @@ Esta metodologia garante precisão temporal máxima, aplicando:
                 fator_desconto = (1 + taxa_desconto_total) ** anos
                 df.at[idx, 'fator_desconto'] = fator_desconto
             else:
-                st.error("⚠️ VOLTZ: Taxa DI-PRE não encontrada para alguns meses.")
+                self.eventos.erro("⚠️ VOLTZ: Taxa DI-PRE não encontrada para alguns meses.")
                 return None
         return df
     
@@ -2171,6 +2132,9 @@ Esta metodologia garante precisão temporal máxima, aplicando:
             
         Returns:
             pd.DataFrame: DataFrame com remuneração variável e valor justo calculados
+        
+        Altera ``df`` in place (etapa do PipelineColunas) e retorna o mesmo
+        DataFrame; para preservar o original, passe uma cópia.
         """
         if df.empty:
             return df
@@ -2181,9 +2145,9 @@ Esta metodologia garante precisão temporal máxima, aplicando:
             # Usar valor alternativo se disponível
             if 'valor_corrigido_ate_data_base' in df.columns:
                 coluna_valor = 'valor_corrigido_ate_data_base'
-                st.info(f"⚡ VOLTZ: Usando '{coluna_valor}' como base para remuneração variável")
+                self.eventos.info(f"⚡ VOLTZ: Usando '{coluna_valor}' como base para remuneração variável")
             else:
-                st.warning("⚠️ VOLTZ: Nenhuma coluna de valor adequada encontrada para remuneração variável")
+                self.eventos.aviso("⚠️ VOLTZ: Nenhuma coluna de valor adequada encontrada para remuneração variável")
                 return df
         
         # Inicializar calculador específico da VOLTZ
@@ -2194,7 +2158,8 @@ Esta metodologia garante precisão temporal máxima, aplicando:
             df=df,
             coluna_valor=coluna_valor,
             coluna_aging='aging',
-            prefixo_colunas='remuneracao_variavel_voltz'
+            prefixo_colunas='remuneracao_variavel_voltz',
+            inplace=True
         )
 
         
@@ -2215,20 +2180,18 @@ Esta metodologia garante precisão temporal máxima, aplicando:
         Returns:
             pd.DataFrame: DataFrame com valor justo calculado
         """
-        df = df.copy()
-        
         # Verificar se temos as colunas necessárias
         colunas_necessarias = ['remuneracao_variavel_voltz_valor_final', 'taxa_recuperacao', 'meses_ate_recebimento']
         
         for coluna in colunas_necessarias:
             if coluna not in df.columns:
-                st.warning(f"⚠️ VOLTZ: Coluna '{coluna}' não encontrada para cálculo do valor justo")
+                self.eventos.aviso(f"⚠️ VOLTZ: Coluna '{coluna}' não encontrada para cálculo do valor justo")
                 return df
         
         # Verificar se temos taxa DI-PRE total anual
         if 'taxa_di_pre_total_anual' not in df.columns:
             # Usar taxa padrão se não estiver disponível
-            st.warning("⚠️ VOLTZ: Taxa DI-PRE não encontrada, usando taxa padrão de 10% a.a.")
+            self.eventos.aviso("⚠️ VOLTZ: Taxa DI-PRE não encontrada, usando taxa padrão de 10% a.a.")
             df['taxa_di_pre_total_anual'] = 0.10  # 10% a.a. como padrão
         
         # 1. CALCULAR TAXA DE DESCONTO MENSAL (vetorizado)
@@ -2261,6 +2224,8 @@ Esta metodologia garante precisão temporal máxima, aplicando:
         Args:
             df: DataFrame com valor justo calculado
         """
+        import streamlit as st
+
         if df.empty:
             return
         
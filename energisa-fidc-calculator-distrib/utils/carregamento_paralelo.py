@@ -0,0 +1,327 @@
+"""
+Carregamento das planilhas das distribuidoras em duas fases.
+
+Fase 1 (``ler_amostra_planilha``): cabecalho + algumas linhas, lidas sob
+demanda pelo openpyxl em modo somente leitura, e o total de linhas pela
+dimensao gravada na aba. O custo nao depende do tamanho do arquivo e a
+amostra basta para o mapeamento e as validacoes.
+
+Fase 2 (``CargaPlanilha``): depois de confirmado o mapeamento, a planilha
+e lida inteira em segundo plano, so com as colunas mapeadas (motor calamine
+quando instalado, ver ``leitor_excel``). A leitura de Excel e CPU-bound
+(parse do XML em Python), entao as cargas rodam em um pool de processos
+compartilhado e varios arquivos sao lidos ao mesmo tempo.
+
+Com o hash do conteudo (``cache_uploads.ler_com_hash``), as duas fases
+guardam e reaproveitam as leituras no cache do processo: o mesmo arquivo
+enviado de novo, com qualquer nome e em qualquer sessao, nao e relido.
+
+Os processos sao criados com ``spawn`` (o servidor do Streamlit tem threads,
+e ``fork`` poderia herdar locks presos). Com um unico nucleo, poucos MB ou
+falha do pool, a carga roda em uma thread do proprio processo.
+
+As duas fases aceitam outro leitor (parametro ``leitor``), ex.: o app v2,
+que tambem le CSV e traz tudo como texto. O leitor da fase 2 precisa ser
+uma funcao de modulo (vai para o pool de processos) e entra na chave do
+cache junto com o arquivo.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Callable, List, Optional, Sequence
+
+import pandas as pd
+
+from .cache_uploads import obter_cache_uploads
+from .leitor_excel import abrir_planilha, abrir_planilha_amostra
+
+ABAS_PREFERIDAS = ('Base', 'Dados', 'Principal')
+LINHAS_AMOSTRA = 200
+# Abaixo disso o custo de enviar os dados a outro processo supera o ganho
+TAMANHO_MINIMO_PARALELO = 4 * 1024 ** 2
+
+
+def escolher_aba(abas: Sequence[str], nome_distribuidora: str) -> str:
+    """Primeira aba com nome comum (Base, Dados, Principal, nome da distribuidora) ou a primeira."""
+    for aba in list(ABAS_PREFERIDAS) + [nome_distribuidora.title()]:
+        if aba in abas:
+            return aba
+    return abas[0]
+
+
+class ResultadoLeitura:
+    """DataFrame lido (ou erro) de um arquivo, com abas e tempo de leitura."""
+
+    def __init__(self, nome_arquivo: str, dataframe: Optional[pd.DataFrame] = None,
+                 abas: Optional[List[str]] = None, aba: Optional[str] = None,
+                 segundos: float = 0.0, erro: Optional[str] = None,
+                 total_linhas: Optional[int] = None, em_cache: bool = False):
+        self.nome_arquivo = nome_arquivo
+        self.dataframe = dataframe
+        self.abas = abas or []
+        self.aba = aba
+        self.segundos = segundos
+        self.erro = erro
+        # Preenchido na leitura de amostra: linhas de dados da aba inteira (estimativa)
+        self.total_linhas = total_linhas
+        self.em_cache = em_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.erro is None and self.dataframe is not None
+
+    @property
+    def registros(self) -> int:
+        return len(self.dataframe) if self.dataframe is not None else 0
+
+    @property
+    def registros_por_segundo(self) -> float:
+        return self.registros / self.segundos if self.segundos > 0 else 0.0
+
+    def descricao(self) -> str:
+        if not self.ok:
+            return f"{self.nome_arquivo}: erro - {self.erro}"
+        if self.total_linhas is not None:
+            return (
+                f"{self.nome_arquivo}: amostra de {self.registros:,} linhas "
+                f"(~{self.total_linhas:,} registros) x {len(self.dataframe.columns)} colunas "
+                f"em {self.segundos:.2f}s"
+            )
+        return (
+            f"{self.nome_arquivo}: {self.registros:,} registros x {len(self.dataframe.columns)} colunas "
+            f"em {self.segundos:.1f}s ({self.registros_por_segundo:,.0f} registros/s)"
+        )
+
+
+def linhas_na_dimensao(planilha: pd.ExcelFile, aba: str) -> Optional[int]:
+    """Linhas de dados (sem o cabecalho) pela dimensao da aba, sem ler as linhas."""
+    try:
+        folha = planilha.book[aba]
+        ultima = getattr(folha, 'max_row', None) or getattr(folha, 'nrows', None)
+    except Exception:
+        return None
+    return max(int(ultima) - 1, 0) if ultima else None
+
+
+def _renomeado(resultado: ResultadoLeitura, nome_arquivo: str) -> ResultadoLeitura:
+    """Leitura do cache atribuida ao arquivo atual (mesmo DataFrame, tempo zero)."""
+    return ResultadoLeitura(nome_arquivo, resultado.dataframe, resultado.abas, resultado.aba,
+                            0.0, resultado.erro, resultado.total_linhas, em_cache=True)
+
+
+def _identificador(leitor: Callable) -> str:
+    return f"{leitor.__module__}.{leitor.__qualname__}"
+
+
+def ler_amostra_excel(origem, nome_arquivo: str, linhas: int = LINHAS_AMOSTRA) -> ResultadoLeitura:
+    """
+    Leitor padrao da fase 1: cabecalho e as primeiras ``linhas`` da aba
+    principal, com o total de linhas estimado pela dimensao da aba.
+    """
+    with abrir_planilha_amostra(origem) as planilha:
+        abas = list(planilha.sheet_names)
+        aba = escolher_aba(abas, nome_arquivo)
+        # Antes do parse: o leitor do pandas zera a dimensao gravada ao ler a aba
+        total = linhas_na_dimensao(planilha, aba)
+        df = planilha.parse(aba, nrows=linhas)
+    if len(df) < linhas:
+        # A amostra ja e a aba inteira (dimensao pode contar linhas vazias formatadas)
+        total = len(df)
+    return ResultadoLeitura(nome_arquivo, df, abas, aba, total_linhas=total)
+
+
+def ler_amostra_planilha(origem, nome_arquivo: str, linhas: int = LINHAS_AMOSTRA,
+                         hash_conteudo: Optional[str] = None,
+                         leitor: Optional[Callable] = None) -> ResultadoLeitura:
+    """
+    Fase 1: amostra do arquivo pelo ``leitor`` (padrao ``ler_amostra_excel``),
+    com o tempo de leitura. Com ``hash_conteudo``, usa e alimenta o cache de
+    uploads.
+    """
+    leitor = leitor or ler_amostra_excel
+    # A aba escolhida pode depender do nome do arquivo, que entra na chave
+    chave = ('amostra', hash_conteudo, nome_arquivo, linhas, _identificador(leitor))
+    if hash_conteudo is not None:
+        em_cache = obter_cache_uploads().obter(chave)
+        if em_cache is not None:
+            return _renomeado(em_cache, nome_arquivo)
+
+    inicio = time.perf_counter()
+    resultado = leitor(origem, nome_arquivo, linhas)
+    resultado.segundos = time.perf_counter() - inicio
+    if hash_conteudo is not None and resultado.ok:
+        obter_cache_uploads().guardar(chave, resultado)
+    return resultado
+
+
+def ler_planilha(origem, nome_arquivo: str, aba: Optional[str] = None,
+                 colunas: Optional[Sequence] = None) -> ResultadoLeitura:
+    """
+    Le uma aba (a principal, se ``aba`` for None) de uma planilha (caminho,
+    bytes ou arquivo aberto), abrindo o arquivo uma unica vez. ``colunas``
+    restringe a leitura a essas colunas do cabecalho.
+    """
+    inicio = time.perf_counter()
+    with abrir_planilha(origem) as planilha:
+        abas = list(planilha.sheet_names)
+        if aba not in abas:
+            aba = escolher_aba(abas, nome_arquivo)
+        if colunas is None:
+            df = planilha.parse(aba)
+        else:
+            try:
+                df = planilha.parse(aba, usecols=list(colunas))
+            except ValueError:
+                # Nome que nao casa com o cabecalho lido (ex.: colunas repetidas)
+                df = planilha.parse(aba)
+    return ResultadoLeitura(nome_arquivo, df, abas, aba, time.perf_counter() - inicio)
+
+
+def _ler_planilha_protegido(conteudo: bytes, nome_arquivo: str, aba: Optional[str] = None,
+                            colunas: Optional[Sequence] = None,
+                            leitor: Callable = ler_planilha) -> ResultadoLeitura:
+    """Versao para o pool: erros de leitura voltam no resultado, nao como excecao."""
+    inicio = time.perf_counter()
+    try:
+        resultado = leitor(conteudo, nome_arquivo, aba, colunas)
+    except Exception as e:
+        resultado = ResultadoLeitura(nome_arquivo, erro=str(e))
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+_lock_executores = threading.Lock()
+_executor_processos: Optional[ProcessPoolExecutor] = None
+_executor_threads: Optional[ThreadPoolExecutor] = None
+
+
+def _executor_local() -> ThreadPoolExecutor:
+    global _executor_threads
+    with _lock_executores:
+        if _executor_threads is None:
+            _executor_threads = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                   thread_name_prefix='carga_planilha')
+        return _executor_threads
+
+
+def _executor_para(tamanho: int):
+    """Pool de processos compartilhado para arquivos grandes com mais de um nucleo."""
+    global _executor_processos
+    if (os.cpu_count() or 1) < 2 or tamanho < TAMANHO_MINIMO_PARALELO:
+        return _executor_local()
+    with _lock_executores:
+        if _executor_processos is None:
+            _executor_processos = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                                      mp_context=get_context('spawn'))
+        return _executor_processos
+
+
+def _descartar_executor_processos() -> None:
+    global _executor_processos
+    with _lock_executores:
+        executor, _executor_processos = _executor_processos, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _submeter(conteudo: bytes, nome_arquivo: str, aba: Optional[str], colunas: Optional[List],
+              leitor: Callable) -> Future:
+    executor = _executor_para(len(conteudo))
+    try:
+        return executor.submit(_ler_planilha_protegido, conteudo, nome_arquivo, aba, colunas, leitor)
+    except (BrokenProcessPool, OSError, RuntimeError):
+        # Pool quebrado ou encerrado: recria na proxima e le em thread agora
+        _descartar_executor_processos()
+        return _executor_local().submit(_ler_planilha_protegido, conteudo, nome_arquivo, aba, colunas, leitor)
+
+
+class CargaPlanilha:
+    """
+    Fase 2: leitura completa de uma planilha em segundo plano, so com as
+    colunas necessarias ao mapeamento.
+
+    Uso:
+        carga = CargaPlanilha(conteudo, "ENERGISA_MT.xlsx", aba="Base")
+        carga.iniciar(["Cliente", "Vencimento", "Valor"])   # retorna na hora
+        carga.pronta                                         # True quando terminou
+        resultado = carga.resultado()                        # espera, se preciso
+
+    ``leitor(conteudo, nome_arquivo, aba, colunas)`` troca a leitura padrao
+    (``ler_planilha``). ``iniciar`` com as mesmas colunas reaproveita a carga em andamento; com
+    outras colunas, descarta a anterior e comeca de novo. Com
+    ``hash_conteudo``, a leitura do mesmo arquivo, aba e colunas ja feita
+    (nesta ou em outra sessao) sai do cache de uploads.
+    """
+
+    def __init__(self, conteudo: bytes, nome_arquivo: str, aba: Optional[str] = None,
+                 hash_conteudo: Optional[str] = None, leitor: Callable = ler_planilha):
+        self.conteudo = conteudo
+        self.nome_arquivo = nome_arquivo
+        self.aba = aba
+        self.hash_conteudo = hash_conteudo
+        self.leitor = leitor
+        self.colunas: Optional[List] = None
+        self._futuro: Optional[Future] = None
+
+    def _chave_cache(self, colunas: Optional[List]):
+        return ('completa', self.hash_conteudo, self.aba, None if colunas is None else tuple(colunas),
+                _identificador(self.leitor))
+
+    @property
+    def iniciada(self) -> bool:
+        return self._futuro is not None
+
+    @property
+    def pronta(self) -> bool:
+        return self._futuro is not None and self._futuro.done()
+
+    def iniciar(self, colunas: Optional[Sequence] = None) -> None:
+        colunas = None if colunas is None else list(dict.fromkeys(colunas))
+        if self._futuro is not None and colunas == self.colunas:
+            return
+        if self._futuro is not None:
+            self._futuro.cancel()
+        self.colunas = colunas
+
+        if self.hash_conteudo is None:
+            self._futuro = _submeter(self.conteudo, self.nome_arquivo, self.aba, colunas, self.leitor)
+            return
+
+        chave = self._chave_cache(colunas)
+        em_cache = obter_cache_uploads().obter(chave)
+        if em_cache is not None:
+            self._futuro = Future()
+            self._futuro.set_result(_renomeado(em_cache, self.nome_arquivo))
+            return
+
+        def _guardar(futuro: Future) -> None:
+            if futuro.cancelled() or futuro.exception() is not None:
+                return
+            if futuro.result().ok:
+                obter_cache_uploads().guardar(chave, futuro.result())
+
+        self._futuro = _submeter(self.conteudo, self.nome_arquivo, self.aba, colunas, self.leitor)
+        self._futuro.add_done_callback(_guardar)
+
+    def cancelar(self) -> None:
+        """Cancela a carga se ainda nao comecou (a que ja esta lendo termina no pool)."""
+        if self._futuro is not None:
+            self._futuro.cancel()
+
+    def resultado(self, timeout: Optional[float] = None) -> ResultadoLeitura:
+        """Resultado da carga (inicia com todas as colunas se ainda nao iniciada)."""
+        if self._futuro is None:
+            self.iniciar()
+        try:
+            return self._futuro.result(timeout=timeout)
+        except BrokenProcessPool:
+            _descartar_executor_processos()
+            resultado = _ler_planilha_protegido(self.conteudo, self.nome_arquivo, self.aba, self.colunas,
+                                                self.leitor)
+            self._futuro = Future()
+            self._futuro.set_result(resultado)
+            return resultado
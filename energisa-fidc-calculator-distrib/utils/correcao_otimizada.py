@@ -2,7 +2,10 @@
 Utilitarios vetorizados para calculos de correcao monetaria.
 """
 
+import hashlib
+from collections import OrderedDict
 from datetime import datetime
+from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -53,6 +56,91 @@ def otimizar_curva_di_pre(df_di_pre: pd.DataFrame) -> pd.DataFrame:
     return df.drop(columns=["mes_ref", "dist_mes_ref"], errors="ignore")
 
 
+_DIAS_NO_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int32)
+_NS_POR_DIA = 86_400_000_000_000
+
+
+def _calendario_civil(dias: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(ordinal do mes, dia, dias no mes) para dias desde 1970-01-01, so com inteiros."""
+    z = dias.astype(np.int64) + 719468
+    era = np.floor_divide(z, 146097)
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+
+    dia = doy - (153 * mp + 2) // 5 + 1
+    mes = np.where(mp < 10, mp + 3, mp - 9)
+    ano = yoe + era * 400 + (mes <= 2)
+
+    bissexto = (ano % 4 == 0) & ((ano % 100 != 0) | (ano % 400 == 0))
+    dias_no_mes = np.take(_DIAS_NO_MES, mes - 1) + ((mes == 2) & bissexto)
+    return (
+        (ano * 12 + mes - 1).astype(np.int32),
+        dia.astype(np.int32),
+        dias_no_mes.astype(np.int32),
+    )
+
+
+def _decompor_datas(datas) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decompoe datas em (ordinal do mes, dia, dias no mes, valido) com aritmetica inteira.
+
+    O ordinal do mes e ``ano * 12 + mes - 1``; datas invalidas ficam com valido=False.
+    O calendario e resolvido uma vez por dia distinto do intervalo e expandido com
+    np.take, ja que carteiras repetem poucas datas em milhoes de linhas.
+    """
+    serie = datas if isinstance(datas, pd.Series) else pd.Series(datas)
+    if not pd.api.types.is_datetime64_dtype(serie.dtype):
+        serie = pd.to_datetime(serie, errors="coerce")
+
+    ns = serie.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    valido = ns != np.iinfo(np.int64).min
+    if not valido.any():
+        zeros = np.zeros(len(ns), dtype=np.int32)
+        return zeros, zeros.copy(), np.ones(len(ns), dtype=np.int32), valido
+
+    dias = np.floor_divide(ns, _NS_POR_DIA)
+    dia_min = int(dias[valido].min())
+    dia_max = int(dias[valido].max())
+
+    if dia_max - dia_min < max(len(dias), 1):
+        ordinal_tab, dia_tab, dias_no_mes_tab = _calendario_civil(np.arange(dia_min, dia_max + 1))
+        posicao = np.where(valido, dias - dia_min, 0)
+        ordinal = np.take(ordinal_tab, posicao)
+        dia = np.take(dia_tab, posicao)
+        dias_no_mes = np.take(dias_no_mes_tab, posicao)
+    else:
+        ordinal, dia, dias_no_mes = _calendario_civil(np.where(valido, dias, 0))
+
+    if not valido.all():
+        ordinal[~valido] = 0
+        dia[~valido] = 0
+        dias_no_mes[~valido] = 1
+    return ordinal, dia, dias_no_mes, valido
+
+
+def _indice_pro_rata_composto(
+    indice_mes: np.ndarray,
+    indice_mes_anterior: np.ndarray,
+    taxa_mensal: np.ndarray,
+    taxa_diaria: np.ndarray,
+    dia: np.ndarray,
+    dias_no_mes: np.ndarray,
+    valido: np.ndarray,
+) -> np.ndarray:
+    """Indice diario composto: anterior * (1 + taxa_diaria)^dia; no ultimo dia, o indice do mes."""
+    resultado = indice_mes.astype("float64", copy=True)
+
+    mask_calcular = valido & ~np.isnan(indice_mes) & ~np.isnan(taxa_mensal) & (dia != dias_no_mes)
+    if mask_calcular.any():
+        resultado[mask_calcular] = indice_mes_anterior[mask_calcular] * np.power(
+            1 + taxa_diaria[mask_calcular],
+            dia[mask_calcular],
+        )
+    return resultado
+
+
 def calcular_indice_diario_vetorizado(
     df: pd.DataFrame,
     coluna_data: str,
@@ -62,42 +150,236 @@ def calcular_indice_diario_vetorizado(
     coluna_taxa_diaria: str,
 ) -> pd.Series:
     """Calcula indice diario sem apply linha a linha."""
-    data = pd.to_datetime(df[coluna_data], errors="coerce")
-    indice_mes = pd.to_numeric(df[coluna_indice_mes], errors="coerce")
-    indice_mes_anterior = pd.to_numeric(df[coluna_indice_mes_anterior], errors="coerce")
-    taxa_mensal = pd.to_numeric(df[coluna_taxa_mensal], errors="coerce")
-    taxa_diaria = pd.to_numeric(df[coluna_taxa_diaria], errors="coerce")
+    _, dia, dias_no_mes, valido = _decompor_datas(df[coluna_data])
+
+    resultado = _indice_pro_rata_composto(
+        pd.to_numeric(df[coluna_indice_mes], errors="coerce").to_numpy(dtype="float64"),
+        pd.to_numeric(df[coluna_indice_mes_anterior], errors="coerce").to_numpy(dtype="float64"),
+        pd.to_numeric(df[coluna_taxa_mensal], errors="coerce").to_numpy(dtype="float64"),
+        pd.to_numeric(df[coluna_taxa_diaria], errors="coerce").to_numpy(dtype="float64"),
+        dia,
+        dias_no_mes,
+        valido,
+    )
+    return pd.Series(resultado, index=df.index, dtype="float64")
+
+
+class IndexCurve:
+    """
+    Curva mensal de indices (IGP-M/IPCA) compilada uma vez por arquivo.
+
+    Guarda, por ordinal de mes (``ano * 12 + mes - 1``), o indice, o indice
+    anterior, a taxa mensal e a taxa diaria, e resolve o indice diario de
+    uma serie de datas com ``value_at`` sem merges nem Periods.
+    """
+
+    def __init__(self, df_indices: pd.DataFrame, coluna_data: str = "data", coluna_indice: str = "indice"):
+        base = pd.DataFrame({
+            "data": pd.to_datetime(df_indices[coluna_data], errors="coerce"),
+            "indice": pd.to_numeric(df_indices[coluna_indice], errors="coerce"),
+        }).dropna()
+        if base.empty:
+            raise ValueError("Curva de indices sem registros validos.")
+
+        base = base.sort_values("data", kind="mergesort")
+        ordinal, _, _, _ = _decompor_datas(base["data"])
+        base["ordinal"] = ordinal
+        # Um registro por competencia (ultimo informado prevalece)
+        base = base.drop_duplicates(subset=["ordinal"], keep="last")
+
+        indice = base["indice"].to_numpy(dtype="float64")
+        indice_anterior = np.concatenate(([np.nan], indice[:-1]))
+        taxa_mensal = 1 - indice_anterior / indice
+        taxa_diaria = (taxa_mensal + 1) ** (1 / 30) - 1
+
+        ordinais = base["ordinal"].to_numpy(dtype=np.int32)
+        self.ordinal_inicial = int(ordinais[0])
+        self.ordinal_final = int(ordinais[-1])
+        self.data_inicial = base["data"].iloc[0]
+        self.data_final = base["data"].iloc[-1]
+        self.ultimo_indice = float(indice[-1])
+        self.total_meses = len(ordinais)
+
+        tamanho = self.ordinal_final - self.ordinal_inicial + 1
+        posicao = ordinais - self.ordinal_inicial
+
+        # Arrays densos com uma posicao extra (NaN) usada como sentinela de "sem competencia"
+        def _denso(valores: np.ndarray) -> np.ndarray:
+            arr = np.full(tamanho + 1, np.nan, dtype="float64")
+            arr[posicao] = valores
+            return arr
+
+        self.indice = _denso(indice)
+        self.indice_anterior = _denso(indice_anterior)
+        self.taxa_mensal = _denso(taxa_mensal)
+        self.taxa_diaria = _denso(taxa_diaria)
+
+        # Posicao da ultima competencia disponivel <= cada mes (consulta as-of)
+        self.sentinela = tamanho
+        disponivel = np.zeros(tamanho, dtype=bool)
+        disponivel[posicao] = True
+        self.posicao_exata = np.where(disponivel, np.arange(tamanho), tamanho).astype(np.int32)
+        posicao_asof = np.maximum.accumulate(np.where(disponivel, np.arange(tamanho), -1))
+        self.posicao_asof = np.where(posicao_asof >= 0, posicao_asof, tamanho).astype(np.int32)
+
+    def _posicoes(self, ordinal: np.ndarray, valido: np.ndarray, asof: bool) -> np.ndarray:
+        """Posicao na curva para cada ordinal; ``sentinela`` quando nao ha competencia aplicavel."""
+        deslocamento = ordinal - np.int32(self.ordinal_inicial)
+        ultima = self.sentinela - 1
+
+        if asof:
+            # Depois do fim da curva vale a ultima competencia
+            fora = ~valido | (deslocamento < 0)
+            np.clip(deslocamento, 0, ultima, out=deslocamento)
+            posicao = np.take(self.posicao_asof, deslocamento)
+        else:
+            fora = ~valido | (deslocamento < 0) | (deslocamento > ultima)
+            np.clip(deslocamento, 0, ultima, out=deslocamento)
+            posicao = np.take(self.posicao_exata, deslocamento)
+
+        posicao[fora] = self.sentinela
+        return posicao
+
+    def meses_disponiveis(self, datas) -> np.ndarray:
+        """Mascara das datas cuja competencia existe na curva."""
+        ordinal, _, _, valido = _decompor_datas(datas)
+        return self._posicoes(ordinal, valido, asof=False) != self.sentinela
+
+    def value_at(
+        self,
+        datas,
+        pro_rata: str = "composto",
+        asof: bool = False,
+        valor_ausente: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Indice diario para cada data.
+
+        pro_rata:
+        - "composto": anterior * (1 + taxa_diaria)^dia (no ultimo dia do mes, o indice do mes)
+        - "linear": anterior + (indice - anterior) * dia / dias_no_mes
+
+        asof=False usa apenas a competencia exata; asof=True usa a ultima
+        competencia disponivel ate a data. Sem competencia (ou data invalida),
+        retorna ``valor_ausente`` (padrao: ultimo indice da curva). Na primeira
+        competencia, sem indice anterior, o indice do mes e usado sem pro-rata.
+        """
+        resultado, _ = self._avaliar(datas, pro_rata, asof, valor_ausente)
+        return resultado
+
+    def _avaliar(
+        self,
+        datas,
+        pro_rata: str,
+        asof: bool,
+        valor_ausente: Optional[float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices diarios e mascara das datas com competencia encontrada."""
+        ordinal, dia, dias_no_mes, valido = _decompor_datas(datas)
+        posicao = self._posicoes(ordinal, valido, asof)
+        encontrado = posicao != self.sentinela
+
+        indice = np.take(self.indice, posicao)
+        indice_anterior = np.take(self.indice_anterior, posicao)
+
+        if pro_rata == "linear":
+            anterior = np.where(np.isnan(indice_anterior), indice, indice_anterior)
+            resultado = anterior + (indice - anterior) * (dia / dias_no_mes)
+        elif pro_rata == "composto":
+            resultado = _indice_pro_rata_composto(
+                indice,
+                indice_anterior,
+                np.take(self.taxa_mensal, posicao),
+                np.take(self.taxa_diaria, posicao),
+                dia,
+                dias_no_mes,
+                encontrado,
+            )
+        else:
+            raise ValueError(f"pro_rata invalido: {pro_rata}")
+
+        ausente = self.ultimo_indice if valor_ausente is None else valor_ausente
+        resultado[~encontrado] = ausente
+        return resultado, encontrado
+
+
+_CACHE_INDEX_CURVES: "OrderedDict[str, IndexCurve]" = OrderedDict()
+_LIMITE_CACHE_INDEX_CURVES = 8
+
+
+def obter_index_curve(
+    df_indices: pd.DataFrame,
+    coluna_data: str = "data",
+    coluna_indice: str = "indice",
+) -> IndexCurve:
+    """Retorna a IndexCurve do arquivo de indices, compilando apenas na primeira vez."""
+    conteudo = pd.util.hash_pandas_object(
+        df_indices[[coluna_data, coluna_indice]], index=False
+    ).to_numpy()
+    chave = hashlib.md5(conteudo.tobytes()).hexdigest()
+
+    curva = _CACHE_INDEX_CURVES.get(chave)
+    if curva is None:
+        curva = IndexCurve(df_indices, coluna_data=coluna_data, coluna_indice=coluna_indice)
+        _CACHE_INDEX_CURVES[chave] = curva
+        while len(_CACHE_INDEX_CURVES) > _LIMITE_CACHE_INDEX_CURVES:
+            _CACHE_INDEX_CURVES.popitem(last=False)
+    else:
+        _CACHE_INDEX_CURVES.move_to_end(chave)
+    return curva
 
-    resultado = pd.Series(np.nan, index=df.index, dtype="float64")
 
-    mask_sem_calculo = data.isna() | indice_mes.isna() | taxa_mensal.isna()
-    resultado.loc[mask_sem_calculo] = indice_mes.loc[mask_sem_calculo]
+def aplicar_indices_correcao(
+    df: pd.DataFrame,
+    curva: IndexCurve,
+    coluna_data_base: str = "data_base",
+    coluna_data_vencimento: str = "data_vencimento_limpa",
+    coluna_fator: str = "fator_correcao",
+) -> dict:
+    """
+    Calcula fator de correcao (indice base / indice vencimento) direto na carteira.
 
-    dia_mes = data.dt.day
-    ultimo_dia = data.dt.days_in_month
+    Os indices diarios vem de ``curva.value_at`` (chaves inteiras de mes e
+    np.take no array denso); as colunas ``coluna_fator``, ``indice_base`` e
+    ``indice_vencimento`` sao gravadas em ``df`` sem copiar o DataFrame.
+    Competencias ausentes usam o ultimo indice da curva.
 
-    mask_ultimo_dia = (~mask_sem_calculo) & (dia_mes == ultimo_dia)
-    resultado.loc[mask_ultimo_dia] = indice_mes.loc[mask_ultimo_dia]
+    Retorna contagens para log: registros validos e sem indice (base/vencimento).
+    """
+    indice_base, encontrado_base = curva._avaliar(df[coluna_data_base], "composto", False, None)
+    indice_vencimento, encontrado_vencimento = curva._avaliar(df[coluna_data_vencimento], "composto", False, None)
 
-    mask_calcular = (~mask_sem_calculo) & (~mask_ultimo_dia)
-    if mask_calcular.any():
-        fator_periodo = np.power(
-            1 + taxa_diaria.loc[mask_calcular],
-            dia_mes.loc[mask_calcular],
-        )
-        resultado.loc[mask_calcular] = (
-            indice_mes_anterior.loc[mask_calcular] * fator_periodo
-        )
+    validos = (indice_base > 0) & (indice_vencimento > 0)
 
-    return resultado
+    fator = np.ones(len(df), dtype="float64")
+    np.divide(indice_base, indice_vencimento, out=fator, where=validos)
+    df[coluna_fator] = fator
+
+    for coluna, valores in (("indice_base", indice_base), ("indice_vencimento", indice_vencimento)):
+        if coluna in df.columns:
+            anterior = pd.to_numeric(df[coluna], errors="coerce").to_numpy(dtype="float64")
+            df[coluna] = np.where(validos, valores, anterior)
+        else:
+            df[coluna] = np.where(validos, valores, np.nan)
+
+    return {
+        "registros_validos": int(validos.sum()),
+        "sem_indice_base": int((~encontrado_base).sum()),
+        "sem_indice_vencimento": int((~encontrado_vencimento).sum()),
+    }
 
 
 def aplicar_correcao_monetaria_vetorizada(
     df: pd.DataFrame,
     coluna_fator: str = "fator_correcao",
+    inplace: bool = False,
 ) -> pd.DataFrame:
-    """Aplica correcao monetaria e valores derivados de forma vetorizada."""
-    df_result = df.copy()
+    """
+    Aplica correcao monetaria e valores derivados de forma vetorizada.
+
+    Com ``inplace=True`` escreve as colunas no proprio ``df`` (sem copia).
+    """
+    df_result = df if inplace else df.copy()
 
     fator = pd.to_numeric(df_result.get(coluna_fator, 1.0), errors="coerce").fillna(1.0)
     valor_liquido = pd.to_numeric(df_result.get("valor_liquido", 0.0), errors="coerce").fillna(0.0)
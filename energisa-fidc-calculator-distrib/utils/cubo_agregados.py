@@ -0,0 +1,146 @@
+"""
+Cubo de agregados do resultado final.
+
+Os agrupamentos do exportador e dos visualizadores usam sempre as mesmas
+chaves (empresa, tipo, classe, status, situacao, aging, aging_taxa). O cubo
+agrega o DataFrame completo uma unica vez no grao mais fino dessas chaves;
+todas as visoes mais grossas (por empresa e aging, por aging_taxa, por
+empresa...) sao derivadas dessa tabela pequena.
+
+Somas e contagens sao re-somadas no rollup; medias sao guardadas como
+(soma, quantidade de nao nulos) para que a media derivada seja identica a
+media calculada direto no DataFrame.
+
+``obter_cubo(df)`` mantem o cubo em cache enquanto o mesmo DataFrame estiver
+vivo (ex.: ``st.session_state.df_final`` entre reruns do Streamlit).
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .cache_dataframes import CachePorDataFrame
+
+DIMENSOES_CUBO = ('empresa', 'tipo', 'classe', 'status', 'situacao', 'aging', 'aging_taxa')
+
+# Colunas somadas no cubo (as que existirem no DataFrame)
+MEDIDAS_SOMA = (
+    'valor_principal', 'valor_liquido', 'valor_corrigido', 'multa', 'juros_moratorios',
+    'correcao_monetaria', 'valor_justo', 'valor_recuperavel',
+    'valor_recuperavel_ate_recebimento', 'valor_recuperavel_ate_data_base',
+    'valor_justo_reajustado', 'desconto_aging_valor',
+    'juros_remuneratorios', 'saldo_devedor_vencimento',
+)
+
+# Colunas com media disponivel no cubo
+MEDIDAS_MEDIA = ('taxa_di_pre_aplicada', 'fator_correcao_ate_recebimento')
+
+CONTAGEM = 'count'
+SUFIXO_NAO_NULOS = '__nao_nulos'
+COLUNA_REGISTROS = '__registros'
+
+
+class CuboAgregados:
+    """
+    Tabela agregada no grao mais fino das dimensoes presentes em ``df``.
+
+    Uso:
+        cubo = CuboAgregados(df_final)
+        cubo.agregar(['empresa', 'aging'], {'qtd_registros': 'count', 'valor_justo': 'sum'})
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        medidas_soma: Iterable[str] = MEDIDAS_SOMA,
+        medidas_media: Iterable[str] = MEDIDAS_MEDIA,
+    ):
+        self.dimensoes = [coluna for coluna in DIMENSOES_CUBO if coluna in df.columns]
+        self.medidas_soma = [coluna for coluna in medidas_soma if coluna in df.columns]
+        self.medidas_media = [coluna for coluna in medidas_media if coluna in df.columns]
+        self.registros = len(df)
+
+        colunas_soma = list(dict.fromkeys(self.medidas_soma + self.medidas_media))
+
+        if not self.dimensoes:
+            # Sem dimensoes: uma unica linha com os totais
+            totais = {coluna: df[coluna].sum() for coluna in colunas_soma}
+            totais.update({coluna + SUFIXO_NAO_NULOS: df[coluna].count() for coluna in self.medidas_media})
+            totais[COLUNA_REGISTROS] = len(df)
+            self.tabela = pd.DataFrame([totais])
+            return
+
+        # Um unico agrupador sobre a base completa (sem copiar o DataFrame)
+        agrupado = df.groupby(self.dimensoes, dropna=False, observed=True, sort=False)
+        partes = [agrupado[colunas_soma].sum()] if colunas_soma else []
+        if self.medidas_media:
+            partes.append(agrupado[self.medidas_media].count().add_suffix(SUFIXO_NAO_NULOS))
+        partes.append(agrupado.size().rename(COLUNA_REGISTROS))
+        self.tabela = pd.concat(partes, axis=1).reset_index()
+
+    @property
+    def grupos(self) -> int:
+        return len(self.tabela)
+
+    def agregar(self, dimensoes: Iterable[str], medidas: Dict[str, str]) -> pd.DataFrame:
+        """
+        Rollup para ``dimensoes`` (subconjunto das dimensoes do cubo).
+
+        ``medidas`` mapeia coluna de saida -> 'sum', 'mean' ou 'count'
+        ('count' = quantidade de registros do grupo), na ordem desejada.
+        """
+        dimensoes = list(dimensoes)
+        fora_do_cubo = [coluna for coluna in dimensoes if coluna not in self.dimensoes]
+        if fora_do_cubo:
+            raise KeyError(f"Dimensoes fora do cubo: {fora_do_cubo}")
+
+        colunas_base: List[str] = [COLUNA_REGISTROS]
+        for coluna, funcao in medidas.items():
+            if funcao == 'sum' and coluna not in self.medidas_soma:
+                raise KeyError(f"Medida de soma fora do cubo: {coluna}")
+            if funcao == 'mean':
+                if coluna not in self.medidas_media:
+                    raise KeyError(f"Medida de media fora do cubo: {coluna}")
+                colunas_base.append(coluna + SUFIXO_NAO_NULOS)
+            if funcao in ('sum', 'mean'):
+                colunas_base.append(coluna)
+        colunas_base = list(dict.fromkeys(colunas_base))
+
+        if dimensoes:
+            rollup = (
+                self.tabela
+                .groupby(dimensoes, dropna=False, observed=True)[colunas_base]
+                .sum()
+                .reset_index()
+            )
+        else:
+            rollup = self.tabela[colunas_base].sum().to_frame().T
+
+        resultado = rollup[dimensoes].copy()
+        for coluna, funcao in medidas.items():
+            if funcao == CONTAGEM:
+                resultado[coluna] = rollup[COLUNA_REGISTROS].astype('int64')
+            elif funcao == 'mean':
+                nao_nulos = rollup[coluna + SUFIXO_NAO_NULOS]
+                resultado[coluna] = rollup[coluna].where(nao_nulos > 0) / nao_nulos.where(nao_nulos > 0)
+            else:
+                resultado[coluna] = rollup[coluna]
+        return resultado
+
+
+_cache_cubos: CachePorDataFrame[CuboAgregados] = CachePorDataFrame()
+
+
+def obter_cubo(df: pd.DataFrame) -> Optional[CuboAgregados]:
+    """
+    Cubo do DataFrame, calculado na primeira chamada e reaproveitado enquanto
+    o mesmo objeto estiver vivo e com as mesmas linhas/colunas.
+    """
+    if df is None or df.empty:
+        return None
+    return _cache_cubos.obter(df, CuboAgregados)
+
+
+def invalidar_cubo(df: pd.DataFrame) -> None:
+    """Descarta o cubo em cache de ``df`` (apos alterar valores in place)."""
+    _cache_cubos.descartar(df)
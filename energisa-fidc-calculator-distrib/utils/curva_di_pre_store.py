@@ -0,0 +1,173 @@
+"""
+Armazenamento historico de curvas DI-PRE com consulta por data base (as-of).
+
+Cada curva BMF e gravada em uma particao Parquet propria, identificada pela
+data do arquivo (``data_arquivo=AAAAMMDD/curva.parquet``). A consulta
+``obter_curva(data_base)`` devolve a curva vigente na data base, isto e, a
+ultima curva com ``data_arquivo <= data_base``. Curvas ja lidas ficam em um
+cache LRU em memoria (as consultas devolvem copias) e a lista de datas so e
+refeita quando a pasta muda.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+PREFIXO_PARTICAO = "data_arquivo="
+NOME_ARQUIVO_PARTICAO = "curva.parquet"
+CAPACIDADE_CACHE_PADRAO = 8
+
+
+def _resolver_pasta_curvas() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / "curvas_di_pre"
+
+
+def _normalizar_data(data) -> Optional[pd.Timestamp]:
+    data_ts = pd.to_datetime(data, errors="coerce")
+    if data_ts is None or pd.isna(data_ts):
+        return None
+    return pd.Timestamp(data_ts).normalize()
+
+
+class CurvaDIPreStore:
+    """
+    Repositorio local de curvas DI-PRE particionado por ``data_arquivo``.
+    """
+
+    def __init__(self, pasta: Optional[Path] = None, capacidade_cache: int = CAPACIDADE_CACHE_PADRAO):
+        self.pasta = Path(pasta) if pasta is not None else _resolver_pasta_curvas()
+        self.capacidade_cache = max(int(capacidade_cache), 1)
+        self._cache: "OrderedDict[pd.Timestamp, pd.DataFrame]" = OrderedDict()
+        self._datas: Optional[Tuple[int, List[pd.Timestamp]]] = None  # (mtime da pasta, datas)
+        self._lock = threading.Lock()
+
+    def _caminho_particao(self, data_arquivo: pd.Timestamp) -> Path:
+        return self.pasta / f"{PREFIXO_PARTICAO}{data_arquivo:%Y%m%d}" / NOME_ARQUIVO_PARTICAO
+
+    def datas_disponiveis(self) -> List[pd.Timestamp]:
+        """
+        Lista as datas de arquivo armazenadas, em ordem crescente. A listagem
+        fica em cache ate a pasta mudar (nova particao muda o mtime da pasta).
+        """
+        try:
+            mtime = self.pasta.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            if self._datas is not None and self._datas[0] == mtime:
+                return list(self._datas[1])
+
+        datas = []
+        for particao in self.pasta.glob(f"{PREFIXO_PARTICAO}*"):
+            if not (particao / NOME_ARQUIVO_PARTICAO).exists():
+                continue
+            data = pd.to_datetime(particao.name[len(PREFIXO_PARTICAO):], format="%Y%m%d", errors="coerce")
+            if not pd.isna(data):
+                datas.append(pd.Timestamp(data))
+        datas.sort()
+
+        with self._lock:
+            self._datas = (mtime, datas)
+        return list(datas)
+
+    def salvar_curva(self, df_di_pre: pd.DataFrame, data_arquivo=None) -> Optional[Path]:
+        """
+        Grava a curva na particao da sua data de arquivo.
+
+        Sem ``data_arquivo`` explicito, usa a coluna ``data_arquivo`` da curva.
+        Regravar a mesma data substitui a particao existente.
+        """
+        if df_di_pre is None or df_di_pre.empty:
+            return None
+
+        if data_arquivo is None and "data_arquivo" in df_di_pre.columns:
+            data_arquivo = pd.to_datetime(df_di_pre["data_arquivo"], errors="coerce").dropna().max()
+        data_arquivo = _normalizar_data(data_arquivo)
+        if data_arquivo is None:
+            raise ValueError("Curva DI-PRE sem data_arquivo valida para particionamento.")
+
+        curva = df_di_pre.copy()
+        curva["data_arquivo"] = data_arquivo
+
+        caminho = self._caminho_particao(data_arquivo)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho_tmp = caminho.with_suffix(".tmp")
+        curva.to_parquet(caminho_tmp, index=False)
+        caminho_tmp.replace(caminho)
+
+        with self._lock:
+            self._datas = None
+            self._cache[data_arquivo] = curva
+            self._cache.move_to_end(data_arquivo)
+            self._aplicar_limite_cache()
+
+        return caminho
+
+    def resolver_data_arquivo(self, data_base) -> Optional[pd.Timestamp]:
+        """Retorna a data da curva vigente em ``data_base`` (ultima <= data_base)."""
+        data_base = _normalizar_data(data_base)
+        if data_base is None:
+            return None
+
+        vigentes = [data for data in self.datas_disponiveis() if data <= data_base]
+        return vigentes[-1] if vigentes else None
+
+    def obter_curva(self, data_base) -> Optional[pd.DataFrame]:
+        """Retorna copia da curva DI-PRE vigente na data base, ou None se nao houver."""
+        data_arquivo = self.resolver_data_arquivo(data_base)
+        if data_arquivo is None:
+            return None
+        return self.carregar_curva(data_arquivo)
+
+    def carregar_curva(self, data_arquivo) -> Optional[pd.DataFrame]:
+        """
+        Le a curva de uma data de arquivo especifica, passando pelo cache LRU.
+        Devolve uma copia: alterar o resultado nao altera o cache.
+        """
+        data_arquivo = _normalizar_data(data_arquivo)
+        if data_arquivo is None:
+            return None
+
+        with self._lock:
+            if data_arquivo in self._cache:
+                self._cache.move_to_end(data_arquivo)
+                return self._cache[data_arquivo].copy()
+
+        caminho = self._caminho_particao(data_arquivo)
+        if not caminho.exists():
+            return None
+
+        curva = pd.read_parquet(caminho)
+
+        with self._lock:
+            self._cache[data_arquivo] = curva
+            self._cache.move_to_end(data_arquivo)
+            self._aplicar_limite_cache()
+
+        return curva.copy()
+
+    def limpar_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._datas = None
+
+    def _aplicar_limite_cache(self) -> None:
+        while len(self._cache) > self.capacidade_cache:
+            self._cache.popitem(last=False)
+
+
+_store_padrao: Optional[CurvaDIPreStore] = None
+_lock_store_padrao = threading.Lock()
+
+
+def obter_store_curvas_di_pre() -> CurvaDIPreStore:
+    """Instancia compartilhada do repositorio na pasta ``data/curvas_di_pre``."""
+    global _store_padrao
+    with _lock_store_padrao:
+        if _store_padrao is None:
+            _store_padrao = CurvaDIPreStore()
+        return _store_padrao
@@ -0,0 +1,111 @@
+"""
+Eventos de progresso e log emitidos pelos calculadores.
+
+Os calculadores nao chamam Streamlit: publicam eventos em um ``SinkEventos``
+recebido no construtor. Cada interface escolhe o sink que quiser:
+``SinkLogging`` (padrao, para jobs e benchmarks), ``SinkMemoria`` (coleta os
+eventos em lista) ou ``SinkStreamlit`` (utils/eventos_streamlit.py, usado
+pelas paginas).
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INFO = "info"
+SUCESSO = "sucesso"
+AVISO = "aviso"
+ERRO = "erro"
+PROGRESSO = "progresso"
+INICIO_ETAPA = "inicio_etapa"
+FIM_ETAPA = "fim_etapa"
+RESUMO = "resumo"
+
+
+class EventoCalculo:
+    """Evento emitido por um calculador."""
+
+    def __init__(self, tipo: str, mensagem: str = "", dados: Optional[Dict] = None):
+        self.tipo = tipo
+        self.mensagem = mensagem
+        self.dados = dados or {}
+        self.instante = time.time()
+
+    def __repr__(self) -> str:
+        return f"EventoCalculo({self.tipo!r}, {self.mensagem!r})"
+
+
+class SinkEventos:
+    """
+    Destino dos eventos. Subclasses sobrescrevem ``emitir``; os atalhos
+    (info, sucesso, aviso, erro, progresso, etapa, resumo) montam o evento.
+    A implementacao base descarta tudo.
+    """
+
+    def emitir(self, evento: EventoCalculo) -> None:
+        pass
+
+    def info(self, mensagem: str) -> None:
+        self.emitir(EventoCalculo(INFO, mensagem))
+
+    def sucesso(self, mensagem: str) -> None:
+        self.emitir(EventoCalculo(SUCESSO, mensagem))
+
+    def aviso(self, mensagem: str) -> None:
+        self.emitir(EventoCalculo(AVISO, mensagem))
+
+    def erro(self, mensagem: str) -> None:
+        self.emitir(EventoCalculo(ERRO, mensagem))
+
+    def progresso(self, fracao: float, mensagem: str = "") -> None:
+        self.emitir(EventoCalculo(PROGRESSO, mensagem, {"fracao": float(fracao)}))
+
+    def resumo(self, titulo: str, metricas: Dict[str, str]) -> None:
+        """Bloco de metricas ja formatadas (rotulo -> valor)."""
+        self.emitir(EventoCalculo(RESUMO, titulo, {"metricas": dict(metricas)}))
+
+    @contextmanager
+    def etapa(self, mensagem: str):
+        """Delimita uma etapa demorada (inicio/fim com duracao)."""
+        inicio = time.perf_counter()
+        self.emitir(EventoCalculo(INICIO_ETAPA, mensagem))
+        try:
+            yield
+        finally:
+            self.emitir(EventoCalculo(FIM_ETAPA, mensagem, {"segundos": time.perf_counter() - inicio}))
+
+
+class SinkLogging(SinkEventos):
+    """Encaminha os eventos para o logging (sem interface)."""
+
+    _NIVEIS = {AVISO: logging.WARNING, ERRO: logging.ERROR}
+
+    def __init__(self, nome_logger: Optional[str] = None):
+        self.logger = logging.getLogger(nome_logger) if nome_logger else logger
+
+    def emitir(self, evento: EventoCalculo) -> None:
+        if evento.tipo == PROGRESSO:
+            self.logger.debug("progresso %.0f%% %s", evento.dados["fracao"] * 100, evento.mensagem)
+        elif evento.tipo == FIM_ETAPA:
+            self.logger.info("%s (%.2fs)", evento.mensagem, evento.dados["segundos"])
+        elif evento.tipo == RESUMO:
+            metricas = ", ".join(f"{rotulo}: {valor}" for rotulo, valor in evento.dados["metricas"].items())
+            self.logger.info("%s | %s", evento.mensagem, metricas)
+        elif evento.tipo != INICIO_ETAPA:
+            self.logger.log(self._NIVEIS.get(evento.tipo, logging.INFO), evento.mensagem)
+
+
+class SinkMemoria(SinkEventos):
+    """Guarda os eventos em lista (jobs em lote, benchmarks, conferencia)."""
+
+    def __init__(self):
+        self.eventos: List[EventoCalculo] = []
+
+    def emitir(self, evento: EventoCalculo) -> None:
+        self.eventos.append(evento)
+
+    def mensagens(self, tipo: Optional[str] = None) -> List[str]:
+        return [evento.mensagem for evento in self.eventos if tipo is None or evento.tipo == tipo]
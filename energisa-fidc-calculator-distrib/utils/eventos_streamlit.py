@@ -0,0 +1,71 @@
+"""
+Adaptador Streamlit para os eventos dos calculadores.
+
+As paginas criam um ``SinkStreamlit`` e o repassam aos calculadores; e o
+unico ponto em que eventos de calculo viram componentes de tela.
+"""
+
+from contextlib import contextmanager, nullcontext
+
+import streamlit as st
+
+from .eventos_calculo import (
+    AVISO,
+    ERRO,
+    INFO,
+    PROGRESSO,
+    RESUMO,
+    SUCESSO,
+    EventoCalculo,
+    SinkEventos,
+)
+
+
+class SinkStreamlit(SinkEventos):
+    """
+    Exibe eventos no Streamlit.
+
+    Args:
+        container: Container onde as mensagens sao escritas (opcional)
+        barra_progresso: Barra ``st.progress`` atualizada pelos eventos de progresso
+    """
+
+    _EXIBIR = {
+        INFO: st.info,
+        SUCESSO: st.success,
+        AVISO: st.warning,
+        ERRO: st.error,
+    }
+
+    def __init__(self, container=None, barra_progresso=None):
+        self.container = container
+        self.barra_progresso = barra_progresso
+
+    def _no_container(self):
+        return self.container if self.container is not None else nullcontext()
+
+    def emitir(self, evento: EventoCalculo) -> None:
+        if evento.tipo == PROGRESSO:
+            if self.barra_progresso is not None:
+                self.barra_progresso.progress(min(max(evento.dados["fracao"], 0.0), 1.0))
+            return
+
+        if evento.tipo == RESUMO:
+            with self._no_container():
+                st.subheader(evento.mensagem)
+                metricas = list(evento.dados["metricas"].items())
+                colunas = st.columns(min(len(metricas), 4) or 1)
+                for posicao, (rotulo, valor) in enumerate(metricas):
+                    with colunas[posicao % len(colunas)]:
+                        st.metric(rotulo, valor)
+            return
+
+        exibir = self._EXIBIR.get(evento.tipo)
+        if exibir is not None:
+            with self._no_container():
+                exibir(evento.mensagem)
+
+    @contextmanager
+    def etapa(self, mensagem: str):
+        with st.spinner(mensagem):
+            yield
@@ -0,0 +1,191 @@
+"""
+Exportacao colunar (Parquet e Arrow IPC) do resultado final.
+
+Diferente do CSV pt-BR, os formatos colunares preservam a precisao total dos
+floats e os tipos de data. Colunas de baixa cardinalidade (empresa, aging,
+tipo) sao gravadas com dictionary encoding e o schema carrega um rodape de
+metadados com a versao do formato e os parametros da execucao, lido de volta
+com ``ler_metadados``. Destinos e origens podem ser caminhos em disco ou
+objetos file-like (ex.: arquivo temporario de download).
+"""
+
+import json
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+VERSAO_FORMATO = "1"
+PREFIXO_METADADOS = "fidc."
+COLUNAS_DICIONARIO = ("empresa", "aging", "aging_taxa", "tipo")
+COMPRESSAO_PADRAO = "zstd"
+
+Destino = Union[str, Path, BinaryIO]
+
+
+def _caminho_ou_arquivo(destino: Destino):
+    """Caminhos viram ``Path``; objetos file-like passam como estao."""
+    return Path(destino) if isinstance(destino, (str, Path)) else destino
+
+
+def parametros_execucao(params) -> Dict:
+    """
+    Parametros escalares de uma execucao (ParametrosCorrecao, dict ou None),
+    prontos para JSON. Tabelas de indices e objetos nao escalares ficam de fora.
+    """
+    if params is None:
+        return {}
+    itens = params.items() if isinstance(params, dict) else vars(params).items()
+
+    parametros = {}
+    for nome, valor in itens:
+        if nome.startswith("_"):
+            continue
+        if isinstance(valor, (datetime, date, pd.Timestamp)):
+            parametros[nome] = valor.isoformat()
+        elif isinstance(valor, (bool, int, float, str, np.integer, np.floating)):
+            parametros[nome] = valor.item() if isinstance(valor, np.generic) else valor
+    return parametros
+
+
+def _tabela_arrow(df: pd.DataFrame, parametros: Optional[Dict] = None) -> pa.Table:
+    """DataFrame -> Table com colunas dicionario e metadados da execucao no schema."""
+    df_arrow = df.copy(deep=False)
+    for coluna in COLUNAS_DICIONARIO:
+        if coluna in df_arrow.columns and not isinstance(df_arrow[coluna].dtype, pd.CategoricalDtype):
+            df_arrow[coluna] = df_arrow[coluna].astype("category")
+
+    tabela = pa.Table.from_pandas(df_arrow, preserve_index=False)
+
+    metadados = dict(tabela.schema.metadata or {})
+    metadados.update({
+        f"{PREFIXO_METADADOS}versao_formato".encode(): VERSAO_FORMATO.encode(),
+        f"{PREFIXO_METADADOS}gerado_em".encode(): datetime.now().isoformat(timespec="seconds").encode(),
+        f"{PREFIXO_METADADOS}registros".encode(): str(len(df)).encode(),
+        f"{PREFIXO_METADADOS}parametros".encode(): json.dumps(parametros or {}, ensure_ascii=False, default=str).encode(),
+    })
+    return tabela.replace_schema_metadata(metadados)
+
+
+def salvar_parquet(
+    df: pd.DataFrame,
+    caminho_arquivo: Destino,
+    parametros: Optional[Dict] = None,
+    compressao: str = COMPRESSAO_PADRAO,
+):
+    """Grava Parquet (zstd por padrao) com dictionary encoding e metadados da execucao."""
+    caminho_arquivo = _caminho_ou_arquivo(caminho_arquivo)
+    pq.write_table(_tabela_arrow(df, parametros), caminho_arquivo, compression=compressao)
+    return caminho_arquivo
+
+
+def salvar_arrow_ipc(
+    df: pd.DataFrame,
+    caminho_arquivo: Destino,
+    parametros: Optional[Dict] = None,
+    compressao: str = COMPRESSAO_PADRAO,
+):
+    """Grava Arrow IPC (formato de arquivo / Feather v2) com metadados da execucao."""
+    caminho_arquivo = _caminho_ou_arquivo(caminho_arquivo)
+    feather.write_feather(_tabela_arrow(df, parametros), caminho_arquivo, compression=compressao)
+    return caminho_arquivo
+
+
+def _schema_arquivo(origem: Destino) -> pa.Schema:
+    """Schema de um Parquet ou Arrow IPC (pela extensao; sem ela, tenta Parquet e depois IPC)."""
+    if isinstance(origem, (str, Path)):
+        caminho_arquivo = Path(origem)
+        if caminho_arquivo.suffix == ".parquet":
+            return pq.read_schema(caminho_arquivo)
+        with pa.memory_map(str(caminho_arquivo)) as fonte:
+            return pa.ipc.open_file(fonte).schema
+
+    try:
+        return pq.read_schema(origem)
+    except (pa.ArrowInvalid, OSError):
+        origem.seek(0)
+        return pa.ipc.open_file(origem).schema
+
+
+def ler_metadados(caminho_arquivo: Destino) -> Dict:
+    """Le o rodape de metadados (versao, data de geracao, registros, parametros)."""
+    schema = _schema_arquivo(caminho_arquivo)
+
+    metadados = {
+        chave.decode()[len(PREFIXO_METADADOS):]: valor.decode()
+        for chave, valor in (schema.metadata or {}).items()
+        if chave.decode().startswith(PREFIXO_METADADOS)
+    }
+    if "parametros" in metadados:
+        metadados["parametros"] = json.loads(metadados["parametros"])
+    if "registros" in metadados:
+        metadados["registros"] = int(metadados["registros"])
+    return metadados
+
+
+def ler_resultado(caminho_arquivo: Union[str, Path]) -> pd.DataFrame:
+    """Le um resultado gravado em Parquet ou Arrow IPC."""
+    caminho_arquivo = Path(caminho_arquivo)
+    if caminho_arquivo.suffix == ".parquet":
+        return pd.read_parquet(caminho_arquivo)
+    return feather.read_feather(caminho_arquivo)
+
+
+def benchmark_leitura(
+    df: pd.DataFrame,
+    pasta: Union[str, Path],
+    parametros: Optional[Dict] = None,
+) -> pd.DataFrame:
+    """
+    Grava ``df`` em CSV pt-BR, Parquet e Arrow IPC e mede escrita, leitura de
+    volta, tamanho e o maior desvio absoluto nas colunas float em relacao ao
+    original (o CSV trunca casas decimais; os colunares devem dar zero).
+    """
+    from .exportacao_csv_brasil import salvar_csv_brasil
+
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    colunas_float = list(df.select_dtypes(include=["float"]).columns)
+
+    def ler_csv(caminho):
+        return pd.read_csv(caminho, sep=";", decimal=",", encoding="utf-8-sig")
+
+    formatos = [
+        ("csv", pasta / "benchmark.csv", lambda caminho: salvar_csv_brasil(df, caminho, remover_documento=False), ler_csv),
+        ("parquet", pasta / "benchmark.parquet", lambda caminho: salvar_parquet(df, caminho, parametros), ler_resultado),
+        ("arrow", pasta / "benchmark.arrow", lambda caminho: salvar_arrow_ipc(df, caminho, parametros), ler_resultado),
+    ]
+
+    linhas = []
+    for formato, caminho, gravar, ler in formatos:
+        inicio = time.perf_counter()
+        gravar(caminho)
+        segundos_escrita = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        df_lido = ler(caminho)
+        segundos_leitura = time.perf_counter() - inicio
+
+        desvios = [
+            np.nanmax(np.abs(
+                pd.to_numeric(df_lido[coluna], errors="coerce").to_numpy(dtype="float64")
+                - df[coluna].to_numpy(dtype="float64")
+            ), initial=0.0)
+            for coluna in colunas_float
+            if coluna in df_lido.columns
+        ]
+        linhas.append({
+            "formato": formato,
+            "tamanho_mb": caminho.stat().st_size / 1024 ** 2,
+            "escrita_s": segundos_escrita,
+            "leitura_s": segundos_leitura,
+            "desvio_max_float": max(desvios) if desvios else 0.0,
+        })
+
+    return pd.DataFrame(linhas)
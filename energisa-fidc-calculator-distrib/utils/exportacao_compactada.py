@@ -0,0 +1,275 @@
+"""
+Exportacao compactada do resultado (CSV .gz / .zst e pacote .zip).
+
+O CSV pt-BR e compactado enquanto as linhas sao escritas: o texto gerado e
+cortado em blocos de alguns MB e cada bloco e compactado por uma thread do
+pool (zlib e zstd liberam o GIL). Cada bloco vira um membro gzip / frame zstd
+independente; a concatenacao e um arquivo valido para ``gzip -d``, ``zstd -d``,
+``pandas.read_csv`` etc. Nao ha passada serial de compactacao no final.
+
+O pacote .zip junta o CSV compactado, uma planilha de resumo (empresa e aging)
+e o manifesto da execucao (parametros, registros e arquivos) para envio a
+administradora do fundo.
+"""
+
+import io
+import json
+import os
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from .cubo_agregados import obter_cubo
+from .exportacao_csv_brasil import CASAS_DECIMAIS_FORA_FAIXA, escrever_csv_brasil_em_blocos
+from .exportacao_excel_streaming import exportar_excel_streaming
+
+# compressao -> (extensao, nivel padrao)
+COMPRESSOES = {
+    "gz": (".csv.gz", 6),
+    "zst": (".csv.zst", 3),
+}
+TAMANHO_BLOCO_COMPACTACAO = 4 * 1024 ** 2
+
+
+def _compactar_gzip(dados: bytes, nivel: int) -> bytes:
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # wbits 31: membro gzip completo
+    return compressor.compress(dados) + compressor.flush()
+
+
+def _compactar_zstd(dados: bytes, nivel: int) -> bytes:
+    return pa.Codec("zstd", compression_level=nivel).compress(dados, asbytes=True)
+
+
+_COMPACTADORES: Dict[str, Callable[[bytes, int], bytes]] = {
+    "gz": _compactar_gzip,
+    "zst": _compactar_zstd,
+}
+
+
+class EstatisticasCompactacao:
+    """Bytes antes/depois, tempo total e blocos de uma escrita compactada."""
+
+    def __init__(self, compressao: str, bytes_originais: int, bytes_compactados: int, segundos: float, blocos: int):
+        self.compressao = compressao
+        self.bytes_originais = bytes_originais
+        self.bytes_compactados = bytes_compactados
+        self.segundos = segundos
+        self.blocos = blocos
+
+    @property
+    def razao(self) -> float:
+        return self.bytes_originais / self.bytes_compactados if self.bytes_compactados else 0.0
+
+    @property
+    def mb_por_segundo(self) -> float:
+        """Vazao sobre o volume nao compactado."""
+        return self.bytes_originais / 1024 ** 2 / self.segundos if self.segundos > 0 else 0.0
+
+    def descricao(self) -> str:
+        return (
+            f"{self.compressao}: {self.bytes_originais / 1024 ** 2:,.1f} MB -> "
+            f"{self.bytes_compactados / 1024 ** 2:,.1f} MB (razao {self.razao:.1f}x, "
+            f"{self.mb_por_segundo:,.1f} MB/s)"
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "compressao": self.compressao,
+            "bytes_originais": self.bytes_originais,
+            "bytes_compactados": self.bytes_compactados,
+            "razao": round(self.razao, 3),
+            "segundos": round(self.segundos, 3),
+            "mb_por_segundo": round(self.mb_por_segundo, 3),
+            "blocos": self.blocos,
+        }
+
+
+class EscritorCompactadoParalelo(io.RawIOBase):
+    """
+    Arquivo binario de escrita que compacta blocos em paralelo e grava na ordem.
+
+    No maximo ``2 * max_workers`` blocos ficam pendentes em memoria; ao passar
+    disso a escrita espera o bloco mais antigo (contrapressao).
+    """
+
+    def __init__(
+        self,
+        caminho_arquivo: Union[str, Path],
+        compressao: str = "gz",
+        nivel: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        tamanho_bloco: int = TAMANHO_BLOCO_COMPACTACAO,
+    ):
+        super().__init__()
+        if compressao not in _COMPACTADORES:
+            raise ValueError(f"Compressao desconhecida: {compressao}")
+        self.compressao = compressao
+        self.nivel = COMPRESSOES[compressao][1] if nivel is None else nivel
+        self.tamanho_bloco = tamanho_bloco
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.bytes_originais = 0
+        self.bytes_compactados = 0
+        self.blocos = 0
+
+        self._compactar = _COMPACTADORES[compressao]
+        self._destino = open(caminho_arquivo, "wb")
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="compactacao")
+        self._pendentes: Deque = deque()
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._buffer += dados
+        while len(self._buffer) >= self.tamanho_bloco:
+            self._enviar(bytes(self._buffer[:self.tamanho_bloco]))
+            del self._buffer[:self.tamanho_bloco]
+        return len(dados)
+
+    def _enviar(self, bloco: bytes) -> None:
+        self.bytes_originais += len(bloco)
+        self.blocos += 1
+        self._pendentes.append(self._executor.submit(self._compactar, bloco, self.nivel))
+        while len(self._pendentes) > 2 * self.max_workers:
+            self._gravar_proximo()
+
+    def _gravar_proximo(self) -> None:
+        compactado = self._pendentes.popleft().result()
+        self._destino.write(compactado)
+        self.bytes_compactados += len(compactado)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._enviar(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pendentes:
+                self._gravar_proximo()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._destino.close()
+            super().close()
+
+
+def salvar_csv_brasil_compactado(
+    df: pd.DataFrame,
+    caminho_arquivo: Union[str, Path],
+    compressao: str = "gz",
+    nivel: Optional[int] = None,
+    casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA,
+    remover_documento: bool = True,
+    tamanho_bloco: int = 100_000,
+    ao_escrever_bloco: Optional[Callable[[int], None]] = None,
+    max_workers: Optional[int] = None,
+) -> EstatisticasCompactacao:
+    """
+    CSV pt-BR (mesmo conteudo de ``salvar_csv_brasil_em_blocos``) gravado ja
+    compactado em gzip ou zstd, com a compactacao em paralelo a escrita.
+    """
+    inicio = time.perf_counter()
+    escritor = EscritorCompactadoParalelo(caminho_arquivo, compressao, nivel, max_workers)
+    with io.TextIOWrapper(escritor, encoding="utf-8-sig", newline="", write_through=True) as arquivo:
+        escrever_csv_brasil_em_blocos(
+            df,
+            arquivo,
+            casas_decimais=casas_decimais,
+            remover_documento=remover_documento,
+            tamanho_bloco=tamanho_bloco,
+            ao_escrever_bloco=ao_escrever_bloco,
+        )
+    return EstatisticasCompactacao(
+        compressao,
+        escritor.bytes_originais,
+        escritor.bytes_compactados,
+        time.perf_counter() - inicio,
+        escritor.blocos,
+    )
+
+
+def salvar_planilha_resumo(df: pd.DataFrame, caminho_arquivo: Union[str, Path]) -> Path:
+    """Planilha pequena com totais por empresa e por empresa x aging (via cubo de agregados)."""
+    caminho_arquivo = Path(caminho_arquivo)
+    cubo = obter_cubo(df)
+    abas = []
+    if cubo is not None:
+        medidas = {"qtd_registros": "count"}
+        medidas.update({
+            coluna: "sum"
+            for coluna in ("valor_principal", "valor_liquido", "valor_corrigido", "valor_justo")
+            if coluna in cubo.medidas_soma
+        })
+        for nome, dimensoes in (("Resumo_Empresa", ["empresa"]), ("Resumo_Aging", ["empresa", "aging"])):
+            dimensoes = [coluna for coluna in dimensoes if coluna in cubo.dimensoes]
+            abas.append((nome, cubo.agregar(dimensoes, medidas)))
+    if not abas:
+        abas.append(("Resumo", pd.DataFrame({"qtd_registros": [len(df)]})))
+    exportar_excel_streaming(caminho_arquivo, abas)
+    return caminho_arquivo
+
+
+def criar_pacote_zip(
+    df: pd.DataFrame,
+    caminho_arquivo: Union[str, Path],
+    compressao: str = "gz",
+    parametros: Optional[Dict] = None,
+    ao_escrever_bloco: Optional[Callable[[int], None]] = None,
+) -> EstatisticasCompactacao:
+    """
+    Pacote .zip com ``resultado.csv.gz|zst``, ``resumo.xlsx`` e ``manifesto.json``.
+
+    O CSV entra ja compactado (ZIP_STORED, sem compactar duas vezes); o
+    manifesto registra parametros, registros, tamanhos e a razao de compressao.
+    """
+    caminho_arquivo = Path(caminho_arquivo)
+    extensao = COMPRESSOES[compressao][0]
+    temporario_csv = caminho_arquivo.with_name(caminho_arquivo.name + extensao + ".tmp")
+    temporario_resumo = caminho_arquivo.with_name(caminho_arquivo.name + ".resumo.xlsx.tmp")
+
+    try:
+        estatisticas = salvar_csv_brasil_compactado(
+            df,
+            temporario_csv,
+            compressao,
+            remover_documento=False,
+            ao_escrever_bloco=ao_escrever_bloco,
+        )
+        salvar_planilha_resumo(df, temporario_resumo)
+
+        arquivos = {
+            "resultado" + extensao: temporario_csv,
+            "resumo.xlsx": temporario_resumo,
+        }
+        manifesto = {
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "registros": len(df),
+            "colunas": [str(coluna) for coluna in df.columns],
+            "parametros": parametros or {},
+            "compactacao": estatisticas.to_dict(),
+            "arquivos": {nome: os.path.getsize(caminho) for nome, caminho in arquivos.items()},
+        }
+
+        with zipfile.ZipFile(caminho_arquivo, "w") as pacote:
+            for nome, caminho in arquivos.items():
+                pacote.write(caminho, nome, compress_type=zipfile.ZIP_STORED)
+            pacote.writestr(
+                "manifesto.json",
+                json.dumps(manifesto, ensure_ascii=False, indent=2, default=str),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+    finally:
+        for temporario in (temporario_csv, temporario_resumo):
+            if temporario.exists():
+                temporario.unlink()
+
+    return estatisticas
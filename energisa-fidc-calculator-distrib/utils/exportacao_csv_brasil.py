@@ -3,6 +3,7 @@ Utilitarios para exportacao CSV no formato brasileiro.
 """
 
 from pathlib import Path
+from typing import Callable, List, Optional, Sequence, TextIO
 
 import numpy as np
 import pandas as pd
@@ -85,6 +86,15 @@ def _parse_numero_robusto(serie: pd.Series) -> pd.Series:
     return numero
 
 
+def colunas_exportacao(
+    colunas: Sequence,
+    colunas_remover: tuple[str, ...] = COLUNAS_REMOVER_EXPORTACAO,
+) -> List:
+    """Lista de colunas sem as removidas da exportacao (comparacao sem caixa/espacos)."""
+    remover = {nome.lower().strip() for nome in colunas_remover}
+    return [coluna for coluna in colunas if str(coluna).strip().lower() not in remover]
+
+
 def _remover_colunas_exportacao(
     df: pd.DataFrame,
     colunas_remover: tuple[str, ...] = COLUNAS_REMOVER_EXPORTACAO,
@@ -101,69 +111,118 @@ def _remover_colunas_exportacao(
     ]
 
     if not colunas_encontradas:
-        return df.copy()
+        return df
 
     return df.drop(columns=colunas_encontradas, errors="ignore")
 
 
-def truncar_numericos(df: pd.DataFrame, casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA) -> pd.DataFrame:
-    """
-    Trunca (nao arredonda) colunas numericas com duas regras:
-    - valores fora do intervalo (-1, 1): casas_decimais (padrao 4)
-    - valores dentro do intervalo (-1, 1): ate 8 casas decimais
-    """
-    if df is None or df.empty:
-        return df
+TAXA_MINIMA_CONVERSAO_TEXTO = 0.60
 
-    df_saida = df.copy()
-    colunas_float = [
-        coluna
-        for coluna in df_saida.select_dtypes(include=["float", "float32", "float64"]).columns
-        if not _preservar_precisao_coluna(coluna)
-    ]
-    colunas_int_candidatas = [
-        coluna
-        for coluna in df_saida.select_dtypes(include=["int", "int32", "int64"]).columns
-        if _coluna_candidata_por_nome(coluna)
-    ]
 
-    colunas_objetivo_texto = []
-    for coluna in df_saida.select_dtypes(include=["object", "string"]).columns:
-        if not _coluna_candidata_por_nome(coluna):
-            continue
-
-        serie_convertida = _parse_numero_robusto(df_saida[coluna])
-        taxa_convertida = serie_convertida.notna().mean()
-        if taxa_convertida >= 0.60:
-            df_saida[coluna] = serie_convertida
-            colunas_objetivo_texto.append(coluna)
-
-    colunas_numericas = list(dict.fromkeys(colunas_float + colunas_int_candidatas + colunas_objetivo_texto))
-    if len(colunas_numericas) == 0:
-        return df_saida
+def truncar_array(valores: np.ndarray, casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA) -> np.ndarray:
+    """
+    Trunca um buffer float64 in place (NaN e inf preservados):
+    - valores fora do intervalo (-1, 1): casas_decimais
+    - valores dentro do intervalo (-1, 1): CASAS_DECIMAIS_SUBUNITARIO
+    """
+    escala = np.where(
+        np.abs(valores) < 1,
+        float(10 ** CASAS_DECIMAIS_SUBUNITARIO),
+        float(10 ** casas_decimais),
+    )
+    np.multiply(valores, escala, out=valores)
+    np.trunc(valores, out=valores)
+    np.divide(valores, escala, out=valores)
+    return valores
 
-    fator = 10 ** casas_decimais
-    fator_subunitario = 10 ** CASAS_DECIMAIS_SUBUNITARIO
 
-    for coluna in colunas_numericas:
-        serie = _parse_numero_robusto(df_saida[coluna])
-        valores = serie.to_numpy(dtype="float64", copy=True)
+class PlanoTruncamento:
+    """
+    Colunas a truncar em um DataFrame, decididas uma unica vez:
+    - float: todas, exceto as de precisao livre (ipca_mensal, fator_*)
+    - inteiras (int/int32/int64): candidatas por nome; os valores nao mudam,
+      mas saem como float (``10,0``), como no truncamento original
+    - texto: candidatas por nome com pelo menos 60% de valores conversiveis
+
+    O plano pode ser aplicado ao frame inteiro ou a cada bloco de uma
+    exportacao em streaming (``valores_truncados``).
+    """
 
-        mask_validos = ~np.isnan(valores)
-        mask_subunitario = mask_validos & (np.abs(valores) < 1)
-        mask_padrao = mask_validos & (~mask_subunitario)
+    def __init__(self, df: pd.DataFrame, casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA):
+        self.casas_decimais = casas_decimais
+        self.colunas_float = [
+            coluna
+            for coluna in df.select_dtypes(include=["float"]).columns
+            if not _preservar_precisao_coluna(coluna)
+        ]
+        self.colunas_inteiras = [
+            coluna
+            for coluna in df.select_dtypes(include=["int", "int32", "int64"]).columns
+            if _coluna_candidata_por_nome(coluna)
+        ]
+        self.colunas_texto = []
+        self._convertidas = {}
+        for coluna in df.select_dtypes(include=["object", "string"]).columns:
+            if not _coluna_candidata_por_nome(coluna):
+                continue
+            serie_convertida = _parse_numero_robusto(df[coluna])
+            if serie_convertida.notna().mean() >= TAXA_MINIMA_CONVERSAO_TEXTO:
+                self.colunas_texto.append(coluna)
+                self._convertidas[coluna] = serie_convertida
+
+    @property
+    def colunas(self) -> list:
+        return self.colunas_float + self.colunas_inteiras + self.colunas_texto
+
+    def __contains__(self, coluna) -> bool:
+        return coluna in self.colunas_float or coluna in self.colunas_inteiras or coluna in self.colunas_texto
+
+    def valores_truncados(self, serie: pd.Series) -> np.ndarray:
+        """Buffer float64 truncado de uma coluna (ou bloco de coluna) do plano."""
+        if serie.name in self.colunas_texto:
+            convertida = self._convertidas.get(serie.name)
+            if convertida is not None and convertida.index.equals(serie.index):
+                serie = convertida
+            elif convertida is not None and convertida.index.is_unique:
+                serie = convertida.reindex(serie.index)
+            else:
+                serie = _parse_numero_robusto(serie)
+        if serie.dtype.kind == "f" and serie.dtype.itemsize < 8:
+            # float32 passa pela representacao decimal, como no parse original
+            # (0.73777384 segue 0.73777384, e nao 0.73777383... do binario)
+            valores = serie.to_numpy(dtype=serie.dtype.name.lower(), na_value=np.nan).astype(str).astype("float64")
+        else:
+            valores = serie.to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        return truncar_array(valores, self.casas_decimais)
+
+    def aplicar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Substitui as colunas do plano, uma a uma, pelos valores truncados."""
+        for coluna in self.colunas:
+            df[coluna] = self.valores_truncados(df[coluna])
+        self._convertidas = {}
+        return df
 
-        if mask_padrao.any():
-            valores[mask_padrao] = np.trunc(valores[mask_padrao] * fator) / fator
 
-        if mask_subunitario.any():
-            valores[mask_subunitario] = (
-                np.trunc(valores[mask_subunitario] * fator_subunitario) / fator_subunitario
-            )
+def truncar_numericos(
+    df: pd.DataFrame,
+    casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA,
+    inplace: bool = False,
+) -> pd.DataFrame:
+    """
+    Trunca (nao arredonda) colunas numericas com duas regras:
+    - valores fora do intervalo (-1, 1): casas_decimais (padrao 4)
+    - valores dentro do intervalo (-1, 1): ate 8 casas decimais
 
-        df_saida[coluna] = valores
+    Colunas float sao truncadas direto no buffer numerico; so colunas de
+    texto passam pelo parse pt-BR. Com ``inplace=True`` as colunas de ``df``
+    sao substituidas; caso contrario ``df`` nao e alterado e o resultado
+    compartilha as colunas nao truncadas com ele.
+    """
+    if df is None or df.empty:
+        return df
 
-    return df_saida
+    df_saida = df if inplace else df.copy(deep=False)
+    return PlanoTruncamento(df_saida, casas_decimais).aplicar(df_saida)
 
 
 def salvar_csv_brasil(
@@ -180,7 +239,7 @@ def salvar_csv_brasil(
     Excecao: colunas ipca_mensal e fator_* preservam precisao original.
     Por padrao, remove a coluna 'documento' para evitar identificadores extensos no arquivo final.
     """
-    df_base = _remover_colunas_exportacao(df) if remover_documento else df.copy()
+    df_base = _remover_colunas_exportacao(df) if remover_documento else df
     df_export = truncar_numericos(df_base, casas_decimais=casas_decimais)
     df_export.to_csv(
         caminho_arquivo,
@@ -190,3 +249,63 @@ def salvar_csv_brasil(
         decimal=",",
     )
     return df_export
+
+
+def escrever_csv_brasil_em_blocos(
+    df: pd.DataFrame,
+    arquivo: TextIO,
+    casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA,
+    remover_documento: bool = True,
+    tamanho_bloco: int = 100_000,
+    ao_escrever_bloco: Optional[Callable[[int], None]] = None,
+    colunas: Optional[Sequence] = None,
+) -> int:
+    """
+    Escreve o CSV pt-BR bloco a bloco em um arquivo texto ja aberto (disco ou
+    escritor compactado). ``colunas`` define quais colunas saem e em que ordem;
+    a projecao e feita em cada bloco, sem copiar o DataFrame inteiro.
+    Retorna o numero de registros gravados.
+    """
+    colunas_saida = list(df.columns) if colunas is None else [coluna for coluna in colunas if coluna in df.columns]
+    if remover_documento:
+        colunas_saida = colunas_exportacao(colunas_saida)
+    posicoes_saida = [df.columns.get_loc(coluna) for coluna in colunas_saida]
+    plano = PlanoTruncamento(df, casas_decimais)
+    colunas_truncadas = [coluna for coluna in plano.colunas if coluna in set(colunas_saida)]
+
+    for inicio in range(0, max(len(df), 1), tamanho_bloco):
+        bloco = df.iloc[inicio:inicio + tamanho_bloco, posicoes_saida].copy(deep=False)
+        for coluna in colunas_truncadas:
+            bloco[coluna] = plano.valores_truncados(bloco[coluna])
+        bloco.to_csv(arquivo, index=False, header=inicio == 0, sep=";", decimal=",")
+        if ao_escrever_bloco is not None:
+            ao_escrever_bloco(len(bloco))
+
+    return len(df)
+
+
+def salvar_csv_brasil_em_blocos(
+    df: pd.DataFrame,
+    caminho_arquivo: str | Path,
+    casas_decimais: int = CASAS_DECIMAIS_FORA_FAIXA,
+    remover_documento: bool = True,
+    tamanho_bloco: int = 100_000,
+    ao_escrever_bloco: Optional[Callable[[int], None]] = None,
+    colunas: Optional[Sequence] = None,
+) -> int:
+    """
+    Mesmo formato de ``salvar_csv_brasil``, gravado bloco a bloco: o
+    truncamento e aplicado em cada bloco e nenhuma copia do DataFrame inteiro
+    e criada. ``ao_escrever_bloco(n)`` e chamado apos cada bloco de ``n``
+    linhas. Retorna o numero de registros gravados.
+    """
+    with open(caminho_arquivo, "w", encoding="utf-8-sig", newline="") as arquivo:
+        return escrever_csv_brasil_em_blocos(
+            df,
+            arquivo,
+            casas_decimais=casas_decimais,
+            remover_documento=remover_documento,
+            tamanho_bloco=tamanho_bloco,
+            ao_escrever_bloco=ao_escrever_bloco,
+            colunas=colunas,
+        )
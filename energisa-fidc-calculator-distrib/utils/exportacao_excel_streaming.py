@@ -0,0 +1,289 @@
+"""
+Exportacao Excel em modo streaming (memoria constante).
+
+Usa o modo ``constant_memory`` do xlsxwriter: cada linha e gravada em disco
+assim que escrita, sem manter a planilha inteira em memoria. Tabelas maiores
+que o limite do Excel (1.048.576 linhas por aba) sao divididas
+automaticamente em abas numeradas (``resultado``, ``resultado_2``, ...).
+
+Cada exportacao devolve ``EstatisticasExportacaoExcel`` com linhas/s e pico de
+memoria (RSS do processo) medidos durante a escrita.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .exportacao_csv_brasil import PlanoTruncamento
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LIMITE_LINHAS_EXCEL = 1_048_576
+LIMITE_NOME_ABA = 31
+FORMATO_DATA_PADRAO = "dd/mm/yyyy"
+INTERVALO_AMOSTRA_MEMORIA = 0.05
+
+
+def _rss_atual_bytes() -> int:
+    """
+    RSS atual do processo. Linux via /proc; outros Unix via pico do getrusage;
+    sem nenhum dos dois (Windows) retorna 0.
+    """
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MonitorMemoria:
+    """
+    Amostra o RSS do processo em uma thread enquanto o contexto esta aberto.
+
+    Uso:
+        with MonitorMemoria() as monitor:
+            ...
+        monitor.pico_mb, monitor.inicial_mb
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_AMOSTRA_MEMORIA):
+        self.intervalo = intervalo
+        self.inicial_bytes = 0
+        self.pico_bytes = 0
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _amostrar(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            self.pico_bytes = max(self.pico_bytes, _rss_atual_bytes())
+
+    def __enter__(self):
+        self.inicial_bytes = self.pico_bytes = _rss_atual_bytes()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.pico_bytes = max(self.pico_bytes, _rss_atual_bytes())
+        return False
+
+    @property
+    def inicial_mb(self) -> float:
+        return self.inicial_bytes / 1024 ** 2
+
+    @property
+    def pico_mb(self) -> float:
+        return self.pico_bytes / 1024 ** 2
+
+
+class EstatisticasExportacaoExcel:
+    """Resultado de uma exportacao: destino, abas, linhas, tempo e memoria."""
+
+    def __init__(self, destino, abas: List[str], registros: int, segundos: float,
+                 memoria_inicial_mb: float, pico_memoria_mb: float):
+        self.destino = destino
+        self.abas = abas
+        self.registros = registros
+        self.segundos = segundos
+        self.memoria_inicial_mb = memoria_inicial_mb
+        self.pico_memoria_mb = pico_memoria_mb
+
+    @property
+    def registros_por_segundo(self) -> float:
+        return self.registros / self.segundos if self.segundos > 0 else 0.0
+
+    @property
+    def acrescimo_memoria_mb(self) -> float:
+        return max(self.pico_memoria_mb - self.memoria_inicial_mb, 0.0)
+
+    def descricao(self) -> str:
+        return (
+            f"{self.registros:,} linhas em {self.segundos:.1f}s "
+            f"({self.registros_por_segundo:,.0f} linhas/s) | "
+            f"{len(self.abas)} aba(s) | pico de memoria {self.pico_memoria_mb:,.0f} MB "
+            f"(+{self.acrescimo_memoria_mb:,.0f} MB)"
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "destino": str(self.destino) if isinstance(self.destino, (str, Path)) else None,
+            "abas": list(self.abas),
+            "registros": self.registros,
+            "segundos": self.segundos,
+            "registros_por_segundo": self.registros_por_segundo,
+            "memoria_inicial_mb": self.memoria_inicial_mb,
+            "pico_memoria_mb": self.pico_memoria_mb,
+        }
+
+
+def nomes_abas_particionadas(nome_base: str, total_linhas: int, linhas_por_aba: int) -> List[str]:
+    """Nomes das abas de uma tabela dividida: base, base_2, base_3, ..."""
+    quantidade = max(1, -(-int(total_linhas) // int(linhas_por_aba)))
+    nomes = [nome_base[:LIMITE_NOME_ABA]]
+    for numero in range(2, quantidade + 1):
+        sufixo = f"_{numero}"
+        nomes.append(nome_base[:LIMITE_NOME_ABA - len(sufixo)] + sufixo)
+    return nomes
+
+
+def _valores_coluna(serie: pd.Series) -> Tuple[str, list]:
+    """Converte a coluna para tipos Python nativos e indica o tipo de escrita."""
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        return "booleano", serie.astype(object).where(serie.notna(), None).tolist()
+
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        valores = np.where(np.isfinite(valores), valores, np.nan)
+        return "numero", valores.tolist()
+
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        serie = serie.dt.tz_localize(None) if getattr(serie.dt, "tz", None) is not None else serie
+        return "data", [None if pd.isna(valor) else valor for valor in serie.astype(object).tolist()]
+
+    valores = serie.astype(object).tolist()
+    return "texto", [None if valor is None or (isinstance(valor, float) and valor != valor) else valor
+                     for valor in valores]
+
+
+def _escrever_bloco(
+    planilha,
+    linha_inicial: int,
+    df_bloco: pd.DataFrame,
+    truncamento: Optional[PlanoTruncamento] = None,
+) -> None:
+    colunas = []
+    for coluna in df_bloco.columns:
+        if truncamento is not None and coluna in truncamento:
+            valores = truncamento.valores_truncados(df_bloco[coluna])
+            valores[~np.isfinite(valores)] = np.nan
+            colunas.append(("numero", valores.tolist()))
+        else:
+            colunas.append(_valores_coluna(df_bloco[coluna]))
+    escritores = {
+        "numero": planilha.write_number,
+        "data": planilha.write_datetime,
+        "booleano": planilha.write_boolean,
+        "texto": planilha.write,
+    }
+    colunas = [(posicao, escritores[tipo], valores) for posicao, (tipo, valores) in enumerate(colunas)]
+
+    for deslocamento in range(len(df_bloco)):
+        linha = linha_inicial + deslocamento
+        for posicao, escrever, valores in colunas:
+            valor = valores[deslocamento]
+            # None (ausente) e NaN ficam em branco
+            if valor is None or valor != valor:
+                continue
+            escrever(linha, posicao, valor)
+
+
+def escrever_dataframe_streaming(
+    workbook: "xlsxwriter.Workbook",
+    df: pd.DataFrame,
+    nome_aba: str,
+    linhas_por_aba: int = LIMITE_LINHAS_EXCEL - 1,
+    tamanho_bloco: int = 50_000,
+    casas_decimais_truncamento: Optional[int] = None,
+    ao_escrever_bloco: Optional[Callable[[int], None]] = None,
+) -> List[str]:
+    """
+    Escreve ``df`` (cabecalho + dados) em uma ou mais abas do workbook.
+
+    ``linhas_por_aba`` conta apenas linhas de dados (o cabecalho ocupa a
+    primeira linha de cada aba). Com ``casas_decimais_truncamento`` as
+    colunas numericas sao truncadas (regras de ``truncar_numericos``) bloco a
+    bloco, sem copiar o DataFrame. ``ao_escrever_bloco(n)`` e chamado apos
+    cada bloco de ``n`` linhas gravado. Retorna os nomes das abas criadas.
+    """
+    linhas_por_aba = max(1, min(int(linhas_por_aba), LIMITE_LINHAS_EXCEL - 1))
+    formato_cabecalho = workbook.add_format({"bold": True})
+    cabecalho = [str(coluna) for coluna in df.columns]
+    abas = nomes_abas_particionadas(nome_aba, len(df), linhas_por_aba)
+    truncamento = (
+        PlanoTruncamento(df, casas_decimais_truncamento)
+        if casas_decimais_truncamento is not None and not df.empty
+        else None
+    )
+
+    for numero_aba, nome in enumerate(abas):
+        planilha = workbook.add_worksheet(nome)
+        planilha.write_row(0, 0, cabecalho, formato_cabecalho)
+        inicio_aba = numero_aba * linhas_por_aba
+        fim_aba = min(inicio_aba + linhas_por_aba, len(df))
+        for inicio in range(inicio_aba, fim_aba, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, fim_aba)
+            _escrever_bloco(planilha, 1 + inicio - inicio_aba, df.iloc[inicio:fim], truncamento)
+            if ao_escrever_bloco is not None:
+                ao_escrever_bloco(fim - inicio)
+
+    return abas
+
+
+def exportar_excel_streaming(
+    destino: Union[str, Path, "os.PathLike", object],
+    abas: Iterable[Tuple[str, pd.DataFrame]],
+    linhas_por_aba: int = LIMITE_LINHAS_EXCEL - 1,
+    formato_data: str = FORMATO_DATA_PADRAO,
+    casas_decimais_truncamento: Optional[int] = None,
+    ao_escrever_bloco: Optional[Callable[[int], None]] = None,
+) -> EstatisticasExportacaoExcel:
+    """
+    Grava as tabelas ``(nome_aba, df)`` em um .xlsx com memoria constante.
+
+    ``destino`` deve ser preferencialmente um caminho em disco; um objeto
+    file-like (BytesIO) tambem e aceito para compatibilidade.
+    ``casas_decimais_truncamento`` ativa o truncamento por bloco e
+    ``ao_escrever_bloco`` recebe o numero de linhas de cada bloco gravado.
+    """
+    # Importacao adiada: abrir o app nao paga o xlsxwriter, so quem exporta
+    import xlsxwriter
+
+    if isinstance(destino, (str, Path)):
+        Path(destino).parent.mkdir(parents=True, exist_ok=True)
+        destino_workbook = str(destino)
+    else:
+        destino_workbook = destino
+
+    abas_criadas: List[str] = []
+    registros = 0
+    inicio = time.perf_counter()
+
+    with MonitorMemoria() as monitor:
+        workbook = xlsxwriter.Workbook(destino_workbook, {
+            "constant_memory": True,
+            "default_date_format": formato_data,
+            "remove_timezone": True,
+        })
+        try:
+            for nome_aba, df in abas:
+                if df is None:
+                    continue
+                abas_criadas.extend(escrever_dataframe_streaming(
+                    workbook, df, nome_aba, linhas_por_aba,
+                    casas_decimais_truncamento=casas_decimais_truncamento,
+                    ao_escrever_bloco=ao_escrever_bloco,
+                ))
+                registros += len(df)
+        finally:
+            workbook.close()
+
+    return EstatisticasExportacaoExcel(
+        destino=destino,
+        abas=abas_criadas,
+        registros=registros,
+        segundos=time.perf_counter() - inicio,
+        memoria_inicial_mb=monitor.inicial_mb,
+        pico_memoria_mb=monitor.pico_mb,
+    )
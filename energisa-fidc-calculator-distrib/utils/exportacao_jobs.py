@@ -0,0 +1,268 @@
+"""
+Exportacao do resultado em varios formatos, em segundo plano.
+
+Um ``JobExportacao`` grava os formatos pedidos (Excel, CSV, Parquet, Arrow) em
+paralelo em um pool de threads, sem bloquear o script Streamlit. O progresso
+de cada formato fica em ``ArtefatoExportacao`` e e lido pela interface a cada
+rerun. Este modulo nao chama Streamlit (as threads do pool nao tem contexto
+de script); a exibicao fica em utils/auto_export_resultado.py.
+
+Threads (e nao processos): o DataFrame e compartilhado sem ser serializado
+e as escritas de CSV/Parquet liberam o GIL na maior parte do tempo.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .exportacao_colunar import salvar_arrow_ipc, salvar_parquet
+from .exportacao_compactada import criar_pacote_zip, salvar_csv_brasil_compactado
+from .exportacao_csv_brasil import CASAS_DECIMAIS_FORA_FAIXA, salvar_csv_brasil_em_blocos
+from .exportacao_excel_streaming import exportar_excel_streaming
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+
+def _gravar_excel(df: pd.DataFrame, caminho: Path, ao_escrever_bloco: Callable[[int], None], parametros: Dict) -> None:
+    exportar_excel_streaming(
+        caminho,
+        [("resultado", df)],
+        casas_decimais_truncamento=CASAS_DECIMAIS_FORA_FAIXA,
+        ao_escrever_bloco=ao_escrever_bloco,
+    )
+
+
+def _gravar_csv(df: pd.DataFrame, caminho: Path, ao_escrever_bloco: Callable[[int], None], parametros: Dict) -> None:
+    salvar_csv_brasil_em_blocos(
+        df,
+        caminho,
+        casas_decimais=CASAS_DECIMAIS_FORA_FAIXA,
+        remover_documento=False,
+        ao_escrever_bloco=ao_escrever_bloco,
+    )
+
+
+def _gravar_parquet(df: pd.DataFrame, caminho: Path, ao_escrever_bloco: Callable[[int], None], parametros: Dict) -> None:
+    salvar_parquet(df, caminho, parametros)
+    ao_escrever_bloco(len(df))
+
+
+def _gravar_arrow(df: pd.DataFrame, caminho: Path, ao_escrever_bloco: Callable[[int], None], parametros: Dict) -> None:
+    salvar_arrow_ipc(df, caminho, parametros)
+    ao_escrever_bloco(len(df))
+
+
+def _gravar_csv_compactado(compressao: str):
+    def gravar(df: pd.DataFrame, caminho: Path, ao_escrever_bloco: Callable[[int], None], parametros: Dict) -> str:
+        return salvar_csv_brasil_compactado(
+            df,
+            caminho,
+            compressao,
+            remover_documento=False,
+            ao_escrever_bloco=ao_escrever_bloco,
+        ).descricao()
+    return gravar
+
+
+def _gravar_pacote(df: pd.DataFrame, caminho: Path, ao_escrever_bloco: Callable[[int], None], parametros: Dict) -> str:
+    return criar_pacote_zip(df, caminho, "gz", parametros, ao_escrever_bloco).descricao()
+
+
+# formato -> (extensao, rotulo, funcao de escrita)
+# A funcao de escrita pode retornar um texto com detalhes (ex.: razao de compressao).
+FORMATOS_EXPORTACAO = {
+    "excel": (".xlsx", "Excel", _gravar_excel),
+    "csv": (".csv", "CSV", _gravar_csv),
+    "parquet": (".parquet", "Parquet", _gravar_parquet),
+    "arrow": (".arrow", "Arrow IPC", _gravar_arrow),
+    "csv_gz": (".csv.gz", "CSV gzip", _gravar_csv_compactado("gz")),
+    "csv_zst": (".csv.zst", "CSV zstd", _gravar_csv_compactado("zst")),
+    "pacote": (".zip", "Pacote zip", _gravar_pacote),
+}
+
+
+class ArtefatoExportacao:
+    """Estado de um formato dentro do job (atualizado pela thread de escrita)."""
+
+    def __init__(self, formato: str, caminho: Path, total_registros: int):
+        self.formato = formato
+        self.rotulo = FORMATOS_EXPORTACAO[formato][1]
+        self.caminho = caminho
+        self.total_registros = total_registros
+        self.registros_escritos = 0
+        self.status = STATUS_PENDENTE
+        self.segundos = 0.0
+        self.tamanho_bytes = 0
+        self.erro: Optional[str] = None
+        self.detalhe: Optional[str] = None
+        # Arquivo de uma exportacao anterior do mesmo resultado (manifesto)
+        self.reaproveitado = False
+
+    @classmethod
+    def existente(cls, formato: str, caminho: Path, total_registros: int) -> "ArtefatoExportacao":
+        artefato = cls(formato, Path(caminho), total_registros)
+        artefato.status = STATUS_CONCLUIDO
+        artefato.registros_escritos = total_registros
+        artefato.tamanho_bytes = os.path.getsize(artefato.caminho)
+        artefato.reaproveitado = True
+        return artefato
+
+    @property
+    def progresso(self) -> float:
+        if self.status == STATUS_CONCLUIDO:
+            return 1.0
+        if self.total_registros <= 0:
+            return 0.0
+        return min(self.registros_escritos / self.total_registros, 1.0)
+
+    @property
+    def tamanho_mb(self) -> float:
+        return self.tamanho_bytes / 1024 ** 2
+
+    @property
+    def mb_por_segundo(self) -> float:
+        return self.tamanho_mb / self.segundos if self.segundos > 0 else 0.0
+
+    @property
+    def registros_por_segundo(self) -> float:
+        return self.total_registros / self.segundos if self.segundos > 0 else 0.0
+
+    def descricao(self) -> str:
+        if self.reaproveitado:
+            return f"{self.tamanho_mb:,.1f} MB, reaproveitado de exportacao anterior do mesmo resultado"
+        if self.status == STATUS_CONCLUIDO:
+            descricao = (
+                f"{self.tamanho_mb:,.1f} MB em {self.segundos:.1f}s "
+                f"({self.mb_por_segundo:,.1f} MB/s, {self.registros_por_segundo:,.0f} linhas/s)"
+            )
+            return f"{descricao} — {self.detalhe}" if self.detalhe else descricao
+        if self.status == STATUS_ERRO:
+            return f"erro: {self.erro}"
+        return f"{self.registros_escritos:,} de {self.total_registros:,} linhas"
+
+
+class JobExportacao:
+    """
+    Grava ``df`` em ``caminho_base`` + extensao de cada formato, em paralelo.
+
+    Uso:
+        job = JobExportacao(df, Path("data/FIDC_Dados_Finais_x"), ["excel", "csv"])
+        job.iniciar()
+        ...
+        job.concluido, job.artefatos
+
+    ``artefatos_existentes`` (formato -> caminho) marca formatos ja gravados
+    como concluidos sem reescreve-los; ``ao_concluir`` e chamado na thread de
+    escrita para cada formato gravado com sucesso.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        caminho_base: Path,
+        formatos: Iterable[str] = tuple(FORMATOS_EXPORTACAO),
+        identificador: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        parametros: Optional[Dict] = None,
+        artefatos_existentes: Optional[Dict[str, Path]] = None,
+        ao_concluir: Optional[Callable[[ArtefatoExportacao], None]] = None,
+    ):
+        formatos = list(dict.fromkeys(formatos))
+        desconhecidos = [formato for formato in formatos if formato not in FORMATOS_EXPORTACAO]
+        if desconhecidos:
+            raise ValueError(f"Formatos de exportacao desconhecidos: {desconhecidos}")
+
+        self.df = df
+        self.caminho_base = Path(caminho_base)
+        self.identificador = identificador
+        # Parametros da execucao gravados no rodape dos formatos colunares
+        self.parametros = parametros or {}
+        self.max_workers = max_workers or len(formatos) or 1
+        self.ao_concluir = ao_concluir
+        artefatos_existentes = artefatos_existentes or {}
+        self.artefatos: Dict[str, ArtefatoExportacao] = {
+            formato: (
+                ArtefatoExportacao.existente(formato, artefatos_existentes[formato], len(df))
+                if formato in artefatos_existentes
+                else ArtefatoExportacao(
+                    formato,
+                    self.caminho_base.with_name(self.caminho_base.name + FORMATOS_EXPORTACAO[formato][0]),
+                    len(df),
+                )
+            )
+            for formato in formatos
+        }
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: List = []
+        self._iniciado = False
+        self._lock = threading.Lock()
+
+    def _executar(self, artefato: ArtefatoExportacao) -> None:
+        gravar = FORMATOS_EXPORTACAO[artefato.formato][2]
+
+        def ao_escrever_bloco(registros: int) -> None:
+            with self._lock:
+                artefato.registros_escritos += registros
+
+        artefato.status = STATUS_EXECUTANDO
+        inicio = time.perf_counter()
+        try:
+            artefato.detalhe = gravar(self.df, artefato.caminho, ao_escrever_bloco, self.parametros)
+            artefato.tamanho_bytes = os.path.getsize(artefato.caminho)
+            if self.ao_concluir is not None:
+                self.ao_concluir(artefato)
+            artefato.status = STATUS_CONCLUIDO
+        except Exception as e:
+            artefato.erro = str(e)
+            artefato.status = STATUS_ERRO
+        finally:
+            artefato.segundos = time.perf_counter() - inicio
+
+    def iniciar(self) -> "JobExportacao":
+        if self._iniciado:
+            return self
+        self._iniciado = True
+        pendentes = [artefato for artefato in self.artefatos.values() if artefato.status == STATUS_PENDENTE]
+        if not pendentes:
+            return self
+        self.caminho_base.parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(pendentes)),
+            thread_name_prefix="exportacao",
+        )
+        self._futures = [self._executor.submit(self._executar, artefato) for artefato in pendentes]
+        # Nao aguarda: as threads terminam sozinhas e o pool e liberado ao final.
+        self._executor.shutdown(wait=False)
+        return self
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia ate o fim (jobs em lote e benchmarks). Retorna ``concluido``."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        for future in self._futures:
+            restante = None if limite is None else max(limite - time.monotonic(), 0)
+            try:
+                future.result(timeout=restante)
+            except Exception:
+                break
+        return self.concluido
+
+    @property
+    def concluido(self) -> bool:
+        return self._iniciado and all(future.done() for future in self._futures)
+
+    @property
+    def progresso(self) -> float:
+        if not self.artefatos:
+            return 1.0
+        return sum(artefato.progresso for artefato in self.artefatos.values()) / len(self.artefatos)
+
+    def artefato(self, formato: str) -> Optional[ArtefatoExportacao]:
+        return self.artefatos.get(formato)
@@ -7,7 +7,29 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import streamlit as st
+import tempfile
 from io import BytesIO
+from typing import BinaryIO
+
+from .cubo_agregados import obter_cubo
+from .exportacao_excel_streaming import EstatisticasExportacaoExcel, exportar_excel_streaming
+
+
+def _arquivo_temporario_excel(exportar=None) -> BinaryIO:
+    """
+    Executa ``exportar(arquivo)`` sobre um arquivo temporário em disco e o
+    devolve posicionado no início (o arquivo é apagado ao ser fechado).
+    Sem ``exportar``, devolve o arquivo vazio.
+    """
+    arquivo = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        if exportar is not None:
+            exportar(arquivo)
+    except Exception:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo
 
 
 class ExportadorResultados:
@@ -183,92 +205,45 @@ class ExportadorResultados:
         
         return pd.DataFrame(dicionario)
     
-    def gerar_agrupamento_detalhado(self, df_consolidado):
+    COLUNAS_VALORES_AGRUPAMENTO = ['valor_liquido', 'valor_corrigido', 'multa', 'juros_moratorios', 'correcao_monetaria', 'valor_justo', 'valor_recuperavel']
+    
+    def _agrupar(self, df_consolidado, colunas_agrupamento):
         """
-        Gera agrupamento detalhado por empresa, tipo, classe, status e situação.
+        Agrupamento padrão das abas (quantidade + somas), derivado do cubo de
+        agregados do DataFrame: o groupby sobre a base completa roda uma única vez.
         """
-        if df_consolidado is None or df_consolidado.empty:
+        cubo = obter_cubo(df_consolidado)
+        if cubo is None:
             return pd.DataFrame()
         
-        # Colunas para agrupamento
-        colunas_agrupamento = ['empresa', 'tipo', 'classe', 'status', 'situacao', 'aging', 'aging_taxa']
-        colunas_existentes = [col for col in colunas_agrupamento if col in df_consolidado.columns]
-        
+        colunas_existentes = [col for col in colunas_agrupamento if col in cubo.dimensoes]
         if not colunas_existentes:
             return pd.DataFrame()
         
-        # Colunas para soma
-        colunas_valores = ['valor_liquido', 'valor_corrigido', 'multa', 'juros_moratorios', 'correcao_monetaria', 'valor_justo', 'valor_recuperavel']
-        colunas_valores_existentes = [col for col in colunas_valores if col in df_consolidado.columns]
-        
-        agrupado = (df_consolidado
-                   .groupby(colunas_existentes, dropna=False)
-                   .agg({
-                       'id_padronizado': 'count',
-                       **{col: 'sum' for col in colunas_valores_existentes}
-                   })
-                   .reset_index()
-                   .round(2))
-        
-        agrupado.rename(columns={'id_padronizado': 'qtd_registros'}, inplace=True)
+        colunas_valores_existentes = [col for col in self.COLUNAS_VALORES_AGRUPAMENTO if col in cubo.medidas_soma]
         
-        return agrupado
+        return cubo.agregar(
+            colunas_existentes,
+            {'qtd_registros': 'count', **{col: 'sum' for col in colunas_valores_existentes}},
+        ).round(2)
+    
+    def gerar_agrupamento_detalhado(self, df_consolidado):
+        """
+        Gera agrupamento detalhado por empresa, tipo, classe, status e situação.
+        """
+        return self._agrupar(df_consolidado, ['empresa', 'tipo', 'classe', 'status', 'situacao', 'aging', 'aging_taxa'])
     
     def gerar_agrupamento_consolidado(self, df_consolidado):
         """
         Gera agrupamento consolidado por empresa e aging.
         """
-        if df_consolidado is None or df_consolidado.empty:
-            return pd.DataFrame()
-        
-        colunas_agrupamento = ['empresa', 'aging', 'aging_taxa']
-        colunas_existentes = [col for col in colunas_agrupamento if col in df_consolidado.columns]
-        
-        if not colunas_existentes:
-            return pd.DataFrame()
-        
-        colunas_valores = ['valor_liquido', 'valor_corrigido', 'multa', 'juros_moratorios', 'correcao_monetaria', 'valor_justo', 'valor_recuperavel']
-        colunas_valores_existentes = [col for col in colunas_valores if col in df_consolidado.columns]
-        
-        agrupado = (df_consolidado
-                   .groupby(colunas_existentes, dropna=False)
-                   .agg({
-                       'id_padronizado': 'count',
-                       **{col: 'sum' for col in colunas_valores_existentes}
-                   })
-                   .reset_index()
-                   .round(2))
-        
-        agrupado.rename(columns={'id_padronizado': 'qtd_registros'}, inplace=True)
-        
-        return agrupado
+        return self._agrupar(df_consolidado, ['empresa', 'aging', 'aging_taxa'])
     
     def gerar_agrupamento_geral(self, df_consolidado):
         """
         Gera agrupamento geral por aging e taxa de recuperação.
         """
-        if df_consolidado is None or df_consolidado.empty:
-            return pd.DataFrame()
-        
-        colunas_agrupamento = ['aging', 'aging_taxa']
-        colunas_existentes = [col for col in colunas_agrupamento if col in df_consolidado.columns]
-        
-        if not colunas_existentes:
-            return pd.DataFrame()
-        
-        colunas_valores = ['valor_liquido', 'valor_corrigido', 'multa', 'juros_moratorios', 'correcao_monetaria', 'valor_justo', 'valor_recuperavel']
-        colunas_valores_existentes = [col for col in colunas_valores if col in df_consolidado.columns]
-        
-        agrupado = (df_consolidado
-                   .groupby(colunas_existentes, dropna=False)
-                   .agg({
-                       'id_padronizado': 'count',
-                       **{col: 'sum' for col in colunas_valores_existentes}
-                   })
-                   .reset_index()
-                   .round(2))
-        
-        agrupado.rename(columns={'id_padronizado': 'qtd_registros'}, inplace=True)
+        agrupado = self._agrupar(df_consolidado, ['aging', 'aging_taxa'])
         
         # Calcular percentuais de participação
         if 'valor_corrigido' in agrupado.columns:
@@ -278,7 +253,73 @@ class ExportadorResultados:
         
         return agrupado
     
-    def criar_arquivo_excel_consolidado(self, df_consolidado) -> BytesIO:
+    def _abas_excel_consolidado(self, df_consolidado):
+        """
+        Gera as abas do arquivo consolidado como pares (nome_aba, DataFrame).
+        Cada agrupamento só é calculado quando a aba anterior já foi gravada.
+        """
+        # Aba 1: Dicionário de Dados
+        df_dicionario = self.criar_dicionario_dados()
+        yield '1_Dicionario_Dados', df_dicionario
+        st.success(f"✅ Aba 1: Dicionário de Dados - {len(df_dicionario)} campos")
+        
+        # Aba 2: Dados Consolidados (sem agregação; dividida em abas numeradas acima do limite do Excel)
+        if df_consolidado is not None and not df_consolidado.empty:
+            yield '2_Dados_Consolidados', df_consolidado
+            st.success(f"✅ Aba 2: Dados Consolidados - {len(df_consolidado):,} registros")
+            
+            # Aba 3: Agrupamento Detalhado
+            agrupamento_detalhado = self.gerar_agrupamento_detalhado(df_consolidado)
+            if not agrupamento_detalhado.empty:
+                yield '3_Agrupamento_Detalhado', agrupamento_detalhado
+                st.success(f"✅ Aba 3: Agrupamento Detalhado - {len(agrupamento_detalhado):,} grupos")
+            
+            # Aba 4: Agrupamento Consolidado
+            agrupamento_consolidado = self.gerar_agrupamento_consolidado(df_consolidado)
+            if not agrupamento_consolidado.empty:
+                yield '4_Agrupamento_Consolidado', agrupamento_consolidado
+                st.success(f"✅ Aba 4: Agrupamento Consolidado - {len(agrupamento_consolidado):,} grupos")
+            
+            # Aba 5: Agrupamento Geral
+            agrupamento_geral = self.gerar_agrupamento_geral(df_consolidado)
+            if not agrupamento_geral.empty:
+                yield '5_Agrupamento_Geral', agrupamento_geral
+                st.success(f"✅ Aba 5: Agrupamento Geral - {len(agrupamento_geral):,} grupos")
+        
+        # Aba adicional: Parâmetros utilizados
+        params_data = {
+            'Parametro': [
+                'Taxa de Multa',
+                'Taxa de Juros Moratórios',
+                'Data de Processamento',
+                'Metodologia IGP-M',
+                'Metodologia IPCA',
+                'Fonte dos Dados IGPM',
+                'Aging - Critério'
+            ],
+            'Valor': [
+                f"{self.params.taxa_multa:.2%}",
+                f"{self.params.taxa_juros_mensal:.2%} ao mês",
+                datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+                'Até 2021.05',
+                'A partir de 2021.06',
+                'SIDRA/IBGE',
+                'Baseado em dias de atraso'
+            ]
+        }
+        yield 'Parametros', pd.DataFrame(params_data)
+        st.success("✅ Aba Parâmetros")
+    
+    def exportar_excel_consolidado(self, df_consolidado, caminho) -> EstatisticasExportacaoExcel:
+        """
+        Grava o arquivo Excel consolidado direto em disco, em modo streaming
+        (memória constante). Retorna linhas/s e pico de memória da exportação.
+        """
+        estatisticas = exportar_excel_streaming(caminho, self._abas_excel_consolidado(df_consolidado))
+        st.caption(f"⏱️ Exportação Excel: {estatisticas.descricao()}")
+        return estatisticas
+    
+    def criar_arquivo_excel_consolidado(self, df_consolidado) -> BinaryIO:
         """
         Cria arquivo Excel com as 5 abas solicitadas:
         1. Dicionário de Dados
@@ -286,66 +327,11 @@ class ExportadorResultados:
         3. Agrupamento Detalhado
         4. Agrupamento Consolidado  
         5. Agrupamento Geral
-        """
-        output = BytesIO()
         
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            
-            # Aba 1: Dicionário de Dados
-            df_dicionario = self.criar_dicionario_dados()
-            df_dicionario.to_excel(writer, sheet_name='1_Dicionario_Dados', index=False)
-            st.success(f"✅ Aba 1: Dicionário de Dados - {len(df_dicionario)} campos")
-            
-            # Aba 2: Dados Consolidados (sem agregação)
-            if df_consolidado is not None and not df_consolidado.empty:
-                df_consolidado.to_excel(writer, sheet_name='2_Dados_Consolidados', index=False)
-                st.success(f"✅ Aba 2: Dados Consolidados - {len(df_consolidado):,} registros")
-                
-                # Aba 3: Agrupamento Detalhado
-                agrupamento_detalhado = self.gerar_agrupamento_detalhado(df_consolidado)
-                if not agrupamento_detalhado.empty:
-                    agrupamento_detalhado.to_excel(writer, sheet_name='3_Agrupamento_Detalhado', index=False)
-                    st.success(f"✅ Aba 3: Agrupamento Detalhado - {len(agrupamento_detalhado):,} grupos")
-                
-                # Aba 4: Agrupamento Consolidado
-                agrupamento_consolidado = self.gerar_agrupamento_consolidado(df_consolidado)
-                if not agrupamento_consolidado.empty:
-                    agrupamento_consolidado.to_excel(writer, sheet_name='4_Agrupamento_Consolidado', index=False)
-                    st.success(f"✅ Aba 4: Agrupamento Consolidado - {len(agrupamento_consolidado):,} grupos")
-                
-                # Aba 5: Agrupamento Geral
-                agrupamento_geral = self.gerar_agrupamento_geral(df_consolidado)
-                if not agrupamento_geral.empty:
-                    agrupamento_geral.to_excel(writer, sheet_name='5_Agrupamento_Geral', index=False)
-                    st.success(f"✅ Aba 5: Agrupamento Geral - {len(agrupamento_geral):,} grupos")
-            
-            # Aba adicional: Parâmetros utilizados
-            params_data = {
-                'Parametro': [
-                    'Taxa de Multa',
-                    'Taxa de Juros Moratórios',
-                    'Data de Processamento',
-                    'Metodologia IGP-M',
-                    'Metodologia IPCA',
-                    'Fonte dos Dados IGPM',
-                    'Aging - Critério'
-                ],
-                'Valor': [
-                    f"{self.params.taxa_multa:.2%}",
-                    f"{self.params.taxa_juros_mensal:.2%} ao mês",
-                    datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
-                    'Até 2021.05',
-                    'A partir de 2021.06',
-                    'SIDRA/IBGE',
-                    'Baseado em dias de atraso'
-                ]
-            }
-            df_params = pd.DataFrame(params_data)
-            df_params.to_excel(writer, sheet_name='Parametros', index=False)
-            st.success("✅ Aba Parâmetros")
-        
-        output.seek(0)
-        return output
+        O workbook é gravado em streaming num arquivo temporário (não em
+        BytesIO); retorna esse arquivo posicionado no início, apagado ao fechar.
+        """
+        return _arquivo_temporario_excel(lambda arquivo: self.exportar_excel_consolidado(df_consolidado, arquivo))
 
     def criar_arquivo_excel(self, df_ess=None, df_voltz=None) -> BytesIO:
         """
@@ -613,53 +599,125 @@ class ExportadorResultados:
         
         return relatorio
     
-    def criar_arquivo_excel_generico(self, bases_finais):
+    COLUNAS_RESUMO_DISTRIBUIDORA = {
+        'valor_liquido': 'Valor_Liquido',
+        'valor_corrigido': 'Valor_Corrigido',
+        'multa': 'Multa_Total',
+        'juros_moratorios': 'Juros_Total',
+        'correcao_monetaria': 'Correcao_Total',
+    }
+    
+    def gerar_resumos_distribuidoras(self, bases_finais):
         """
-        Cria arquivo Excel consolidado para múltiplas distribuidoras.
+        Calcula, em uma única passada agrupada, o resumo consolidado por
+        distribuidora e o resumo por aging de cada distribuidora.
+        
+        Retorna (df_resumo_consolidado, {distribuidora: resumo_aging}).
         """
-        if not bases_finais:
-            return BytesIO()
-        
-        # Criar buffer para o arquivo Excel
-        excel_buffer = BytesIO()
-        
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            # Aba de resumo consolidado
-            dados_resumo = []
-            for distribuidora, df in bases_finais.items():
-                if df.empty:
-                    continue
-                    
-                dados_resumo.append({
-                    'Distribuidora': distribuidora,
-                    'Registros': len(df),
-                    'Valor_Liquido': df['valor_liquido'].sum() if 'valor_liquido' in df.columns else 0,
-                    'Valor_Corrigido': df['valor_corrigido'].sum() if 'valor_corrigido' in df.columns else 0,
-                    'Multa_Total': df['multa'].sum() if 'multa' in df.columns else 0,
-                    'Juros_Total': df['juros_moratorios'].sum() if 'juros_moratorios' in df.columns else 0,
-                    'Correcao_Total': df['correcao_monetaria'].sum() if 'correcao_monetaria' in df.columns else 0
-                })
+        bases = {nome: df for nome, df in bases_finais.items() if df is not None and not df.empty}
+        if not bases:
+            return pd.DataFrame(), {}
+        
+        colunas_valores = list(self.COLUNAS_RESUMO_DISTRIBUIDORA)
+        
+        # Frame enxuto só com as colunas dos resumos (sem concatenar as bases inteiras)
+        partes = []
+        for nome, df in bases.items():
+            parte = pd.DataFrame({
+                'Distribuidora': nome,
+                'aging': df['aging'].to_numpy() if 'aging' in df.columns else None,
+                'id_padronizado': df['id_padronizado'].notna().to_numpy() if 'id_padronizado' in df.columns else True,
+                **{col: df[col].to_numpy() for col in colunas_valores if col in df.columns},
+            }, index=pd.RangeIndex(len(df)))
+            partes.append(parte)
+        df_todas = pd.concat(partes, ignore_index=True, sort=False)
+        for col in colunas_valores:
+            if col not in df_todas.columns:
+                df_todas[col] = np.nan
+        
+        # Resumo consolidado por distribuidora (colunas ausentes na base somam 0, como antes)
+        df_resumo = (
+            df_todas
+            .groupby('Distribuidora', sort=False)
+            .agg(Registros=('Distribuidora', 'size'), **{
+                rotulo: (col, 'sum') for col, rotulo in self.COLUNAS_RESUMO_DISTRIBUIDORA.items()
+            })
+            .reset_index()
+        )
+        df_resumo['Perc_Correcao'] = ((df_resumo['Valor_Corrigido'] / df_resumo['Valor_Liquido'] - 1) * 100).round(2)
+        
+        # Resumo por aging de todas as distribuidoras de uma vez
+        por_aging = (
+            df_todas
+            .groupby(['Distribuidora', 'aging'], sort=True)
+            .agg(Qtd_Registros=('id_padronizado', 'sum'), **{col: (col, 'sum') for col in colunas_valores})
+        )
+        
+        resumos_aging = {}
+        for nome, df in bases.items():
+            colunas_disponiveis = [col for col in colunas_valores if col in df.columns]
+            if 'aging' not in df.columns or not colunas_disponiveis or nome not in por_aging.index.get_level_values(0):
+                continue
             
-            if dados_resumo:
-                df_resumo = pd.DataFrame(dados_resumo)
-                df_resumo['Perc_Correcao'] = ((df_resumo['Valor_Corrigido'] / df_resumo['Valor_Liquido'] - 1) * 100).round(2)
-                df_resumo.to_excel(writer, sheet_name='Resumo_Consolidado', index=False)
+            resumo = por_aging.loc[nome, ['Qtd_Registros'] + colunas_disponiveis].round(2)
+            resumo.columns = ['Qtd_Registros'] + [col.replace('_', ' ').title() for col in colunas_disponiveis]
             
-            # Aba para cada distribuidora
-            for distribuidora, df in bases_finais.items():
-                if df.empty:
-                    continue
-                    
-                # Nome da aba (limitado a 31 caracteres)
-                nome_aba = distribuidora[:31] if len(distribuidora) > 31 else distribuidora
-                df.to_excel(writer, sheet_name=nome_aba, index=False)
-                
-                # Resumo por aging para esta distribuidora
-                if 'aging' in df.columns:
-                    resumo_aging = self.gerar_resumo_por_aging(df, distribuidora)
-                    if not resumo_aging.empty:
-                        nome_aba_aging = f"{distribuidora[:25]}_Aging"
-                        resumo_aging.to_excel(writer, sheet_name=nome_aba_aging, index=True)
-        
-        excel_buffer.seek(0)
-        return excel_buffer.getvalue()
+            # Calcular percentuais de participação
+            if 'valor_corrigido' in df.columns:
+                total_valor_corrigido = df_resumo.loc[df_resumo['Distribuidora'] == nome, 'Valor_Corrigido'].iloc[0]
+                if total_valor_corrigido > 0:
+                    resumo['Participacao_Perc'] = (resumo['Valor Corrigido'] / total_valor_corrigido * 100).round(2)
+            
+            # Calcular percentual médio de correção por aging
+            if 'valor_liquido' in df.columns and 'valor_corrigido' in df.columns:
+                mask = resumo['Valor Liquido'] > 0
+                resumo.loc[mask, 'Perc_Correcao_Medio'] = ((resumo.loc[mask, 'Valor Corrigido'] / resumo.loc[mask, 'Valor Liquido'] - 1) * 100).round(2)
+            
+            resumo = resumo.reset_index()
+            resumo.insert(0, 'Base', nome)
+            resumos_aging[nome] = resumo
+        
+        return df_resumo, resumos_aging
+    
+    def _abas_excel_generico(self, bases_finais):
+        """Abas do arquivo consolidado de múltiplas distribuidoras, na ordem de escrita."""
+        df_resumo, resumos_aging = self.gerar_resumos_distribuidoras(bases_finais)
+        
+        # Aba de resumo consolidado
+        if not df_resumo.empty:
+            yield 'Resumo_Consolidado', df_resumo
+        
+        # Aba para cada distribuidora (dividida em abas numeradas acima do limite do Excel)
+        for distribuidora, df in bases_finais.items():
+            if df is None or df.empty:
+                continue
+            
+            # Nome da aba (limitado a 31 caracteres)
+            yield distribuidora[:31], df
+            
+            # Resumo por aging para esta distribuidora
+            if distribuidora in resumos_aging:
+                yield f"{distribuidora[:25]}_Aging", resumos_aging[distribuidora]
+    
+    def exportar_excel_generico(self, bases_finais, caminho) -> EstatisticasExportacaoExcel:
+        """
+        Grava o Excel consolidado de múltiplas distribuidoras direto em disco,
+        em modo streaming. Retorna tempo total, linhas/s e pico de memória.
+        """
+        estatisticas = exportar_excel_streaming(caminho, self._abas_excel_generico(bases_finais))
+        st.caption(f"⏱️ Exportação Excel: {estatisticas.descricao()}")
+        return estatisticas
+    
+    def criar_arquivo_excel_generico(self, bases_finais) -> BinaryIO:
+        """
+        Cria arquivo Excel consolidado para múltiplas distribuidoras.
+        
+        Os resumos de todas as distribuidoras saem de uma única passada agrupada
+        e as abas são gravadas em streaming (xlsxwriter constant_memory) num
+        arquivo temporário; retorna esse arquivo posicionado no início, apagado
+        ao fechar. Sem bases, o arquivo temporário retornado fica vazio.
+        """
+        if not bases_finais:
+            return _arquivo_temporario_excel()
+        
+        return _arquivo_temporario_excel(lambda arquivo: self.exportar_excel_generico(bases_finais, arquivo))
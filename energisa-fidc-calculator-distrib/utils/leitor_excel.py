@@ -0,0 +1,139 @@
+"""
+Camada de leitura de Excel com motor plugavel.
+
+Usa o motor ``calamine`` do pandas (python-calamine, leitor em Rust) quando
+instalado e o motor padrao do pandas (openpyxl para .xlsx, xlrd para .xls)
+caso contrario. Se o calamine falhar em um arquivo especifico, a leitura e
+refeita com o motor padrao, entao o resultado nunca depende do pacote
+opcional estar presente.
+
+Uso:
+    df = ler_excel(arquivo, sheet_name="Input", header=None)
+    with abrir_planilha(arquivo) as planilha:
+        planilha.sheet_names, planilha.parse(aba)
+    with abrir_planilha_amostra(arquivo) as planilha:
+        planilha.parse(aba, nrows=200)
+    grade, abas, aba = ler_aba_bruta(arquivo, "IGPM")
+    grades, abas = ler_abas_brutas(arquivo)
+"""
+
+import importlib.util
+import io
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+MOTOR_RAPIDO = "calamine"
+
+
+def _calamine_disponivel() -> bool:
+    # Motor calamine do pandas existe a partir da 2.2
+    versao = tuple(int(parte) for parte in pd.__version__.split(".")[:2] if parte.isdigit())
+    return versao >= (2, 2) and importlib.util.find_spec("python_calamine") is not None
+
+
+CALAMINE_DISPONIVEL = _calamine_disponivel()
+
+
+def motor_excel() -> str:
+    """Nome do motor usado por padrao ("calamine" ou "openpyxl")."""
+    return MOTOR_RAPIDO if CALAMINE_DISPONIVEL else "openpyxl"
+
+
+def _rebobinar(origem):
+    """Bytes viram BytesIO; arquivos abertos voltam ao inicio (releitura no fallback)."""
+    if isinstance(origem, (bytes, bytearray, memoryview)):
+        return io.BytesIO(origem)
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+    return origem
+
+
+def abrir_planilha(origem) -> pd.ExcelFile:
+    """``pd.ExcelFile`` com o motor rapido, ou o padrao se indisponivel/falhar."""
+    if CALAMINE_DISPONIVEL:
+        try:
+            return pd.ExcelFile(_rebobinar(origem), engine=MOTOR_RAPIDO)
+        except Exception:
+            pass
+    return pd.ExcelFile(_rebobinar(origem))
+
+
+def abrir_planilha_amostra(origem) -> pd.ExcelFile:
+    """
+    ``pd.ExcelFile`` para ler so as primeiras linhas. O calamine monta a aba
+    inteira na primeira leitura; o openpyxl em modo somente leitura percorre
+    as linhas sob demanda, entao ``parse(aba, nrows=n)`` para na linha ``n``.
+    Arquivos que nao sao .xlsx (ex.: .xls) usam ``abrir_planilha``.
+    """
+    try:
+        return pd.ExcelFile(_rebobinar(origem), engine="openpyxl")
+    except Exception:
+        return abrir_planilha(origem)
+
+
+def ler_excel(origem, **kwargs) -> pd.DataFrame:
+    """``pd.read_excel`` com o motor rapido e fallback para o motor padrao."""
+    if CALAMINE_DISPONIVEL:
+        try:
+            return pd.read_excel(_rebobinar(origem), engine=MOTOR_RAPIDO, **kwargs)
+        except Exception:
+            pass
+    return pd.read_excel(_rebobinar(origem), **kwargs)
+
+
+def ler_aba_bruta(origem, aba: Optional[str] = None) -> Tuple[pd.DataFrame, List[str], str]:
+    """
+    Grade de valores de uma aba (sem cabecalho, colunas 0..n), sem as linhas
+    totalmente vazias. ``aba`` inexistente ou None usa a primeira aba.
+    Retorna ``(grade, abas, aba_utilizada)``.
+    """
+    if CALAMINE_DISPONIVEL:
+        try:
+            with pd.ExcelFile(_rebobinar(origem), engine=MOTOR_RAPIDO) as planilha:
+                abas = list(planilha.sheet_names)
+                aba_utilizada = aba if aba in abas else abas[0]
+                grade = planilha.parse(aba_utilizada, header=None)
+            return grade.dropna(how="all").reset_index(drop=True), abas, aba_utilizada
+        except Exception:
+            pass
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_rebobinar(origem), data_only=True, read_only=True)
+    try:
+        abas = list(workbook.sheetnames)
+        aba_utilizada = aba if aba in abas else abas[0]
+        linhas = [list(linha) for linha in workbook[aba_utilizada].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    return pd.DataFrame(linhas).dropna(how="all").reset_index(drop=True), abas, aba_utilizada
+
+
+def ler_abas_brutas(origem) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """
+    Grades de valores de todas as abas (como ``ler_aba_bruta``) em uma unica
+    abertura do arquivo. Retorna ``({aba: grade}, abas)``.
+    """
+    if CALAMINE_DISPONIVEL:
+        try:
+            with pd.ExcelFile(_rebobinar(origem), engine=MOTOR_RAPIDO) as planilha:
+                abas = list(planilha.sheet_names)
+                grades = planilha.parse(abas, header=None)
+            return {aba: grade.dropna(how="all").reset_index(drop=True) for aba, grade in grades.items()}, abas
+        except Exception:
+            pass
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_rebobinar(origem), data_only=True, read_only=True)
+    try:
+        abas = list(workbook.sheetnames)
+        grades = {
+            aba: pd.DataFrame([list(linha) for linha in workbook[aba].iter_rows(values_only=True)])
+            .dropna(how="all").reset_index(drop=True)
+            for aba in abas
+        }
+    finally:
+        workbook.close()
+    return grades, abas
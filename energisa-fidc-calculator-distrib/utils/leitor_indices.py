@@ -0,0 +1,185 @@
+"""
+Leitura vetorizada do arquivo de indices IGP-M/IPCA, compartilhada pelo app
+principal (pagina de Correcao) e pelo app v2.
+
+O arquivo e aberto uma unica vez (todas as abas) e cada aba e convertida
+em uma curva ``['data', 'indice']`` (data no primeiro dia do mes). Duas
+estruturas:
+
+- ``ESTRUTURA_DATA_INDICE``: coluna A com a data e coluna B com o indice.
+  A data pode ser data do Excel, numero de serie do Excel (ex.: 34547),
+  texto ``agosto/1994`` / ``ago/1994`` ou texto de data.
+- ``ESTRUTURA_ANO_MES`` (ex.: aba ``IGPM_IPCA``): coluna C com o ano, D com
+  o mes e F com o indice; so anos entre 1990 e 2035.
+
+Sem estrutura informada vale a regra do v2: abas com 6 colunas ou mais sao
+ano/mes, as demais data/indice. O app principal escolhe a estrutura pelo
+nome da aba pedida (``IGPM`` = data/indice).
+
+O arquivo fica em cache pelo hash do conteudo: reenviar o mesmo arquivo
+(ou cada rerun do Streamlit com o arquivo no uploader) nao le o Excel de novo.
+
+Uso:
+    arquivo = ler_indices_excel(upload)
+    df_igpm = arquivo.curva("IGPM")      # aba inexistente usa a primeira
+    df_ipca = arquivo.curva("IGPM_IPCA", ESTRUTURA_ANO_MES)
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache_uploads import CacheUploads, ler_com_hash, tamanho_em_memoria
+from .leitor_excel import ler_abas_brutas
+
+ABA_IGPM = "IGPM"
+ESTRUTURA_ANO_MES = "ano_mes"
+ESTRUTURA_DATA_INDICE = "data_indice"
+COLUNAS_MINIMAS_ANO_MES = 6
+ANO_MINIMO = 1990
+ANO_MAXIMO = 2035
+LIMITE_CACHE_BYTES = 64 * 1024 ** 2
+# Serie do Excel: dia 0 = 1899-12-30 (compensa o 29/02/1900 inexistente)
+ORIGEM_SERIE_EXCEL = pd.Timestamp("1899-12-30")
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "março": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+}
+
+_cache_indices = CacheUploads(LIMITE_CACHE_BYTES)
+
+
+def converter_datas_mensais(valores: pd.Series) -> pd.Series:
+    """
+    Datas no primeiro dia do mes a partir de uma coluna mista do Excel:
+    datas, numeros de serie, ``mes/ano`` por extenso e textos de data.
+    O que nao for reconhecido vira NaT.
+    """
+    valores = pd.Series(valores).reset_index(drop=True)
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores.dt.to_period("M").dt.to_timestamp()
+
+    # Numeros (e textos numericos) sao series do Excel
+    series = pd.to_numeric(valores, errors="coerce")
+    datas = ORIGEM_SERIE_EXCEL + pd.to_timedelta(np.floor(series), unit="D")
+
+    texto = valores.astype(str).str.strip().str.lower().where(series.isna() & valores.notna())
+
+    # "agosto/1994", "ago-1994", "março / 2021"
+    partes = texto.str.extract(r"^([a-zç]+)\s*[/\-]\s*(\d{4})$")
+    meses = partes[0].map(MESES)
+    datas = datas.fillna(pd.to_datetime(
+        partes[1] + "-" + meses.astype("Int64").astype(str).str.zfill(2),
+        format="%Y-%m", errors="coerce",
+    ))
+
+    # Datas (datetime do Excel viram "AAAA-MM-DD hh:mm:ss" no texto)
+    restantes = texto.where(datas.isna())
+    iso = restantes.str.match(r"^\d{4}-\d{2}-\d{2}").eq(True)
+    datas = datas.fillna(pd.to_datetime(restantes.where(iso).str[:10], format="%Y-%m-%d", errors="coerce"))
+    restantes = restantes.where(datas.isna() & ~iso)
+    if restantes.notna().any():
+        datas = datas.fillna(pd.to_datetime(restantes, format="mixed", dayfirst=True, errors="coerce"))
+
+    return datas.dt.to_period("M").dt.to_timestamp()
+
+
+def converter_indices(valores: pd.Series) -> pd.Series:
+    """Indice numerico; virgula decimal aceita, o resto vira NaN."""
+    if valores.dtype == object:
+        valores = valores.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(valores, errors="coerce")
+
+
+def _curva_ano_mes(grade: pd.DataFrame) -> pd.DataFrame:
+    """Estrutura IGPM_IPCA: C (ano), D (mes), F (indice)."""
+    df = grade.iloc[:, [2, 3, 5]].dropna()
+    ano = pd.to_numeric(df.iloc[:, 0], errors="coerce")
+    mes = pd.to_numeric(df.iloc[:, 1], errors="coerce")
+    validos = ano.between(ANO_MINIMO, ANO_MAXIMO) & mes.between(1, 12)
+    data = pd.to_datetime(
+        pd.DataFrame({"year": ano[validos], "month": mes[validos], "day": 1}).astype(int)
+    ) if validos.any() else pd.Series(dtype="datetime64[ns]")
+    return pd.DataFrame({"data": data, "indice": converter_indices(df.iloc[:, 2][validos])})
+
+
+def _curva_data_indice(grade: pd.DataFrame) -> pd.DataFrame:
+    """Estrutura IGPM: A (data), B (indice)."""
+    df = grade.iloc[:, [0, 1]].dropna(subset=[grade.columns[0]])
+    data = converter_datas_mensais(df.iloc[:, 0])
+    return pd.DataFrame({"data": data.to_numpy(), "indice": converter_indices(df.iloc[:, 1]).to_numpy()})
+
+
+def detectar_estrutura(grade: pd.DataFrame) -> str:
+    """Regra do v2: 6 colunas ou mais = ano/mes (C, D, F); senao data/indice (A, B)."""
+    if grade.shape[1] >= COLUNAS_MINIMAS_ANO_MES:
+        return ESTRUTURA_ANO_MES
+    return ESTRUTURA_DATA_INDICE
+
+
+def converter_aba_indices(grade: pd.DataFrame, estrutura: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Curva ``['data', 'indice']`` ordenada de uma aba, ou None se a aba nao tiver
+    colunas para a estrutura ou nao houver indices validos.
+    """
+    estrutura = estrutura or detectar_estrutura(grade)
+    if estrutura == ESTRUTURA_ANO_MES:
+        if grade.shape[1] < COLUNAS_MINIMAS_ANO_MES:
+            return None
+        df = _curva_ano_mes(grade)
+    else:
+        if grade.shape[1] < 2:
+            return None
+        df = _curva_data_indice(grade)
+    df = df.dropna(subset=["data", "indice"])
+    if df.empty:
+        return None
+    return df.sort_values("data", kind="stable").reset_index(drop=True)
+
+
+class IndicesArquivo:
+    """Abas de um arquivo de indices; cada curva e convertida uma vez por estrutura."""
+
+    def __init__(self, grades: Dict[str, pd.DataFrame], abas: List[str]):
+        self.grades = grades
+        self.abas = abas
+        self._curvas: Dict[Tuple[str, str], Optional[pd.DataFrame]] = {}
+
+    def aba_utilizada(self, aba: Optional[str] = None) -> Optional[str]:
+        """``aba`` se existir no arquivo, senao a primeira aba."""
+        if aba in self.grades:
+            return aba
+        return self.abas[0] if self.abas else None
+
+    def curva(self, aba: Optional[str] = None, estrutura: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        Copia da curva da aba (ou da primeira aba), ou None. Sem ``estrutura``
+        vale ``detectar_estrutura``.
+        """
+        aba = self.aba_utilizada(aba)
+        if aba is None:
+            return None
+        grade = self.grades[aba]
+        chave = (aba, estrutura or detectar_estrutura(grade))
+        if chave not in self._curvas:
+            self._curvas[chave] = converter_aba_indices(grade, chave[1])
+        curva = self._curvas[chave]
+        return None if curva is None else curva.copy()
+
+
+def ler_indices_excel(origem) -> IndicesArquivo:
+    """
+    Abas do arquivo de indices, lidas de uma vez; as curvas sao convertidas
+    sob demanda por ``IndicesArquivo.curva``. Arquivos ja lidos (mesmo conteudo) saem do cache.
+    """
+    conteudo, hash_conteudo = ler_com_hash(origem)
+    arquivo = _cache_indices.obter(hash_conteudo)
+    if arquivo is None:
+        grades, abas = ler_abas_brutas(conteudo)
+        arquivo = IndicesArquivo(grades, abas)
+        _cache_indices.guardar(hash_conteudo, arquivo, sum(tamanho_em_memoria(g) for g in grades.values()))
+    return arquivo
@@ -0,0 +1,132 @@
+"""
+Manifesto dos arquivos exportados, indexado pela chave da execucao.
+
+A chave combina o hash do conteudo do resultado final (todas as linhas e
+colunas, via ``pd.util.hash_pandas_object``) com o hash dos parametros da
+execucao. O manifesto fica em ``data/manifesto_exportacoes.json`` e sobrevive
+a reinicios do app: pedir de novo a exportacao de um resultado identico
+devolve os arquivos ja gravados em vez de escreve-los outra vez.
+
+O hash do conteudo e calculado uma vez por DataFrame (cache enquanto o mesmo
+objeto estiver vivo), entao reruns do Streamlit nao reprocessam a base.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .cache_dataframes import CachePorDataFrame
+
+ARQUIVO_MANIFESTO = "manifesto_exportacoes.json"
+VERSAO_MANIFESTO = 1
+
+_cache_hashes: CachePorDataFrame[str] = CachePorDataFrame()
+
+
+def _calcular_hash_conteudo(df: pd.DataFrame) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[str(coluna), str(tipo)] for coluna, tipo in df.dtypes.items()]).encode())
+    digest.update(str(len(df)).encode())
+    for coluna in df.columns:
+        # Coluna a coluna: evita materializar o hash de todas as colunas de uma vez
+        digest.update(pd.util.hash_pandas_object(df[coluna], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def hash_conteudo(df: pd.DataFrame) -> str:
+    """
+    Hash de todas as celulas, nomes e tipos das colunas de ``df``.
+    Reaproveitado enquanto o mesmo objeto estiver vivo e com as mesmas linhas/colunas.
+    """
+    return _cache_hashes.obter(df, _calcular_hash_conteudo)
+
+
+def hash_parametros(parametros: Optional[Dict]) -> str:
+    """Hash estavel (chaves ordenadas) dos parametros escalares da execucao."""
+    texto = json.dumps(parametros or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(texto.encode(), digest_size=8).hexdigest()
+
+
+def chave_execucao(df: pd.DataFrame, parametros: Optional[Dict] = None) -> str:
+    """Chave da execucao: ``<hash do conteudo>-<hash dos parametros>``."""
+    return f"{hash_conteudo(df)}-{hash_parametros(parametros)}"
+
+
+class ManifestoExportacao:
+    """
+    Registro em disco dos artefatos por chave de execucao e formato.
+
+    Uso:
+        manifesto = ManifestoExportacao(Path("data"))
+        manifesto.artefatos(chave)            # {"excel": Path(...), ...}
+        manifesto.registrar(chave, "csv", caminho, registros=len(df))
+
+    Seguro para chamadas das threads de exportacao (lock + escrita atomica).
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, pasta: Path):
+        self.caminho = Path(pasta) / ARQUIVO_MANIFESTO
+
+    def _ler(self) -> Dict:
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                conteudo = json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"versao": VERSAO_MANIFESTO, "execucoes": {}}
+        if conteudo.get("versao") != VERSAO_MANIFESTO:
+            return {"versao": VERSAO_MANIFESTO, "execucoes": {}}
+        return conteudo
+
+    def _gravar(self, conteudo: Dict) -> None:
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_name(f"{self.caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(conteudo, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho)
+
+    def artefatos(self, chave: str) -> Dict[str, Path]:
+        """
+        Formatos ja exportados para ``chave`` cujo arquivo ainda existe com o
+        mesmo tamanho registrado (arquivos apagados ou sobrescritos sao ignorados).
+        """
+        execucao = self._ler()["execucoes"].get(chave, {})
+        validos = {}
+        for formato, registro in execucao.get("arquivos", {}).items():
+            caminho = Path(registro["caminho"])
+            try:
+                if caminho.stat().st_size == registro["tamanho_bytes"]:
+                    validos[formato] = caminho
+            except OSError:
+                continue
+        return validos
+
+    def registrar(
+        self,
+        chave: str,
+        formato: str,
+        caminho: Path,
+        registros: Optional[int] = None,
+        parametros: Optional[Dict] = None,
+    ) -> None:
+        caminho = Path(caminho)
+        with self._lock:
+            conteudo = self._ler()
+            execucao = conteudo["execucoes"].setdefault(chave, {"arquivos": {}})
+            if registros is not None:
+                execucao["registros"] = registros
+            if parametros is not None:
+                execucao["parametros"] = parametros
+            execucao["arquivos"][formato] = {
+                "caminho": str(caminho.resolve()),
+                "tamanho_bytes": caminho.stat().st_size,
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._gravar(conteudo)
@@ -7,8 +7,166 @@ import pandas as pd
 import numpy as np
 import re
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 import streamlit as st
+from pandas.api.types import union_categoricals
+
+from .perfis_mapeamento import PerfisMapeamento
+
+
+# Campos padronizados que o analista mapeia (chave dos perfis de mapeamento)
+CAMPOS_MAPEAVEIS = (
+    'nome_cliente', 'documento', 'contrato', 'classe', 'situacao',
+    'valor_principal', 'valor_nao_cedido', 'valor_terceiro', 'valor_cip',
+    'data_vencimento', 'empresa', 'tipo', 'status'
+)
+TAMANHO_MAXIMO_ID = 100
+TAMANHO_NOME_ID_TRUNCADO = 50
+_RE_CARACTERES_ESPECIAIS = re.compile(r'[^A-Za-z0-9\s]')
+_RE_ESPACOS = re.compile(r'\s+')
+# Mesmo efeito das duas regex para nomes só com ASCII, via str.translate/split
+_TABELA_REMOCAO_ASCII = str.maketrans('', '', ''.join(
+    chr(codigo) for codigo in range(128) if _RE_CARACTERES_ESPECIAIS.match(chr(codigo))
+))
+
+
+def _limpar_nome_id(nome: str) -> str:
+    """Nome sem caracteres especiais, em maiúsculas, espaços trocados por '_'."""
+    if nome.isascii():
+        return '_'.join(nome.translate(_TABELA_REMOCAO_ASCII).upper().split())
+    nome_limpo = _RE_CARACTERES_ESPECIAIS.sub('', nome)
+    return _RE_ESPACOS.sub('_', nome_limpo.strip().upper())
+
+
+def _data_id(data_venc) -> str:
+    """Data de vencimento como AAAAMMDD (texto: só remove separadores)."""
+    if isinstance(data_venc, str):
+        return data_venc.replace('/', '').replace('-', '').replace(' ', '')[:8]
+    try:
+        if pd.isna(data_venc):
+            return "SEMDATA"
+    except (TypeError, ValueError):
+        pass
+    try:
+        return pd.to_datetime(data_venc).strftime('%Y%m%d')
+    except Exception:
+        return "SEMDATA"
+
+
+def _textos_datas_id(datas: pd.Series):
+    """(códigos por linha, texto AAAAMMDD por código) sem formatar linha a linha."""
+    if pd.api.types.is_datetime64_any_dtype(datas):
+        codigos, distintas = pd.factorize(datas)
+        textos = pd.Series(distintas).dt.strftime('%Y%m%d').to_numpy(dtype=object)
+        if (codigos < 0).any():
+            codigos = np.where(codigos < 0, len(textos), codigos)
+            textos = np.append(textos, "SEMDATA")
+        return codigos, textos
+    codigos, distintas = pd.factorize(datas.to_numpy(dtype=object), use_na_sentinel=False)
+    return codigos, np.array([_data_id(valor) for valor in distintas], dtype=object)
+
+
+def construir_ids_padronizados(nomes: pd.Series, datas: pd.Series, nome_distribuidora: str) -> pd.Series:
+    """
+    IDs ``<distribuidora>_<NOME_LIMPO>_<AAAAMMDD>`` (nome truncado em 50
+    caracteres se o ID passar de 100), sem sufixos de duplicidade.
+
+    Nomes e datas são tratados por valor distinto (regex e conversão de data
+    uma vez por valor) e o texto do ID é montado uma vez por par nome+data.
+    """
+    codigos_nome, nomes_distintos = pd.factorize(nomes.to_numpy(dtype=object))
+    nomes_limpos = np.array(
+        [_limpar_nome_id(str(nome).strip()) for nome in nomes_distintos] + [_limpar_nome_id("SEM_NOME")],
+        dtype=object,
+    )
+    codigos_nome = np.where(codigos_nome < 0, len(nomes_limpos) - 1, codigos_nome)
+    codigos_data, datas_texto = _textos_datas_id(datas)
+
+    # Um texto por par (nome, data) presente na base
+    total_datas = len(datas_texto)
+    par = codigos_nome.astype(np.int64) * total_datas + codigos_data
+    codigos_par, pares = pd.factorize(par)
+    codigo_nome_par = pares // total_datas
+    codigo_data_par = pares % total_datas
+
+    prefixo = f"{nome_distribuidora}_"
+    tamanho_nome = np.fromiter((len(nome) for nome in nomes_limpos), dtype=np.int64, count=len(nomes_limpos))
+    tamanho_data = np.fromiter((len(data) for data in datas_texto), dtype=np.int64, count=total_datas)
+    truncar = len(prefixo) + tamanho_nome[codigo_nome_par] + 1 + tamanho_data[codigo_data_par] > TAMANHO_MAXIMO_ID
+
+    nome_par = nomes_limpos[codigo_nome_par]
+    if truncar.any():
+        nome_par[truncar] = [nome[:TAMANHO_NOME_ID_TRUNCADO] for nome in nome_par[truncar]]
+    ids_par = prefixo + nome_par + "_" + datas_texto[codigo_data_par]
+    return pd.Series(ids_par[codigos_par], index=nomes.index, name='id_padronizado')
+
+
+def adicionar_sufixos_duplicados(ids: pd.Series, codigos: np.ndarray = None) -> pd.Series:
+    """Prefixa ``<n>_`` na n-ésima repetição de cada ID (a primeira ocorrência mantém o ID)."""
+    if codigos is None:
+        codigos, _ = pd.factorize(ids)
+    valores = ids.to_numpy(dtype=object).copy()
+    ocorrencia = pd.Series(codigos).groupby(codigos).cumcount().to_numpy()
+    repetidos = np.flatnonzero(ocorrencia > 0)
+    valores[repetidos] = [f"{n}_{valor}" for n, valor in zip(ocorrencia[repetidos], valores[repetidos])]
+    return pd.Series(valores, index=ids.index, name=ids.name)
+
+
+def _concatenar_coluna(partes: List[pd.Series], total: int) -> pd.Series:
+    """Uma coluna da base consolidada, alocada uma única vez."""
+    if all(isinstance(parte.dtype, pd.CategoricalDtype) for parte in partes):
+        # Categorias unificadas: a coluna continua categórica (pd.concat viraria object)
+        try:
+            return pd.Series(union_categoricals([parte.array for parte in partes]))
+        except TypeError:
+            return pd.concat(partes, ignore_index=True)
+
+    tipos = {parte.dtype for parte in partes}
+    mesmo_tipo_numpy = len(tipos) == 1 and all(isinstance(tipo, np.dtype) for tipo in tipos)
+    so_numericos = all(isinstance(tipo, np.dtype) and tipo.kind in 'iuf' for tipo in tipos)
+    if not (mesmo_tipo_numpy or so_numericos):
+        return pd.concat(partes, ignore_index=True)
+
+    valores = np.empty(total, dtype=np.result_type(*tipos))
+    inicio = 0
+    for parte in partes:
+        valores[inicio:inicio + len(parte)] = parte.to_numpy()
+        inicio += len(parte)
+    return pd.Series(valores, copy=False)
+
+
+def consolidar_bases_padronizadas(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Empilha as bases padronizadas (mesmo resultado de
+    ``pd.concat(dataframes, ignore_index=True)``), alocando cada coluna uma
+    única vez no tamanho final. Colunas categóricas têm as categorias
+    unificadas e continuam categóricas. Colunas ausentes em uma base ficam
+    vazias (NaN) nas linhas dela. O resultado não compartilha memória com as
+    bases de entrada.
+    """
+    dataframes = [df for df in dataframes if df is not None]
+    if not dataframes:
+        return pd.DataFrame()
+    total = sum(len(df) for df in dataframes)
+
+    colunas = []
+    vistas = set()
+    for df in dataframes:
+        for coluna in df.columns:
+            if coluna not in vistas:
+                vistas.add(coluna)
+                colunas.append(coluna)
+
+    consolidadas = {}
+    for coluna in colunas:
+        partes = []
+        for df in dataframes:
+            if coluna in df.columns:
+                partes.append(df[coluna])
+            else:
+                partes.append(pd.Series(np.nan, index=pd.RangeIndex(len(df)), dtype=float))
+        consolidadas[coluna] = _concatenar_coluna(partes, total)
+    return pd.DataFrame(consolidadas, index=pd.RangeIndex(total), copy=False)
 
 
 class MapeadorCampos:
@@ -18,19 +176,62 @@ class MapeadorCampos:
     
     def __init__(self, params):
         self.params = params
-        # Importar calculador VOLTZ para detecção
-        from .calculador_voltz import CalculadorVoltz
-        self.calculador_voltz = CalculadorVoltz(params)
+        self.perfis = PerfisMapeamento()
     
     def identificar_tipo_distribuidora(self, nome_arquivo: str) -> str:
         """
         Identifica se é VOLTZ ou distribuidora padrão.
         """
-        if self.calculador_voltz.identificar_voltz(nome_arquivo):
+        # Detecção só pelo nome: não precisa de uma instância do calculador VOLTZ
+        from .calculador_voltz import CalculadorVoltz
+        if CalculadorVoltz.identificar_voltz(nome_arquivo):
             return "VOLTZ"
         else:
             return "PADRAO"
     
+    def obter_perfil_mapeamento(self, df: pd.DataFrame, nome_arquivo: str) -> Optional[Dict[str, str]]:
+        """
+        Mapeamento já confirmado para um arquivo com o mesmo cabeçalho
+        (mesma distribuidora e mesmo conjunto de colunas), ou None.
+        """
+        return self.perfis.obter(self.identificar_tipo_distribuidora(nome_arquivo), df.columns,
+                                 campos=CAMPOS_MAPEAVEIS)
+    
+    def salvar_perfil_mapeamento(self, df: pd.DataFrame, nome_arquivo: str, mapeamento: Dict[str, str]) -> bool:
+        """
+        Guarda o mapeamento como perfil do cabeçalho do arquivo.
+        Falha de escrita (ex.: pasta somente leitura) não interrompe o fluxo.
+        """
+        try:
+            self.perfis.registrar(self.identificar_tipo_distribuidora(nome_arquivo), df.columns, mapeamento,
+                                  campos=CAMPOS_MAPEAVEIS)
+        except OSError:
+            return False
+        return True
+
+    def colunas_necessarias(self, colunas, mapeamento: Dict[str, str]) -> List:
+        """
+        Colunas do arquivo que aplicar_mapeamento usa: as mapeadas e, se nome
+        ou vencimento não estiverem mapeados, as que criar_id_padronizado
+        procuraria no arquivo original. Define o que a carga completa lê.
+        """
+        colunas = list(colunas)
+        presentes = set(colunas)
+        necessarias = [origem for origem in mapeamento.values() if origem is not None and origem in presentes]
+
+        procuras = []
+        if mapeamento.get('nome_cliente') is None:
+            procuras.append(['nome', 'cliente', 'razao'])
+        if mapeamento.get('data_vencimento') is None:
+            procuras.append(['vencimento', 'venc', 'prazo', 'data'])
+        for termos in procuras:
+            for col in colunas:
+                if isinstance(col, str) and any(termo in col.lower() for termo in termos):
+                    necessarias.append(col)
+                    break
+
+        return list(dict.fromkeys(necessarias))
+
     def criar_mapeamento_automatico(self, df: pd.DataFrame, nome_distribuidora: str) -> Dict[str, str]:
         """
         Cria mapeamento automático baseado em análise dos nomes das colunas.
@@ -122,11 +323,7 @@ class MapeadorCampos:
             ]
         else:
             # Para outras distribuidoras: todos os campos
-            campos_padrao = [
-                'nome_cliente', 'documento', 'contrato', 'classe', 'situacao',
-                'valor_principal', 'valor_nao_cedido', 'valor_terceiro', 'valor_cip',
-                'data_vencimento', 'empresa', 'tipo', 'status'
-            ]
+            campos_padrao = list(CAMPOS_MAPEAVEIS)
         
         # Para VOLTZ, remover campos que são preenchidos automaticamente
         if tipo_distribuidora == "VOLTZ":
@@ -219,16 +416,16 @@ class MapeadorCampos:
         # Detectar tipo de distribuidora
         tipo_distribuidora = self.identificar_tipo_distribuidora(nome_distribuidora)
         
-        df_padronizado = pd.DataFrame()
-        
-        # Aplicar mapeamentos disponíveis
-        campos_mapeados = 0
+        # Projeção + renomeação: as colunas do padronizado são as mesmas Series
+        # do arquivo carregado (sem cópia); a cópia única acontece na consolidação
+        colunas_projetadas = {}
         for campo_padrao, campo_original in mapeamento.items():
             if campo_original is not None and campo_original in df.columns:
-                df_padronizado[campo_padrao] = df[campo_original]
-                campos_mapeados += 1
+                colunas_projetadas[campo_padrao] = df[campo_original]
             elif campo_original is not None:
                 st.warning(f"⚠️ Campo {campo_original} não encontrado")
+        campos_mapeados = len(colunas_projetadas)
+        df_padronizado = pd.DataFrame(colunas_projetadas, index=df.index, copy=False)
         
         # Para VOLTZ, adicionar campos automáticos
         if tipo_distribuidora == "VOLTZ":
@@ -287,69 +484,36 @@ class MapeadorCampos:
         if campo_nome and campo_data_venc:
             st.info(f"🔗 Criando IDs únicos baseados em: **{campo_nome}** + **{campo_data_venc}**")
             
-            # Criar ID único combinando nome + data
-            def criar_id_unico(row):
-                try:
-                    # Buscar nome no df_padronizado ou df_original
-                    if campo_nome in df_padronizado.columns:
-                        nome = str(row[campo_nome]).strip() if pd.notna(row[campo_nome]) else "SEM_NOME"
-                    else:
-                        idx = row.name
-                        nome = str(df_original.loc[idx, campo_nome]).strip() if pd.notna(df_original.loc[idx, campo_nome]) else "SEM_NOME"
-                    
-                    # Buscar data no df_padronizado ou df_original
-                    if campo_data_venc in df_padronizado.columns:
-                        data_venc = row[campo_data_venc]
-                    else:
-                        idx = row.name
-                        data_venc = df_original.loc[idx, campo_data_venc]
-                    
-                    # Limpar nome (remover caracteres especiais)
-                    nome_limpo = re.sub(r'[^A-Za-z0-9\s]', '', nome)
-                    nome_limpo = re.sub(r'\s+', '_', nome_limpo.strip().upper())
-                    
-                    # Converter data para string
-                    if pd.notna(data_venc):
-                        if isinstance(data_venc, str):
-                            data_str = data_venc.replace('/', '').replace('-', '').replace(' ', '')[:8]
-                        else:
-                            try:
-                                data_obj = pd.to_datetime(data_venc)
-                                data_str = data_obj.strftime('%Y%m%d')
-                            except:
-                                data_str = "SEMDATA"
-                    else:
-                        data_str = "SEMDATA"
-                    
-                    # Criar ID único
-                    id_unico = f"{nome_distribuidora}_{nome_limpo}_{data_str}"
-                    
-                    # Limitar tamanho se necessário
-                    if len(id_unico) > 100:
-                        nome_truncado = nome_limpo[:50]
-                        id_unico = f"{nome_distribuidora}_{nome_truncado}_{data_str}"
-                    
-                    return id_unico
-                    
-                except Exception:
-                    # Em caso de erro, criar ID baseado no índice
-                    return f"{nome_distribuidora}_REG_{row.name}"
+            # Campos podem vir do df_padronizado ou do df_original (mesmas linhas, mesma ordem)
+            nomes = df_padronizado[campo_nome] if campo_nome in df_padronizado.columns else df_original[campo_nome]
+            datas = df_padronizado[campo_data_venc] if campo_data_venc in df_padronizado.columns else df_original[campo_data_venc]
+            
+            ids = construir_ids_padronizados(nomes, datas, nome_distribuidora)
             
-            # Aplicar função para criar IDs
-            df_padronizado['id_padronizado'] = df_padronizado.apply(criar_id_unico, axis=1)
+            # Rótulo repetido no índice do df_original: a busca linha a linha por .loc
+            # não era possível nesses registros, que recebem ID baseado no índice
+            if (campo_nome not in df_padronizado.columns or campo_data_venc not in df_padronizado.columns):
+                rotulos_repetidos = df_original.index.duplicated(keep=False)
+                if rotulos_repetidos.any():
+                    ids = ids.copy()
+                    ids[rotulos_repetidos] = [
+                        f"{nome_distribuidora}_REG_{rotulo}" for rotulo in df_original.index[rotulos_repetidos]
+                    ]
             
             # Verificar unicidade
-            ids_unicos = df_padronizado['id_padronizado'].nunique()
+            codigos_ids, ids_distintos = pd.factorize(ids)
+            ids_unicos = len(ids_distintos)
             total_registros = len(df_padronizado)
             
             if ids_unicos < total_registros:
                 st.warning(f"⚠️ Detectadas {total_registros - ids_unicos} duplicatas - adicionando sufixos...")
-                # Adicionar sufixos para garantir unicidade
-                df_padronizado['id_padronizado'] = df_padronizado.groupby('id_padronizado').cumcount().astype(str).replace('0', '') + '_' + df_padronizado['id_padronizado']
-                df_padronizado['id_padronizado'] = df_padronizado['id_padronizado'].str.replace('^_', '', regex=True)
+                # Adicionar sufixos para garantir unicidade: 1ª ocorrência mantém o ID, as demais recebem "<n>_"
+                ids = adicionar_sufixos_duplicados(ids, codigos_ids)
+                df_padronizado['id_padronizado'] = ids
                 
                 st.success(f"✅ Unicidade garantida: {df_padronizado['id_padronizado'].nunique()} IDs únicos")
             else:
+                df_padronizado['id_padronizado'] = ids
                 st.success(f"✅ IDs únicos criados: {ids_unicos}/{total_registros}")
             
         else:
@@ -3,11 +3,9 @@ Parâmetros de correção monetária para o cálculo FIDC
 Baseado no notebook original
 """
 
-import json
-import pandas as pd
-import sidrapy
 from datetime import datetime
-from typing import Dict
+
+from .provedor_indices import obter_provedor_indices
 
 
 class ParametrosCorrecao:
@@ -25,8 +23,11 @@ class ParametrosCorrecao:
         self.data_base_padrao = datetime(2025, 4, 30)
 
         # ARMAZENAMENTO DE ÍNDICES
-        self.indices_igpm = self._carregar_igpm()
-        self.indices_ipca = self._calcular_ipca_acumulado(valor_base_ipca)
+        # Séries do cache local (data/series_indices.json) ou embutidas;
+        # a SIDRA só é consultada ao atualizar o cache (atualizar_indices.py)
+        provedor = obter_provedor_indices()
+        self.indices_igpm = {**self._carregar_igpm(), **(provedor.igpm() or {})}
+        self.indices_ipca = provedor.ipca_acumulado(valor_base_ipca)
 
     def _carregar_igpm(self):
         """Carrega os índices IGP-M acumulados até 2021.05."""
@@ -356,54 +357,6 @@ class ParametrosCorrecao:
             "2021.05": 1069.28900
             }
 
-    def _calcular_ipca_acumulado(self, valor_inicial: float):
-        """Baixa IPCA mensal e calcula índice acumulado a partir de 2021.06."""
-        try:
-            start = "202106"
-            end = datetime.today().strftime("%Y%m")
-            periodo = f"{start}-{end}"
-
-            df = sidrapy.get_table(
-                table_code="1737",
-                territorial_level="1",
-                ibge_territorial_code="all",
-                variable="63",
-                period=periodo,
-                format="pandas"
-            )[['D2C', 'V']][1:]
-
-            df["V"] = df["V"].astype(float)
-
-            acumulado = [valor_inicial]
-            for i in range(1, len(df)):
-                novo_valor = round(acumulado[-1] * (1 + df.loc[i, "V"] / 100), 4)
-                acumulado.append(novo_valor)
-
-            df["acumulado"] = acumulado
-
-            ipca_dict = {
-                f"{str(row['D2C'])[:4]}.{str(row['D2C'])[4:]}": row["acumulado"]
-                for _, row in df.iterrows()
-            }
-
-            return ipca_dict
-        
-        except Exception:
-            # Dados IPCA padrão caso API não funcione
-            return {
-                "2021.07": 1078.02, "2021.08": 1086.41, "2021.09": 1096.87,
-                "2021.10": 1107.98, "2021.11": 1119.53, "2021.12": 1130.95, "2022.01": 1142.76,
-                "2022.02": 1154.36, "2022.03": 1166.03, "2022.04": 1177.75, "2022.05": 1190.70,
-                "2022.06": 1202.69, "2022.07": 1210.44, "2022.08": 1209.64, "2022.09": 1215.85,
-                "2022.10": 1222.74, "2022.11": 1228.50, "2022.12": 1234.63, "2023.01": 1241.52,
-                "2023.02": 1248.99, "2023.03": 1257.24, "2023.04": 1263.73, "2023.05": 1267.85,
-                "2023.06": 1268.06, "2023.07": 1268.91, "2023.08": 1270.23, "2023.09": 1271.96,
-                "2023.10": 1273.51, "2023.11": 1274.15, "2023.12": 1276.05, "2024.01": 1279.38,
-                "2024.02": 1283.86, "2024.03": 1289.02, "2024.04": 1293.40, "2024.05": 1296.85,
-                "2024.06": 1300.47, "2024.07": 1304.94, "2024.08": 1308.67, "2024.09": 1312.83,
-                "2024.10": 1316.78, "2024.11": 1320.84, "2024.12": 1325.18, "2025.01": 1329.46
-            }
-
     def buscar_indice_correcao(self, data: datetime) -> float:
         """Retorna o índice de correção (IGPM ou IPCA) para a data especificada."""
         ref = f"{data.year}.{data.month:02d}"
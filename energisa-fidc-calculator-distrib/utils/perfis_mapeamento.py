@@ -0,0 +1,129 @@
+"""
+Perfis de mapeamento de colunas aprendidos por distribuidora e cabecalho.
+
+Cada arquivo mensal de uma distribuidora costuma chegar com exatamente o
+mesmo cabecalho. O perfil guarda o mapeamento confirmado pelo analista,
+indexado por ``<tipo da distribuidora>:<assinatura do cabecalho>``, onde a
+assinatura e o hash do conjunto de nomes de colunas (a ordem das colunas nao
+importa). Um arquivo com assinatura conhecida recebe o mapeamento na hora,
+sem interacao manual.
+
+Os perfis ficam em ``data/perfis_mapeamento.json`` e sobrevivem a reinicios
+do app. O mesmo arquivo atende o app principal e o v2; cada app passa os
+campos que conhece (``campos``), le so esses campos e, ao gravar, preserva
+os campos do outro app no mesmo perfil.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Collection, Dict, Iterable, Optional
+
+ARQUIVO_PERFIS = "perfis_mapeamento.json"
+VERSAO_PERFIS = 1
+
+
+def _resolver_pasta_perfis() -> Path:
+    return Path(__file__).resolve().parents[1] / "data"
+
+
+def assinatura_colunas(colunas: Iterable) -> str:
+    """Hash do conjunto de nomes de colunas (sem espacos nas pontas, ordem ignorada)."""
+    nomes = sorted(str(coluna).strip() for coluna in colunas)
+    texto = json.dumps(nomes, ensure_ascii=False)
+    return hashlib.blake2b(texto.encode(), digest_size=12).hexdigest()
+
+
+class PerfisMapeamento:
+    """
+    Registro em disco dos mapeamentos confirmados.
+
+    Uso:
+        perfis = PerfisMapeamento()
+        perfis.obter("PADRAO", df.columns)              # {"nome_cliente": "Cliente", ...} ou None
+        perfis.registrar("PADRAO", df.columns, mapeamento)
+        perfis.obter("PADRAO", df.columns, campos=CAMPOS_DO_APP)
+
+    Seguro para chamadas concorrentes (lock + escrita atomica).
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, pasta: Optional[Path] = None):
+        pasta = Path(pasta) if pasta is not None else _resolver_pasta_perfis()
+        self.caminho = pasta / ARQUIVO_PERFIS
+
+    @staticmethod
+    def chave(distribuidora: str, colunas: Iterable) -> str:
+        return f"{distribuidora}:{assinatura_colunas(colunas)}"
+
+    def _ler(self) -> Dict:
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                conteudo = json.load(arquivo)
+        except (OSError, json.JSONDecodeError):
+            return {"versao": VERSAO_PERFIS, "perfis": {}}
+        if conteudo.get("versao") != VERSAO_PERFIS:
+            return {"versao": VERSAO_PERFIS, "perfis": {}}
+        return conteudo
+
+    def _gravar(self, conteudo: Dict) -> None:
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_name(f"{self.caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(conteudo, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho)
+
+    def obter(self, distribuidora: str, colunas: Iterable,
+              campos: Optional[Collection[str]] = None) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Mapeamento salvo para o cabecalho (so os ``campos``, se informados),
+        ou None. Perfis que apontam para colunas inexistentes no arquivo sao
+        ignorados.
+        """
+        colunas = [str(coluna) for coluna in colunas]
+        perfil = self._ler()["perfis"].get(self.chave(distribuidora, colunas))
+        if not perfil:
+            return None
+        mapeamento = perfil.get("mapeamento", {})
+        if campos is not None:
+            mapeamento = {campo: origem for campo, origem in mapeamento.items() if campo in campos}
+        if not mapeamento:
+            return None
+        presentes = set(colunas)
+        if any(origem is not None and origem not in presentes for origem in mapeamento.values()):
+            return None
+        return dict(mapeamento)
+
+    def registrar(self, distribuidora: str, colunas: Iterable, mapeamento: Dict[str, Optional[str]],
+                  campos: Optional[Collection[str]] = None) -> None:
+        """
+        Grava (ou substitui) o perfil do cabecalho; mapeamento vazio nao e
+        gravado. Com ``campos``, so esses campos sao substituidos e os demais
+        do perfil salvo (do outro app) sao mantidos.
+        """
+        if not mapeamento:
+            return
+        colunas = [str(coluna) for coluna in colunas]
+        chave = self.chave(distribuidora, colunas)
+        with self._lock:
+            conteudo = self._ler()
+            anterior = conteudo["perfis"].get(chave, {})
+            if campos is not None:
+                mapeamento = {
+                    **{campo: origem for campo, origem in anterior.get("mapeamento", {}).items()
+                       if campo not in campos},
+                    **mapeamento,
+                }
+            if anterior.get("mapeamento") == mapeamento:
+                return
+            conteudo["perfis"][chave] = {
+                "distribuidora": distribuidora,
+                "colunas": colunas,
+                "mapeamento": dict(mapeamento),
+                "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._gravar(conteudo)
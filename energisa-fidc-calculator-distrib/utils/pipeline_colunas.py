@@ -0,0 +1,160 @@
+"""
+Pipeline de etapas sobre colunas de um unico DataFrame, sem copias por etapa.
+
+Cada etapa declara as colunas que le e as que escreve e altera o frame
+compartilhado in place. A unica copia obrigatoria acontece na entrada do
+pipeline (para nao alterar o DataFrame de quem chamou); etapas que mudam o
+numero de linhas (merge, filtro) declaram ``copia=True`` e devolvem o novo
+frame, que passa a ser o compartilhado.
+
+O ProfilerPipeline mede tempo por etapa. Contar copias exige instrumentar
+``DataFrame.copy`` para o processo inteiro, entao isso fica fora do runtime:
+o benchmark (``benchmark_pipeline_colunas.py``) passa o seu contador em
+``ProfilerPipeline(contar_copias=...)``. Com a variavel de ambiente
+``FIDC_PERFIL_ETAPAS=1``, os calculadores de correcao medem o tempo das
+etapas e publicam o resumo nos seus eventos (``profiler_depuracao``).
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+VARIAVEL_PERFIL_ETAPAS = "FIDC_PERFIL_ETAPAS"
+
+
+class ProfilerPipeline:
+    """
+    Tempo por etapa de um PipelineColunas; com ``contar_copias`` (contexto que
+    entrega um objeto com ``copias`` e ``bytes_copiados``), tambem as copias
+    e os bytes copiados por etapa.
+    """
+
+    def __init__(self, contar_copias: Optional[Callable[[], ContextManager]] = None):
+        self.registros: List[Dict] = []
+        self.contar_copias = contar_copias
+
+    @contextmanager
+    def medir(self, nome: str, registros: int):
+        inicio = time.perf_counter()
+        if self.contar_copias is None:
+            yield
+            copias, bytes_copiados = None, None
+        else:
+            with self.contar_copias() as contador:
+                yield
+            copias, bytes_copiados = contador.copias, contador.bytes_copiados
+        self.registros.append({
+            'etapa': nome,
+            'registros': registros,
+            'segundos': time.perf_counter() - inicio,
+            'copias': copias,
+            'mb_copiados': None if bytes_copiados is None else bytes_copiados / 1024 ** 2,
+        })
+
+    @property
+    def total_copias(self) -> Optional[int]:
+        """Soma das copias por etapa, ou None sem ``contar_copias``."""
+        if self.contar_copias is None:
+            return None
+        return sum(registro['copias'] for registro in self.registros)
+
+    def resumo(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.registros,
+            columns=['etapa', 'registros', 'segundos', 'copias', 'mb_copiados'],
+        )
+
+    def metricas(self) -> Dict[str, str]:
+        """Uma linha formatada por etapa, para ``SinkEventos.resumo``."""
+        metricas = {}
+        for registro in self.registros:
+            texto = f"{registro['segundos']:.3f}s"
+            if registro['copias'] is not None:
+                texto += f", {registro['copias']} copia(s), {registro['mb_copiados']:.1f} MB"
+            metricas[registro['etapa']] = texto
+        return metricas
+
+
+def profiler_depuracao() -> Optional[ProfilerPipeline]:
+    """ProfilerPipeline novo se ``FIDC_PERFIL_ETAPAS`` estiver ligado no ambiente, senao None."""
+    if os.environ.get(VARIAVEL_PERFIL_ETAPAS, "") in ("", "0"):
+        return None
+    return ProfilerPipeline()
+
+
+class EtapaColunas:
+    """
+    Etapa do pipeline.
+
+    funcao(df) altera df in place e retorna df; com ``copia=True`` pode
+    retornar um novo DataFrame (ex.: merge que muda o numero de linhas).
+    ``mensagem`` e repassada ao ``notificar`` do pipeline ao fim da etapa.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        funcao: Callable[[pd.DataFrame], Optional[pd.DataFrame]],
+        le: Iterable[str] = (),
+        escreve: Iterable[str] = (),
+        copia: bool = False,
+        mensagem: Optional[str] = None,
+    ):
+        self.nome = nome
+        self.funcao = funcao
+        self.le = tuple(le)
+        self.escreve = tuple(escreve)
+        self.copia = copia
+        self.mensagem = mensagem
+
+
+class PipelineColunas:
+    """Executa etapas em sequencia sobre um frame compartilhado."""
+
+    def __init__(
+        self,
+        etapas: Iterable[EtapaColunas],
+        profiler: Optional[ProfilerPipeline] = None,
+        notificar: Optional[Callable[[str], None]] = None,
+    ):
+        self.etapas = list(etapas)
+        self.profiler = profiler
+        self.notificar = notificar
+
+    def executar(self, df: pd.DataFrame, copiar_entrada: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Roda todas as etapas. Retorna o frame final, ou None se alguma etapa
+        retornar None (erro ja reportado pela propria etapa).
+        """
+        if copiar_entrada:
+            df = df.copy()
+
+        for etapa in self.etapas:
+            ausentes = [coluna for coluna in etapa.le if coluna not in df.columns]
+            if ausentes:
+                raise KeyError(f"Etapa '{etapa.nome}' requer colunas ausentes: {ausentes}")
+
+            if self.profiler is not None:
+                with self.profiler.medir(etapa.nome, len(df)):
+                    resultado = etapa.funcao(df)
+            else:
+                resultado = etapa.funcao(df)
+
+            if resultado is None:
+                return None
+            if resultado is not df and not etapa.copia:
+                raise RuntimeError(f"Etapa '{etapa.nome}' retornou um novo DataFrame sem declarar copia=True")
+            df = resultado
+
+            faltando = [coluna for coluna in etapa.escreve if coluna not in df.columns]
+            if faltando:
+                raise KeyError(f"Etapa '{etapa.nome}' nao gerou as colunas: {faltando}")
+
+            if etapa.mensagem and self.notificar is not None:
+                self.notificar(etapa.mensagem)
+
+        return df
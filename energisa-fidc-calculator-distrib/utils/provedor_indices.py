@@ -0,0 +1,356 @@
+"""
+Provedor de indices de correcao (IGP-M e IPCA) com cache local em disco.
+
+As series ficam em ``data/series_indices.json`` (versionado pelo campo
+``versao``). Montar os parametros de correcao so le esse arquivo, sem
+acessar a internet; a SIDRA/IBGE e consultada apenas em uma atualizacao
+explicita (``atualizar_da_sidra`` ou ``python atualizar_indices.py``), que
+tambem aceita um arquivo local para funcionar sem rede.
+
+Conteudo do cache:
+    {
+      "versao": 1,
+      "series": {
+        "ipca": {"valores": {"2021.06": 0.53, ...}, "fonte": "...", "atualizado_em": "..."},
+        "igpm": {"valores": {"1994.08": 100.0, ...}, "fonte": "...", "atualizado_em": "..."}
+      }
+    }
+
+O IPCA e guardado como variacao mensal (%), como a SIDRA devolve; o indice
+acumulado e remontado para qualquer valor base, arredondado a 4 casas a
+cada mes como no calculo original. O IGP-M e guardado como numero-indice. Sem cache (ou sem a
+serie no cache), vale a serie embutida; a primeira gravacao do IPCA parte
+das variacoes da serie embutida, entao um arquivo so com os meses recentes
+basta para estender a serie.
+
+Leituras e series montadas ficam memorizadas no processo enquanto o arquivo
+nao muda (chave pela data de modificacao).
+"""
+
+import json
+import os
+import threading
+from itertools import accumulate
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ARQUIVO_SERIES = "series_indices.json"
+VERSAO_SERIES = 1
+SERIES_SUPORTADAS = ("ipca", "igpm")
+INICIO_IPCA = "2021.06"
+VALOR_BASE_IPCA = 1069.29
+
+# IPCA acumulado embutido (base 2021.06 = 1069.29), usado sem cache local.
+# Inclui 2021.06 e 2025.02-2025.04, que faltavam na tabela antiga do app
+# principal (esses meses caiam no indice padrao 1329.46).
+IPCA_ACUMULADO_EMBUTIDO = {
+    "2021.06": 1069.29, "2021.07": 1078.02, "2021.08": 1086.41, "2021.09": 1096.87,
+    "2021.10": 1107.98, "2021.11": 1119.53, "2021.12": 1130.95, "2022.01": 1142.76,
+    "2022.02": 1154.36, "2022.03": 1166.03, "2022.04": 1177.75, "2022.05": 1190.70,
+    "2022.06": 1202.69, "2022.07": 1210.44, "2022.08": 1209.64, "2022.09": 1215.85,
+    "2022.10": 1222.74, "2022.11": 1228.50, "2022.12": 1234.63, "2023.01": 1241.52,
+    "2023.02": 1248.99, "2023.03": 1257.24, "2023.04": 1263.73, "2023.05": 1267.85,
+    "2023.06": 1268.06, "2023.07": 1268.91, "2023.08": 1270.23, "2023.09": 1271.96,
+    "2023.10": 1273.51, "2023.11": 1274.15, "2023.12": 1276.05, "2024.01": 1279.38,
+    "2024.02": 1283.86, "2024.03": 1289.02, "2024.04": 1293.40, "2024.05": 1296.85,
+    "2024.06": 1300.47, "2024.07": 1304.94, "2024.08": 1308.67, "2024.09": 1312.83,
+    "2024.10": 1316.78, "2024.11": 1320.84, "2024.12": 1325.18, "2025.01": 1329.46,
+    "2025.02": 1334.01, "2025.03": 1338.60, "2025.04": 1343.22,
+}
+
+NOMES_COLUNA_PERIODO = ("periodo", "período", "d2c", "mes", "mês", "data", "referencia")
+NOMES_COLUNA_VALOR = ("valor", "v", "variacao", "variação", "indice", "índice", "ipca", "igpm")
+
+
+def _resolver_pasta_series() -> Path:
+    return Path(__file__).resolve().parents[1] / "data"
+
+
+def normalizar_periodos(periodos) -> pd.Series:
+    """
+    Periodos em ``AAAA.MM``. Aceita AAAAMM (texto ou numero), ``AAAA.MM``,
+    ``AAAA-MM``, ``MM/AAAA`` e datas; o que nao for reconhecido vira NaN.
+    """
+    texto = pd.Series(periodos).astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+    datas = pd.to_datetime(texto.where(texto.str.fullmatch(r"\d{6}")), format="%Y%m", errors="coerce")
+
+    partes = texto.str.extract(r"^(\d{4})[./-](\d{1,2})$")
+    ano_mes = pd.to_datetime(partes[0] + "-" + partes[1].str.zfill(2), format="%Y-%m", errors="coerce")
+    datas = datas.fillna(ano_mes)
+
+    partes = texto.str.extract(r"^(\d{1,2})[./-](\d{4})$")
+    mes_ano = pd.to_datetime(partes[1] + "-" + partes[0].str.zfill(2), format="%Y-%m", errors="coerce")
+    datas = datas.fillna(mes_ano)
+
+    restantes = datas.isna()
+    if restantes.any():
+        datas[restantes] = pd.to_datetime(texto[restantes], errors="coerce", dayfirst=True)
+    return datas.dt.strftime("%Y.%m")
+
+
+def ipca_acumulado(variacoes: Dict[str, float], valor_base: float = VALOR_BASE_IPCA) -> Dict[str, float]:
+    """
+    Indice IPCA acumulado a partir das variacoes mensais (%).
+
+    O primeiro mes recebe ``valor_base`` e cada mes seguinte aplica a
+    variacao do mes anterior, arredondando a 4 casas a cada passo (mesmos
+    valores do calculo original com a SIDRA):
+    ``indice[k] = round(indice[k-1] * (1 + v[k-1]/100), 4)``. A serie vai ate
+    o mes seguinte a ultima variacao e para no primeiro mes sem variacao
+    anterior (buraco na serie).
+    """
+    if not variacoes:
+        return {}
+    serie = pd.Series(variacoes, dtype=float).sort_index()
+    meses = pd.PeriodIndex(pd.to_datetime(serie.index, format="%Y.%m"), freq="M")
+    serie.index = meses
+    serie = serie.reindex(pd.period_range(meses.min(), meses.max() + 1, freq="M"))
+
+    fatores = 1 + serie.to_numpy()[:-1] / 100
+    fatores = np.concatenate(([1.0], fatores))
+    faltantes = np.isnan(fatores)
+    if faltantes.any():
+        corte = int(np.argmax(faltantes))
+        fatores = fatores[:corte]
+
+    # O arredondamento de cada mes entra no seguinte, entao o produto e
+    # sequencial (poucas dezenas de meses); os fatores seguem vetorizados
+    acumulado = list(accumulate(fatores[1:].tolist(), lambda nivel, fator: round(nivel * fator, 4),
+                                initial=valor_base))
+    rotulos = serie.index[:len(acumulado)].strftime("%Y.%m")
+    return dict(zip(rotulos, acumulado))
+
+
+def variacoes_ipca_embutidas() -> Dict[str, float]:
+    """Variacoes mensais (%) que remontam ``IPCA_ACUMULADO_EMBUTIDO`` (o ultimo mes fica sem variacao)."""
+    niveis = pd.Series(IPCA_ACUMULADO_EMBUTIDO, dtype=float).sort_index()
+    variacoes = (niveis.shift(-1) / niveis - 1) * 100
+    return variacoes.dropna().to_dict()
+
+
+class ProvedorIndices:
+    """
+    Series de IGP-M e IPCA do cache local, com atualizacao sob demanda.
+
+    Uso:
+        provedor = obter_provedor_indices()
+        provedor.ipca_acumulado(1069.29)     # {"2021.06": 1069.29, ...}
+        provedor.igpm()                      # {"1994.08": 100.0, ...} ou None sem cache
+        provedor.atualizar_da_sidra()        # rede
+        provedor.atualizar_de_arquivo("ipca.csv", "ipca")   # sem rede
+
+    Seguro para chamadas concorrentes (lock + escrita atomica).
+    """
+
+    def __init__(self, pasta: Optional[Path] = None):
+        pasta = Path(pasta) if pasta is not None else _resolver_pasta_series()
+        self.caminho = pasta / ARQUIVO_SERIES
+        self._lock = threading.Lock()
+        self._conteudo: Optional[Tuple[Optional[int], Dict]] = None
+        self._acumulados: Dict[Tuple[Optional[int], float], Dict[str, float]] = {}
+
+    def _versao_arquivo(self) -> Optional[int]:
+        try:
+            return self.caminho.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _ler(self) -> Tuple[Optional[int], Dict]:
+        """Conteudo do cache, relido so quando o arquivo muda."""
+        versao = self._versao_arquivo()
+        with self._lock:
+            if self._conteudo is not None and self._conteudo[0] == versao:
+                return self._conteudo
+        conteudo = {"versao": VERSAO_SERIES, "series": {}}
+        if versao is not None:
+            try:
+                with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                    lido = json.load(arquivo)
+                if lido.get("versao") == VERSAO_SERIES:
+                    conteudo = lido
+            except (OSError, ValueError):
+                pass
+        with self._lock:
+            self._conteudo = (versao, conteudo)
+            self._acumulados.clear()
+        return self._conteudo
+
+    def _gravar(self, conteudo: Dict) -> None:
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_name(f"{self.caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(conteudo, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho)
+
+    def serie(self, nome: str) -> Optional[Dict[str, float]]:
+        """Valores guardados da serie (variacoes do IPCA, indices do IGP-M), ou None."""
+        valores = self._ler()[1]["series"].get(nome, {}).get("valores")
+        return dict(valores) if valores else None
+
+    def descricao(self) -> Dict[str, Dict]:
+        """Fonte, data de atualizacao e periodo de cada serie do cache."""
+        descricao = {}
+        for nome, dados in self._ler()[1]["series"].items():
+            periodos = sorted(dados.get("valores", {}))
+            descricao[nome] = {
+                "fonte": dados.get("fonte"),
+                "atualizado_em": dados.get("atualizado_em"),
+                "inicio": periodos[0] if periodos else None,
+                "fim": periodos[-1] if periodos else None,
+            }
+        return descricao
+
+    def igpm(self) -> Optional[Dict[str, float]]:
+        """IGP-M do cache, ou None (quem chama usa a serie embutida)."""
+        return self.serie("igpm")
+
+    def ipca_acumulado(self, valor_base: float = VALOR_BASE_IPCA) -> Dict[str, float]:
+        """IPCA acumulado desde 2021.06 (cache local, ou serie embutida); cada chamada recebe sua copia."""
+        versao, conteudo = self._ler()
+        chave = (versao, float(valor_base))
+        with self._lock:
+            serie = self._acumulados.get(chave)
+        if serie is None:
+            variacoes = conteudo["series"].get("ipca", {}).get("valores")
+            if variacoes:
+                serie = ipca_acumulado(variacoes, valor_base)
+            else:
+                fator = float(valor_base) / VALOR_BASE_IPCA
+                serie = {mes: round(valor * fator, 4) for mes, valor in IPCA_ACUMULADO_EMBUTIDO.items()}
+            with self._lock:
+                self._acumulados[chave] = serie
+        return dict(serie)
+
+    def guardar_serie(self, nome: str, valores: Dict[str, float], fonte: str) -> int:
+        """
+        Mescla ``valores`` na serie do cache (periodos novos substituem os
+        antigos) e grava o arquivo. Devolve o numero de periodos da serie.
+        """
+        if nome not in SERIES_SUPORTADAS:
+            raise ValueError(f"Serie desconhecida: {nome} (use {', '.join(SERIES_SUPORTADAS)})")
+        valores = {str(mes): float(valor) for mes, valor in valores.items() if pd.notna(valor)}
+        if not valores:
+            raise ValueError(f"Nenhum valor valido para a serie {nome}.")
+
+        with self._lock:
+            conteudo = self._ler_sem_memoria()
+            atual = conteudo["series"].get(nome, {}).get("valores")
+            if not atual:
+                atual = variacoes_ipca_embutidas() if nome == "ipca" else {}
+            mesclado = dict(sorted({**atual, **valores}.items()))
+            conteudo["series"][nome] = {
+                "valores": mesclado,
+                "fonte": fonte,
+                "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._gravar(conteudo)
+        return len(mesclado)
+
+    def _ler_sem_memoria(self) -> Dict:
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                conteudo = json.load(arquivo)
+        except (OSError, ValueError):
+            return {"versao": VERSAO_SERIES, "series": {}}
+        if conteudo.get("versao") != VERSAO_SERIES:
+            return {"versao": VERSAO_SERIES, "series": {}}
+        return conteudo
+
+    def atualizar_da_sidra(self, fim: Optional[str] = None) -> int:
+        """Baixa as variacoes mensais do IPCA (tabela 1737) desde 2021.06 e grava no cache."""
+        # Importacao adiada: sidrapy (e requests) so na atualizacao
+        import sidrapy
+
+        fim = fim or datetime.today().strftime("%Y%m")
+        df = sidrapy.get_table(
+            table_code="1737",
+            territorial_level="1",
+            ibge_territorial_code="all",
+            variable="63",
+            period=f"{INICIO_IPCA.replace('.', '')}-{fim}",
+            format="pandas"
+        )[['D2C', 'V']][1:]
+
+        periodos = normalizar_periodos(df["D2C"])
+        variacoes = pd.to_numeric(df["V"], errors="coerce")
+        return self.guardar_serie("ipca", dict(zip(periodos, variacoes)), fonte="SIDRA/IBGE tabela 1737")
+
+    def atualizar_de_arquivo(self, caminho, serie: str = "ipca") -> Dict[str, int]:
+        """
+        Atualiza o cache a partir de um arquivo local, sem rede:
+
+        - ``.json`` no formato deste cache (ex.: copiado de outra maquina):
+          todas as series do arquivo sao mescladas;
+        - ``.csv``/``.xlsx``/``.xls`` com uma coluna de periodo e uma de
+          valor (variacao mensal em % para ``ipca``, numero-indice para ``igpm``).
+
+        Devolve o numero de periodos de cada serie atualizada.
+        """
+        caminho = Path(caminho)
+        fonte = f"arquivo local {caminho.name}"
+
+        if caminho.suffix.lower() == ".json":
+            with open(caminho, "r", encoding="utf-8") as arquivo:
+                conteudo = json.load(arquivo)
+            if conteudo.get("versao") != VERSAO_SERIES:
+                raise ValueError(f"Versao de cache incompativel: {conteudo.get('versao')} (esperada {VERSAO_SERIES}).")
+            return {
+                nome: self.guardar_serie(nome, dados.get("valores", {}), dados.get("fonte") or fonte)
+                for nome, dados in conteudo.get("series", {}).items()
+                if nome in SERIES_SUPORTADAS
+            }
+
+        return {serie: self.guardar_serie(serie, ler_serie_tabular(caminho), fonte)}
+
+
+def _escolher_coluna(colunas, nomes, padrao):
+    por_nome = {str(coluna).strip().lower(): coluna for coluna in colunas}
+    for nome in nomes:
+        if nome in por_nome:
+            return por_nome[nome]
+    return padrao
+
+
+def ler_serie_tabular(caminho) -> Dict[str, float]:
+    """``{AAAA.MM: valor}`` de um CSV/Excel com colunas de periodo e valor."""
+    caminho = Path(caminho)
+    if caminho.suffix.lower() in (".xlsx", ".xls"):
+        from .leitor_excel import ler_excel
+        df = ler_excel(caminho)
+    else:
+        df = pd.read_csv(caminho, sep=None, engine="python", dtype=str)
+
+    if df.shape[1] < 2:
+        raise ValueError("O arquivo precisa de uma coluna de periodo e uma de valor.")
+    coluna_periodo = _escolher_coluna(df.columns, NOMES_COLUNA_PERIODO, df.columns[0])
+    coluna_valor = _escolher_coluna(df.columns, NOMES_COLUNA_VALOR, df.columns[1])
+
+    valores = df[coluna_valor]
+    if valores.dtype == object:
+        # Formato brasileiro: "1.234,56" -> 1234.56
+        texto = valores.astype(str).str.strip()
+        decimal_virgula = texto.str.contains(",", regex=False)
+        texto = texto.where(~decimal_virgula, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        valores = texto
+    valores = pd.to_numeric(valores, errors="coerce")
+
+    periodos = normalizar_periodos(df[coluna_periodo])
+    validos = periodos.notna().to_numpy() & valores.notna().to_numpy()
+    return dict(zip(periodos[validos], valores[validos]))
+
+
+_provedor_global: Optional[ProvedorIndices] = None
+_lock_global = threading.Lock()
+
+
+def obter_provedor_indices() -> ProvedorIndices:
+    """Provedor do processo, compartilhado entre sessoes."""
+    global _provedor_global
+    with _lock_global:
+        if _provedor_global is None:
+            _provedor_global = ProvedorIndices()
+        return _provedor_global
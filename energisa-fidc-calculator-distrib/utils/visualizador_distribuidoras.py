@@ -7,7 +7,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
-from .exportacao_csv_brasil import salvar_csv_brasil
+from .cubo_agregados import obter_cubo
+from .exportacao_csv_brasil import colunas_exportacao, salvar_csv_brasil_em_blocos
+from .visualizador_paginado import exibir_resultado_paginado, ordenar_colunas
 
 
 class VisualizadorDistribuidoras:
@@ -201,12 +203,10 @@ class VisualizadorDistribuidoras:
             if col in df_final.columns:
                 colunas_groupby.append(col)
         
-        df_agg1 = (
-            df_final
-            .groupby(colunas_groupby, dropna=False)
-            .agg(colunas_agg_1)
-            .reset_index()
-        )
+        # Todas as visões derivam do cubo de agregados (calculado uma vez por resultado)
+        cubo = obter_cubo(df_final)
+        
+        df_agg1 = cubo.agregar(colunas_groupby, colunas_agg_1)
         
         df_agg1['aging'] = pd.Categorical(df_agg1['aging'], categories=self.ordem_aging, ordered=True)
         df_agg1 = df_agg1.sort_values(['empresa'] + [col for col in colunas_opcionais if col in df_agg1.columns] + ['aging'])
@@ -217,12 +217,7 @@ class VisualizadorDistribuidoras:
         st.subheader("🎯 Agrupamento Consolidado - Por Empresa e Aging")
         st.caption("Valores consolidados por empresa e faixa de aging, incluindo valor principal, líquido, corrigido, recuperável e valor justo")
         
-        df_agg2 = (
-            df_final
-            .groupby(['empresa', 'aging', 'aging_taxa'], dropna=False)
-            .agg(colunas_agg_1)
-            .reset_index()
-        )
+        df_agg2 = cubo.agregar(['empresa', 'aging', 'aging_taxa'], colunas_agg_1)
         
         df_agg2['aging'] = pd.Categorical(df_agg2['aging'], categories=self.ordem_aging, ordered=True)
         df_agg2 = df_agg2.sort_values(['empresa'])
@@ -233,12 +228,7 @@ class VisualizadorDistribuidoras:
         st.subheader("📈 Agrupamento Geral - Por Aging e Taxa de Recuperação")
         st.caption("Visão consolidada geral agrupada apenas por faixa de aging, mostrando totais gerais incluindo valor justo")
         
-        df_agg3 = (
-            df_final
-            .groupby(['aging_taxa'], dropna=False)
-            .agg(colunas_agg_1)
-            .reset_index()
-        )
+        df_agg3 = cubo.agregar(['aging_taxa'], colunas_agg_1)
         
         st.dataframe(df_agg3, use_container_width=True, hide_index=True)
     
@@ -266,12 +256,7 @@ class VisualizadorDistribuidoras:
             colunas_resumo_empresa['valor_justo_reajustado'] = 'sum'
             colunas_resumo_empresa['desconto_aging_valor'] = 'sum'
         
-        df_resumo_empresa = (
-            df_final
-            .groupby('empresa', dropna=False)
-            .agg(colunas_resumo_empresa)
-            .reset_index()
-        )
+        df_resumo_empresa = obter_cubo(df_final).agregar(['empresa'], colunas_resumo_empresa)
         
         # Ordenar por empresa
         df_resumo_empresa = df_resumo_empresa.sort_values('empresa')
@@ -381,7 +366,7 @@ class VisualizadorDistribuidoras:
         - **Conteúdo:** Todos os registros processados com aging, correção monetária, taxa de recuperação e valor justo com DI-PRE
         
         **💡 Opções de exportação:**
-        - **📋 Preview:** Mostra 10 linhas para validar formato
+        - **📋 Preview:** Navegação página a página por todos os registros, com ordenação e seleção de colunas
         - **💾 Completo:** Salva todos os dados na pasta 'data'
         """)
         
@@ -404,16 +389,8 @@ class VisualizadorDistribuidoras:
             'valor_justo_reajustado', 'desconto_aging_perc', 'desconto_aging_valor'
         ]
         
-        preview_df = df_final.head(10).copy()
-        
-        # Identificar colunas que existem na ordem especificada
-        colunas_existentes = [col for col in colunas_ordem_usuario if col in preview_df.columns]
-        colunas_restantes = [col for col in preview_df.columns if col not in colunas_ordem_usuario]
-        
-        # Reordenar DataFrame conforme especificação do usuário
-        preview_df = preview_df[colunas_existentes + colunas_restantes]
-        
-        st.dataframe(preview_df, use_container_width=True, hide_index=True)
+        # Pagina a pagina: o navegador recebe so a janela visivel, nunca o resultado inteiro
+        exibir_resultado_paginado(df_final, "exportacao_distribuidoras", colunas_ordem=colunas_ordem_usuario, tamanho_pagina=50)
         
         # Botão para exportar dados completos
         if st.button("💾 Salvar Dados Completos na Pasta 'data'", type="primary", use_container_width=True, key="salvar_dados_distribuidoras"):
@@ -423,20 +400,17 @@ class VisualizadorDistribuidoras:
                 nome_arquivo = f"FIDC_Dados_Finais_{timestamp}.csv"
                 caminho_arquivo = f"data/{nome_arquivo}"
                 
-                # Reordenar DataFrame completo
-                df_export = df_final.copy()
-                colunas_existentes_completo = [col for col in colunas_ordem_usuario if col in df_export.columns]
-                colunas_restantes_completo = [col for col in df_export.columns if col not in colunas_ordem_usuario]
-                df_export = df_export[colunas_existentes_completo + colunas_restantes_completo]
-                
-                # Salvar arquivo no formato brasileiro com truncamento para 2 casas
-                df_export = salvar_csv_brasil(df_export, caminho_arquivo, casas_decimais=4)
+                # Ordem de colunas aplicada bloco a bloco na escrita (sem copiar o DataFrame completo)
+                colunas_export = ordenar_colunas(list(df_final.columns), colunas_ordem_usuario)
+
+                # Salvar arquivo no formato brasileiro com truncamento (4 casas; 8 para valores em (-1, 1))
+                registros = salvar_csv_brasil_em_blocos(df_final, caminho_arquivo, casas_decimais=4, colunas=colunas_export)
                 
                 st.success(f"✅ **Dados salvos com sucesso!**")
                 st.info(f"📄 **Arquivo:** `{nome_arquivo}`")
                 st.info(f"📂 **Local:** `{caminho_arquivo}`")
-                st.info(f"📊 **Registros:** {len(df_export):,}")
-                st.info(f"📋 **Colunas:** {len(df_export.columns)}")
+                st.info(f"📊 **Registros:** {registros:,}")
+                st.info(f"📋 **Colunas:** {len(colunas_exportacao(colunas_export))}")
                 
             except Exception as e:
                 st.error(f"❌ Erro ao salvar arquivo: {str(e)}")
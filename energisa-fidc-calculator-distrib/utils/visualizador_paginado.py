@@ -0,0 +1,175 @@
+"""
+Visualizacao paginada do resultado final.
+
+O navegador recebe apenas a pagina atual (janela de linhas x colunas
+escolhidas); o DataFrame completo nunca e serializado. A ordenacao usa um
+argsort calculado uma unica vez por coluna e sentido e guardado em cache,
+entao trocar de pagina custa o mesmo para 10 mil ou 3 milhoes de linhas.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .cache_dataframes import CachePorDataFrame
+
+TAMANHOS_PAGINA = (50, 100, 200, 500)
+TAMANHO_PAGINA_PADRAO = 100
+SEM_ORDENACAO = "(ordem original)"
+
+
+def ordenar_colunas(colunas: Sequence[str], colunas_ordem: Optional[Sequence[str]] = None) -> List[str]:
+    """Colunas de ``colunas_ordem`` presentes (na ordem dada) seguidas das demais."""
+    if not colunas_ordem:
+        return list(colunas)
+    presentes = set(colunas)
+    primeiras = [coluna for coluna in colunas_ordem if coluna in presentes]
+    ja_incluidas = set(primeiras)
+    return primeiras + [coluna for coluna in colunas if coluna not in ja_incluidas]
+
+
+class PaginadorResultado:
+    """
+    Fatias de um DataFrame por pagina, com projecao de colunas e ordenacao.
+
+    Uso:
+        paginador = PaginadorResultado(df_final)
+        paginador.pagina(3, 100, colunas=['empresa', 'valor_justo'], ordenar_por='valor_justo')
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._ordens: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    @property
+    def registros(self) -> int:
+        return len(self.df)
+
+    def total_paginas(self, tamanho_pagina: int) -> int:
+        return max((self.registros + tamanho_pagina - 1) // tamanho_pagina, 1)
+
+    def ordem(self, coluna: str, ascendente: bool = True) -> np.ndarray:
+        """
+        Posicoes das linhas ordenadas por ``coluna`` (nulos sempre no fim),
+        calculadas uma vez por coluna e sentido.
+        """
+        chave = (coluna, ascendente)
+        posicoes = self._ordens.get(chave)
+        if posicoes is None:
+            serie = self.df[coluna]
+            if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie):
+                valores = serie
+            else:
+                # Texto/misto: codigos do factorize ordenado (comparacao entre inteiros)
+                codigos, _ = pd.factorize(serie.astype(str).where(serie.notna()), sort=True)
+                valores = pd.Series(np.where(codigos < 0, np.nan, codigos))
+            posicoes = np.asarray(
+                valores.reset_index(drop=True)
+                .sort_values(ascending=ascendente, kind="stable", na_position="last")
+                .index,
+                dtype=np.int64,
+            )
+            self._ordens[chave] = posicoes
+        return posicoes
+
+    def pagina(
+        self,
+        numero: int,
+        tamanho_pagina: int = TAMANHO_PAGINA_PADRAO,
+        colunas: Optional[Sequence[str]] = None,
+        ordenar_por: Optional[str] = None,
+        ascendente: bool = True,
+    ) -> pd.DataFrame:
+        """Linhas da pagina ``numero`` (1..total_paginas), so com ``colunas``."""
+        numero = min(max(int(numero), 1), self.total_paginas(tamanho_pagina))
+        inicio = (numero - 1) * tamanho_pagina
+        fim = min(inicio + tamanho_pagina, self.registros)
+
+        if ordenar_por:
+            linhas = self.ordem(ordenar_por, ascendente)[inicio:fim]
+        else:
+            linhas = slice(inicio, fim)
+
+        # Linhas primeiro: iloc[linhas, colunas] faria o take das colunas na base inteira
+        pagina = self.df.iloc[linhas]
+        return pagina if colunas is None else pagina[list(colunas)]
+
+
+_cache_paginadores: CachePorDataFrame[PaginadorResultado] = CachePorDataFrame()
+
+
+def obter_paginador(df: pd.DataFrame) -> PaginadorResultado:
+    """
+    Paginador do DataFrame, reaproveitado (com as ordenacoes ja calculadas)
+    enquanto o mesmo objeto estiver vivo e com as mesmas linhas/colunas.
+    """
+    return _cache_paginadores.obter(df, PaginadorResultado)
+
+
+def exibir_resultado_paginado(
+    df: pd.DataFrame,
+    chave: str,
+    colunas_ordem: Optional[Sequence[str]] = None,
+    tamanho_pagina: int = TAMANHO_PAGINA_PADRAO,
+    altura: int = 420,
+) -> None:
+    """
+    Tabela paginada com selecao de colunas, ordenacao e navegacao.
+    ``chave`` prefixa as chaves dos widgets (varias tabelas na mesma pagina).
+    """
+    if df is None or df.empty:
+        st.info("Nenhum registro para exibir.")
+        return
+
+    paginador = obter_paginador(df)
+    colunas = ordenar_colunas(list(df.columns), colunas_ordem)
+
+    col_colunas, col_ordem, col_sentido, col_tamanho = st.columns([4, 2, 1, 1])
+    with col_colunas:
+        colunas_exibidas = st.multiselect(
+            "Colunas",
+            colunas,
+            default=colunas,
+            key=f"{chave}_colunas",
+        ) or colunas
+    with col_ordem:
+        ordenar_por = st.selectbox("Ordenar por", [SEM_ORDENACAO] + colunas, key=f"{chave}_ordenar_por")
+    with col_sentido:
+        ascendente = st.radio("Sentido", ["↑", "↓"], horizontal=True, key=f"{chave}_sentido") == "↑"
+    with col_tamanho:
+        opcoes_tamanho = sorted(set(TAMANHOS_PAGINA) | {tamanho_pagina})
+        tamanho = st.selectbox(
+            "Linhas",
+            opcoes_tamanho,
+            index=opcoes_tamanho.index(tamanho_pagina),
+            key=f"{chave}_tamanho",
+        )
+
+    total_paginas = paginador.total_paginas(tamanho)
+    numero = st.number_input(
+        "Página",
+        min_value=1,
+        max_value=total_paginas,
+        value=1,
+        step=1,
+        key=f"{chave}_pagina",
+    )
+
+    pagina = paginador.pagina(
+        numero,
+        tamanho,
+        colunas=colunas_exibidas,
+        ordenar_por=None if ordenar_por == SEM_ORDENACAO else ordenar_por,
+        ascendente=ascendente,
+    )
+    st.dataframe(pagina, use_container_width=True, hide_index=True, height=altura)
+
+    numero = min(int(numero), total_paginas)
+    inicio = (numero - 1) * tamanho
+    st.caption(
+        f"Página {numero:,} de {total_paginas:,} · "
+        f"linhas {inicio + 1:,}–{inicio + len(pagina):,} de {paginador.registros:,} · "
+        f"{len(colunas_exibidas)} de {len(colunas)} colunas"
+    )
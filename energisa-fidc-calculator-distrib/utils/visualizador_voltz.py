@@ -7,7 +7,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from .checkpoint_manager import checkpoint_manager
-from .exportacao_csv_brasil import salvar_csv_brasil
+from .cubo_agregados import obter_cubo
+from .exportacao_csv_brasil import colunas_exportacao, salvar_csv_brasil_em_blocos
+from .visualizador_paginado import exibir_resultado_paginado, ordenar_colunas
 
 
 class VisualizadorVoltz:
@@ -188,12 +190,9 @@ class VisualizadorVoltz:
             colunas_groupby.append('aging_taxa')
         
         # Criar agrupamento
-        df_agg = (
-            df_final
-            .groupby(colunas_groupby, dropna=False)
-            .agg(colunas_agg)
-            .reset_index()
-        )
+        # Visões derivadas do cubo de agregados (calculado uma vez por resultado)
+        cubo = obter_cubo(df_final)
+        df_agg = cubo.agregar(colunas_groupby, colunas_agg)
         
         # Ordenar se tiver aging
         if 'aging' in df_agg.columns:
@@ -208,12 +207,7 @@ class VisualizadorVoltz:
         if 'aging_taxa' in df_final.columns:
             st.subheader("🎯 Consolidado por Aging - VOLTZ")
             
-            df_agg_aging = (
-                df_final
-                .groupby(['aging_taxa'], dropna=False)
-                .agg(colunas_agg)
-                .reset_index()
-            )
+            df_agg_aging = cubo.agregar(['aging_taxa'], colunas_agg)
             
             st.dataframe(df_agg_aging, use_container_width=True, hide_index=True)
     
@@ -249,12 +243,7 @@ class VisualizadorVoltz:
             colunas_resumo['valor_recuperavel_ate_data_base'] = 'sum'
         
         # Criar resumo por empresa
-        df_resumo = (
-            df_final
-            .groupby('empresa', dropna=False)
-            .agg(colunas_resumo)
-            .reset_index()
-        )
+        df_resumo = obter_cubo(df_final).agregar(['empresa'], colunas_resumo)
         
         # Formatação para exibição
         df_display = df_resumo.copy()
@@ -400,14 +389,8 @@ class VisualizadorVoltz:
         ]
         
         # Preview dos dados
-        preview_df = df_final.head(10).copy()
-        
-        # Reordenar conforme especificação VOLTZ
-        colunas_existentes = [col for col in colunas_ordem_voltz if col in preview_df.columns]
-        colunas_restantes = [col for col in preview_df.columns if col not in colunas_ordem_voltz]
-        preview_df = preview_df[colunas_existentes + colunas_restantes]
-        
-        st.dataframe(preview_df, use_container_width=True, hide_index=True)
+        # Pagina a pagina: o navegador recebe so a janela visivel, nunca o resultado inteiro
+        exibir_resultado_paginado(df_final, "exportacao_voltz", colunas_ordem=colunas_ordem_voltz, tamanho_pagina=50)
         
         # Botão para salvar
         if st.button("💾 Salvar Dados VOLTZ Completos", type="primary", use_container_width=True, key="salvar_dados_voltz"):
@@ -417,20 +400,17 @@ class VisualizadorVoltz:
                 nome_arquivo = f"FIDC_VOLTZ_Dados_Finais_{timestamp}.csv"
                 caminho_arquivo = f"data/{nome_arquivo}"
                 
-                # Reordenar DataFrame completo
-                df_export = df_final.copy()
-                colunas_existentes_completo = [col for col in colunas_ordem_voltz if col in df_export.columns]
-                colunas_restantes_completo = [col for col in df_export.columns if col not in colunas_ordem_voltz]
-                df_export = df_export[colunas_existentes_completo + colunas_restantes_completo]
-                
-                # Salvar arquivo no formato brasileiro com truncamento para 2 casas
-                df_export = salvar_csv_brasil(df_export, caminho_arquivo, casas_decimais=4)
+                # Ordem de colunas aplicada bloco a bloco na escrita (sem copiar o DataFrame completo)
+                colunas_export = ordenar_colunas(list(df_final.columns), colunas_ordem_voltz)
+
+                # Salvar arquivo no formato brasileiro com truncamento (4 casas; 8 para valores em (-1, 1))
+                registros = salvar_csv_brasil_em_blocos(df_final, caminho_arquivo, casas_decimais=4, colunas=colunas_export)
                 
                 st.success(f"✅ **Dados VOLTZ salvos com sucesso!**")
                 st.info(f"📄 **Arquivo:** `{nome_arquivo}`")
                 st.info(f"📂 **Local:** `{caminho_arquivo}`")
-                st.info(f"📊 **Registros:** {len(df_export):,}")
-                st.info(f"📋 **Colunas:** {len(df_export.columns)}")
+                st.info(f"📊 **Registros:** {registros:,}")
+                st.info(f"📋 **Colunas:** {len(colunas_exportacao(colunas_export))}")
                 
             except Exception as e:
                 st.error(f"❌ Erro ao salvar arquivo: {str(e)}")
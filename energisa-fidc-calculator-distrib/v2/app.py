@@ -13,8 +13,11 @@ Como rodar:
 """
 
 import gc
+import os
+import tempfile
 import time
 from datetime import date, datetime
+from uuid import uuid4
 
 import numpy as np
 import pandas as pd
@@ -53,9 +56,32 @@ def _cur(v: float) -> str:
 def _pct(v: float) -> str:
     return f"{v * 100:.2f}%"
 
+def _upload_content(up_file) -> tuple[bytes, str]:
+    """Bytes e hash do upload; o hash é calculado uma vez por upload (file_id)."""
+    file_id = getattr(up_file, "file_id", None) or (up_file.name, up_file.size)
+    digest = st.session_state.upload_digests.get(file_id)
+    if digest is None:
+        data, digest = eng.read_with_hash(up_file)
+        st.session_state.upload_digests[file_id] = digest
+        return data, digest
+    return up_file.getvalue(), digest
+
+def _load_key(name: str, digest: str, mapping: dict) -> tuple:
+    return (name, digest, tuple(sorted(set(mapping.values()))))
+
+def _full_load(name: str, data: bytes, digest: str, mapping: dict):
+    """Carga completa (só as colunas mapeadas), iniciada uma vez por arquivo e mapeamento."""
+    key = _load_key(name, digest, mapping)
+    loads = st.session_state.full_loads
+    if key not in loads:
+        loads[key] = eng.start_full_load(name, data, list(key[2]), digest=digest)
+    return loads[key]
+
 def _init_state():
     defaults = {
-        "files_data":        [],   # list of {name, df_raw, mapping}
+        "files_data":        [],   # list of {name, df_raw (amostra), rows, data, mapping}
+        "full_loads":        {},   # (nome, hash, colunas) -> CargaPlanilha da carga completa
+        "upload_digests":    {},   # file_id do upload -> hash do conteúdo
         "df_taxa":           None,
         "df_di_pre":         None,
         "df_indices_excel":  None,
@@ -64,6 +90,10 @@ def _init_state():
         "df_result":         None,
         "summary":           None,
         "calc_done":         False,
+        "run_id":            None,  # identifica o cálculo; arquivos exportados valem por execução
+        "run_ts":            None,  # data/hora do cálculo, usada nos nomes dos arquivos baixados
+        "exports":           {},    # tipo -> {run_id, path, stats} (arquivos temporários em disco)
+        "export_dir":        None,  # TemporaryDirectory da sessão com os arquivos exportados
         "params": {
             "data_base":        date.today().strftime("%Y-%m-%d"),
             "spread_percent":   0.025,
@@ -78,6 +108,74 @@ def _init_state():
 
 _init_state()
 
+_ST_VERSION = tuple(int(p) for p in st.__version__.split(".")[:2])
+
+def _export_dir() -> str:
+    """
+    Pasta temporária das exportações desta sessão. É apagada com tudo dentro
+    quando a sessão termina (o Streamlit descarta o session_state e o
+    TemporaryDirectory é coletado) ou quando o servidor encerra.
+    """
+    if st.session_state.export_dir is None:
+        st.session_state.export_dir = tempfile.TemporaryDirectory(prefix="fidc_v2_")
+    return st.session_state.export_dir.name
+
+def _export_file(kind: str, suffix: str, spinner: str, write) -> dict:
+    """
+    Arquivo de exportação da execução atual, gravado em disco uma única vez.
+
+    ``write(path)`` grava o arquivo (e pode retornar estatísticas). Reruns e
+    cliques repetidos reaproveitam o arquivo; um novo cálculo apaga o anterior.
+    """
+    exports = st.session_state.exports
+    cached = exports.get(kind)
+    if cached and cached["run_id"] == st.session_state.run_id and os.path.exists(cached["path"]):
+        return cached
+
+    if cached:
+        _remove_export(exports.pop(kind))
+
+    with st.spinner(spinner):
+        fd, path = tempfile.mkstemp(prefix="fidc_resultado_", suffix=suffix, dir=_export_dir())
+        os.close(fd)
+        try:
+            t0 = time.perf_counter()
+            stats = write(path) or {}
+            stats.setdefault("seconds", time.perf_counter() - t0)
+            stats.setdefault("size_mb", os.path.getsize(path) / 1024 ** 2)
+        except Exception:
+            os.remove(path)
+            raise
+    exports[kind] = {"run_id": st.session_state.run_id, "path": path, "stats": stats}
+    return exports[kind]
+
+def _remove_export(export: dict):
+    """Apaga o arquivo temporário de uma exportação (se ainda existir)."""
+    try:
+        os.remove(export["path"])
+    except FileNotFoundError:
+        pass
+
+def _discard_exports():
+    """Apaga os arquivos exportados da execução anterior (novo cálculo)."""
+    for export in st.session_state.exports.values():
+        _remove_export(export)
+    st.session_state.exports = {}
+
+def _file_download_button(label: str, export: dict, file_name: str, mime: str):
+    """Botão de download lido do arquivo em disco (sem montar o conteúdo em BytesIO)."""
+    # Streamlit >= 1.35: on_click="ignore" evita reexecutar o script a cada clique
+    extra = {"on_click": "ignore"} if _ST_VERSION >= (1, 35) else {}
+    with open(export["path"], "rb") as fh:
+        st.download_button(
+            label=label,
+            data=fh,
+            file_name=file_name,
+            mime=mime,
+            use_container_width=True,
+            **extra,
+        )
+
 # ══════════════════════════════════════════════════════════════════════
 # TABS
 # ══════════════════════════════════════════════════════════════════════
@@ -123,33 +221,46 @@ with tab_upload:
 
         new_files_data = []
 
-        for up_file in uploaded:
+        # Fase 1: cabeçalho + amostra de cada arquivo (não depende do tamanho).
+        # A base completa é lida em segundo plano quando o mapeamento é confirmado.
+        # Leituras ficam no cache do processo pelo hash do conteúdo: reruns, o
+        # mesmo arquivo com outro nome e outras sessões não releem o arquivo.
+        t_read = time.time()
+        reads = {}  # fkey -> (upload, bytes, hash, leitura); mesmo nome e conteúdo = mesmo arquivo
+        for f in uploaded:
+            data, digest = _upload_content(f)
+            fkey = f"{f.name}_{digest[:8]}"  # conteúdo novo com o mesmo nome = arquivo novo
+            if fkey not in reads:
+                reads[fkey] = (f, data, digest, eng.read_uploaded_sample(f.name, data, digest=digest))
+        st.caption(
+            f"⏱️ Leitura dos cabeçalhos: {time.time() - t_read:.2f}s no total · "
+            + " · ".join(
+                f"{info['name']} " + ("em cache" if info.get("cached") else f"{info['seconds']:.2f}s")
+                for *_, info in reads.values()
+            )
+        )
+        active_loads: set = set()
+
+        for fkey, (up_file, data, digest, info) in reads.items():
             with st.expander(f"📄 {up_file.name}", expanded=True):
-                try:
-                    df_raw = eng.read_uploaded_file(up_file)
-                except Exception as e:
-                    st.error(f"Erro ao ler {up_file.name}: {e}")
+                if info["error"] is not None:
+                    st.error(f"Erro ao ler {up_file.name}: {info['error']}")
                     continue
+                df_raw = info["df"]
+                rows   = info["rows"] if info["rows"] is not None else len(df_raw)
 
-                st.caption(f"{len(df_raw):,} linhas · {len(df_raw.columns)} colunas")
+                st.caption(f"~{rows:,} linhas · {len(df_raw.columns)} colunas · amostra lida em {info['seconds']:.2f}s")
 
                 # Preview (checkbox evita expander aninhado — não suportado pelo Streamlit)
-                if st.checkbox("👁️ Pré-visualizar dados (5 linhas)", key=f"prev_{up_file.name}"):
+                if st.checkbox("👁️ Pré-visualizar dados (5 linhas)", key=f"prev_{fkey}"):
                     st.dataframe(df_raw.head(5), use_container_width=True)
 
-                csv_cols  = list(df_raw.columns)
-                detected  = eng.auto_detect_columns(csv_cols)
-
-                ALL_INTERNAL = (
-                    eng.REQUIRED_COLS
-                    + eng.IMPORTANT_COLS
-                    + [
-                        "valor_nao_cedido", "valor_terceiro", "valor_cip",
-                        "tipo", "nome_cliente", "documento",
-                        "contrato", "classe", "situacao", "status_conta",
-                        "is_voltz",
-                    ]
-                )
+                csv_cols    = list(df_raw.columns)
+                distributor = eng.distributor_from_filename(up_file.name)
+                profile     = eng.load_mapping_profile(csv_cols, distributor)
+                detected    = profile if profile is not None else eng.auto_detect_columns(csv_cols)
+
+                ALL_INTERNAL = eng.MAPPABLE_COLS
 
                 # Status da detecção
                 ok  = [c for c in ALL_INTERNAL if c in detected]
@@ -159,27 +270,49 @@ with tab_upload:
                 c1.success(f"✓ {len(ok)} campos detectados")
                 c2.warning(f"○ {len(nok)} campos não detectados")
 
-                # Tabela de mapeamento
-                st.markdown("**Confirme o mapeamento:**")
-                mapping = {}
-                opts = ["— não usar —"] + csv_cols
-
-                cols_per_row = 3
-                internal_list = ALL_INTERNAL
-                for i in range(0, len(internal_list), cols_per_row):
-                    row_cols = st.columns(cols_per_row)
-                    for j, internal in enumerate(internal_list[i : i + cols_per_row]):
-                        current = detected.get(internal, "")
-                        is_req  = internal in eng.REQUIRED_COLS
-                        label   = f"{'🔴 ' if is_req else ''}{internal}"
-                        sel = row_cols[j].selectbox(
-                            label,
-                            options=opts,
-                            index=opts.index(current) if current in opts else 0,
-                            key=f"map_{up_file.name}_{internal}",
-                        )
-                        if sel != "— não usar —":
-                            mapping[internal] = sel
+                # Cabeçalho já confirmado antes: aplica o perfil sem abrir a tabela
+                review    = True
+                confirmed = False
+                if profile is not None:
+                    st.info("📌 Cabeçalho reconhecido — perfil de mapeamento salvo aplicado automaticamente.")
+                    review = st.checkbox("✏️ Revisar mapeamento", key=f"rev_{fkey}")
+
+                if review:
+                    # Tabela de mapeamento em formulário: trocar um campo não dispara rerun
+                    mapping = {}
+                    opts = ["— não usar —"] + csv_cols
+                    with st.form(key=f"form_map_{fkey}"):
+                        st.markdown("**Confirme o mapeamento:**")
+                        cols_per_row = 3
+                        internal_list = ALL_INTERNAL
+                        for i in range(0, len(internal_list), cols_per_row):
+                            row_cols = st.columns(cols_per_row)
+                            for j, internal in enumerate(internal_list[i : i + cols_per_row]):
+                                current = detected.get(internal, "")
+                                is_req  = internal in eng.REQUIRED_COLS
+                                label   = f"{'🔴 ' if is_req else ''}{internal}"
+                                sel = row_cols[j].selectbox(
+                                    label,
+                                    options=opts,
+                                    index=opts.index(current) if current in opts else 0,
+                                    key=f"map_{fkey}_{internal}",
+                                )
+                                if sel != "— não usar —":
+                                    mapping[internal] = sel
+                        confirmed = st.form_submit_button("💾 Confirmar mapeamento")
+                    if confirmed and eng.save_mapping_profile(csv_cols, mapping, distributor):
+                        st.success("Perfil salvo — próximos arquivos com este cabeçalho serão mapeados automaticamente.")
+                else:
+                    mapping = dict(profile)
+
+                # Mapeamento confirmado (ou perfil aplicado): carga completa em segundo plano
+                load_key = _load_key(up_file.name, digest, mapping)
+                if not review or confirmed or load_key in st.session_state.full_loads:
+                    if _full_load(up_file.name, data, digest, mapping).pronta:
+                        st.caption("📥 Base completa carregada.")
+                    else:
+                        st.caption(f"⏳ Carregando a base completa em segundo plano ({len(load_key[2])} colunas)...")
+                active_loads.add(load_key)
 
                 # Verifica obrigatórios
                 missing = [c for c in eng.REQUIRED_COLS if c not in mapping]
@@ -191,14 +324,21 @@ with tab_upload:
                 new_files_data.append({
                     "name":    up_file.name,
                     "df_raw":  df_raw,
+                    "rows":    rows,
+                    "data":    data,
+                    "digest":  digest,
                     "mapping": mapping,
                 })
 
+        # Cargas de arquivos removidos ou de mapeamentos anteriores não são mais usadas
+        for stale in set(st.session_state.full_loads) - active_loads:
+            st.session_state.full_loads.pop(stale).cancelar()
+
         st.session_state.files_data = new_files_data
         st.session_state.calc_done  = False
 
         if new_files_data:
-            total_rows = sum(len(f["df_raw"]) for f in new_files_data)
+            total_rows = sum(f["rows"] for f in new_files_data)
             st.success(f"✅ {len(new_files_data)} arquivo(s) · {total_rows:,} linhas prontas para cálculo.")
 
     elif not st.session_state.files_data:
@@ -268,10 +408,17 @@ with tab_params:
                     )
                 st.success(f"✅ {len(ipca)} pontos IPCA carregados.")
 
-            # Se ainda não carregou, usa fallback
+            # Se ainda não carregou, usa o cache local (ou as séries embutidas)
             if st.session_state.idx_df is None:
                 st.session_state.idx_df = eng.build_index_series()
-                st.info("ℹ️ Usando índices embutidos (IGP-M até mai/2021 + IPCA fallback).")
+                ipca_cache = eng.index_cache_info().get("ipca")
+                if ipca_cache:
+                    st.info(
+                        f"ℹ️ IPCA do cache local até {ipca_cache['fim']} "
+                        f"({ipca_cache['fonte']}, atualizado em {ipca_cache['atualizado_em'][:10]})."
+                    )
+                else:
+                    st.info("ℹ️ Usando índices embutidos (IGP-M até mai/2021 + IPCA fallback).")
 
             if st.session_state.idx_df is not None:
                 df_idx = st.session_state.idx_df
@@ -443,18 +590,29 @@ with tab_calc:
                 all_results: list[pd.DataFrame] = []
                 total_files = len(files_data)
 
-                for i, fd in enumerate(files_data):
+                # Cargas completas que ainda não começaram vão todas para o pool agora
+                loads = [_full_load(fd["name"], fd["data"], fd["digest"], fd["mapping"]) for fd in files_data]
+
+                for i, (fd, load) in enumerate(zip(files_data, loads)):
                     fname   = fd["name"]
-                    df_raw  = fd["df_raw"]
                     mapping = fd["mapping"]
 
                     pct = int((i / total_files) * 80)
                     progress.progress(pct, text=f"Processando {fname}...")
+                    if not load.pronta:
+                        status.info(f"⏳ {fname} — aguardando a carga completa...")
+                    loaded_full = eng.full_load_result(load)
+                    if loaded_full["error"] is not None:
+                        raise ValueError(f"{fname}: {loaded_full['error']}")
+                    df_raw = loaded_full["df"]
                     status.info(f"📄 {fname} — {len(df_raw):,} linhas")
 
-                    # Renomear colunas conforme mapeamento
+                    # Mapeamento usado vira o perfil do cabeçalho (cabeçalho completo da amostra)
+                    eng.save_mapping_profile(list(fd["df_raw"].columns), mapping, eng.distributor_from_filename(fname))
+
+                    # Renomear colunas conforme mapeamento (sem copiar: calculate() já copia a entrada)
                     rename_map = {v: k for k, v in mapping.items()}
-                    df = df_raw.rename(columns=rename_map).copy()
+                    df = df_raw.rename(columns=rename_map, copy=False)
 
                     # Detectar VOLTZ pelo nome do arquivo
                     is_voltz_file = "VOLTZ" in fname.upper()
@@ -493,6 +651,9 @@ with tab_calc:
                 st.session_state.df_result = df_final
                 st.session_state.summary   = summary
                 st.session_state.calc_done = True
+                st.session_state.run_id    = uuid4().hex
+                st.session_state.run_ts    = datetime.now().strftime("%Y%m%d_%H%M%S")
+                _discard_exports()
 
                 elapsed = time.time() - t_start
                 progress.progress(100, text="Concluído!")
@@ -635,32 +796,46 @@ with tab_results:
     st.markdown("---")
     st.subheader("Exportar Resultados")
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ts = st.session_state.run_ts or datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_params = dict(st.session_state.params)
 
-    c_xlsx, c_csv, _ = st.columns([1, 1, 2])
+    c_xlsx, c_csv, c_parquet, c_arrow = st.columns(4)
 
     with c_xlsx:
-        with st.spinner("Gerando Excel..."):
-            xlsx_bytes = eng.to_excel_bytes(df_res, s)
-        st.download_button(
-            label="📥 Baixar Excel (.xlsx)",
-            data=xlsx_bytes,
-            file_name=f"fidc_resultado_{ts}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True,
+        xlsx_export = _export_file("xlsx", ".xlsx", "Gerando Excel...", lambda path: eng.to_excel_file(df_res, s, path))
+        _file_download_button(
+            "📥 Baixar Excel (.xlsx)", xlsx_export, f"fidc_resultado_{ts}.xlsx",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        xs = xlsx_export["stats"]
+        st.caption(
+            f"{xs['rows']:,} linhas · {xs['sheets']} aba(s) · {xs['seconds']:.1f}s "
+            f"({xs['rows_per_second']:,.0f} linhas/s) · pico {xs['peak_memory_mb']:,.0f} MB"
         )
 
     with c_csv:
-        csv_bytes = eng.to_csv_bytes(df_res)
-        st.download_button(
-            label="📥 Baixar CSV (;)",
-            data=csv_bytes,
-            file_name=f"fidc_resultado_{ts}.csv",
-            mime="text/csv",
-            use_container_width=True,
+        csv_export = _export_file("csv", ".csv", "Gerando CSV...", lambda path: eng.to_csv_file(df_res, path))
+        _file_download_button("📥 Baixar CSV (;)", csv_export, f"fidc_resultado_{ts}.csv", "text/csv")
+        cs = csv_export["stats"]
+        st.caption(f"{cs['size_mb']:,.1f} MB · {cs['seconds']:.1f}s ({cs['rows_per_second']:,.0f} linhas/s)")
+
+    # Formatos colunares: precisão total e datas tipadas (uso pela equipe de risco em pandas/Arrow)
+    with c_parquet:
+        pq_export = _export_file("parquet", ".parquet", "Gerando Parquet...", lambda path: eng.to_parquet_file(df_res, path, run_params))
+        _file_download_button(
+            "📥 Baixar Parquet", pq_export, f"fidc_resultado_{ts}.parquet", "application/vnd.apache.parquet",
+        )
+        st.caption(f"{pq_export['stats']['size_mb']:,.1f} MB · {pq_export['stats']['seconds']:.1f}s")
+
+    with c_arrow:
+        arrow_export = _export_file("arrow", ".arrow", "Gerando Arrow IPC...", lambda path: eng.to_arrow_file(df_res, path, run_params))
+        _file_download_button(
+            "📥 Baixar Arrow IPC", arrow_export, f"fidc_resultado_{ts}.arrow", "application/vnd.apache.arrow.file",
         )
+        st.caption(f"{arrow_export['stats']['size_mb']:,.1f} MB · {arrow_export['stats']['seconds']:.1f}s")
 
     st.caption(
-        "Excel: 3 abas (Resultado, Resumo Aging, Resumo Empresa) · "
-        "CSV: separador `;`, BOM UTF-8, formato pt-BR."
+        "Excel: 3 abas (Resultado, Resumo Aging, Resumo Empresa; Resultado dividido em abas numeradas acima de 1.048.576 linhas) · "
+        "CSV: separador `;`, BOM UTF-8, formato pt-BR · "
+        "Parquet/Arrow: zstd, precisão total, datas tipadas e parâmetros da execução no rodapé."
     )
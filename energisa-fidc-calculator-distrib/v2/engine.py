@@ -1,21 +1,37 @@
 """
 FIDC Calculator v2 — Engine Vetorizada
 ======================================
-Motor de cálculo puro (sem Streamlit, sem IO).
+Motor de cálculo sem Streamlit.
 100% vetorizado: pd.cut / merge_asof / numpy broadcasting.
 
+O IO fica nos módulos compartilhados com o app principal (pacote utils):
+leitura de uploads e do arquivo de índices, cache de uploads, perfis de
+mapeamento, cache local das séries IGP-M/IPCA (data/) e escrita do Excel
+em streaming. As funções de
+cálculo não fazem IO; as exportações (to_*_file) gravam só no destino recebido.
+
 Fórmulas idênticas à vw_fidc_results (Supabase) e ao calculator_vectorized.py
 do worker Railway — fonte da verdade confirmada.
 """
 from __future__ import annotations
 
 import io
+import os
+import time
 from datetime import datetime
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 
+from utils.cache_uploads import ler_com_hash as read_with_hash
+from utils.carregamento_paralelo import CargaPlanilha, ResultadoLeitura, ler_amostra_planilha, linhas_na_dimensao
+from utils.exportacao_excel_streaming import exportar_excel_streaming
+from utils.leitor_excel import abrir_planilha, abrir_planilha_amostra, ler_excel
+from utils.leitor_indices import ler_indices_excel
+from utils.perfis_mapeamento import PerfisMapeamento
+from utils.provedor_indices import VALOR_BASE_IPCA, obter_provedor_indices
+
 # ══════════════════════════════════════════════════════════════════════
 # TABELAS DE REFERÊNCIA
 # ══════════════════════════════════════════════════════════════════════
@@ -110,6 +126,12 @@ COL_SYNONYMS: dict[str, list[str]] = {
 
 REQUIRED_COLS  = ["valor_principal", "data_vencimento"]
 IMPORTANT_COLS = ["empresa", "data_base"]
+MAPPABLE_COLS  = REQUIRED_COLS + IMPORTANT_COLS + [
+    "valor_nao_cedido", "valor_terceiro", "valor_cip",
+    "tipo", "nome_cliente", "documento",
+    "contrato", "classe", "situacao", "status_conta",
+    "is_voltz",
+]
 
 # ══════════════════════════════════════════════════════════════════════
 # ÍNDICE IGP-M HISTÓRICO (hardcoded, base ago/1994=100)
@@ -227,52 +249,42 @@ IGPM_DICT: dict[str, float] = {
     "2021.05": 1069.28900,
 }
 
-IPCA_FALLBACK: dict[str, float] = {
-    "2021.06": 1069.29, "2021.07": 1078.02, "2021.08": 1086.41,
-    "2021.09": 1096.87, "2021.10": 1107.98, "2021.11": 1119.53,
-    "2021.12": 1130.95, "2022.01": 1142.76, "2022.02": 1154.36,
-    "2022.03": 1166.03, "2022.04": 1177.75, "2022.05": 1190.70,
-    "2022.06": 1202.69, "2022.07": 1210.44, "2022.08": 1209.64,
-    "2022.09": 1215.85, "2022.10": 1222.74, "2022.11": 1228.50,
-    "2022.12": 1234.63, "2023.01": 1241.52, "2023.02": 1248.99,
-    "2023.03": 1257.24, "2023.04": 1263.73, "2023.05": 1267.85,
-    "2023.06": 1268.06, "2023.07": 1268.91, "2023.08": 1270.23,
-    "2023.09": 1271.96, "2023.10": 1273.51, "2023.11": 1274.15,
-    "2023.12": 1276.05, "2024.01": 1279.38, "2024.02": 1283.86,
-    "2024.03": 1289.02, "2024.04": 1293.40, "2024.05": 1296.85,
-    "2024.06": 1300.47, "2024.07": 1304.94, "2024.08": 1308.67,
-    "2024.09": 1312.83, "2024.10": 1316.78, "2024.11": 1320.84,
-    "2024.12": 1325.18, "2025.01": 1329.46, "2025.02": 1334.01,
-    "2025.03": 1338.60, "2025.04": 1343.22,
-}
-
 # ══════════════════════════════════════════════════════════════════════
 # CARREGAMENTO DE ÍNDICES
 # ══════════════════════════════════════════════════════════════════════
 
-def load_ipca_from_sidra(valor_base: float = 1069.29) -> dict[str, float]:
-    """Baixa IPCA mensal do IBGE SIDRA e retorna índice acumulado desde 2021.06."""
+# Séries do cache local data/series_indices.json (utils.provedor_indices, o
+# mesmo do app principal): IPCA como variação mensal (%), IGP-M como
+# número-índice. A SIDRA só é consultada no botão de atualização; o app parte
+# do cache ou das séries embutidas.
+IPCA_BASE_VALUE = VALOR_BASE_IPCA
+
+
+def load_ipca(valor_base: float = IPCA_BASE_VALUE) -> dict[str, float]:
+    """IPCA acumulado desde 2021.06 do cache local (sem rede), ou a série embutida."""
+    return obter_provedor_indices().ipca_acumulado(valor_base)
+
+
+def load_igpm() -> dict[str, float]:
+    """IGP-M embutido com os pontos do cache local por cima."""
+    return {**IGPM_DICT, **(obter_provedor_indices().igpm() or {})}
+
+
+def index_cache_info() -> dict[str, dict]:
+    """Fonte, data de atualização e período de cada série do cache."""
+    return obter_provedor_indices().descricao()
+
+
+def load_ipca_from_sidra(valor_base: float = IPCA_BASE_VALUE) -> dict[str, float]:
+    """
+    Baixa IPCA mensal do IBGE SIDRA, grava no cache local e retorna o índice
+    acumulado desde 2021.06. Sem rede (ou sem sidrapy), retorna o cache local.
+    """
     try:
-        import sidrapy
-        df = sidrapy.get_table(
-            table_code="1737",
-            territorial_level="1",
-            ibge_territorial_code="all",
-            variable="63",
-            period=f"202106-{datetime.today().strftime('%Y%m')}",
-            format="pandas",
-        )[["D2C", "V"]][1:]
-        df["V"] = df["V"].astype(float)
-        acumulado = [valor_base]
-        for i in range(1, len(df)):
-            acumulado.append(round(acumulado[-1] * (1 + df.loc[i, "V"] / 100), 4))
-        df["acumulado"] = acumulado
-        return {
-            f"{str(row['D2C'])[:4]}.{str(row['D2C'])[4:]}": row["acumulado"]
-            for _, row in df.iterrows()
-        }
-    except Exception:
-        return IPCA_FALLBACK.copy()
+        obter_provedor_indices().atualizar_da_sidra()
+    except Exception as exc:
+        print(f"[engine] load_ipca_from_sidra erro: {exc}")
+    return load_ipca(valor_base)
 
 
 def build_index_series(
@@ -285,7 +297,7 @@ def build_index_series(
 
     Prioridade:
       1. df_excel (se fornecido) — índices carregados do Excel do usuário
-      2. igpm_dict + ipca_dict — séries hardcoded/SIDRA
+      2. igpm_dict + ipca_dict — cache local (data/series_indices.json) ou embutidas
     """
     if df_excel is not None and not df_excel.empty:
         df = df_excel[["data", "indice"]].rename(columns={"indice": "value"}).copy()
@@ -294,15 +306,12 @@ def build_index_series(
         df["value"] = pd.to_numeric(df["value"], errors="coerce").fillna(0)
         return df[["date", "value"]]
 
-    combined = {**(igpm_dict or IGPM_DICT), **(ipca_dict or IPCA_FALLBACK)}
-    records = []
-    for key, val in combined.items():
-        try:
-            y, m = key.split(".")
-            records.append({"date": pd.Timestamp(f"{y}-{m}-01"), "value": float(val)})
-        except Exception:
-            pass
-    df = pd.DataFrame(records).sort_values("date").reset_index(drop=True)
+    combined = {**(igpm_dict or load_igpm()), **(ipca_dict or load_ipca())}
+    df = pd.DataFrame({
+        "date": pd.to_datetime(pd.Index(combined.keys()), format="%Y.%m", errors="coerce"),
+        "value": pd.to_numeric(pd.Series(list(combined.values())), errors="coerce").to_numpy(),
+    })
+    df = df.dropna().sort_values("date").reset_index(drop=True)
     return df
 
 
@@ -310,74 +319,15 @@ def load_indices_from_excel(
     file_obj, sheet_name: Optional[str] = None
 ) -> Optional[pd.DataFrame]:
     """
-    Carrega série de índices de arquivo Excel.
+    Carrega série de índices de arquivo Excel (utils/leitor_indices.py, o mesmo
+    leitor do app principal: vetorizado e em cache pelo hash do arquivo).
     Suporta duas estruturas:
-      - Aba IGPM_IPCA: colunas C (ano), D (mês), F (índice)
-      - Aba IGPM / genérica: colunas A (data), B (índice)
+      - ≥6 colunas (ex.: aba IGPM_IPCA): colunas C (ano), D (mês), F (índice)
+      - Demais abas (ex.: IGPM): colunas A (data), B (índice)
     Retorna DataFrame com colunas ['data', 'indice'] ou None em erro.
     """
     try:
-        from openpyxl import load_workbook
-
-        if hasattr(file_obj, "read"):
-            if hasattr(file_obj, "seek"):
-                file_obj.seek(0)
-            raw = io.BytesIO(file_obj.read())
-        else:
-            raw = file_obj
-
-        wb = load_workbook(raw, data_only=True, read_only=True)
-        sheet = sheet_name if (sheet_name and sheet_name in wb.sheetnames) else wb.sheetnames[0]
-        ws = wb[sheet]
-
-        rows = [list(r) for r in ws.iter_rows(values_only=True)]
-        df_raw = pd.DataFrame(rows).dropna(how="all").reset_index(drop=True)
-        wb.close()
-
-        # Detectar estrutura: se ≥6 colunas → IGPM_IPCA (cols C,D,F = idx 2,3,5)
-        if df_raw.shape[1] >= 6:
-            df = df_raw.iloc[:, [2, 3, 5]].copy()
-            df.columns = ["ano", "mes", "indice"]
-            df = df.dropna()
-            df["ano"] = pd.to_numeric(df["ano"], errors="coerce")
-            df["mes"] = pd.to_numeric(df["mes"], errors="coerce")
-            df = df.dropna(subset=["ano", "mes"])
-            df = df[(df["ano"] >= 1990) & (df["ano"] <= 2035)]
-            df = df[(df["mes"] >= 1) & (df["mes"] <= 12)]
-            df["data"] = pd.to_datetime(
-                df["ano"].astype(int).astype(str) + "-"
-                + df["mes"].astype(int).astype(str).str.zfill(2) + "-01"
-            )
-        else:
-            # Estrutura simples: col A=data, col B=índice
-            df = df_raw.iloc[:, [0, 1]].copy()
-            df.columns = ["data_raw", "indice"]
-            df = df.dropna(subset=["data_raw"])
-
-            datas = []
-            for v in df["data_raw"]:
-                if isinstance(v, datetime):
-                    datas.append(pd.Timestamp(v.year, v.month, 1))
-                elif isinstance(v, (int, float)):
-                    from datetime import timedelta
-                    d = datetime(1899, 12, 30) + timedelta(days=int(v))
-                    datas.append(pd.Timestamp(d.year, d.month, 1))
-                else:
-                    try:
-                        t = pd.to_datetime(str(v), dayfirst=True, errors="coerce")
-                        datas.append(t.replace(day=1) if not pd.isnull(t) else pd.NaT)
-                    except Exception:
-                        datas.append(pd.NaT)
-            df["data"] = datas
-
-        df["indice"] = (
-            df["indice"].astype(str).str.replace(",", ".", regex=False)
-        )
-        df["indice"] = pd.to_numeric(df["indice"], errors="coerce")
-        df = df.dropna(subset=["data", "indice"])
-        df = df[["data", "indice"]].sort_values("data").reset_index(drop=True)
-        return df
-
+        return ler_indices_excel(file_obj).curva(sheet_name)
     except Exception as exc:
         print(f"[engine] load_indices_from_excel erro: {exc}")
         return None
@@ -389,9 +339,7 @@ def load_recovery_rates_from_excel(file_obj) -> Optional[pd.DataFrame]:
     Espera colunas: Empresa, Tipo, Aging, Taxa de recuperação, Prazo de recebimento
     """
     try:
-        if hasattr(file_obj, "seek"):
-            file_obj.seek(0)
-        df = pd.read_excel(file_obj, dtype=str)
+        df = ler_excel(file_obj, dtype=str)
         df.columns = [str(c).strip() for c in df.columns]
 
         # Normaliza nomes de colunas
@@ -440,9 +388,7 @@ def load_di_pre_from_excel(file_obj) -> Optional[pd.DataFrame]:
     Espera colunas: meses_futuros (ou Prazo), 252 (taxa 252 d.u.)
     """
     try:
-        if hasattr(file_obj, "seek"):
-            file_obj.seek(0)
-        df = pd.read_excel(file_obj, dtype=str)
+        df = ler_excel(file_obj, dtype=str)
         df.columns = [str(c).strip() for c in df.columns]
 
         rename: dict[str, str] = {}
@@ -485,6 +431,39 @@ def auto_detect_columns(csv_cols: list[str]) -> dict[str, str]:
     return mapping
 
 
+# ══════════════════════════════════════════════════════════════════════
+# PERFIS DE MAPEAMENTO (aprendidos por distribuidora + cabeçalho)
+# ══════════════════════════════════════════════════════════════════════
+
+def distributor_from_filename(name: str) -> str:
+    """Tipo de distribuidora usado na chave do perfil (mesma regra do cálculo)."""
+    return "VOLTZ" if "VOLTZ" in str(name).upper() else "PADRAO"
+
+
+def load_mapping_profile(csv_cols: list[str], distributor: str = "PADRAO") -> Optional[dict[str, str]]:
+    """
+    Mapeamento {interno: csv_col} confirmado antes para o mesmo cabeçalho, ou None.
+    Perfis em data/perfis_mapeamento.json (utils.perfis_mapeamento, os mesmos
+    do app principal); só os campos de MAPPABLE_COLS são usados.
+    """
+    mapping = PerfisMapeamento().obter(distributor, csv_cols, campos=MAPPABLE_COLS)
+    if mapping is None:
+        return None
+    return {internal: col for internal, col in mapping.items() if col is not None} or None
+
+
+def save_mapping_profile(csv_cols: list[str], mapping: dict[str, str], distributor: str = "PADRAO") -> bool:
+    """Grava o mapeamento como perfil do cabeçalho (escrita atômica). False se não gravou."""
+    if not mapping:
+        return False
+    try:
+        PerfisMapeamento().registrar(distributor, csv_cols, mapping, campos=MAPPABLE_COLS)
+    except OSError as exc:
+        print(f"[engine] save_mapping_profile erro: {exc}")
+        return False
+    return True
+
+
 # ══════════════════════════════════════════════════════════════════════
 # PARSING HELPERS
 # ══════════════════════════════════════════════════════════════════════
@@ -522,16 +501,23 @@ def parse_date_col(series: pd.Series) -> pd.Series:
     return parsed
 
 
-def read_uploaded_file(file_obj) -> pd.DataFrame:
-    """Lê CSV ou Excel com detecção de encoding/separador."""
+def read_uploaded_file(
+    file_obj, nrows: Optional[int] = None, columns: Optional[list[str]] = None
+) -> pd.DataFrame:
+    """
+    Lê CSV ou Excel com detecção de encoding/separador.
+    nrows: só as primeiras linhas (amostra). columns: só essas colunas
+    (nomes já sem espaços nas pontas, como no DataFrame retornado).
+    """
     name = getattr(file_obj, "name", "")
+    usecols = None
+    if columns is not None:
+        keep = frozenset(columns)
+        usecols = lambda c: str(c).strip() in keep  # noqa: E731
     if name.lower().endswith((".xlsx", ".xls")):
-        xl = pd.ExcelFile(file_obj)
-        pref = next(
-            (s for s in xl.sheet_names if s.lower() in ("base", "dados", "data", "sheet1", "planilha1")),
-            xl.sheet_names[0],
-        )
-        df = xl.parse(pref, dtype=str)
+        # Amostra via openpyxl sob demanda: o calamine monta a aba inteira
+        with (abrir_planilha_amostra(file_obj) if nrows else abrir_planilha(file_obj)) as xl:
+            df = xl.parse(_preferred_sheet(xl.sheet_names), dtype=str, nrows=nrows, usecols=usecols)
     else:
         if hasattr(file_obj, "seek"):
             file_obj.seek(0)
@@ -541,6 +527,7 @@ def read_uploaded_file(file_obj) -> pd.DataFrame:
                 df = pd.read_csv(
                     io.BytesIO(raw), sep=None, engine="python",
                     encoding=enc, dtype=str, on_bad_lines="skip",
+                    nrows=nrows, usecols=usecols,
                 )
                 break
             except Exception:
@@ -551,6 +538,89 @@ def read_uploaded_file(file_obj) -> pd.DataFrame:
     return df
 
 
+def _preferred_sheet(sheet_names: list[str]) -> str:
+    return next(
+        (s for s in sheet_names if s.lower() in ("base", "dados", "data", "sheet1", "planilha1")),
+        sheet_names[0],
+    )
+
+
+SAMPLE_ROWS = 200
+
+
+# Carga em duas fases (amostra e base completa em segundo plano), com cache
+# e pool de carga de utils.carregamento_paralelo; os leitores abaixo trazem
+# CSV e Excel como texto, como read_uploaded_file.
+def _read_sample(data: bytes, name: str, nrows: int) -> ResultadoLeitura:
+    """Fase 1: cabeçalho + nrows linhas e o total estimado de linhas."""
+    buf = io.BytesIO(data)
+    buf.name = name
+    sheet = None
+    if name.lower().endswith((".xlsx", ".xls")):
+        with abrir_planilha_amostra(buf) as xl:
+            sheet = _preferred_sheet(xl.sheet_names)
+            rows = linhas_na_dimensao(xl, sheet)
+            df = xl.parse(sheet, dtype=str, nrows=nrows)
+        df.columns = [str(c).strip() for c in df.columns]
+    else:
+        rows = max(data.count(b"\n") - 1 + (not data.endswith(b"\n")), 0)
+        df = read_uploaded_file(buf, nrows=nrows)
+    if len(df) < nrows:
+        rows = len(df)  # a amostra já é o arquivo inteiro
+    return ResultadoLeitura(name, df, aba=sheet, total_linhas=rows)
+
+
+def _read_full(data: bytes, name: str, sheet: Optional[str] = None,
+               columns: Optional[list[str]] = None) -> ResultadoLeitura:
+    """Fase 2: arquivo inteiro, só com as colunas mapeadas (executado no pool de carga)."""
+    buf = io.BytesIO(data)
+    buf.name = name
+    return ResultadoLeitura(name, read_uploaded_file(buf, columns=columns), aba=sheet)
+
+
+def _load_info(result: ResultadoLeitura) -> dict:
+    return {
+        "name": result.nome_arquivo, "df": result.dataframe, "rows": result.total_linhas,
+        "error": result.erro, "seconds": result.segundos, "cached": result.em_cache,
+    }
+
+
+def read_uploaded_sample(
+    name: str, data: bytes, nrows: int = SAMPLE_ROWS, digest: Optional[str] = None
+) -> dict:
+    """
+    Fase 1 do carregamento: cabeçalho + nrows linhas, em milissegundos para
+    qualquer tamanho de arquivo. Suficiente para mapear e validar colunas.
+    Retorna {"name", "df", "rows" (total estimado), "error", "seconds", "cached"}.
+    Com digest (read_with_hash), usa e alimenta o cache de uploads do
+    processo (utils.cache_uploads, o mesmo do app principal).
+    """
+    try:
+        result = ler_amostra_planilha(data, name, nrows, digest, leitor=_read_sample)
+    except Exception as exc:
+        result = ResultadoLeitura(name, erro=str(exc))
+    return _load_info(result)
+
+
+def start_full_load(
+    name: str, data: bytes, columns: Optional[list[str]] = None, digest: Optional[str] = None
+) -> CargaPlanilha:
+    """
+    Fase 2: lê o arquivo inteiro em segundo plano, só com as colunas
+    mapeadas. Retorna na hora a CargaPlanilha (.pronta, .cancelar());
+    use full_load_result para o resultado. Com digest, leitura igual já
+    feita (qualquer sessão) sai do cache.
+    """
+    load = CargaPlanilha(data, name, hash_conteudo=digest, leitor=_read_full)
+    load.iniciar(columns)
+    return load
+
+
+def full_load_result(load: CargaPlanilha) -> dict:
+    """Espera a carga de start_full_load (se o pool de processos caiu, lê aqui mesmo)."""
+    return _load_info(load.resultado())
+
+
 # ══════════════════════════════════════════════════════════════════════
 # LOOKUP VETORIZADO DE ÍNDICES  (merge_asof — O(n log n))
 # ══════════════════════════════════════════════════════════════════════
@@ -683,6 +753,18 @@ def get_di_pre_rate(df_di_pre: Optional[pd.DataFrame], meses: int) -> float:
     return float(closest.iloc[0]["252"])
 
 
+def resolve_di_pre_curve(curve_store, data_base) -> Optional[pd.DataFrame]:
+    """Curva DI-PRE vigente em data_base no repositório. None se indisponível."""
+    try:
+        curva = curve_store.obter_curva(data_base)
+    except Exception as exc:
+        print(f"[engine] resolve_di_pre_curve erro: {exc}")
+        return None
+    if curva is None or curva.empty or "meses_futuros" not in curva.columns or "252" not in curva.columns:
+        return None
+    return curva
+
+
 # ══════════════════════════════════════════════════════════════════════
 # CÁLCULO PRINCIPAL VETORIZADO
 # ══════════════════════════════════════════════════════════════════════
@@ -696,10 +778,14 @@ def calculate(
     spread_percent: float = 0.025,
     prazo_horizonte: int = 6,
     is_voltz_global: bool = False,
+    curve_store=None,
 ) -> pd.DataFrame:
     """
     Pipeline de cálculo vetorizado completo.
 
+    curve_store: repositório de curvas DI-PRE (objeto com obter_curva(data_base)).
+    Quando df_di_pre não é informado, a curva vigente na data base é resolvida nele.
+
     Fórmulas idênticas à vw_fidc_results (Supabase):
       Padrão : VL = max(VP-VNC-VT-VCIP,0)  |  JM simples  |  IGP-M/IPCA
       VOLTZ  : SDV = VP×1.0465              |  JM composto  |  IGP-M
@@ -732,6 +818,10 @@ def calculate(
     df["empresa"] = df.get("empresa", pd.Series("DESCONHECIDA", index=df.index)).fillna("DESCONHECIDA").astype(str).str.strip()
     df["tipo"]    = df.get("tipo",    pd.Series("",             index=df.index)).fillna("").astype(str)
 
+    # ── Curva DI-PRE as-of data_base ────────────────────────────────────
+    if df_di_pre is None and curve_store is not None:
+        df_di_pre = resolve_di_pre_curve(curve_store, data_base or df["data_base"].max())
+
     # ── Escalares ───────────────────────────────────────────────────────
     idx_df_clean = _build_idx_df(idx_df)
     ipca_mensal  = get_ipca_mensal(idx_df_clean)
@@ -889,74 +979,173 @@ OUTPUT_HEADERS = [
 ]
 
 
-def to_excel_bytes(df: pd.DataFrame, summary: dict) -> bytes:
-    """Exporta resultado para Excel com aba de dados e aba de resumo."""
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        # Aba Dados
-        out = df.reindex(columns=OUTPUT_COLS).copy()
-        if "is_voltz" in out.columns:
-            out["is_voltz"] = out["is_voltz"].map(lambda v: "Sim" if v else "Não")
-        for col in ("data_vencimento", "data_base"):
-            if col in out.columns:
-                out[col] = pd.to_datetime(out[col], errors="coerce").dt.strftime("%d/%m/%Y").fillna("")
-        out.columns = OUTPUT_HEADERS[: len(out.columns)]
-        out.to_excel(writer, sheet_name="Resultado", index=False)
-
-        # Aba Resumo por Aging
-        aging_rows = []
-        for label in AGING_LABELS:
-            d = summary["by_aging"].get(label, {})
-            if d:
-                aging_rows.append({
-                    "Aging": label,
-                    "Qtd": d["count"],
-                    "Vlr Principal": d["valor_principal"],
-                    "Vlr Corrigido": d["valor_corrigido"],
-                    "Valor Justo":   d["valor_justo"],
-                })
-        if aging_rows:
-            pd.DataFrame(aging_rows).to_excel(writer, sheet_name="Resumo Aging", index=False)
-
-        # Aba Resumo por Empresa
-        emp_rows = [
-            {
-                "Empresa": emp,
+def _excel_sheets(df: pd.DataFrame, summary: dict):
+    """Abas do Excel de resultado como pares (nome, DataFrame)."""
+    # Aba Dados
+    out = df.reindex(columns=OUTPUT_COLS).copy()
+    if "is_voltz" in out.columns:
+        out["is_voltz"] = out["is_voltz"].map(lambda v: "Sim" if v else "Não")
+    for col in ("data_vencimento", "data_base"):
+        if col in out.columns:
+            out[col] = pd.to_datetime(out[col], errors="coerce").dt.strftime("%d/%m/%Y").fillna("")
+    out.columns = OUTPUT_HEADERS[: len(out.columns)]
+    sheets = [("Resultado", out)]
+
+    # Aba Resumo por Aging
+    aging_rows = []
+    for label in AGING_LABELS:
+        d = summary["by_aging"].get(label, {})
+        if d:
+            aging_rows.append({
+                "Aging": label,
                 "Qtd": d["count"],
                 "Vlr Principal": d["valor_principal"],
                 "Vlr Corrigido": d["valor_corrigido"],
                 "Valor Justo":   d["valor_justo"],
-            }
-            for emp, d in sorted(summary["by_empresa"].items())
-        ]
-        if emp_rows:
-            pd.DataFrame(emp_rows).to_excel(writer, sheet_name="Resumo Empresa", index=False)
+            })
+    if aging_rows:
+        sheets.append(("Resumo Aging", pd.DataFrame(aging_rows)))
+
+    # Aba Resumo por Empresa
+    emp_rows = [
+        {
+            "Empresa": emp,
+            "Qtd": d["count"],
+            "Vlr Principal": d["valor_principal"],
+            "Vlr Corrigido": d["valor_corrigido"],
+            "Valor Justo":   d["valor_justo"],
+        }
+        for emp, d in sorted(summary["by_empresa"].items())
+    ]
+    if emp_rows:
+        sheets.append(("Resumo Empresa", pd.DataFrame(emp_rows)))
+
+    return sheets
+
+
+def to_excel_file(df: pd.DataFrame, summary: dict, target) -> dict:
+    """
+    Exporta resultado para Excel em modo streaming (``exportar_excel_streaming``).
+
+    ``target`` é um caminho em disco (recomendado) ou um objeto file-like.
+    Acima de 1.048.576 linhas o resultado é dividido em abas numeradas
+    (Resultado, Resultado_2, ...). Retorna estatísticas: linhas, abas,
+    segundos, linhas/s e pico de memória (MB) amostrado durante a exportação.
+    """
+    stats = exportar_excel_streaming(target, _excel_sheets(df, summary))
+    return {
+        "rows": len(df),
+        "sheets": len(stats.abas),
+        "seconds": stats.segundos,
+        "rows_per_second": len(df) / stats.segundos if stats.segundos > 0 else 0.0,
+        "peak_memory_mb": stats.pico_memoria_mb,
+        "peak_memory_before_mb": stats.memoria_inicial_mb,
+    }
 
+
+def to_excel_bytes(df: pd.DataFrame, summary: dict) -> bytes:
+    """Exporta resultado para Excel com aba de dados e aba de resumo."""
+    buf = io.BytesIO()
+    to_excel_file(df, summary, buf)
     buf.seek(0)
     return buf.read()
 
 
-def to_csv_bytes(df: pd.DataFrame) -> bytes:
-    """Exporta resultado para CSV semicolon, BOM UTF-8, formato pt-BR."""
-    out = df.reindex(columns=OUTPUT_COLS).copy()
+CSV_FLOAT_COLS = (
+    "valor_principal_limpo", "valor_nao_cedido", "valor_terceiro", "valor_cip",
+    "valor_liquido", "multa", "juros_moratorios", "fator_correcao",
+    "correcao_monetaria", "valor_corrigido",
+    "juros_remuneratorios", "saldo_devedor_vencimento",
+    "taxa_recuperacao", "valor_recuperavel", "valor_justo",
+)
+CSV_CHUNK_ROWS = 200_000
+
+
+def _csv_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Formata um bloco de linhas no padrão do CSV pt-BR (datas dd/mm/aaaa, 2 casas com vírgula)."""
+    out = chunk.reindex(columns=OUTPUT_COLS)
     if "is_voltz" in out.columns:
-        out["is_voltz"] = out["is_voltz"].map(lambda v: "Sim" if v else "Não")
+        out["is_voltz"] = np.where(out["is_voltz"].astype(bool), "Sim", "Não")
     for col in ("data_vencimento", "data_base"):
         if col in out.columns:
             out[col] = pd.to_datetime(out[col], errors="coerce").dt.strftime("%d/%m/%Y").fillna("")
-    float_cols = [
-        "valor_principal_limpo", "valor_nao_cedido", "valor_terceiro", "valor_cip",
-        "valor_liquido", "multa", "juros_moratorios", "fator_correcao",
-        "correcao_monetaria", "valor_corrigido",
-        "juros_remuneratorios", "saldo_devedor_vencimento",
-        "taxa_recuperacao", "valor_recuperavel", "valor_justo",
-    ]
-    for col in float_cols:
-        if col in out.columns:
-            out[col] = out[col].apply(lambda v: "" if pd.isna(v) else f"{float(v):.2f}".replace(".", ","))
     for col in out.select_dtypes(include="object").columns:
+        if col in CSV_FLOAT_COLS:
+            continue
         out[col] = out[col].fillna("").astype(str).str.replace(";", ",", regex=False)
+    # Só as colunas de valor ficam float64 (2 casas, vírgula via float_format/decimal no to_csv);
+    # demais floats saem com a representação padrão, com ponto.
+    for col in out.columns:
+        if col in CSV_FLOAT_COLS:
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype("float64")
+        elif out[col].dtype.kind == "f":
+            out[col] = out[col].astype(object)
     out.columns = OUTPUT_HEADERS[: len(out.columns)]
-    buf = io.StringIO()
-    out.to_csv(buf, sep=";", index=False, lineterminator="\r\n")
-    return ("\ufeff" + buf.getvalue()).encode("utf-8")
+    return out
+
+
+def to_csv_file(df: pd.DataFrame, target, chunk_rows: int = CSV_CHUNK_ROWS) -> dict:
+    """
+    Exporta resultado para CSV semicolon, BOM UTF-8, formato pt-BR, em blocos.
+
+    ``target`` é um caminho em disco (recomendado) ou um objeto file-like binário.
+    Só um bloco de ``chunk_rows`` linhas é formatado como texto por vez.
+    Retorna estatísticas: linhas, segundos, linhas/s e tamanho (MB).
+    """
+    t0 = time.perf_counter()
+    own_file = isinstance(target, (str, os.PathLike))
+    handle = open(target, "wb") if own_file else target
+    written = 0
+    try:
+        handle.write("\ufeff".encode("utf-8"))
+        for start in range(0, max(len(df), 1), chunk_rows):
+            block = _csv_chunk(df.iloc[start:start + chunk_rows]).to_csv(
+                sep=";", index=False, header=start == 0, lineterminator="\r\n",
+                float_format="%.2f", decimal=",",
+            ).encode("utf-8")
+            handle.write(block)
+            written += len(block) + (3 if start == 0 else 0)
+    finally:
+        if own_file:
+            handle.close()
+
+    seconds = time.perf_counter() - t0
+    return {
+        "rows": len(df),
+        "seconds": seconds,
+        "rows_per_second": len(df) / seconds if seconds > 0 else 0.0,
+        "size_mb": written / 1024 ** 2,
+    }
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Exporta resultado para CSV semicolon, BOM UTF-8, formato pt-BR."""
+    buf = io.BytesIO()
+    to_csv_file(df, buf)
+    return buf.getvalue()
+
+
+def _columnar_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas de saída em tipos nativos (float64 e datas sem conversão para texto)."""
+    return df.reindex(columns=[c for c in OUTPUT_COLS if c in df.columns]).copy(deep=False)
+
+
+def to_parquet_file(df: pd.DataFrame, target, params: Optional[dict] = None) -> None:
+    """Exporta resultado para Parquet (``salvar_parquet``) em caminho ou file-like."""
+    from utils.exportacao_colunar import salvar_parquet
+
+    salvar_parquet(_columnar_frame(df), target, params)
+
+
+def to_arrow_file(df: pd.DataFrame, target, params: Optional[dict] = None) -> None:
+    """Exporta resultado para Arrow IPC / Feather v2 (``salvar_arrow_ipc``) em caminho ou file-like."""
+    from utils.exportacao_colunar import salvar_arrow_ipc
+
+    salvar_arrow_ipc(_columnar_frame(df), target, params)
+
+
+def read_columnar_metadata(source) -> dict:
+    """Lê o rodapé fidc.* (versão, data de geração, registros, parâmetros) de Parquet ou Arrow."""
+    from utils.exportacao_colunar import ler_metadados
+
+    return ler_metadados(source)